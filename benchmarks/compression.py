@@ -0,0 +1,120 @@
+"""
+Response size and latency with each negotiated content coding.
+
+Serves the app with uvicorn on a local port and fetches three typical large
+payloads with Accept-Encoding set to identity, gzip, br and zstd in turn:
+
+- /api/files/list/ for a directory of 10,000 files
+- /api/tasks/ after planning 300 report tasks, each with its subtasks
+- /api/files/read/ of a ~1 MiB text file
+
+Reported bytes are what went over the wire. Latency is the full request time
+on loopback, where transfer is nearly free, so it mostly shows the CPU cost
+of compressing; on a real network the smaller bodies win back transfer time.
+
+Usage:
+    python benchmarks/compression.py [--files 10000] [--tasks 300] [--requests 30]
+"""
+
+import argparse
+import asyncio
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+import httpx
+
+from io_latency import percentile, serve
+from api.tasks import get_task_planner
+from main import app
+from utils.compression import available_encodings
+
+
+def seed_tasks(count: int) -> None:
+    async def plan():
+        for i in range(count):
+            await get_task_planner().plan_task(
+                f"生成第 {i} 季度销售报告，包含数据分析和图表"
+            )
+
+    asyncio.run(plan())
+
+
+def measure(base_url, url, params, encoding, requests):
+    latencies = []
+    wire_bytes = 0
+    with httpx.Client(base_url=base_url, timeout=60) as c:
+        for _ in range(requests):
+            started = time.perf_counter()
+            with c.stream(
+                "GET", url, params=params, headers={"Accept-Encoding": encoding}
+            ) as response:
+                assert response.status_code == 200, response.status_code
+                wire_bytes = sum(len(chunk) for chunk in response.iter_raw())
+            latencies.append((time.perf_counter() - started) * 1000)
+    return wire_bytes, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=10_000)
+    parser.add_argument("--tasks", type=int, default=300)
+    parser.add_argument("--requests", type=int, default=30)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp()).resolve()
+    try:
+        listing_dir = workdir / "listing"
+        listing_dir.mkdir()
+        for i in range(args.files):
+            (listing_dir / f"project-report-{i:05d}.docx").write_bytes(b"x" * (i % 97))
+
+        text_file = workdir / "notes.md"
+        with open(text_file, "w", encoding="utf-8") as f:
+            i = 0
+            while f.tell() < 1024 * 1024:
+                f.write(f"- [{i:05d}] 会议纪要：讨论第 {i % 12 + 1} 月预算与进度安排\n")
+                i += 1
+
+        seed_tasks(args.tasks)
+
+        payloads = (
+            (
+                f"list {args.files} files",
+                "/api/files/list/",
+                {"path": str(listing_dir)},
+            ),
+            (f"list {args.tasks} tasks", "/api/tasks/", None),
+            ("read 1 MiB text", "/api/files/read/", {"path": str(text_file)}),
+        )
+        encodings = ["identity"] + available_encodings()[::-1]
+
+        server, thread, base_url = serve(app)
+        try:
+            for label, url, params in payloads:
+                print(f"\n{label}")
+                baseline = None
+                for encoding in encodings:
+                    size, latencies = measure(
+                        base_url, url, params, encoding, args.requests
+                    )
+                    baseline = baseline or size
+                    print(
+                        f"  {encoding:<9} {size:>10,} B ({size / baseline:6.1%})"
+                        f"   p50 {statistics.median(latencies):7.2f} ms"
+                        f"   p99 {percentile(latencies, 0.99):7.2f} ms"
+                    )
+        finally:
+            server.should_exit = True
+            thread.join()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Latency of small file API requests while slow large reads run concurrently.
+
+Compares a handler that reads files directly on the event loop (how the file
+API used to work) with the current handlers, which run file I/O on the
+per-mount IOExecutor. Each app is served by uvicorn on a local port. Small
+requests (/health and a 1 KiB /read/) are timed from one client while other
+clients keep reading a large file.
+
+A slow network mount is emulated by sleeping before every read of the large
+file; like a blocking read() syscall, time.sleep holds up its thread without
+holding the GIL.
+
+Usage:
+    python benchmarks/io_latency.py [--latency-ms 50] [--readers 4] [--requests 200]
+"""
+
+import argparse
+import shutil
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Query
+
+import api.file_system as file_system
+from main import app
+
+
+def slow_reads(large_file: Path, latency: float):
+    """Wrap the file API's text sniffing so reads of large_file stall."""
+    sniff = file_system.is_probably_text
+
+    def is_probably_text(path, *args, **kwargs):
+        if Path(path) == large_file:
+            time.sleep(latency)
+        return sniff(path, *args, **kwargs)
+
+    file_system.is_probably_text = is_probably_text
+
+
+def build_blocking_app(large_file: Path, latency: float) -> FastAPI:
+    """App with the previous handlers, which block the event loop."""
+    blocking_app = FastAPI()
+
+    @blocking_app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    @blocking_app.get("/api/files/read/")
+    async def read_file(path: str = Query(...)):
+        file_path = Path(path).resolve()
+        if file_path == large_file:
+            time.sleep(latency)
+        with open(file_path, "r", encoding="utf-8") as f:
+            return {"path": str(file_path), "content": f.read()}
+
+    return blocking_app
+
+
+def serve(target_app) -> tuple:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+
+    config = uvicorn.Config(target_app, port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def measure(target_app, large_file, small_file, readers, requests):
+    server, thread, base_url = serve(target_app)
+    stop = threading.Event()
+
+    def large_reader():
+        with httpx.Client(base_url=base_url, timeout=60) as c:
+            while not stop.is_set():
+                c.get("/api/files/read/", params={"path": str(large_file)})
+
+    background = [threading.Thread(target=large_reader) for _ in range(readers)]
+    for t in background:
+        t.start()
+    time.sleep(0.2)
+
+    latencies = {"/health": [], "small /read/": []}
+    with httpx.Client(base_url=base_url, timeout=60) as c:
+        for i in range(requests):
+            if i % 2:
+                name, url, params = "/health", "/health", None
+            else:
+                name, url = "small /read/", "/api/files/read/"
+                params = {"path": str(small_file)}
+
+            started = time.perf_counter()
+            response = c.get(url, params=params)
+            latencies[name].append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.text
+            time.sleep(0.005)
+
+    stop.set()
+    for t in background:
+        t.join()
+    server.should_exit = True
+    thread.join()
+    return latencies
+
+
+def report(label, latencies):
+    print(f"\n{label}")
+    for name, samples in latencies.items():
+        print(
+            f"  {name:<14} p50 {statistics.median(samples):8.2f} ms"
+            f"   p99 {percentile(samples, 0.99):8.2f} ms"
+            f"   max {max(samples):8.2f} ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--large-kb", type=int, default=1024)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp()).resolve()
+    try:
+        large_file = workdir / "large.txt"
+        large_file.write_text("0123456789abcdef\n" * (args.large_kb * 64))
+
+        small_file = workdir / "small.txt"
+        small_file.write_text("x" * 1024)
+
+        latency = args.latency_ms / 1000
+        slow_reads(large_file, latency)
+
+        print(
+            f"{args.readers} concurrent readers of a {args.large_kb} KiB file "
+            f"with {args.latency_ms:g} ms read latency, "
+            f"{args.requests} small requests"
+        )
+        for label, target_app in (
+            ("blocking handlers (before)", build_blocking_app(large_file, latency)),
+            ("IOExecutor handlers (after)", app),
+        ):
+            latencies = measure(
+                target_app, large_file, small_file, args.readers, args.requests
+            )
+            report(label, latencies)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
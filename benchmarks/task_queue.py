@@ -0,0 +1,159 @@
+"""
+Cost of queue operations with 100,000 pending tasks.
+
+Times enqueue, dequeue, reprioritize and remove on PriorityTaskQueue, the
+indexed heap behind TaskQueue, against the two obvious alternatives:
+
+- a deque (what TaskQueue used before), which is FIFO only; honouring
+  priorities means scanning it for the best task on every dequeue
+- heapq with lazy deletion, which is fast but cannot reprioritize or remove
+  in place; stale entries stay in the heap until they reach the top
+
+Scans are O(n) per operation, so they are timed on a sample of operations
+and reported per operation like the rest.
+
+Usage:
+    python benchmarks/task_queue.py [--tasks 100000] [--sample 200]
+"""
+
+import argparse
+import heapq
+import itertools
+import random
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from core.priority_queue import PRIORITY_RANKS, PriorityTaskQueue
+from models.task import Task, TaskPriority
+
+
+def make_tasks(count: int):
+    rnd = random.Random(7)
+    priorities = list(TaskPriority)
+    return [
+        Task(id=f"task-{i}", description="benchmark", priority=rnd.choice(priorities))
+        for i in range(count)
+    ]
+
+
+def bench_heap(tasks, sample):
+    rnd = random.Random(1)
+    queue = PriorityTaskQueue()
+    ids = [task.id for task in tasks]
+
+    started = time.perf_counter()
+    for task in tasks:
+        queue.push(task)
+    push = time.perf_counter() - started
+
+    targets = rnd.sample(ids, sample * 2)
+    started = time.perf_counter()
+    for task_id in targets[:sample]:
+        queue.reprioritize(task_id, rnd.choice(list(TaskPriority)))
+    reprioritize = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for task_id in targets[sample:]:
+        queue.remove(task_id)
+    remove = time.perf_counter() - started
+
+    count = len(queue)
+    started = time.perf_counter()
+    while queue:
+        queue.pop()
+    pop = time.perf_counter() - started
+    return push / len(tasks), pop / count, reprioritize / sample, remove / sample
+
+
+def bench_deque(tasks, sample):
+    rnd = random.Random(1)
+    queue = deque()
+    started = time.perf_counter()
+    for task in tasks:
+        queue.append(task)
+    push = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(sample):
+        best = min(queue, key=lambda t: PRIORITY_RANKS[t.priority])
+        queue.remove(best)
+    pop = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(sample):
+        queue.remove(queue[rnd.randrange(len(queue))])
+    remove = time.perf_counter() - started
+    return push / len(tasks), pop / sample, None, remove / sample
+
+
+def bench_lazy_heap(tasks, sample):
+    rnd = random.Random(1)
+    heap = []
+    live = {}
+    sequence = itertools.count()
+    started = time.perf_counter()
+    for task in tasks:
+        entry = [PRIORITY_RANKS[task.priority], next(sequence), task]
+        live[task.id] = entry
+        heapq.heappush(heap, entry)
+    push = time.perf_counter() - started
+
+    targets = rnd.sample(list(live), sample * 2)
+    started = time.perf_counter()
+    for task_id in targets[:sample]:
+        # Mark the old entry dead and push a replacement, which also loses
+        # the task's FIFO position
+        old = live[task_id]
+        rank = PRIORITY_RANKS[rnd.choice(list(TaskPriority))]
+        entry = [rank, next(sequence), old[2]]
+        old[2] = None
+        live[task_id] = entry
+        heapq.heappush(heap, entry)
+    reprioritize = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for task_id in targets[sample:]:
+        live.pop(task_id)[2] = None
+    remove = time.perf_counter() - started
+
+    count = len(live)
+    started = time.perf_counter()
+    while heap:
+        entry = heapq.heappop(heap)
+        if entry[2] is not None:
+            del live[entry[2].id]
+    pop = time.perf_counter() - started
+    return push / len(tasks), pop / count, reprioritize / sample, remove / sample
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--sample", type=int, default=200)
+    args = parser.parse_args()
+
+    tasks = make_tasks(args.tasks)
+    priorities = [task.priority for task in tasks]
+    print(f"{args.tasks:,} queued tasks\n")
+    print(f"{'':<22}{'enqueue':>15}{'dequeue':>15}{'reprioritize':>15}{'remove':>15}")
+    for label, bench in (
+        ("indexed heap", bench_heap),
+        ("deque + scan", bench_deque),
+        ("heapq, lazy delete", bench_lazy_heap),
+    ):
+        # Reprioritizing changes tasks in place; start each run the same
+        for task, priority in zip(tasks, priorities):
+            task.priority = priority
+        results = bench(tasks, args.sample)
+        cells = [
+            "n/a".rjust(15) if r is None else f"{r * 1e6:12.2f} µs" for r in results
+        ]
+        print(f"{label:<22}" + "".join(cells))
+
+
+if __name__ == "__main__":
+    main()
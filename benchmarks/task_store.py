@@ -0,0 +1,105 @@
+"""
+Sustained task state transitions per second.
+
+Drives tasks through the executor lifecycle (preparing, running,
+completed, result) for a fixed time and counts transitions that are
+durable at the end, against:
+
+- MemoryTaskStore, the old process-local dicts; nothing survives a restart
+- SQLiteTaskStore with group commit, as TaskExecutor uses it
+- SQLite with one transaction per transition, the naive persistent store
+
+Each transition of the group-committed store is acknowledged at once and
+committed within flush_interval; the final flush is included in the time.
+
+Usage:
+    python benchmarks/task_store.py [--seconds 3] [--tasks 1000]
+"""
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from models.task import Task
+from storage.task_store import MemoryTaskStore, SQLiteTaskStore
+
+LIFECYCLE = ("preparing", "running", "completed", "result")
+
+
+class PerTransitionStore:
+    """SQLite store committing every write on its own."""
+
+    def __init__(self, db_path: str):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            "CREATE TABLE states (task_id TEXT PRIMARY KEY, state TEXT);"
+            "CREATE TABLE results (task_id TEXT PRIMARY KEY, data TEXT);"
+        )
+
+    def set_state(self, task_id, state):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO states VALUES (?, ?)", (task_id, state)
+            )
+
+    def set_result(self, task_id, result):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?)", (task_id, str(result))
+            )
+
+    def flush(self):
+        pass
+
+
+def run(store, seconds: float, tasks: int) -> float:
+    ids = [f"task-{i}" for i in range(tasks)]
+    if hasattr(store, "save_task"):
+        for task_id in ids:
+            store.save_task(Task(id=task_id, description="benchmark"))
+        store.flush()
+
+    transitions = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for task_id in ids:
+            for step in LIFECYCLE:
+                if step == "result":
+                    store.set_result(task_id, {"success": True})
+                else:
+                    store.set_state(task_id, step)
+            transitions += len(LIFECYCLE)
+    store.flush()
+    return transitions / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--tasks", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        stores = (
+            ("memory", MemoryTaskStore()),
+            ("sqlite, group commit", SQLiteTaskStore(f"{temp_dir}/group.db")),
+            ("sqlite, per transition", PerTransitionStore(f"{temp_dir}/single.db")),
+        )
+        print(f"{args.tasks:,} tasks, {args.seconds:g} s each\n")
+        for label, store in stores:
+            rate = run(store, args.seconds, args.tasks)
+            print(f"{label:<26}{rate:14,.0f} transitions/s")
+            if hasattr(store, "close"):
+                store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,83 +1,864 @@
-from fastapi import APIRouter, HTTPException, Query, Body
-from pydantic import BaseModel
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Query,
+    Body,
+    Header,
+    Request,
+    WebSocket,
+    WebSocketDisconnect,
+)
+from starlette.requests import ClientDisconnect
+from fastapi.responses import Response, StreamingResponse
+from urllib.parse import quote
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
 from pathlib import Path
+import asyncio
+import json
 import os
-from typing import List, Optional
+import shutil
+import stat
+from typing import List, Literal, Optional, Tuple
+from utils.config import get_data_dir, get_io_concurrency
+from utils.http_cache import (
+    PRIVATE_REVALIDATE,
+    cache_headers,
+    is_not_modified,
+    not_modified_response,
+)
 from utils.performance import monitor_performance
+from storage.archive import (
+    ARCHIVE_FORMATS,
+    ARCHIVE_MEDIA_TYPES,
+    ArchiveError,
+    BodyReader,
+    check_format,
+    extract_archive,
+    iter_archive,
+)
+from storage.batch import MAX_BATCH_OPERATIONS, BatchRunner
+from storage.bulk_read import (
+    MAX_BULK_FILES,
+    expand_glob,
+    multipart_end,
+    multipart_part,
+    new_boundary,
+    read_entry,
+)
+from storage.change_feed import ChangeFeed, Subscription
+from storage.content_index import ContentIndex
+from storage.file_index import FileIndex
+from storage.io_executor import IOExecutor
+from storage.listing import iter_ndjson, listing_etag, page_items, sort_items
+from storage.metadata_cache import MetadataCache
+from storage.preview import PreviewCache, build_preview
+from storage.transfer import TransferCancelled, TransferJob
+from storage.trash import TrashError, TrashManager
+from storage.tree import TreeAggregator
+from storage.versions import VersionNotFound, VersionStore
+from storage.upload import (
+    HASH_ALGORITHMS,
+    ChecksumMismatch,
+    UploadConflict,
+    UploadWriter,
+    upload_status,
+)
+from storage.streaming import (
+    DEFAULT_CHUNK_SIZE,
+    FileRangeResponse,
+    RangeNotSatisfiable,
+    file_etag,
+    if_range_matches,
+    is_probably_text,
+    parse_range,
+)
 
 router = APIRouter()
 
+metadata_cache = MetadataCache()
+
+_io_workers, _io_mount_workers = get_io_concurrency()
+io_executor = IOExecutor(_io_workers, _io_mount_workers)
+
+_file_index: Optional[FileIndex] = None
+_content_index: Optional[ContentIndex] = None
+_preview_cache: Optional[PreviewCache] = None
+_tree_aggregator: Optional[TreeAggregator] = None
+_version_store: Optional[VersionStore] = None
+_change_feed: Optional[ChangeFeed] = None
+_trash: Optional[TrashManager] = None
+
+# Largest file returned inline as a JSON string; bigger files must be streamed
+MAX_INLINE_READ_BYTES = 10 * 1024 * 1024
+
+
+SortKey = Literal["type", "name", "size", "mtime", "none"]
+SearchMode = Literal["glob", "prefix", "substring"]
+HashName = Literal[HASH_ALGORITHMS]
+ArchiveFormat = Literal[ARCHIVE_FORMATS]
+
+# Request body chunks are gathered into blocks of this size per disk write
+UPLOAD_WRITE_SIZE = 1024 * 1024
+
+# Idle change feed connections get a keepalive this often
+CHANGE_FEED_HEARTBEAT = 15.0
+
+# Listings name their resolved folder here, the form change events use
+RESOLVED_PATH_HEADER = "X-Resolved-Path"
+
 
 class FileItem(BaseModel):
     name: str
     is_dir: bool
     size: int
     path: str
+    mtime: Optional[float] = None
+
+
+class FilePage(BaseModel):
+    items: List[FileItem]
+    next_cursor: Optional[str] = None
+
+
+class BatchOperation(BaseModel):
+    op: Literal["rename", "move", "copy", "delete", "mkdir"]
+    path: str
+    destination: Optional[str] = None
+    overwrite: bool = False
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_OPERATIONS
+    )
+    atomic: bool = False
+    stream: bool = False
+    max_workers: int = Field(8, ge=1, le=32)
+
+
+class BulkReadRequest(BaseModel):
+    paths: List[str] = Field(default_factory=list, max_length=MAX_BULK_FILES)
+    root: str = "."
+    pattern: Optional[str] = None
+    max_files: int = Field(1000, ge=1, le=MAX_BULK_FILES)
+    max_bytes: int = Field(1024 * 1024, ge=1, le=MAX_INLINE_READ_BYTES)
+    truncate: bool = False
+    include_binary: bool = False
+    format: Literal["ndjson", "multipart"] = "ndjson"
+    concurrency: int = Field(16, ge=1, le=64)
+
+
+class TransferRequest(BaseModel):
+    source: str
+    destination: str
+    overwrite: bool = False
+    resume: bool = False
+    stream: bool = False
+    max_workers: int = Field(8, ge=1, le=32)
+
+
+def get_file_index() -> FileIndex:
+    """
+    Get the filename index, opening it and resuming indexing on first use.
+
+    Returns:
+        Shared FileIndex instance
+    """
+    global _file_index
+    if _file_index is None:
+        _file_index = FileIndex(str(get_data_dir() / "file_index.db"))
+        _file_index.start()
+    return _file_index
+
+
+def get_content_index() -> ContentIndex:
+    """
+    Get the full-text content index, opening it on first use.
+
+    Returns:
+        Shared ContentIndex instance
+    """
+    global _content_index
+    if _content_index is None:
+        _content_index = ContentIndex(str(get_data_dir() / "content_index.db"))
+    return _content_index
+
+
+def get_preview_cache() -> PreviewCache:
+    """
+    Get the on-disk preview cache, creating it on first use.
+
+    Returns:
+        Shared PreviewCache instance
+    """
+    global _preview_cache
+    if _preview_cache is None:
+        _preview_cache = PreviewCache(str(get_data_dir() / "previews"))
+    return _preview_cache
+
+
+def get_tree_aggregator() -> TreeAggregator:
+    """
+    Get the folder size aggregator, creating it on first use.
+
+    Returns:
+        Shared TreeAggregator instance
+    """
+    global _tree_aggregator
+    if _tree_aggregator is None:
+        _tree_aggregator = TreeAggregator()
+    return _tree_aggregator
+
+
+def get_version_store() -> VersionStore:
+    """
+    Get the file version history, opening it on first use.
+
+    Returns:
+        Shared VersionStore instance
+    """
+    global _version_store
+    if _version_store is None:
+        _version_store = VersionStore(str(get_data_dir() / "versions"))
+    return _version_store
+
+
+def get_change_feed() -> ChangeFeed:
+    """
+    Get the filesystem change feed, creating it on first use.
+
+    Returns:
+        Shared ChangeFeed instance
+    """
+    global _change_feed
+    if _change_feed is None:
+        _change_feed = ChangeFeed()
+    return _change_feed
+
+
+def get_trash() -> TrashManager:
+    """
+    Get the trash manager, recovering trash from earlier runs on first use.
+
+    Returns:
+        Shared TrashManager instance
+    """
+    global _trash
+    if _trash is None:
+        _trash = TrashManager(str(get_data_dir() / "trash"))
+        _trash.recover()
+    return _trash
+
+
+def _resolve_directory(path: str) -> Path:
+    """
+    Normalize a directory path and make sure it exists.
+
+    Args:
+        path: Directory path from the request
+
+    Returns:
+        Resolved directory path, the form every cache key and invalidation
+        uses
+
+    Raises:
+        HTTPException: If the path is missing or not a directory
+    """
+    normalized_path = Path(path).expanduser().resolve()
+
+    if not normalized_path.exists():
+        raise HTTPException(status_code=404, detail="路径不存在")
+
+    if not normalized_path.is_dir():
+        raise HTTPException(status_code=400, detail="路径不是目录")
+
+    return normalized_path
+
+
+def _load_listing(path: str, stat_dirs: bool) -> Tuple[Path, List[dict]]:
+    normalized_path = _resolve_directory(path)
+    items = metadata_cache.get_listing(str(normalized_path), stat_dirs=stat_dirs)
+    # Hash here, off the event loop; the digest is memoized on the listing
+    listing_etag(items)
+    return normalized_path, items
+
+
+def _stat_file(path: str) -> Tuple[Path, os.stat_result]:
+    file_path = Path(path).resolve()
+    return file_path, metadata_cache.get_stat(str(file_path))
+
+
+def _read_text(file_path: Path) -> Optional[str]:
+    if not is_probably_text(file_path):
+        return None
+    with open(file_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _load_preview(path: str, lines: int, rows: int) -> dict:
+    file_path = Path(path).resolve()
+    if not file_path.is_file():
+        raise HTTPException(status_code=404, detail="文件不存在")
+
+    preview = get_preview_cache().get_or_build(
+        str(file_path), build_preview, lines=lines, rows=rows
+    )
+    return {"path": str(file_path), **preview}
+
+
+def _preserve(path: str, reason: str) -> None:
+    # Passed to every operation that replaces or removes existing files
+    get_version_store().snapshot(path, reason)
+
+
+def _write_text(path: str, content: str) -> Path:
+    file_path = Path(path).resolve()
+
+    os.makedirs(file_path.parent, exist_ok=True)
+    get_version_store().snapshot(str(file_path), "write")
+
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+    metadata_cache.invalidate(str(file_path))
+    return file_path
+
+
+def _delete_path(path: str) -> Tuple[Path, Optional[dict]]:
+    file_path = Path(path).resolve()
+
+    if not file_path.exists():
+        raise HTTPException(status_code=404, detail="路径不存在")
+
+    data_dir = get_data_dir().resolve()
+    if file_path == data_dir or file_path in data_dir.parents:
+        raise HTTPException(status_code=400, detail="不能删除 SmartWork 数据目录")
+
+    if file_path.is_file():
+        get_version_store().snapshot(str(file_path), "delete")
+
+    try:
+        entry = get_trash().trash(str(file_path))
+    except TrashError:
+        # No usable trash folder on this volume, or the item cannot be
+        # moved there (mount points, other devices)
+        entry = None
+        if file_path.is_dir():
+            shutil.rmtree(file_path)
+        else:
+            file_path.unlink()
+
+    metadata_cache.invalidate(str(file_path))
+    # Only indexes already open; a later scan will not find the path
+    if _file_index is not None:
+        _file_index.refresh_path(str(file_path))
+    if _content_index is not None:
+        _content_index.remove_path(str(file_path))
+    return file_path, entry
+
+
+def _restore_entry(trash_id: str) -> dict:
+    entry = get_trash().restore(trash_id)
+    path = entry["path"]
+    metadata_cache.invalidate(path)
+    # Only indexes already open; each skips paths outside its roots
+    if _file_index is not None:
+        _file_index.refresh_path(path)
+        if _content_index is not None and any(
+            Path(path).is_relative_to(root) for root in _file_index.roots()
+        ):
+            _content_index.refresh_path(path)
+    return entry
 
 
 @monitor_performance
 @router.get("/list/", response_model=List[FileItem])
-async def list_files(path: str = Query(".", description="文件路径")):
+async def list_files(
+    request: Request,
+    response: Response,
+    path: str = Query(".", description="文件路径"),
+    sort: SortKey = Query("type", description="排序方式"),
+):
     """
     List files in a directory with performance monitoring.
 
+    Responses carry a weak ETag over the listing; a matching If-None-Match
+    gets 304 Not Modified without the body being built.
+    X-Resolved-Path names the listed folder as change events report it.
+
     Args:
+        request: Incoming request, for conditional headers
+        response: Outgoing response, for cache headers
         path: Directory path to list
+        sort: Sort key (type, name, size, mtime or none)
 
     Returns:
         Sorted list of files and directories
     """
     try:
-        normalized_path = Path(path).expanduser().absolute()
+        normalized_path, items = await io_executor.run(
+            path, _load_listing, path, sort == "mtime"
+        )
+        etag = listing_etag(items, sort)
+        if is_not_modified(request.headers, etag):
+            return not_modified_response(etag)
 
-        if not normalized_path.exists():
-            raise HTTPException(status_code=404, detail="路径不存在")
+        response.headers.update(cache_headers(etag))
+        response.headers[RESOLVED_PATH_HEADER] = str(normalized_path)
+        return sort_items(items, sort)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        if not normalized_path.is_dir():
-            raise HTTPException(status_code=400, detail="路径不是目录")
 
-        files = []
-        for item in normalized_path.iterdir():
-            try:
-                files.append(
-                    {
-                        "name": item.name,
-                        "is_dir": item.is_dir(),
-                        "size": item.stat().st_size if item.is_file() else 0,
-                        "path": str(item),
-                    }
-                )
-            except (PermissionError, OSError):
+@monitor_performance
+@router.get("/list/page", response_model=FilePage)
+async def list_files_page(
+    path: str = Query(".", description="文件路径"),
+    limit: int = Query(200, ge=1, le=10000, description="每页条目数"),
+    cursor: Optional[str] = Query(None, description="上一页返回的游标"),
+    sort: SortKey = Query("type", description="排序方式"),
+    descending: bool = Query(False, description="是否倒序"),
+):
+    """
+    List one page of a directory using cursor pagination.
+
+    Args:
+        path: Directory path to list
+        limit: Maximum number of items in the page
+        cursor: Cursor returned by the previous page
+        sort: Sort key (type, name, size, mtime or none)
+        descending: Reverse the sort order
+
+    Returns:
+        Page of items and the cursor for the next page
+    """
+    try:
+        _, items = await io_executor.run(path, _load_listing, path, sort == "mtime")
+        items, next_cursor = page_items(
+            iter(items),
+            limit,
+            cursor=cursor,
+            sort=sort,
+            descending=descending,
+        )
+        return {"items": items, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@monitor_performance
+@router.get("/list/stream")
+async def stream_files(path: str = Query(".", description="文件路径")):
+    """
+    Stream a directory listing as NDJSON, one entry per line.
+
+    Entries are sent in directory order as they are scanned, so clients can
+    render the first rows before the scan finishes.
+
+    Args:
+        path: Directory path to list
+
+    Returns:
+        Streaming NDJSON response
+    """
+    normalized_path = await io_executor.run(path, _resolve_directory, path)
+    return StreamingResponse(
+        io_executor.iterate(path, iter_ndjson(str(normalized_path))),
+        media_type="application/x-ndjson",
+    )
+
+
+async def _subscribe_changes(path: str) -> Subscription:
+    normalized_path = await io_executor.run(path, _resolve_directory, path)
+    return await io_executor.run(
+        path,
+        get_change_feed().subscribe,
+        str(normalized_path.resolve()),
+        asyncio.get_running_loop(),
+    )
+
+
+def _feed_hello(subscription: Subscription) -> dict:
+    # complete=False means part of the tree could not be watched, so the
+    # client should keep polling it
+    return {
+        "type": "subscribed",
+        "root": subscription.root,
+        "complete": subscription.complete,
+    }
+
+
+@router.get("/changes")
+async def change_feed_events(path: str = Query(..., description="监听的文件夹")):
+    """
+    Stream changes below a folder as server-sent events.
+
+    Each event is a JSON message: "subscribed" once, then "changes" with a
+    coalesced batch of {path, type, is_dir} entries, or "resync" when the
+    client fell behind and should list the folder again.
+
+    Args:
+        path: Folder to watch, including subfolders
+
+    Returns:
+        text/event-stream response
+    """
+    subscription = await _subscribe_changes(path)
+
+    async def events():
+        try:
+            message = _feed_hello(subscription)
+            while True:
+                if message is None:
+                    yield ": ping\n\n"
+                else:
+                    data = json.dumps(message, ensure_ascii=False)
+                    yield f"event: {message['type']}\ndata: {data}\n\n"
+                message = await subscription.get(CHANGE_FEED_HEARTBEAT)
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/changes/ws")
+async def change_feed_socket(
+    websocket: WebSocket, path: str = Query(..., description="监听的文件夹")
+):
+    """
+    Push changes below a folder over a WebSocket.
+
+    Sends the same JSON messages as the server-sent events endpoint.
+
+    Args:
+        websocket: Client connection
+        path: Folder to watch, including subfolders
+    """
+    await websocket.accept()
+    try:
+        subscription = await _subscribe_changes(path)
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "detail": e.detail})
+        await websocket.close(code=1008)
+        return
+
+    # Anything the client sends is ignored; receiving only detects closing
+    receiver = asyncio.ensure_future(websocket.receive())
+    try:
+        await websocket.send_json(_feed_hello(subscription))
+        while True:
+            getter = asyncio.ensure_future(subscription.get(CHANGE_FEED_HEARTBEAT))
+            done, _ = await asyncio.wait(
+                {getter, receiver}, return_when=asyncio.FIRST_COMPLETED
+            )
+            if receiver in done:
+                getter.cancel()
+                if receiver.result()["type"] == "websocket.disconnect":
+                    return
+                receiver = asyncio.ensure_future(websocket.receive())
                 continue
 
-        return sorted(files, key=lambda x: (not x["is_dir"]), x["name"])
+            message = getter.result()
+            await websocket.send_json(message or {"type": "ping"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        subscription.close()
+
+
+def _load_tree(path: str, depth: int, max_entries: int, limit: int) -> dict:
+    normalized_path = _resolve_directory(path)
+    return get_tree_aggregator().tree(
+        str(normalized_path), depth=depth, max_entries=max_entries, limit=limit
+    )
+
+
+@monitor_performance
+@router.get("/tree")
+async def folder_tree(
+    path: str = Query(".", description="文件夹路径"),
+    depth: int = Query(2, ge=0, le=10, description="返回的目录层数"),
+    max_entries: int = Query(
+        100_000, ge=1, le=5_000_000, description="最多扫描的文件和文件夹数"
+    ),
+    limit: int = Query(100, ge=1, le=1000, description="每个目录最多返回的子目录数"),
+):
+    """
+    Get a folder tree with total size and file count per directory.
+
+    The whole subtree is summed, using cached per-directory aggregates that
+    are updated incrementally from change events; only directories that
+    changed since the last call are rescanned. ``depth`` only limits how
+    much of the tree is returned.
+
+    Args:
+        path: Root folder
+        depth: Levels of subfolders to return
+        max_entries: Scan budget; larger trees are returned with
+            complete=false
+        limit: Maximum subfolders per folder, largest first
+
+    Returns:
+        Tree of folders with size, files, dirs and children
+    """
+    try:
+        return await io_executor.run(path, _load_tree, path, depth, max_entries, limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @monitor_performance
 @router.get("/read/")
-async def read_file(path: str = Query(..., description="文件路径")):
+async def read_file(
+    request: Request,
+    response: Response,
+    path: str = Query(..., description="文件路径"),
+    stream: bool = Query(False, description="以原始字节流返回文件内容"),
+    chunk_size: int = Query(
+        DEFAULT_CHUNK_SIZE, ge=4096, le=8 * 1024 * 1024, description="流式分块大小"
+    ),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None, alias="If-Range"),
+):
     """
     Read a file with performance monitoring.
 
+    Small text files are returned inline as JSON. With ``stream=true`` or a
+    ``Range`` header the raw bytes are streamed in fixed-size chunks, so
+    memory use does not depend on file size. Both forms carry ETag and
+    Last-Modified, and conditional requests for an unchanged file get 304
+    Not Modified without the file being read.
+
     Args:
+        request: Incoming request, for conditional headers
+        response: Outgoing response, for cache headers
         path: File path to read
+        stream: Stream raw bytes instead of returning JSON
+        chunk_size: Chunk size for streamed responses
+        range_header: Optional HTTP Range header
+        if_range: Optional HTTP If-Range validator
 
     Returns:
-        File content as string
+        File content as string, or a streamed (partial) file response
     """
     try:
-        file_path = Path(path).resolve()
+        try:
+            file_path, stat_result = await io_executor.run(path, _stat_file, path)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="文件不存在")
 
-        if not file_path.exists() or file_path.is_dir():
+        if stat.S_ISDIR(stat_result.st_mode):
             raise HTTPException(status_code=404, detail="文件不存在")
 
-        if not file_path.is_file():
+        if not stat.S_ISREG(stat_result.st_mode):
             raise HTTPException(status_code=400, detail="路径不是文件")
 
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
+        etag = file_etag(stat_result)
+        mtime = stat_result.st_mtime
+        if not range_header and is_not_modified(request.headers, etag, mtime):
+            return not_modified_response(etag, mtime, PRIVATE_REVALIDATE)
+
+        if stream or range_header:
+            byte_range = None
+            if range_header and (
+                if_range is None or if_range_matches(if_range, stat_result)
+            ):
+                try:
+                    byte_range = parse_range(range_header, stat_result.st_size)
+                except RangeNotSatisfiable as e:
+                    return Response(
+                        status_code=416,
+                        headers={"Content-Range": f"bytes */{e.size}"},
+                    )
+
+            return FileRangeResponse(
+                file_path,
+                stat_result,
+                byte_range=byte_range,
+                chunk_size=chunk_size,
+                headers={"Cache-Control": PRIVATE_REVALIDATE},
+                executor=io_executor.executor_for(path),
+            )
 
+        if stat_result.st_size > MAX_INLINE_READ_BYTES:
+            raise HTTPException(
+                status_code=413, detail="文件过大，请使用 stream=true 流式读取"
+            )
+
+        content = await io_executor.run(path, _read_text, file_path)
+        if content is None:
+            raise HTTPException(
+                status_code=415, detail="二进制文件，请使用 stream=true 读取"
+            )
+
+        response.headers.update(cache_headers(etag, mtime, PRIVATE_REVALIDATE))
         return {"path": str(file_path), "content": content}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _bulk_read_results(paths: List[str], request: BulkReadRequest):
+    """Read files on the I/O pool, yielding results as each one finishes."""
+    remaining = iter(paths)
+    pending = set()
+
+    def schedule() -> None:
+        for path in remaining:
+            pending.add(
+                asyncio.ensure_future(
+                    io_executor.run(
+                        path,
+                        read_entry,
+                        path,
+                        request.max_bytes,
+                        request.truncate,
+                        request.include_binary,
+                        request.format == "multipart",
+                    )
+                )
+            )
+            if len(pending) >= request.concurrency:
+                return
+
+    # Only `concurrency` files are held in memory, however slow the client
+    schedule()
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.discard(task)
+                yield task.result()
+            schedule()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _stream_bulk_read(
+    paths: List[str], limit_reached: bool, request: BulkReadRequest, boundary: str
+):
+    files = errors = 0
+    async for entry in _bulk_read_results(paths, request):
+        if "error" in entry:
+            errors += 1
+        else:
+            files += 1
+        if request.format == "multipart":
+            yield multipart_part(boundary, entry)
+        else:
+            line = json.dumps({"type": "file", **entry}, ensure_ascii=False)
+            yield (line + "\n").encode("utf-8")
+
+    summary = {
+        "type": "summary",
+        "requested": len(paths),
+        "files": files,
+        "errors": errors,
+        "limit_reached": limit_reached,
+    }
+    if request.format == "multipart":
+        yield multipart_part(boundary, summary) + multipart_end(boundary)
+    else:
+        yield (json.dumps(summary) + "\n").encode("utf-8")
+
+
+@monitor_performance
+@router.post("/read/bulk")
+async def read_files_bulk(request: BulkReadRequest):
+    """
+    Read many files in one request.
+
+    Files are given as a list of paths, a glob relative to ``root``, or
+    both. They are read concurrently on the I/O pool and streamed back as
+    each one finishes, either as NDJSON lines (text inline, binary files
+    as base64 with ``include_binary``) or as a multipart/mixed body with
+    one part of raw bytes per file. A file that cannot be read, or is
+    bigger than ``max_bytes`` without ``truncate``, is reported in its own
+    result without failing the others. The stream ends with a summary.
+
+    Args:
+        request: Paths or glob, size cap and output format
+
+    Returns:
+        Streaming NDJSON or multipart response
+    """
+    paths = list(dict.fromkeys(request.paths))
+    limit_reached = False
+    if request.pattern:
+        try:
+            matches, limit_reached = await io_executor.run(
+                request.root,
+                expand_glob,
+                request.root,
+                request.pattern,
+                request.max_files,
+            )
+        except NotADirectoryError:
+            raise HTTPException(status_code=404, detail="目录不存在")
+        except (ValueError, NotImplementedError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        listed = set(paths)
+        paths.extend(path for path in matches if path not in listed)
+    if not paths and not request.pattern:
+        raise HTTPException(status_code=400, detail="请提供 paths 或 pattern")
+    if len(paths) > request.max_files:
+        paths = paths[: request.max_files]
+        limit_reached = True
+
+    boundary = new_boundary()
+    if request.format == "multipart":
+        media_type = f"multipart/mixed; boundary={boundary}"
+    else:
+        media_type = "application/x-ndjson"
+    return StreamingResponse(
+        _stream_bulk_read(paths, limit_reached, request, boundary),
+        media_type=media_type,
+    )
+
+
+@monitor_performance
+@router.get("/preview")
+async def preview_file(
+    path: str = Query(..., description="文件路径"),
+    lines: int = Query(20, ge=1, le=200, description="文本预览行数"),
+    rows: int = Query(10, ge=1, le=100, description="表格预览行数"),
+):
+    """
+    Get a lightweight preview of a file for the file browser.
+
+    Text files return their first lines, xlsx workbooks their sheet names
+    and the first sheet's top rows, and pptx decks their slide titles.
+    Previews are built from a bounded prefix of the file and cached on disk
+    by path, size and mtime.
+
+    Args:
+        path: File path
+        lines: Maximum text lines
+        rows: Maximum spreadsheet rows
+
+    Returns:
+        Preview with a "kind" of text, xlsx, pptx or none
+    """
+    try:
+        return await io_executor.run(path, _load_preview, path, lines, rows)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -98,12 +879,7 @@ async def write_file(
         Success message
     """
     try:
-        file_path = Path(path).resolve()
-
-        os.makedirs(file_path.parent, exist_ok=True)
-
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(content)
+        file_path = await io_executor.run(path, _write_text, path, content)
 
         return {"message": "文件写入成功", "path": str(file_path)}
     except Exception as e:
@@ -114,124 +890,775 @@ async def write_file(
 @router.delete("/delete/")
 async def delete_file(path: str = Query(..., description="文件路径")):
     """
-    Delete a file with performance monitoring.
+    Delete a file or folder by moving it to the trash.
+
+    The move is a single rename, so large folders are deleted instantly;
+    they are purged from disk in the background and can be restored until
+    then.
 
     Args:
         path: File path to delete
 
     Returns:
-        Success message
+        Success message and the trash entry id
     """
     try:
-        file_path = Path(path).resolve()
+        file_path, entry = await io_executor.run(path, _delete_path, path)
 
-        if not file_path.exists():
-            raise HTTPException(status_code=404, detail="路径不存在")
+        return {
+            "message": "删除成功",
+            "path": str(file_path),
+            "trash_id": entry["id"] if entry else None,
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        if file_path.is_dir():
-            import shutil
-            shutil.rmtree(file_path)
-        else:
-            file_path.unlink()
 
-        return {"message": "删除成功", "path": str(file_path)}
+@router.get("/trash")
+async def list_trash():
+    """
+    List deleted items that have not been purged yet.
+
+    Returns:
+        Trash entries with purge progress, and trash counters
+    """
+    trash = await run_in_threadpool(get_trash)
+    return {"entries": trash.entries(), "stats": trash.stats()}
+
+
+@monitor_performance
+@router.post("/trash/restore")
+async def restore_trash(trash_id: str = Query(..., description="回收站条目")):
+    """
+    Restore a deleted item to its original path.
+
+    Args:
+        trash_id: Trash entry id returned by the delete endpoint
+
+    Returns:
+        The restored entry
+    """
+    try:
+        entry = await run_in_threadpool(_restore_entry, trash_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="回收站条目不存在或正在清除")
+    except FileExistsError:
+        raise HTTPException(status_code=409, detail="原路径已存在同名文件")
+    return {"message": "已恢复", "entry": entry}
+
+
+@router.delete("/trash")
+async def purge_trash(
+    trash_id: Optional[str] = Query(None, description="回收站条目，默认全部")
+):
+    """
+    Purge deleted items now instead of after the retention period.
+
+    Args:
+        trash_id: Entry to purge; all entries if omitted
+
+    Returns:
+        Number of entries scheduled for purging
+    """
+    trash = await run_in_threadpool(get_trash)
+    scheduled = await run_in_threadpool(trash.purge, trash_id)
+    if trash_id is not None and not scheduled:
+        raise HTTPException(status_code=404, detail="回收站条目不存在")
+    return {"message": "正在清除", "scheduled": scheduled}
+
+
+@router.get("/versions")
+async def list_versions(
+    path: str = Query(..., description="文件路径"),
+    limit: int = Query(100, ge=1, le=1000, description="最多返回的版本数"),
+):
+    """
+    List saved versions of a file, newest first.
+
+    Args:
+        path: File path
+        limit: Maximum number of versions
+
+    Returns:
+        Path and its versions
+    """
+    file_path = await io_executor.run(path, Path(path).resolve)
+    versions = await io_executor.run(
+        path, get_version_store().list_versions, str(file_path), limit
+    )
+    return {"path": str(file_path), "versions": versions}
+
+
+@monitor_performance
+@router.post("/versions/restore")
+async def restore_version(
+    path: str = Query(..., description="文件路径"),
+    version_id: Optional[int] = Query(None, description="要恢复的版本，默认上一版本"),
+):
+    """
+    Restore a file to a saved version.
+
+    Without version_id, restores the previous version (undo); repeating it
+    steps further back.
+
+    Args:
+        path: File path
+        version_id: Version to restore
+
+    Returns:
+        The restored version
+    """
+    try:
+        file_path = await io_executor.run(path, Path(path).resolve)
+        version = await io_executor.run(
+            path, get_version_store().restore, str(file_path), version_id
+        )
+        metadata_cache.invalidate(str(file_path))
+        return {"message": "版本已恢复", "path": str(file_path), "version": version}
+    except VersionNotFound:
+        raise HTTPException(status_code=404, detail="没有可恢复的版本")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@monitor_performance
-@router.delete("/delete/")
-async def delete_file(path: str = Query(..., description="文件路径")):
+@router.get("/versions/diff")
+async def diff_versions(
+    path: str = Query(..., description="文件路径"),
+    from_version: int = Query(..., description="旧版本"),
+    to_version: Optional[int] = Query(None, description="新版本，默认当前文件"),
+    context: int = Query(3, ge=0, le=100, description="上下文行数"),
+):
     """
-    Delete a file with performance monitoring.
+    Stream a unified diff between two versions of a file.
 
     Args:
-        path: File path to delete
+        path: File path
+        from_version: Old version id
+        to_version: New version id; defaults to the current file content
+        context: Context lines around each change
 
     Returns:
-        Success message
+        Streaming text/plain diff
     """
+    file_path = await io_executor.run(path, Path(path).resolve)
+    # The first call opens the version database
+    store = await run_in_threadpool(get_version_store)
+    lines = store.diff(str(file_path), from_version, to_version, context)
     try:
-        file_path = Path(path).resolve()
+        # Resolve both sides before the response starts, so a missing
+        # version is a 404 rather than a truncated stream
+        first = await io_executor.run(path, next, lines, None)
+    except VersionNotFound:
+        raise HTTPException(status_code=404, detail="版本不存在")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="文件不存在")
 
-        if not file_path.exists():
-            raise HTTPException(status_code=404, detail="路径不存在")
+    async def body():
+        if first is None:
+            return
+        yield first
+        async for line in io_executor.iterate(path, lines):
+            yield line
 
-        if file_path.is_dir():
-            import shutil
+    return StreamingResponse(body(), media_type="text/plain; charset=utf-8")
 
-            shutil.rmtree(file_path)
-        else:
-            file_path.unlink()
 
-        return {"message": "删除成功", "path": str(file_path)}
+async def _receive_upload(request: Request, writer: UploadWriter) -> None:
+    pending = bytearray()
+    async for chunk in request.stream():
+        pending += chunk
+        if len(pending) >= UPLOAD_WRITE_SIZE:
+            await io_executor.run(writer.path, writer.write, bytes(pending))
+            pending.clear()
+    if pending:
+        await io_executor.run(writer.path, writer.write, bytes(pending))
+
+
+@monitor_performance
+@router.put("/upload")
+async def upload_file(
+    request: Request,
+    path: str = Query(..., description="文件路径"),
+    offset: int = Query(0, ge=0, description="本次数据在文件中的起始偏移"),
+    complete: bool = Query(True, description="上传完成后原子替换目标文件"),
+    hash: Optional[HashName] = Query(None, description="写入时计算的哈希算法"),
+    expected_hash: Optional[str] = Query(None, description="期望的十六进制摘要"),
+):
+    """
+    Upload raw bytes to a file in constant memory.
+
+    The request body is streamed to a hidden partial file next to the
+    destination and renamed over it once complete, so readers never see a
+    half-written file. Large files can be sent in several requests with
+    ``complete=false``; after an interruption, ``/upload/status`` reports
+    the offset to resume from.
+
+    Args:
+        request: Incoming request whose body is the file data
+        path: Destination file path
+        offset: Byte offset of this request's data
+        complete: Move the file into place after this request
+        hash: Digest computed over the whole file by the completing request
+        expected_hash: Digest the completed file must match
+
+    Returns:
+        Bytes received, and the final path, size and digest when complete
+    """
+    if expected_hash and hash is None:
+        raise HTTPException(status_code=400, detail="expected_hash 需要同时指定 hash")
+
+    file_path = await io_executor.run(path, Path(path).resolve)
+    # Earlier parts are hashed from disk by the request that completes the file
+    writer = UploadWriter(
+        str(file_path), offset=offset, hash_name=hash if complete else None
+    )
+
+    try:
+        await io_executor.run(path, writer.open)
+    except UploadConflict as e:
+        headers = {"Upload-Offset": str(e.offset)} if e.offset is not None else None
+        raise HTTPException(status_code=409, detail=str(e), headers=headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+    try:
+        await _receive_upload(request, writer)
+        if not complete:
+            await io_executor.run(path, writer.close)
+            return {
+                "path": str(file_path),
+                "received": writer.received,
+                "offset": offset + writer.received,
+                "complete": False,
+            }
+
+        result = await io_executor.run(path, _commit_upload, writer, expected_hash)
+        metadata_cache.invalidate(str(file_path))
+        return {**result, "received": writer.received, "complete": True}
+    except ChecksumMismatch as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ClientDisconnect:
+        # Keep the partial file so the client can resume
+        await io_executor.run(path, writer.close)
+        raise HTTPException(status_code=400, detail="上传中断")
     except Exception as e:
+        await io_executor.run(path, writer.close)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _commit_upload(writer: UploadWriter, expected_hash: Optional[str]) -> dict:
+    _preserve(writer.path, "overwrite")
+    return writer.commit(expected_hash)
+
+
 @monitor_performance
-@router.get("/read/")
-async def read_file(path: str = Query(..., description="文件路径")):
+@router.get("/archive")
+async def download_archive(
+    path: str = Query(..., description="要打包的文件或文件夹"),
+    format: ArchiveFormat = Query("zip", description="压缩格式"),
+    level: Optional[int] = Query(None, ge=0, le=19, description="压缩级别"),
+):
     """
-    Read a file with performance monitoring.
+    Stream a file or folder as a zip, tar.gz or tar.zst archive.
+
+    The archive is built while it is sent, in constant memory, and
+    tar.gz and tar.zst are compressed on several cores.
 
     Args:
-        path: File path to read
+        path: File or folder to archive
+        format: Archive format
+        level: Compression level (0-9 for zip and tar.gz, up to 19 for tar.zst)
 
     Returns:
-        File content as string
+        Streaming archive download
     """
     try:
-        file_path = Path(path).resolve()
+        check_format(format)
+    except ArchiveError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if level is not None and format != "tar.zst" and level > 9:
+        raise HTTPException(status_code=400, detail="压缩级别需在 0-9 之间")
 
-        if not file_path.exists() or file_path.is_dir():
-            raise HTTPException(status_code=404, detail="文件不存在")
+    try:
+        file_path, _ = await io_executor.run(path, _stat_file, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="路径不存在")
 
-        if not file_path.is_file():
-            raise HTTPException(status_code=400, detail="路径不是文件")
+    filename = f"{file_path.name or 'archive'}.{format}"
+    headers = {
+        "Content-Disposition": (
+            f'attachment; filename="archive.{format}"; '
+            f"filename*=UTF-8''{quote(filename)}"
+        )
+    }
+    return StreamingResponse(
+        io_executor.iterate(path, iter_archive(str(file_path), format, level)),
+        media_type=ARCHIVE_MEDIA_TYPES[format],
+        headers=headers,
+    )
 
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
 
-        return {"path": str(file_path), "content": content}
+def _extract_body(
+    reader: BodyReader, destination: str, format: str, overwrite: bool
+) -> dict:
+    try:
+        return extract_archive(
+            reader, destination, format, overwrite, preserve=_preserve
+        )
+    finally:
+        # Unblocks the request body pump if extraction stopped early
+        reader.abort()
+        metadata_cache.invalidate(destination)
+
+
+@monitor_performance
+@router.post("/extract")
+async def extract_upload(
+    request: Request,
+    path: str = Query(..., description="解压到的文件夹"),
+    format: ArchiveFormat = Query(..., description="压缩格式"),
+    overwrite: bool = Query(False, description="覆盖已存在的文件"),
+):
+    """
+    Extract an archive sent as the request body.
+
+    tar archives are extracted while the body is still arriving; zip data
+    is spooled to disk first because its index is at the end. Either way
+    memory use does not depend on the archive size. Entries that would
+    land outside the destination are rejected.
+
+    Args:
+        request: Incoming request whose body is the archive
+        path: Destination folder, created if missing
+        format: Archive format
+        overwrite: Replace existing files instead of failing
+
+    Returns:
+        Destination path and number of files and bytes extracted
+    """
+    try:
+        check_format(format)
+    except ArchiveError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    destination = str(await io_executor.run(path, Path(path).resolve))
+    reader = BodyReader()
+    extraction = asyncio.ensure_future(
+        io_executor.run_job(path, _extract_body, reader, destination, format, overwrite)
+    )
+
+    try:
+        async for chunk in request.stream():
+            if extraction.done():
+                break
+            await run_in_threadpool(reader.feed, chunk)
+        await run_in_threadpool(reader.feed, None)
+        result = await extraction
+        return {"message": "解压成功", **result}
+    except ArchiveError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileExistsError as e:
+        raise HTTPException(status_code=409, detail=f"文件已存在: {e}")
+    except ClientDisconnect:
+        raise HTTPException(status_code=400, detail="上传中断")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        reader.abort()
+        if not extraction.done():
+            # Let extraction finish reading what it has before returning
+            await asyncio.wait([extraction])
 
 
-@router.post("/write/")
-async def write_file(
-    path: str = Query(..., description="文件路径"), content: str = Body(..., embed=True)
+@router.get("/upload/status")
+async def get_upload_status(path: str = Query(..., description="文件路径")):
+    """
+    Get the resume offset of an interrupted upload.
+
+    Args:
+        path: Destination file path
+
+    Returns:
+        Bytes received so far and whether a partial upload exists
+    """
+    file_path = await io_executor.run(path, Path(path).resolve)
+    return await io_executor.run(path, upload_status, str(file_path))
+
+
+@router.delete("/upload")
+async def abort_upload(path: str = Query(..., description="文件路径")):
+    """
+    Discard a partial upload.
+
+    Args:
+        path: Destination file path
+
+    Returns:
+        Success message
+    """
+    file_path = await io_executor.run(path, Path(path).resolve)
+    writer = UploadWriter(str(file_path))
+    try:
+        await io_executor.run(path, writer.open)
+    except UploadConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    await io_executor.run(path, writer.abort)
+    return {"message": "上传已取消", "path": str(file_path)}
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """
+    Get metadata cache counters.
+
+    Returns:
+        Hit/miss counters and cache size
+    """
+    stats = {**metadata_cache.stats(), "io": io_executor.stats()}
+    if _version_store is not None:
+        stats["versions"] = _version_store.stats()
+    if _change_feed is not None:
+        stats["change_feed"] = _change_feed.stats()
+    if _trash is not None:
+        stats["trash"] = _trash.stats()
+    return stats
+
+
+def _add_index_root(directory: Path) -> dict:
+    index = get_file_index()
+    index.add_root(str(directory))
+    get_content_index().refresh_in_background(index.roots())
+    return index.status()
+
+
+def _remove_index_root(path: str) -> dict:
+    root = str(Path(path).expanduser().resolve())
+    index = get_file_index()
+    index.remove_root(root)
+    # Revoked folders must not stay searchable through their text
+    get_content_index().remove_root(root)
+    return index.status()
+
+
+def _index_roots() -> List[str]:
+    return get_file_index().roots()
+
+
+def _search_names(q: str, mode: str, root: Optional[str], limit: int) -> List[dict]:
+    if root:
+        root = str(Path(root).expanduser().resolve())
+    return get_file_index().search(q, mode, root, limit)
+
+
+def _search_content(q: str, root: Optional[str], limit: int) -> List[dict]:
+    if root:
+        root = str(Path(root).expanduser().resolve())
+    return get_content_index().search(q, root, limit, _index_roots())
+
+
+@router.post("/index/roots")
+async def add_index_root(path: str = Query(..., description="授权索引的文件夹")):
+    """
+    Grant a folder to the filename index and start indexing it.
+
+    Args:
+        path: Directory to index
+
+    Returns:
+        Current index status
+    """
+    normalized_path = await io_executor.run(path, _resolve_directory, path)
+    return await run_in_threadpool(_add_index_root, normalized_path)
+
+
+@router.delete("/index/roots")
+async def remove_index_root(path: str = Query(..., description="已授权的文件夹")):
+    """
+    Remove a folder from the filename and content indexes.
+
+    Args:
+        path: Directory previously added
+
+    Returns:
+        Current index status
+    """
+    return await run_in_threadpool(_remove_index_root, path)
+
+
+@router.get("/index/status")
+async def index_status():
+    """
+    Get filename index status.
+
+    Returns:
+        Entry count, roots and pending background work
+    """
+    index = await run_in_threadpool(get_file_index)
+    return await run_in_threadpool(index.status)
+
+
+@monitor_performance
+@router.get("/search")
+async def search_files(
+    q: str = Query(..., min_length=1, description="搜索内容"),
+    mode: SearchMode = Query("substring", description="匹配方式"),
+    root: Optional[str] = Query(None, description="限定搜索的文件夹"),
+    limit: int = Query(100, ge=1, le=5000, description="最多返回条目数"),
 ):
+    """
+    Search file and folder names in the granted folders.
+
+    Args:
+        q: Search text, prefix or glob pattern
+        mode: Matching mode (glob, prefix or substring)
+        root: Optional folder to restrict results to
+        limit: Maximum number of results
+
+    Returns:
+        Matching entries
+    """
     try:
-        file_path = Path(path).resolve()
+        results = await run_in_threadpool(_search_names, q, mode, root, limit)
+        return {"query": q, "mode": mode, "results": results}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        os.makedirs(file_path.parent, exist_ok=True)
 
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(content)
+@router.post("/content-index/refresh")
+async def refresh_content_index():
+    """
+    Re-index the content of all granted folders in the background.
 
-        return {"message": "文件写入成功", "path": str(file_path)}
+    Returns:
+        Whether a refresh was started, and the index status
+    """
+    index = await run_in_threadpool(get_content_index)
+    roots = await run_in_threadpool(_index_roots)
+    started = index.refresh_in_background(roots)
+    return {"started": started, "status": await run_in_threadpool(index.status)}
+
+
+@router.get("/content-index/status")
+async def content_index_status():
+    """
+    Get full-text content index status.
+
+    Returns:
+        Document count and last refresh counters
+    """
+    index = await run_in_threadpool(get_content_index)
+    return await run_in_threadpool(index.status)
+
+
+@monitor_performance
+@router.get("/content-search")
+async def search_content(
+    q: str = Query(..., min_length=1, description="搜索内容"),
+    root: Optional[str] = Query(None, description="限定搜索的文件夹"),
+    limit: int = Query(20, ge=1, le=500, description="最多返回条目数"),
+):
+    """
+    Search the text content of files in the granted folders.
+
+    Args:
+        q: Words to search for
+        root: Optional folder to restrict results to
+        limit: Maximum number of results
+
+    Returns:
+        Ranked matches with highlighted snippets
+    """
+    try:
+        results = await run_in_threadpool(_search_content, q, root, limit)
+        return {"query": q, "results": results}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.delete("/delete/")
-async def delete_file(path: str = Query(..., description="文件路径")):
+async def _stream_batch(runner: BatchRunner, on_result):
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def publish(result):
+        on_result(result)
+        loop.call_soon_threadsafe(queue.put_nowait, result)
+
+    def run():
+        try:
+            return runner.run(publish)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    job = asyncio.ensure_future(run_in_threadpool(run))
+    while True:
+        result = await queue.get()
+        if result is None:
+            break
+        yield json.dumps({"type": "result", **result}, ensure_ascii=False) + "\n"
+
     try:
-        file_path = Path(path).resolve()
+        summary = await job
+        summary.pop("results")
+        yield json.dumps({"type": "summary", **summary}, ensure_ascii=False) + "\n"
+    except Exception as e:
+        yield json.dumps({"type": "error", "error": str(e)}, ensure_ascii=False) + "\n"
 
-        if not file_path.exists():
-            raise HTTPException(status_code=404, detail="路径不存在")
 
-        if file_path.is_dir():
-            import shutil
+@monitor_performance
+@router.post("/batch")
+async def batch_operations(request: BatchRequest):
+    """
+    Run many rename/move/copy/delete/mkdir operations in one request.
 
-            shutil.rmtree(file_path)
-        else:
-            file_path.unlink()
+    Independent operations run concurrently on a bounded thread pool.
+    With ``atomic`` the batch is all-or-nothing and rolled back on the
+    first failure. With ``stream`` per-item results are sent as NDJSON as
+    each operation finishes, followed by a summary line.
+
+    Args:
+        request: Operations and execution options
+
+    Returns:
+        Summary with per-item results, or a streaming NDJSON response
+    """
+    runner = BatchRunner(
+        [operation.dict() for operation in request.operations],
+        atomic=request.atomic,
+        max_workers=request.max_workers,
+        preserve=_preserve,
+    )
+
+    def on_result(result):
+        for key in ("path", "destination"):
+            if result.get(key):
+                metadata_cache.invalidate(result[key])
+
+    if request.stream:
+        return StreamingResponse(
+            _stream_batch(runner, on_result), media_type="application/x-ndjson"
+        )
 
-        return {"message": "删除成功", "path": str(file_path)}
+    try:
+        return await run_in_threadpool(runner.run, on_result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _transfer_job(request: TransferRequest, move: bool) -> TransferJob:
+    return TransferJob(
+        str(Path(request.source).expanduser().resolve()),
+        str(Path(request.destination).expanduser().resolve()),
+        move=move,
+        overwrite=request.overwrite,
+        resume=request.resume,
+        max_workers=request.max_workers,
+        preserve=_preserve,
+    )
+
+
+def _finish_transfer(job: TransferJob) -> None:
+    metadata_cache.invalidate(job.destination)
+    if job.move:
+        metadata_cache.invalidate(job.source)
+
+
+async def _stream_transfer(job: TransferJob):
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+
+    def publish(progress):
+        loop.call_soon_threadsafe(queue.put_nowait, progress)
+
+    def run():
+        try:
+            return job.run(publish)
+        finally:
+            _finish_transfer(job)
+            loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    task = asyncio.ensure_future(io_executor.run_job(job.destination, run))
+    try:
+        while True:
+            progress = await queue.get()
+            if progress is None:
+                break
+            yield json.dumps({"type": "progress", **progress}) + "\n"
+
+        try:
+            summary = await task
+            yield json.dumps({"type": "done", **summary}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            error = {"type": "error", "error": str(e), **job.progress()}
+            yield json.dumps(error, ensure_ascii=False) + "\n"
+    finally:
+        # The client went away; stop copying, the job can be resumed
+        job.cancel()
+
+
+async def _transfer(request: TransferRequest, move: bool):
+    job = _transfer_job(request, move)
+    try:
+        await run_in_threadpool(job.check)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="源路径不存在")
+    except FileExistsError:
+        raise HTTPException(status_code=409, detail="目标已存在")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if request.stream:
+        return StreamingResponse(
+            _stream_transfer(job), media_type="application/x-ndjson"
+        )
+
+    try:
+        return await io_executor.run_job(job.destination, job.run)
+    except TransferCancelled:
+        raise HTTPException(status_code=409, detail="复制已取消，可使用 resume 继续")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        _finish_transfer(job)
+
+
+@monitor_performance
+@router.post("/copy")
+async def copy_path(request: TransferRequest):
+    """
+    Copy a file or folder on the server.
+
+    Data is copied inside the kernel (reflink, copy_file_range or
+    sendfile) and folders are copied by several threads at once. With
+    ``resume`` an interrupted copy continues into the existing destination,
+    skipping finished files. With ``stream`` progress is sent as NDJSON
+    while copying, followed by a done or error line.
+
+    Args:
+        request: Source, destination and copy options
+
+    Returns:
+        Transfer summary, or a streaming NDJSON response
+    """
+    return await _transfer(request, move=False)
+
+
+@monitor_performance
+@router.post("/move")
+async def move_path(request: TransferRequest):
+    """
+    Move a file or folder on the server.
+
+    Within one filesystem this is a single rename; across filesystems the
+    source is copied like /copy and removed once the copy is complete.
+
+    Args:
+        request: Source, destination and move options
+
+    Returns:
+        Transfer summary, or a streaming NDJSON response
+    """
+    return await _transfer(request, move=True)
@@ -1,15 +1,49 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Optional
-
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+from datetime import datetime
+from pathlib import Path
+from typing import List, Literal, Optional
+import asyncio
+import json
+import threading
+
+from api.file_system import get_file_index
 from core.task_planner import TaskPlanner
-from core.task_executor import TaskExecutor
-from models.task import Task
+from core.task_executor import TaskExecutionState, TaskExecutor
+from models.task import Task, TaskPriority, TaskStatus
+from storage.duplicates import DuplicateFinder
+from storage.task_log import LEVELS, TaskLogStore
+from storage.task_store import SQLiteTaskStore
+from utils.config import get_data_dir
+from utils.http_cache import (
+    BOOT_ID,
+    cache_headers,
+    is_not_modified,
+    not_modified_response,
+)
 
 router = APIRouter()
 
-task_planner = TaskPlanner()
-task_executor = TaskExecutor()
+# Tasks, states, results and logs survive restarts; the database and
+# log segments are opened on first use
+_task_store: Optional[SQLiteTaskStore] = None
+_task_log_store: Optional[TaskLogStore] = None
+_task_planner: Optional[TaskPlanner] = None
+_task_executor: Optional[TaskExecutor] = None
+
+# Newest log entries included in GET /{task_id}; page through the rest
+# with GET /{task_id}/logs
+TASK_LOG_TAIL = 100
+# Records read per step while following a log
+FOLLOW_BATCH = 500
+# Longest wait for new records before checking whether the task finished
+FOLLOW_WAIT_SECONDS = 5.0
+
+LogLevel = Literal[tuple(LEVELS)]
+
+_duplicate_finder: Optional[DuplicateFinder] = None
 
 
 class TaskCreateRequest(BaseModel):
@@ -17,6 +51,76 @@ class TaskCreateRequest(BaseModel):
     parent_task_id: Optional[str] = None
 
 
+class DuplicateSearchRequest(BaseModel):
+    roots: Optional[List[str]] = None
+    min_size: int = Field(1, ge=0)
+
+
+def get_task_store() -> SQLiteTaskStore:
+    """
+    Get the task store, opening its database on first use.
+
+    Returns:
+        Shared SQLiteTaskStore instance
+    """
+    global _task_store
+    if _task_store is None:
+        _task_store = SQLiteTaskStore(str(get_data_dir() / "tasks.db"))
+    return _task_store
+
+
+def get_task_log_store() -> TaskLogStore:
+    """
+    Get the task log store, spilling to the data directory.
+
+    Returns:
+        Shared TaskLogStore instance
+    """
+    global _task_log_store
+    if _task_log_store is None:
+        _task_log_store = TaskLogStore(str(get_data_dir() / "task_logs"))
+    return _task_log_store
+
+
+def get_task_planner() -> TaskPlanner:
+    """
+    Get the task planner backed by the task store.
+
+    Returns:
+        Shared TaskPlanner instance
+    """
+    global _task_planner
+    if _task_planner is None:
+        _task_planner = TaskPlanner(store=get_task_store())
+    return _task_planner
+
+
+def get_task_executor() -> TaskExecutor:
+    """
+    Get the task executor backed by the task and log stores.
+
+    Returns:
+        Shared TaskExecutor instance
+    """
+    global _task_executor
+    if _task_executor is None:
+        _task_executor = TaskExecutor(store=get_task_store(), logs=get_task_log_store())
+    return _task_executor
+
+
+def get_duplicate_finder() -> DuplicateFinder:
+    """
+    Get the duplicate finder, opening its hash cache on first use.
+
+    Returns:
+        Shared DuplicateFinder instance
+    """
+    global _duplicate_finder
+    if _duplicate_finder is None:
+        _duplicate_finder = DuplicateFinder(str(get_data_dir() / "duplicates.db"))
+    return _duplicate_finder
+
+
 @router.post("/")
 async def create_task(request: TaskCreateRequest):
     """
@@ -29,7 +133,7 @@ async def create_task(request: TaskCreateRequest):
         Created task with initial status
     """
     try:
-        task = task_planner.plan_task(
+        task = await get_task_planner().plan_task(
             request.description, parent_task_id=request.parent_task_id
         )
 
@@ -41,27 +145,117 @@ async def create_task(request: TaskCreateRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _granted_roots(requested: Optional[List[str]]) -> List[str]:
+    granted = get_file_index().roots()
+    if requested is None:
+        return granted
+
+    roots = []
+    for path in requested:
+        root = str(Path(path).expanduser().resolve())
+        if not any(root == g or root.startswith(g.rstrip("/") + "/") for g in granted):
+            raise HTTPException(status_code=403, detail=f"Folder not granted: {path}")
+        roots.append(root)
+    return roots
+
+
+@router.post("/duplicates")
+async def find_duplicates(request: DuplicateSearchRequest):
+    """
+    Start a task that finds duplicate files in granted folders.
+
+    The search runs in the background; follow it through the task's
+    state, logs and result, and stop it with DELETE /{task_id}.
+
+    Args:
+        request: Folders to search (all granted folders by default) and
+            the smallest file size considered
+
+    Returns:
+        Created task
+    """
+    roots = await run_in_threadpool(_granted_roots, request.roots)
+    if not roots:
+        raise HTTPException(status_code=400, detail="No granted folders to search")
+
+    finder = await run_in_threadpool(get_duplicate_finder)
+    task = get_task_planner().register_task(f"查找重复文件: {', '.join(roots)}")
+
+    async def job(task: Task, report) -> dict:
+        loop = asyncio.get_running_loop()
+        cancelled = threading.Event()
+
+        def progress(message: str, percent: float) -> None:
+            loop.call_soon_threadsafe(report, message, percent)
+
+        try:
+            return await run_in_threadpool(
+                finder.find, roots, request.min_size, progress, cancelled
+            )
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    get_task_executor().start_task(task, job)
+    return {
+        "success": True,
+        "task": task.dict(),
+    }
+
+
+def task_etag(task_id: str) -> str:
+    """
+    Build an ETag from the planner and executor change counters of a task.
+
+    Args:
+        task_id: Task identifier
+
+    Returns:
+        Quoted ETag string
+    """
+    return '"{}-{}-{}-{}"'.format(
+        BOOT_ID,
+        task_id,
+        get_task_planner().get_task_version(task_id),
+        get_task_executor().get_task_version(task_id),
+    )
+
+
 @router.get("/{task_id}")
-async def get_task(task_id: str):
+async def get_task(task_id: str, request: Request, response: Response):
     """
     Get task details by ID.
 
+    Polling clients should send If-None-Match with the last ETag; while
+    nothing about the task changed the response is 304 with no body.
+
     Args:
         task_id: Task identifier
+        request: Incoming request, for conditional headers
+        response: Outgoing response, for cache headers
 
     Returns:
         Task details with current status
     """
     try:
-        task = task_planner.get_task(task_id)
+        task = get_task_planner().get_task(task_id)
         if not task:
             raise HTTPException(status_code=404, detail="Task not found")
 
+        etag = task_etag(task_id)
+        if is_not_modified(request.headers, etag):
+            return not_modified_response(etag)
+
+        response.headers.update(cache_headers(etag))
+        logs, log_count = await run_in_threadpool(
+            get_task_log_store().read, task_id, -TASK_LOG_TAIL
+        )
         return {
             "success": True,
             "task": task.dict(),
-            "logs": task_executor.get_task_logs(task_id),
-            "result": task_executor.get_task_result(task_id),
+            "logs": logs,
+            "log_count": log_count,
+            "result": get_task_executor().get_task_result(task_id),
         }
     except HTTPException:
         raise
@@ -81,16 +275,16 @@ async def execute_task(task_id: str):
         Updated task after execution
     """
     try:
-        task = task_planner.get_task(task_id)
+        task = get_task_planner().get_task(task_id)
         if not task:
             raise HTTPException(status_code=404, detail="Task not found")
 
-        executed_task = await task_executor.execute_task(task)
+        executed_task = await get_task_executor().execute_task(task)
 
         return {
             "success": True,
             "task": executed_task.dict(),
-            "result": task_executor.get_task_result(task_id),
+            "result": get_task_executor().get_task_result(task_id),
         }
     except HTTPException:
         raise
@@ -110,7 +304,7 @@ async def get_task_state(task_id: str):
         Current task state
     """
     try:
-        state = task_executor.get_task_state(task_id)
+        state = get_task_executor().get_task_state(task_id)
         if state is None:
             raise HTTPException(status_code=404, detail="Task not found")
 
@@ -125,24 +319,74 @@ async def get_task_state(task_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _is_finished(task_id: str) -> bool:
+    state = get_task_executor().get_task_state(task_id)
+    return state is not None and not TaskExecutionState.TRANSITIONS.get(state)
+
+
+async def _follow_logs(task_id: str, offset: int, level: Optional[str]):
+    while True:
+        # Checked before reading: a task logs its last entry in the same
+        # step that finishes it, so nothing can follow an empty read
+        finished = _is_finished(task_id)
+        records, offset = await run_in_threadpool(
+            get_task_log_store().read, task_id, offset, FOLLOW_BATCH, level
+        )
+        if records:
+            yield "".join(
+                json.dumps(record, ensure_ascii=False) + "\n" for record in records
+            )
+        elif finished:
+            return
+        else:
+            await get_task_log_store().wait(task_id, offset, FOLLOW_WAIT_SECONDS)
+
+
 @router.get("/{task_id}/logs")
-async def get_task_logs(task_id: str):
+async def get_task_logs(
+    task_id: str,
+    offset: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    level: Optional[LogLevel] = None,
+    follow: bool = False,
+):
     """
     Get execution logs for a task.
 
+    Entries are numbered from 0 in the order they were logged. Continue
+    paging from next_offset; a negative offset counts back from the
+    newest entry. With follow, entries from offset on are streamed as
+    NDJSON while the task runs, like ``tail -f``, and the stream ends
+    when the task finishes.
+
     Args:
         task_id: Task identifier
+        offset: First entry
+        limit: Maximum number of entries, unless following
+        level: Minimum level: debug, info, warning or error
+        follow: Stream new entries until the task finishes
 
     Returns:
-        List of log entries
+        A page of log entries and the offset of the next page
     """
+    if follow:
+        if get_task_planner().get_task(task_id) is None and not _is_finished(task_id):
+            raise HTTPException(status_code=404, detail="Task not found")
+        return StreamingResponse(
+            _follow_logs(task_id, offset, level),
+            media_type="application/x-ndjson",
+        )
+
     try:
-        logs = task_executor.get_task_logs(task_id)
+        logs, next_offset = await run_in_threadpool(
+            get_task_log_store().read, task_id, offset, limit, level
+        )
 
         return {
             "success": True,
             "task_id": task_id,
             "logs": logs,
+            "next_offset": next_offset,
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -160,28 +404,41 @@ async def cancel_task(task_id: str):
         Success status
     """
     try:
-        cancelled = await task_executor.cancel_task(task_id)
+        cancelled = await get_task_executor().cancel_task(task_id)
 
         return {
             "success": cancelled,
-            "message": "Task cancelled"
-            if cancelled
-            else "Task not running or not found",
+            "message": (
+                "Task cancelled" if cancelled else "Task not running or not found"
+            ),
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/")
-async def list_tasks():
+async def list_tasks(
+    status: Optional[TaskStatus] = None,
+    priority: Optional[TaskPriority] = None,
+    since: Optional[datetime] = None,
+    limit: Optional[int] = Query(None, ge=1),
+):
     """
-    List all tasks.
+    List tasks, oldest first.
+
+    Args:
+        status: Only tasks with this status
+        priority: Only tasks with this priority
+        since: Only tasks created after this time
+        limit: Maximum number of tasks
 
     Returns:
-        List of all tasks
+        List of matching tasks
     """
     try:
-        tasks = task_planner.get_all_tasks()
+        tasks = await run_in_threadpool(
+            get_task_store().list_tasks, status, priority, since, limit
+        )
 
         return {
             "success": True,
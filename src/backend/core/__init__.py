@@ -1,5 +1,17 @@
+from .process_pool import CPUJob, CPUPool, ExecutionClass
 from .sandbox import Sandbox
 from .task_planner import TaskPlanner
 from .task_executor import TaskExecutor, TaskExecutionState
+from .task_graph import TaskGraph, TaskGraphError
 
-__all__ = ["Sandbox", "TaskPlanner", "TaskExecutor", "TaskExecutionState"]
+__all__ = [
+    "Sandbox",
+    "TaskPlanner",
+    "TaskExecutor",
+    "TaskExecutionState",
+    "TaskGraph",
+    "TaskGraphError",
+    "CPUJob",
+    "CPUPool",
+    "ExecutionClass",
+]
@@ -0,0 +1,206 @@
+import itertools
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from models.task import Task, TaskPriority
+
+# Lower rank runs first
+PRIORITY_RANKS: Dict[TaskPriority, int] = {
+    TaskPriority.CRITICAL: 0,
+    TaskPriority.HIGH: 1,
+    TaskPriority.MEDIUM: 2,
+    TaskPriority.LOW: 3,
+}
+
+DEFAULT_AGING_SECONDS = 60.0
+
+
+class _Entry:
+    __slots__ = ("key", "task", "enqueued_at", "index")
+
+    def __init__(self, task: Task, enqueued_at: float):
+        self.task = task
+        self.enqueued_at = enqueued_at
+        self.key: Tuple[float, int] = (0.0, 0)
+        self.index = 0
+
+
+class PriorityTaskQueue:
+    """
+    Indexed binary heap of tasks ordered by priority, with aging.
+
+    With aging, a task's sort key is its enqueue time plus
+    ``rank * aging_seconds``: waiting aging_seconds is worth one priority
+    level, so a LOW task queued long enough overtakes newer CRITICAL work
+    and nothing starves. Keys never change while a task waits, which keeps
+    the heap valid without rescanning. Within a priority tasks leave in
+    FIFO order.
+
+    Enqueue, dequeue, reprioritize and remove are O(log n); a task ID to
+    heap position index makes the last two possible without a scan.
+    """
+
+    def __init__(
+        self,
+        aging_seconds: Optional[float] = DEFAULT_AGING_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize an empty queue.
+
+        Args:
+            aging_seconds: Waiting time worth one priority level; None or 0
+                disables aging
+            clock: Monotonic time source in seconds
+        """
+        self.aging_seconds = aging_seconds or None
+        self._clock = clock
+        self._heap: List[_Entry] = []
+        self._entries: Dict[str, _Entry] = {}
+        self._sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def __contains__(self, task_id: object) -> bool:
+        return task_id in self._entries
+
+    def __iter__(self) -> Iterator[Task]:
+        """Iterate over queued tasks in dispatch order (O(n log n))."""
+        return (entry.task for entry in sorted(self._heap, key=lambda e: e.key))
+
+    def push(self, task: Task) -> None:
+        """
+        Add a task.
+
+        Args:
+            task: Task to queue
+
+        Raises:
+            ValueError: If a task with the same ID is already queued
+        """
+        if task.id in self._entries:
+            raise ValueError(f"Task {task.id} is already queued")
+
+        entry = _Entry(task, self._clock())
+        entry.key = self._key(entry, task.priority, next(self._sequence))
+        entry.index = len(self._heap)
+        self._heap.append(entry)
+        self._entries[task.id] = entry
+        self._sift_up(entry.index)
+
+    def pop(self) -> Task:
+        """
+        Remove and return the task that should run next.
+
+        Returns:
+            Task with the lowest aged key
+
+        Raises:
+            IndexError: If the queue is empty
+        """
+        if not self._heap:
+            raise IndexError("pop from an empty task queue")
+        return self._remove_at(0).task
+
+    def peek(self) -> Optional[Task]:
+        """
+        Get the task that would be popped next without removing it.
+
+        Returns:
+            Next task or None if the queue is empty
+        """
+        return self._heap[0].task if self._heap else None
+
+    def remove(self, task_id: str) -> Task:
+        """
+        Remove a queued task.
+
+        Args:
+            task_id: ID of the task
+
+        Returns:
+            The removed task
+
+        Raises:
+            KeyError: If the task is not queued
+        """
+        return self._remove_at(self._entries[task_id].index).task
+
+    def reprioritize(self, task_id: str, priority: TaskPriority) -> Task:
+        """
+        Change the priority of a queued task.
+
+        The task keeps the credit for the time it has already waited and
+        goes behind tasks of its new priority that were queued earlier.
+
+        Args:
+            task_id: ID of the task
+            priority: New priority
+
+        Returns:
+            The updated task
+
+        Raises:
+            KeyError: If the task is not queued
+        """
+        entry = self._entries[task_id]
+        entry.task.priority = priority
+        entry.key = self._key(entry, priority, entry.key[1])
+        self._sift_up(entry.index)
+        self._sift_down(entry.index)
+        return entry.task
+
+    def _key(
+        self, entry: _Entry, priority: TaskPriority, sequence: int
+    ) -> Tuple[float, int]:
+        rank = PRIORITY_RANKS[TaskPriority(priority)]
+        if self.aging_seconds is None:
+            return (rank, sequence)
+        return (entry.enqueued_at + rank * self.aging_seconds, sequence)
+
+    def _remove_at(self, index: int) -> _Entry:
+        heap = self._heap
+        entry = heap[index]
+        last = heap.pop()
+        if last is not entry:
+            heap[index] = last
+            last.index = index
+            self._sift_up(index)
+            self._sift_down(last.index)
+        del self._entries[entry.task.id]
+        return entry
+
+    def _sift_up(self, index: int) -> None:
+        heap = self._heap
+        entry = heap[index]
+        while index > 0:
+            parent_index = (index - 1) >> 1
+            parent = heap[parent_index]
+            if entry.key >= parent.key:
+                break
+            heap[index] = parent
+            parent.index = index
+            index = parent_index
+        heap[index] = entry
+        entry.index = index
+
+    def _sift_down(self, index: int) -> None:
+        heap = self._heap
+        size = len(heap)
+        entry = heap[index]
+        while True:
+            child_index = 2 * index + 1
+            if child_index >= size:
+                break
+            right_index = child_index + 1
+            if right_index < size and heap[right_index].key < heap[child_index].key:
+                child_index = right_index
+            child = heap[child_index]
+            if entry.key <= child.key:
+                break
+            heap[index] = child
+            child.index = index
+            index = child_index
+        heap[index] = entry
+        entry.index = index
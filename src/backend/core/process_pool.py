@@ -0,0 +1,167 @@
+import asyncio
+import functools
+import importlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from utils.config import get_cpu_workers
+
+# Imported by every worker process when it starts, so the first CPU-bound
+# subtask does not pay for loading openpyxl, python-pptx or markdown
+WARM_MODULES = (
+    "openpyxl",
+    "pptx",
+    "markdown",
+    "generators.excel_generator",
+    "generators.ppt_generator",
+    "generators.document_generator",
+)
+
+
+class ExecutionClass(str, Enum):
+    """Where a subtask runs: on the event loop or in a worker process."""
+
+    IO = "io"
+    CPU = "cpu"
+
+
+class CPUJob:
+    """
+    Subtask job that runs a CPU-bound function in a worker process.
+
+    Used wherever a TaskJob is accepted; TaskExecutor sends it to its
+    CPUPool instead of awaiting it on the event loop. The function and its
+    arguments must be picklable, so module-level functions only. Results
+    travel back through a pipe: return paths and summaries, not file
+    contents.
+    """
+
+    execution_class = ExecutionClass.CPU
+
+    def __init__(self, func: Callable[..., Any], *args: Any, **kwargs: Any):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+
+def execution_class(job: Optional[Callable[..., Any]]) -> ExecutionClass:
+    """
+    Get the execution class of a job.
+
+    Args:
+        job: A TaskJob, CPUJob or None
+
+    Returns:
+        ExecutionClass.CPU for CPUJob, otherwise ExecutionClass.IO
+    """
+    return getattr(job, "execution_class", ExecutionClass.IO)
+
+
+def _warm(modules: Sequence[str]) -> None:
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+def generate_document(
+    generator: str, content: Any, output_path: str, **kwargs: Any
+) -> Dict[str, Any]:
+    """
+    Run a document generator in a worker process.
+
+    Args:
+        generator: Dotted path of a DocumentGenerator subclass, e.g.
+            ``generators.excel_generator.ExcelGenerator``
+        content: Content or data passed to generate()
+        output_path: File to write
+        **kwargs: Extra generate() arguments
+
+    Returns:
+        Whether generation succeeded and the output path
+    """
+    module, _, name = generator.rpartition(".")
+    generator_class = getattr(importlib.import_module(module), name)
+    success = asyncio.run(generator_class().generate(content, output_path, **kwargs))
+    return {"success": bool(success), "output_path": output_path}
+
+
+class CPUPool:
+    """
+    Process pool for CPU-bound subtasks.
+
+    Sized to the cores available to this process. Workers are spawned
+    rather than forked, since forking a process with running threads and
+    an event loop is unsafe, and pre-import WARM_MODULES when they start.
+    The pool is created on first use or by warm().
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        warm_modules: Sequence[str] = WARM_MODULES,
+    ):
+        """
+        Initialize the pool.
+
+        Args:
+            max_workers: Worker processes (defaults to get_cpu_workers())
+            warm_modules: Modules each worker imports at startup
+        """
+        self.max_workers = max_workers or get_cpu_workers()
+        self.warm_modules = tuple(warm_modules)
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run a function in a worker process.
+
+        Args:
+            func: Picklable callable
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Result of func
+        """
+        call = functools.partial(func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._executor(), call)
+
+    async def warm(self) -> int:
+        """
+        Start all worker processes now instead of on first use.
+
+        Returns:
+            Number of distinct worker processes that answered
+        """
+        pids = await asyncio.gather(
+            *(self.run(_ready) for _ in range(self.max_workers))
+        )
+        return len(set(pids))
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm,
+                    initargs=(self.warm_modules,),
+                )
+            return self._pool
@@ -1,13 +1,27 @@
 import asyncio
-from typing import Dict, Any, Optional, Callable
+from collections.abc import Mapping
+from typing import Dict, Any, Iterator, Optional, Callable, Awaitable
 from datetime import datetime
 import logging
 
+from .process_pool import CPUPool, ExecutionClass, execution_class
 from .sandbox import Sandbox
+from .task_graph import TaskGraph
 from models.task import Task, TaskStatus
+from storage.task_log import TaskLogStore
+from storage.task_store import MemoryTaskStore, TaskStore
+from utils.config import get_task_concurrency
+from utils.http_cache import ChangeCounter
 
 logger = logging.getLogger(__name__)
 
+ProgressCallback = Callable[[str, float], None]
+
+# A job does the actual work of a task, reporting progress as it goes,
+# and returns the task result. A CPUJob may stand in for one to run
+# CPU-bound work in a worker process.
+TaskJob = Callable[[Task, ProgressCallback], Awaitable[Dict[str, Any]]]
+
 
 class TaskExecutionState:
     """
@@ -46,6 +60,28 @@ class TaskExecutionState:
         return to_state in cls.TRANSITIONS.get(from_state, [])
 
 
+class _TaskStates(Mapping):
+    """Read-only view of the execution states in a task store."""
+
+    def __init__(self, store: TaskStore):
+        self._store = store
+
+    def __getitem__(self, task_id: str) -> str:
+        state = self._store.get_state(task_id)
+        if state is None:
+            raise KeyError(task_id)
+        return state
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.state_ids())
+
+    def __len__(self) -> int:
+        return len(self._store.state_ids())
+
+    def __contains__(self, task_id: object) -> bool:
+        return isinstance(task_id, str) and self._store.get_state(task_id) is not None
+
+
 class TaskExecutor:
     """
     Task execution engine with state machine and sandbox isolation.
@@ -54,17 +90,33 @@ class TaskExecutor:
     environment setup, execution, monitoring, and cleanup.
     """
 
-    def __init__(self, sandbox: Optional[Sandbox] = None):
+    def __init__(
+        self,
+        sandbox: Optional[Sandbox] = None,
+        max_parallel_subtasks: Optional[int] = None,
+        cpu_pool: Optional[CPUPool] = None,
+        store: Optional[TaskStore] = None,
+        logs: Optional[TaskLogStore] = None,
+    ):
         self.sandbox: Sandbox = sandbox or Sandbox()
-        self.task_states: Dict[str, str] = {}
-        self.task_results: Dict[str, Dict[str, Any]] = {}
-        self.task_logs: Dict[str, list] = {}
+        self.max_parallel_subtasks = max_parallel_subtasks or get_task_concurrency()
+        # CPU-bound jobs run here so they cannot stall the event loop
+        self.cpu_pool: CPUPool = cpu_pool or CPUPool()
+        # States and results live in the store; tasks are saved there
+        # whenever their status changes
+        self.store: TaskStore = store or MemoryTaskStore()
+        self.task_states: Mapping = _TaskStates(self.store)
+        self.logs: TaskLogStore = logs or TaskLogStore()
+        # Bumped on every state, log or result change; used for task ETags
+        self.task_versions = ChangeCounter()
         self._running_tasks: Dict[str, asyncio.Task] = {}
 
     async def execute_task(
         self,
         task: Task,
         progress_callback: Optional[Callable[[str, float], None]] = None,
+        job: Optional[TaskJob] = None,
+        subtask_jobs: Optional[Dict[str, TaskJob]] = None,
     ) -> Task:
         """
         Execute a task through the state machine.
@@ -72,6 +124,8 @@ class TaskExecutor:
         Args:
             task: The task to execute
             progress_callback: Optional callback for progress updates
+            job: Optional coroutine function doing the task's work
+            subtask_jobs: Optional jobs for individual subtasks, by subtask ID
 
         Returns:
             Updated task with final status and results
@@ -92,46 +146,17 @@ class TaskExecutor:
             await self._prepare_task(task)
 
             self._set_state(task_id, TaskExecutionState.RUNNING)
+            task.status = TaskStatus.IN_PROGRESS
+            self.store.save_task(task)
             self._log(task_id, "Starting task execution")
 
-            result = await self._process_task(task, progress_callback)
-
-            if result["success"]:
-                task.status = TaskStatus.COMPLETED
-                self._set_state(task_id, TaskExecutionState.COMPLETED)
-                self._log(task_id, "Task completed successfully")
+            if job is not None:
+                result = await self._run_job(task, job, progress_callback)
             else:
-                task.status = TaskStatus.FAILED
-                self._set_state(task_id, TaskExecutionState.FAILED)
-                self._log(
-                    task_id, f"Task failed: {result.get('error', 'Unknown error')}"
+                result = await self._process_task(
+                    task, progress_callback, subtask_jobs or {}
                 )
 
-            self.task_results[task_id] = result
-            return task
-
-        except asyncio.CancelledError:
-            task.status = TaskStatus.FAILED
-            self._set_state(task_id, TaskExecutionState.CANCELLED)
-            self._log(task_id, "Task was cancelled")
-            return task
-
-        except Exception as e:
-            task.status = TaskStatus.FAILED
-            self._set_state(task_id, TaskExecutionState.FAILED)
-            self._log(task_id, f"Task execution error: {str(e)}")
-            self.task_results[task_id] = {"success": False, "error": str(e)}
-            return task
-
-        try:
-            self._set_state(task_id, TaskExecutionState.PREPARING)
-            await self._prepare_task(task)
-
-            self._set_state(task_id, TaskExecutionState.RUNNING)
-            self._log(task_id, "Starting task execution")
-
-            result = await self._process_task(task, progress_callback)
-
             if result["success"]:
                 task.status = TaskStatus.COMPLETED
                 self._set_state(task_id, TaskExecutionState.COMPLETED)
@@ -140,96 +165,96 @@ class TaskExecutor:
                 task.status = TaskStatus.FAILED
                 self._set_state(task_id, TaskExecutionState.FAILED)
                 self._log(
-                    task_id, f"Task failed: {result.get('error', 'Unknown error')}"
+                    task_id,
+                    f"Task failed: {result.get('error', 'Unknown error')}",
+                    "error",
                 )
 
-            self.task_results[task_id] = result
+            self._set_result(task_id, result)
+            self.store.save_task(task)
             return task
 
         except asyncio.CancelledError:
             task.status = TaskStatus.FAILED
             self._set_state(task_id, TaskExecutionState.CANCELLED)
-            self._log(task_id, "Task was cancelled")
+            self._log(task_id, "Task was cancelled", "warning")
+            self.store.save_task(task)
             return task
 
         except Exception as e:
             task.status = TaskStatus.FAILED
             self._set_state(task_id, TaskExecutionState.FAILED)
-            self._log(task_id, f"Task execution error: {str(e)}")
-            self.task_results[task_id] = {"success": False, "error": str(e)}
+            self._log(task_id, f"Task execution error: {str(e)}", "error")
+            self._set_result(task_id, {"success": False, "error": str(e)})
+            self.store.save_task(task)
             return task
 
-        try:
-            self._set_state(task_id, TaskExecutionState.PREPARING)
-            await self._prepare_task(task)
-
-            self._set_state(task_id, TaskExecutionState.RUNNING)
-            self._log(task_id, "Starting task execution")
-
-            result = await self._process_task(task, progress_callback)
+        finally:
+            # A finished task's log is read rarely; keep it on disk only
+            self.logs.release(task_id)
 
-            if result["success"]:
-                task.status = TaskStatus.COMPLETED
-                self._set_state(task_id, TaskExecutionState.COMPLETED)
-                self._log(task_id, "Task completed successfully")
-            else:
-                task.status = TaskStatus.FAILED
-                self._set_state(task_id, TaskExecutionState.FAILED)
-                self._log(
-                    task_id, f"Task failed: {result.get('error', 'Unknown error')}"
-                )
-
-            self.task_results[task_id] = result
-            return task
-
-        except asyncio.CancelledError:
-            task.status = TaskStatus.FAILED
-            self._set_state(task_id, TaskExecutionState.CANCELLED)
-            self._log(task_id, "Task was cancelled")
-            return task
+    def start_task(
+        self,
+        task: Task,
+        job: Optional[TaskJob] = None,
+        progress_callback: Optional[Callable[[str, float], None]] = None,
+    ) -> asyncio.Task:
+        """
+        Execute a task in the background.
 
-        except Exception as e:
-            task.status = TaskStatus.FAILED
-            self._set_state(task_id, TaskExecutionState.FAILED)
-            self._log(task_id, f"Task execution error: {str(e)}")
-            self.task_results[task_id] = {"success": False, "error": str(e)}
-            return task
+        The task can be followed through its state, logs and result, and
+        stopped with cancel_task().
 
-        try:
-            self._set_state(task_id, TaskExecutionState.PREPARING)
-            await self._prepare_task(task)
+        Args:
+            task: The task to execute
+            job: Optional coroutine function doing the task's work
+            progress_callback: Optional callback for progress updates
 
-            self._set_state(task_id, TaskExecutionState.RUNNING)
-            self._log(task_id, "Starting task execution")
+        Returns:
+            The asyncio task running the execution
+        """
+        running = asyncio.create_task(
+            self.execute_task(task, progress_callback, job=job)
+        )
+        self._running_tasks[task.id] = running
+        running.add_done_callback(lambda _: self._running_tasks.pop(task.id, None))
+        return running
 
-            result = await self._process_task(task, progress_callback)
+    async def _run_job(
+        self,
+        task: Task,
+        job: TaskJob,
+        progress_callback: Optional[Callable[[str, float], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run a job, logging its progress reports.
 
-            if result["success"]:
-                task.status = TaskStatus.COMPLETED
-                self._set_state(task_id, TaskExecutionState.COMPLETED)
-                self._log(task_id, "Task completed successfully")
-            else:
-                task.status = TaskStatus.FAILED
-                self._set_state(task_id, TaskExecutionState.FAILED)
-                self._log(
-                    task_id, f"Task failed: {result.get('error', 'Unknown error')}"
-                )
+        CPUJob functions run in a worker process of cpu_pool; a result that
+        is not a dictionary is returned under "result".
 
-            self.task_results[task_id] = result
-            return task
+        Args:
+            task: The task the job belongs to
+            job: Coroutine function or CPUJob doing the work
+            progress_callback: Optional callback for progress updates
 
-        except asyncio.CancelledError:
-            task.status = TaskStatus.FAILED
-            self._set_state(task_id, TaskExecutionState.CANCELLED)
-            self._log(task_id, "Task was cancelled")
-            return task
+        Returns:
+            Job result, with success defaulting to True
+        """
 
-        except Exception as e:
-            task.status = TaskStatus.FAILED
-            self._set_state(task_id, TaskExecutionState.FAILED)
-            self._log(task_id, f"Task execution error: {str(e)}")
-            self.task_results[task_id] = {"success": False, "error": str(e)}
-            return task
+        def report(message: str, progress: float) -> None:
+            self._log(task.id, f"{message} ({progress:.0f}%)")
+            if progress_callback:
+                progress_callback(message, progress)
+
+        if execution_class(job) == ExecutionClass.CPU:
+            report("Running in a worker process", 0)
+            result = await self.cpu_pool.run(job.func, *job.args, **job.kwargs)
+            if not isinstance(result, dict):
+                result = {"result": result}
+            report("Worker process finished", 100)
+        else:
+            result = await job(task, report)
+        return {"success": True, **result}
 
     async def _prepare_task(self, task: Task) -> None:
         """
@@ -244,6 +269,7 @@ class TaskExecutor:
         self,
         task: Task,
         progress_callback: Optional[Callable[[str, float], None]] = None,
+        subtask_jobs: Optional[Dict[str, TaskJob]] = None,
     ) -> Dict[str, Any]:
         """
         Process the actual task execution.
@@ -251,6 +277,7 @@ class TaskExecutor:
         Args:
             task: The task to process
             progress_callback: Optional callback for progress updates
+            subtask_jobs: Optional jobs for individual subtasks, by subtask ID
 
         Returns:
             Dictionary with execution result
@@ -258,7 +285,9 @@ class TaskExecutor:
         self._log(task.id, f"Executing task: {task.description}")
 
         if task.subtasks:
-            result = await self._execute_subtasks(task, progress_callback)
+            result = await self._execute_subtasks(
+                task, progress_callback, subtask_jobs or {}
+            )
         else:
             result = await self._execute_single_task(task, progress_callback)
 
@@ -268,40 +297,138 @@ class TaskExecutor:
         self,
         task: Task,
         progress_callback: Optional[Callable[[str, float], None]] = None,
+        subtask_jobs: Optional[Dict[str, TaskJob]] = None,
     ) -> Dict[str, Any]:
         """
-        Execute all subtasks sequentially.
+        Execute subtasks in dependency order.
+
+        Each subtask starts as soon as all subtasks it depends on have
+        succeeded, so independent subtasks overlap and a wide plan takes
+        about as long as its critical path. Subtasks depending on a failed
+        subtask are skipped. Progress is reported for the whole graph.
+
+        Subtasks are placed by execution class: at most
+        max_parallel_subtasks I/O-bound subtasks run on the event loop, and
+        CPU-bound ones (CPUJob) are limited to the worker processes of
+        cpu_pool, so waiting for a core never holds an I/O slot.
 
         Args:
             task: Parent task with subtasks
             progress_callback: Optional callback for progress updates
+            subtask_jobs: Optional jobs for individual subtasks, by subtask ID
 
         Returns:
             Dictionary with overall execution result
-        """
-        total_subtasks = len(task.subtasks)
-        completed = 0
 
-        all_results = []
-
-        for subtask in task.subtasks:
-            self._log(task.id, f"Executing subtask: {subtask.description}")
+        Raises:
+            TaskGraphError: If the dependencies form a cycle
+        """
+        graph = TaskGraph(task.subtasks)
+        total_subtasks = len(graph.tasks)
+        self._log(
+            task.id,
+            f"Scheduling {total_subtasks} subtasks in {graph.depth()} layers",
+        )
 
-            subtask_result = await self._execute_single_task(subtask, progress_callback)
-            all_results.append(subtask_result)
+        done_fraction = {subtask_id: 0.0 for subtask_id in graph.tasks}
+        waiting_on = {
+            subtask_id: len(deps) for subtask_id, deps in graph.requires.items()
+        }
+        results: Dict[str, Dict[str, Any]] = {}
+        subtask_jobs = subtask_jobs or {}
+        limits = {
+            ExecutionClass.IO: asyncio.Semaphore(self.max_parallel_subtasks),
+            ExecutionClass.CPU: asyncio.Semaphore(self.cpu_pool.max_workers),
+        }
 
-            completed += 1
-            if progress_callback:
-                progress = (completed / total_subtasks) * 100
-                progress_callback(subtask.description, progress)
+        def report_for(subtask_id: str) -> Callable[[str, float], None]:
+            def report(description: str, progress: float) -> None:
+                done_fraction[subtask_id] = min(max(progress, 0), 100) / 100
+                if progress_callback:
+                    overall = sum(done_fraction.values()) / total_subtasks * 100
+                    progress_callback(description, overall)
+
+            return report
+
+        async def run(subtask: Task) -> Dict[str, Any]:
+            job = subtask_jobs.get(subtask.id)
+            async with limits[execution_class(job)]:
+                self._log(task.id, f"Executing subtask: {subtask.description}")
+                try:
+                    if job is None:
+                        return await self._execute_single_task(
+                            subtask, report_for(subtask.id)
+                        )
+                    result = await self._run_job(subtask, job, report_for(subtask.id))
+                    return {
+                        "task_id": subtask.id,
+                        "description": subtask.description,
+                        **result,
+                    }
+                except Exception as e:
+                    return {
+                        "success": False,
+                        "task_id": subtask.id,
+                        "description": subtask.description,
+                        "error": str(e),
+                    }
+
+        running: Dict[asyncio.Future, str] = {}
+
+        def start(subtask_id: str) -> None:
+            running[asyncio.ensure_future(run(graph.tasks[subtask_id]))] = subtask_id
+
+        for subtask_id in graph.roots():
+            start(subtask_id)
 
-        success = all(r["success"] for r in all_results)
+        try:
+            while running:
+                finished, _ = await asyncio.wait(
+                    running, return_when=asyncio.FIRST_COMPLETED
+                )
+                for future in finished:
+                    subtask_id = running.pop(future)
+                    result = future.result()
+                    results[subtask_id] = result
+                    if done_fraction[subtask_id] < 1:
+                        report_for(subtask_id)(graph.tasks[subtask_id].description, 100)
+                    if not result["success"]:
+                        self._log(
+                            task.id,
+                            f"Subtask failed: {graph.tasks[subtask_id].description}",
+                            "warning",
+                        )
+                        continue
+                    for dependent in graph.dependents[subtask_id]:
+                        waiting_on[dependent] -= 1
+                        if waiting_on[dependent] == 0:
+                            start(dependent)
+        finally:
+            for future in running:
+                future.cancel()
+
+        skipped = 0
+        for subtask_id, subtask in graph.tasks.items():
+            if subtask_id not in results:
+                skipped += 1
+                results[subtask_id] = {
+                    "success": False,
+                    "task_id": subtask_id,
+                    "description": subtask.description,
+                    "skipped": True,
+                    "error": "A dependency failed",
+                }
+
+        all_results = [results[subtask_id] for subtask_id in graph.tasks]
+        completed = sum(1 for r in all_results if r["success"])
 
         return {
-            "success": success,
+            "success": completed == total_subtasks,
             "subtask_results": all_results,
             "total_subtasks": total_subtasks,
             "completed_subtasks": completed,
+            "skipped_subtasks": skipped,
+            "critical_path": graph.depth(),
         }
 
     async def _execute_single_task(
@@ -350,7 +477,7 @@ class TaskExecutor:
             task = self._running_tasks[task_id]
             task.cancel()
             self._set_state(task_id, TaskExecutionState.CANCELLED)
-            self._log(task_id, "Task cancelled")
+            self._log(task_id, "Task cancelled", "warning")
             return True
         return False
 
@@ -362,22 +489,35 @@ class TaskExecutor:
             task_id: ID of the task
             state: New state value
         """
-        self.task_states[task_id] = state
+        self.store.set_state(task_id, state)
+        self._touch(task_id)
         logger.debug(f"Task {task_id} state: {state}")
 
-    def _log(self, task_id: str, message: str) -> None:
+    def _set_result(self, task_id: str, result: Dict[str, Any]) -> None:
+        """
+        Store the execution result of a task.
+
+        Args:
+            task_id: ID of the task
+            result: Result dictionary
+        """
+        self.store.set_result(task_id, result)
+        self._touch(task_id)
+
+    def _touch(self, task_id: str) -> None:
+        self.task_versions.touch(task_id)
+
+    def _log(self, task_id: str, message: str, level: str = "info") -> None:
         """
         Add a log entry for a task.
 
         Args:
             task_id: ID of the task
             message: Log message
+            level: Log level name, see storage.task_log.LEVELS
         """
-        if task_id not in self.task_logs:
-            self.task_logs[task_id] = []
-
-        timestamp = datetime.now().isoformat()
-        self.task_logs[task_id].append({"timestamp": timestamp, "message": message})
+        self.logs.append(task_id, message, level)
+        self._touch(task_id)
         logger.debug(f"[Task {task_id}] {message}")
 
     def get_task_state(self, task_id: str) -> Optional[str]:
@@ -390,7 +530,19 @@ class TaskExecutor:
         Returns:
             Current state or None if task not found
         """
-        return self.task_states.get(task_id)
+        return self.store.get_state(task_id)
+
+    def get_task_version(self, task_id: str) -> int:
+        """
+        Get the change counter of a task.
+
+        Args:
+            task_id: ID of the task
+
+        Returns:
+            Counter that moves on every state, log and result change
+        """
+        return self.task_versions.get(task_id)
 
     def get_task_result(self, task_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -402,29 +554,53 @@ class TaskExecutor:
         Returns:
             Task result or None if not available
         """
-        return self.task_results.get(task_id)
+        return self.store.get_result(task_id)
 
-    def get_task_logs(self, task_id: str) -> list:
+    def get_task_logs(
+        self,
+        task_id: str,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        level: Optional[str] = None,
+    ) -> list:
         """
-        Get all logs for a task.
+        Get logs for a task.
 
         Args:
             task_id: ID of the task
+            offset: First log sequence number; negative counts from the end
+            limit: Maximum number of entries
+            level: Minimum log level
 
         Returns:
-            List of log entries
+            List of log entries with seq, timestamp, level and message
         """
-        return self.task_logs.get(task_id, [])
+        return self.logs.read(task_id, offset, limit, level)[0]
 
     async def cleanup(self) -> None:
         """
         Clean up executor resources.
 
-        Cancels all running tasks and cleans up sandbox.
+        Cancels all running tasks and waits for them to record their final
+        state and log lines, then stops the worker processes, writes the
+        stores to disk and cleans up sandbox.
         """
-        for task_id, task in self._running_tasks.items():
+        running = list(self._running_tasks.items())
+        for task_id, task in running:
+            self._log(task_id, "Task cancelled during cleanup", "warning")
             task.cancel()
-            self._log(task_id, "Task cancelled during cleanup")
+
+        results = await asyncio.gather(
+            *(task for _, task in running), return_exceptions=True
+        )
+        for (task_id, _), result in zip(running, results):
+            if isinstance(result, asyncio.CancelledError):
+                # Cancelled before execute_task() got to run
+                self._set_state(task_id, TaskExecutionState.CANCELLED)
 
         self._running_tasks.clear()
+        self.cpu_pool.shutdown(wait=False)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.store.flush)
+        await loop.run_in_executor(None, self.logs.close)
         self.sandbox.cleanup()
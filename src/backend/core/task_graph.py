@@ -0,0 +1,91 @@
+from typing import Dict, List
+
+from models.task import Task
+
+
+class TaskGraphError(ValueError):
+    """Raised when subtask dependencies do not form a DAG."""
+
+
+class TaskGraph:
+    """
+    Dependency graph of a task's subtasks.
+
+    Dependencies on tasks outside the graph, such as the parent task, are
+    treated as already satisfied. The graph is checked and layered once
+    when built, so a cycle is reported before any subtask runs.
+    """
+
+    def __init__(self, tasks: List[Task]):
+        """
+        Build the graph and its topological layers.
+
+        Args:
+            tasks: Subtasks, in planning order
+
+        Raises:
+            TaskGraphError: If task IDs repeat or dependencies form a cycle
+        """
+        self.tasks: Dict[str, Task] = {}
+        for task in tasks:
+            if task.id in self.tasks:
+                raise TaskGraphError(f"Duplicate subtask ID: {task.id}")
+            self.tasks[task.id] = task
+
+        self.requires: Dict[str, List[str]] = {}
+        self.dependents: Dict[str, List[str]] = {task_id: [] for task_id in self.tasks}
+        for task in tasks:
+            # dict.fromkeys drops repeated dependencies but keeps their order
+            requires = [
+                dep for dep in dict.fromkeys(task.dependencies) if dep in self.tasks
+            ]
+            self.requires[task.id] = requires
+            for dep in requires:
+                self.dependents[dep].append(task.id)
+
+        self.layers = self._layer()
+
+    def _layer(self) -> List[List[str]]:
+        # Kahn's algorithm, one layer per round
+        order = {task_id: index for index, task_id in enumerate(self.tasks)}
+        remaining = {task_id: len(deps) for task_id, deps in self.requires.items()}
+        layer = [task_id for task_id, count in remaining.items() if count == 0]
+        layers = []
+        placed = 0
+
+        while layer:
+            layers.append(layer)
+            placed += len(layer)
+            ready = []
+            for task_id in layer:
+                for dependent in self.dependents[task_id]:
+                    remaining[dependent] -= 1
+                    if remaining[dependent] == 0:
+                        ready.append(dependent)
+            # Keep planning order within a layer
+            layer = sorted(ready, key=order.get)
+
+        if placed < len(self.tasks):
+            cycle = sorted(task_id for task_id, count in remaining.items() if count)
+            raise TaskGraphError(
+                f"Subtask dependencies form a cycle: {', '.join(cycle)}"
+            )
+        return layers
+
+    def roots(self) -> List[str]:
+        """
+        Get the subtasks that can start immediately.
+
+        Returns:
+            IDs of subtasks without dependencies inside the graph
+        """
+        return list(self.layers[0]) if self.layers else []
+
+    def depth(self) -> int:
+        """
+        Get the length of the critical path in subtasks.
+
+        Returns:
+            Number of topological layers
+        """
+        return len(self.layers)
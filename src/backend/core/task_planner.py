@@ -1,14 +1,24 @@
-from typing import List, Optional, Dict
+from typing import List, Optional
 from models.task import Task, TaskStatus, TaskPriority
 from llm.llm_client import LLMClient
+from storage.task_store import MemoryTaskStore, TaskStore
+from utils.http_cache import ChangeCounter
 import json
 import re
 
 
 class TaskPlanner:
-    def __init__(self, llm_client: Optional[LLMClient] = None):
+    def __init__(
+        self,
+        llm_client: Optional[LLMClient] = None,
+        store: Optional[TaskStore] = None,
+    ):
         self.llm_client = llm_client
-        self.tasks: Dict[str, Task] = {}
+        self.store = store or MemoryTaskStore()
+        self.task_versions = ChangeCounter()
+        # Numbering continues after the tasks already in a persistent
+        # store; counted on first use so the store opens lazily
+        self._next_id: Optional[int] = None
 
     async def decompose_task(self, task: Task) -> List[Task]:
         if not task.description:
@@ -178,19 +188,60 @@ class TaskPlanner:
         Returns:
             Created task with planned subtasks
         """
-        task = Task(id=f"task-{len(self.tasks) + 1}", description=description)
+        task = Task(id=self._new_id(), description=description)
 
-        if parent_task_id and parent_task_id in self.tasks:
-            parent = self.tasks[parent_task_id]
+        parent = self.store.get_task(parent_task_id) if parent_task_id else None
+        if parent is not None:
             parent.subtasks.append(task)
             task.dependencies = [parent_task_id]
+            self.store.save_task(parent)
+            self._touch(parent_task_id)
         else:
             subtasks = await self.decompose_task(task)
-            task.subtasks = subtasks
+            # Tasks that cannot be decomposed come back as [task] itself
+            task.subtasks = [subtask for subtask in subtasks if subtask is not task]
 
-        self.tasks[task.id] = task
+        self.store.save_task(task)
+        self._touch(task.id)
         return task
 
+    def register_task(self, description: str) -> Task:
+        """
+        Create a task that is carried out by a job rather than planned.
+
+        Args:
+            description: Task description
+
+        Returns:
+            Created task, without subtasks
+        """
+        task = Task(id=self._new_id(), description=description)
+        self.store.save_task(task)
+        self._touch(task.id)
+        return task
+
+    def _new_id(self) -> str:
+        if self._next_id is None:
+            self._next_id = self.store.count_tasks() + 1
+        task_id = f"task-{self._next_id}"
+        self._next_id += 1
+        return task_id
+
+    def _touch(self, task_id: str) -> None:
+        self.task_versions.touch(task_id)
+
+    def get_task_version(self, task_id: str) -> int:
+        """
+        Get the change counter of a planned task.
+
+        Args:
+            task_id: Task identifier
+
+        Returns:
+            Counter that moves whenever the planner changes the task
+        """
+        return self.task_versions.get(task_id)
+
     def get_task(self, task_id: str) -> Optional[Task]:
         """
         Get task by ID.
@@ -201,7 +252,7 @@ class TaskPlanner:
         Returns:
             Task or None if not found
         """
-        return self.tasks.get(task_id)
+        return self.store.get_task(task_id)
 
     def get_all_tasks(self) -> List[Task]:
         """
@@ -210,4 +261,4 @@ class TaskPlanner:
         Returns:
             List of all tasks
         """
-        return list(self.tasks.values())
+        return self.store.list_tasks()
@@ -1,66 +1,281 @@
 import asyncio
-from typing import List
-from collections import deque
-from datetime import datetime
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional, Set
 
-from models.task import Task, TaskStatus
+from .priority_queue import DEFAULT_AGING_SECONDS, PriorityTaskQueue
+from .task_executor import TaskExecutor, TaskJob
+from models.task import Task, TaskPriority, TaskStatus
+
+# Durations kept per metric for the percentiles in get_status()
+_TIMING_SAMPLES = 1000
+# Finished tasks kept in memory per outcome
+DEFAULT_MAX_FINISHED = 1000
+
+
+class QueueFullError(Exception):
+    """Raised when a task cannot be queued because the queue is full."""
+
+
+class QueueClosedError(Exception):
+    """Raised when a task is added after shutdown() was called."""
+
+
+class _Timings:
+    def __init__(self, samples: int = _TIMING_SAMPLES):
+        self.count = 0
+        self.total = 0.0
+        self.recent: Deque[float] = deque(maxlen=samples)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        if not self.count:
+            return {"count": 0, "avg_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        recent = sorted(self.recent)
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000, 3),
+            "p95_ms": round(recent[int(0.95 * (len(recent) - 1))] * 1000, 3),
+            "max_ms": round(recent[-1] * 1000, 3),
+        }
 
 
 class TaskQueue:
     """
     Task queue system with parallel execution.
 
-    Manages concurrent task execution with configurable limits.
+    A fixed pool of long-lived worker coroutines takes pending tasks in
+    priority order, with aging so low priority work still gets its turn,
+    and runs them through TaskExecutor. At most max_pending tasks wait in
+    the queue; add_task() then waits for room or fails with
+    QueueFullError, so producers cannot outrun the workers unboundedly.
+    Only the newest max_finished completed, failed and cancelled tasks are
+    kept; older ones remain available from the executor's task store.
     """
 
-    def __init__(self, max_concurrent: int = 3):
+    def __init__(
+        self,
+        max_concurrent: int = 3,
+        aging_seconds: Optional[float] = DEFAULT_AGING_SECONDS,
+        max_pending: Optional[int] = 1000,
+        executor: Optional[TaskExecutor] = None,
+        max_finished: int = DEFAULT_MAX_FINISHED,
+    ):
         """
         Initialize task queue.
 
+        Workers start with the first added task.
+
         Args:
             max_concurrent: Maximum number of concurrent tasks
+            aging_seconds: Waiting time that raises a pending task by one
+                priority level; None disables aging
+            max_pending: Maximum number of waiting tasks; None for no limit
+            executor: Executor running the tasks; a new one by default
+            max_finished: Finished tasks kept per outcome
         """
         self.max_concurrent = max_concurrent
-        self.queue = deque()
-        self.running_tasks = set()
-        self.completed_tasks = set()
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self.executor = executor or TaskExecutor()
+        self.queue = PriorityTaskQueue(aging_seconds)
+        self.running_tasks: Dict[str, Task] = {}
+        self.completed_tasks: "OrderedDict[str, Task]" = OrderedDict()
+        self.failed_tasks: "OrderedDict[str, Task]" = OrderedDict()
+        self.cancelled_tasks: "OrderedDict[str, Task]" = OrderedDict()
+        # Totals per outcome, including tasks no longer kept
+        self._finished_counts = {"completed": 0, "failed": 0, "cancelled": 0}
+
+        self._jobs: Dict[str, TaskJob] = {}
+        self._enqueued_at: Dict[str, float] = {}
+        self._handles: Dict[str, asyncio.Task] = {}
+        self._cancel_requested: Set[str] = set()
+        self._workers: List[asyncio.Task] = []
+        self._changed: Optional[asyncio.Condition] = None
+        self._closed = False
+        self._queue_wait = _Timings()
+        self._run_time = _Timings()
 
-    async def add_task(self, task: Task) -> str:
+    async def add_task(
+        self,
+        task: Task,
+        job: Optional[TaskJob] = None,
+        block: bool = True,
+        timeout: Optional[float] = None,
+    ) -> str:
         """
         Add a task to the queue.
 
         Args:
             task: Task to add
+            job: Optional coroutine function doing the task's work, passed
+                to TaskExecutor.execute_task()
+            block: Wait for room when the queue is full instead of failing
+            timeout: Longest wait for room in seconds; None waits forever
 
         Returns:
             Task ID
+
+        Raises:
+            QueueFullError: If the queue is full and block is False, or no
+                room opened up within timeout
+            QueueClosedError: If the queue has been shut down
+            ValueError: If the task is already queued or running
         """
-        self.queue.append(task)
-        await self._process_queue()
+        changed = self._start()
+        async with changed:
+            if self._closed:
+                raise QueueClosedError("Task queue is shut down")
+            if task.id in self.queue or task.id in self.running_tasks:
+                raise ValueError(f"Task {task.id} is already queued")
+            if self._full():
+                if not block:
+                    raise QueueFullError(
+                        f"Task queue is full ({self.max_pending} pending tasks)"
+                    )
+                try:
+                    await asyncio.wait_for(
+                        changed.wait_for(lambda: not self._full() or self._closed),
+                        timeout,
+                    )
+                except asyncio.TimeoutError:
+                    raise QueueFullError(
+                        f"Task queue is still full after {timeout}s "
+                        f"({self.max_pending} pending tasks)"
+                    )
+                if self._closed:
+                    raise QueueClosedError("Task queue is shut down")
+
+            task.status = TaskStatus.PENDING
+            self.queue.push(task)
+            self._enqueued_at[task.id] = time.monotonic()
+            if job is not None:
+                self._jobs[task.id] = job
+            changed.notify_all()
         return task.id
 
+    async def reprioritize_task(self, task_id: str, priority: TaskPriority) -> bool:
+        """
+        Change the priority of a pending task.
+
+        Args:
+            task_id: ID of the task
+            priority: New priority
+
+        Returns:
+            True if the task was pending, False otherwise
+        """
+        if task_id not in self.queue:
+            return False
+        self.queue.reprioritize(task_id, priority)
+        return True
+
+    async def remove_task(self, task_id: str) -> Optional[Task]:
+        """
+        Remove a pending task before it starts.
+
+        Args:
+            task_id: ID of the task
+
+        Returns:
+            The removed task, or None if it was not pending
+        """
+        if task_id not in self.queue:
+            return None
+        task = self.queue.remove(task_id)
+        self._jobs.pop(task_id, None)
+        self._enqueued_at.pop(task_id, None)
+        task.status = TaskStatus.CANCELLED
+        self._finish("cancelled", self.cancelled_tasks, task)
+        await self._notify()
+        return task
+
+    async def cancel_task(self, task_id: str) -> bool:
+        """
+        Cancel a pending or running task.
+
+        Args:
+            task_id: ID of the task
+
+        Returns:
+            True if the task was pending or running, False otherwise
+        """
+        if await self.remove_task(task_id) is not None:
+            return True
+        handle = self._handles.get(task_id)
+        if handle is None:
+            return False
+        self._cancel_requested.add(task_id)
+        handle.cancel()
+        return True
+
+    async def join(self) -> None:
+        """
+        Wait until no task is pending or running.
+        """
+        changed = self._start()
+        async with changed:
+            await changed.wait_for(lambda: not self.queue and not self.running_tasks)
+
+    async def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop the queue and its workers.
+
+        New tasks are refused from now on.
+
+        Args:
+            wait: Let pending and running tasks finish first; otherwise
+                pending tasks are dropped and running ones cancelled
+        """
+        self._closed = True
+        if self._changed is not None:
+            await self._notify()
+
+        if wait:
+            if self._workers:
+                await self.join()
+        else:
+            for task_id in [task.id for task in self.queue]:
+                await self.remove_task(task_id)
+            for task_id in list(self._handles):
+                await self.cancel_task(task_id)
+            await asyncio.gather(*self._handles.values(), return_exceptions=True)
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers.clear()
+
     async def get_status(self) -> dict:
         """
         Get queue status.
 
         Returns:
-            Dictionary with queue statistics
+            Dictionary with queue statistics, including how long tasks
+            waited in the queue and how long they ran
         """
         return {
             "pending": len(self.queue),
             "running": len(self.running_tasks),
-            "completed": len(self.completed_tasks),
+            **self._finished_counts,
             "max_concurrent": self.max_concurrent,
+            "max_pending": self.max_pending,
+            "queue_wait": self._queue_wait.summary(),
+            "run_time": self._run_time.summary(),
         }
 
     async def get_completed_tasks(self) -> List[Task]:
         """
-        Get all completed tasks.
+        Get the most recently completed tasks, oldest first.
 
         Returns:
-            List of completed tasks
+            List of up to max_finished completed tasks
         """
-        return list(self.completed_tasks)
+        return list(self.completed_tasks.values())
 
     async def get_running_tasks(self) -> List[Task]:
         """
@@ -69,40 +284,86 @@ class TaskQueue:
         Returns:
             List of running tasks
         """
-        return list(self.running_tasks)
+        return list(self.running_tasks.values())
 
-    async def _process_queue(self):
-        """
-        Process the queue and execute tasks.
+    def _finish(
+        self, outcome: str, finished: "OrderedDict[str, Task]", task: Task
+    ) -> None:
+        self._finished_counts[outcome] += 1
+        finished.pop(task.id, None)
+        finished[task.id] = task
+        while len(finished) > self.max_finished:
+            finished.popitem(last=False)
+
+    def _full(self) -> bool:
+        return self.max_pending is not None and len(self.queue) >= self.max_pending
 
-        Starts pending tasks when slots are available.
+    def _start(self) -> asyncio.Condition:
+        # Created on first use so the queue binds to the loop it runs on
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        if not self._workers and not self._closed:
+            self._workers = [
+                asyncio.create_task(self._worker(), name=f"task-queue-worker-{i}")
+                for i in range(self.max_concurrent)
+            ]
+        return self._changed
+
+    async def _notify(self) -> None:
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _worker(self) -> None:
+        """
+        Take tasks off the queue and execute them, one at a time.
         """
-        while len(self.running_tasks) < self.max_concurrent and self.queue:
-            task = self.queue.popleft()
-            task.status = TaskStatus.RUNNING
-            self.running_tasks.add(task.id)
+        changed = self._changed
+        while True:
+            async with changed:
+                await changed.wait_for(lambda: len(self.queue) > 0)
+                # TaskExecutor marks the task IN_PROGRESS once it starts
+                task = self.queue.pop()
+                self.running_tasks[task.id] = task
+                # Wakes producers waiting for room
+                changed.notify_all()
 
-            asyncio.create_task(self._execute_task(task))
+            try:
+                await self._execute_task(task)
+            finally:
+                async with changed:
+                    self.running_tasks.pop(task.id, None)
+                    changed.notify_all()
 
-    async def _execute_task(self, task: Task):
+    async def _execute_task(self, task: Task) -> None:
         """
         Execute a single task.
 
         Args:
             task: Task to execute
         """
-        try:
-            await asyncio.sleep(1)
+        started = time.monotonic()
+        self._queue_wait.add(started - self._enqueued_at.pop(task.id, started))
 
-            task.status = TaskStatus.COMPLETED
-        except Exception as e:
-            task.status = TaskStatus.FAILED
-            print(f"Task {task.id} failed: {e}")
+        handle = asyncio.create_task(
+            self.executor.execute_task(task, job=self._jobs.pop(task.id, None))
+        )
+        self._handles[task.id] = handle
+        try:
+            # Unlike awaiting the handle, wait() lets a cancelled worker
+            # stop even though execute_task() swallows cancellation
+            await asyncio.wait({handle})
+        except asyncio.CancelledError:
+            handle.cancel()
+            raise
         finally:
-            if task.id in self.running_tasks:
-                self.running_tasks.remove(task.id)
-
-            if task.status == TaskStatus.COMPLETED:
-                self.completed_tasks.add(task.id)
+            self._handles.pop(task.id, None)
+            self._run_time.add(time.monotonic() - started)
 
-            await self._process_queue()
+        if task.id in self._cancel_requested or handle.cancelled():
+            self._cancel_requested.discard(task.id)
+            task.status = TaskStatus.CANCELLED
+            self._finish("cancelled", self.cancelled_tasks, task)
+        elif task.status == TaskStatus.COMPLETED:
+            self._finish("completed", self.completed_tasks, task)
+        else:
+            self._finish("failed", self.failed_tasks, task)
@@ -1,7 +1,15 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from api.file_system import router as file_router
-from api.tasks import router as tasks_router
+from starlette.concurrency import run_in_threadpool
+from api.file_system import RESOLVED_PATH_HEADER, get_trash, router as file_router
+from api.tasks import (
+    get_task_executor,
+    get_task_log_store,
+    get_task_store,
+    router as tasks_router,
+)
+from utils.compression import CompressionMiddleware
 from utils.performance import monitor_performance
 
 app = FastAPI(
@@ -14,12 +22,42 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Lets the frontend match change events to its cached listings
+    expose_headers=[RESOLVED_PATH_HEADER],
 )
+# Large listings, task dumps and text reads compress well
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
 
 app.include_router(file_router, prefix="/api/files", tags=["files"])
 app.include_router(tasks_router, prefix="/api/tasks", tags=["tasks"])
 
 
+@app.on_event("startup")
+async def recover_trash():
+    # Resume purges interrupted by the last shutdown
+    await run_in_threadpool(get_trash)
+
+
+@app.on_event("startup")
+async def warm_cpu_pool():
+    # Spawn and pre-import the document workers in the background so the
+    # first CPU-bound subtask does not wait for them; opens the task stores
+    task_executor = await run_in_threadpool(get_task_executor)
+    app.state.cpu_pool_warmup = asyncio.create_task(task_executor.cpu_pool.warm())
+
+
+@app.on_event("shutdown")
+async def stop_task_executor():
+    app.state.cpu_pool_warmup.cancel()
+    # Cancels running tasks and waits for their final state and log lines
+    # before the stores are closed
+    await get_task_executor().cleanup()
+    # Commit the last batch of task state transitions and write the
+    # log entries still in memory to their segment files
+    await run_in_threadpool(get_task_store().close)
+    await run_in_threadpool(get_task_log_store().close)
+
+
 @app.get("/")
 async def root():
     return {"message": "SmartWork API Server", "version": "0.1.0"}
@@ -0,0 +1,20 @@
+from .listing import list_directory, list_page
+from .metadata_cache import MetadataCache
+from .streaming import (
+    FileRangeResponse,
+    RangeNotSatisfiable,
+    file_etag,
+    parse_range,
+)
+from .watcher import ChangeWatcher
+
+__all__ = [
+    "ChangeWatcher",
+    "FileRangeResponse",
+    "MetadataCache",
+    "RangeNotSatisfiable",
+    "file_etag",
+    "list_directory",
+    "list_page",
+    "parse_range",
+]
@@ -0,0 +1,457 @@
+import gzip
+import io
+import os
+import queue
+import shutil
+import tarfile
+import tempfile
+import threading
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterator, Optional
+
+from .transfer import PreserveCallback, preserve_tree
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_FORMATS = ("zip", "tar.gz", "tar.zst")
+
+ARCHIVE_MEDIA_TYPES = {
+    "zip": "application/zip",
+    "tar.gz": "application/gzip",
+    "tar.zst": "application/zstd",
+}
+
+# Bytes handed to the HTTP response at a time, and chunks buffered between
+# the archiving thread and the response; together they bound memory use
+ARCHIVE_CHUNK_SIZE = 256 * 1024
+_QUEUE_CHUNKS = 16
+
+# Input compressed per gzip member by the parallel gzip writer
+GZIP_BLOCK_SIZE = 1024 * 1024
+
+
+class ArchiveError(Exception):
+    pass
+
+
+class ArchiveCancelled(Exception):
+    pass
+
+
+def available_formats() -> list:
+    return [f for f in ARCHIVE_FORMATS if f != "tar.zst" or zstandard is not None]
+
+
+def check_format(archive_format: str) -> None:
+    """
+    Check that an archive format is known and its codec installed.
+
+    Raises:
+        ArchiveError: If the format cannot be used
+    """
+    if archive_format not in ARCHIVE_FORMATS:
+        raise ArchiveError(f"Unsupported archive format: {archive_format}")
+    if archive_format == "tar.zst" and zstandard is None:
+        raise ArchiveError("tar.zst needs the zstandard package")
+
+
+class _QueueWriter(io.RawIOBase):
+    """
+    Write-only stream that hands full chunks to a bounded queue.
+
+    A full queue blocks the writer, so the archiving thread runs no further
+    ahead of the client than the queue allows.
+    """
+
+    def __init__(self, chunks: "queue.Queue", cancelled: threading.Event):
+        self._chunks = chunks
+        self._cancelled = cancelled
+        self._buffer = bytearray()
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def write(self, data) -> int:
+        if self._cancelled.is_set():
+            raise ArchiveCancelled()
+        self._buffer += data
+        self.position += len(data)
+        if len(self._buffer) >= ARCHIVE_CHUNK_SIZE:
+            self.flush()
+        return len(data)
+
+    def flush(self) -> None:
+        if self._buffer:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+
+    def _put(self, chunk: bytes) -> None:
+        while True:
+            if self._cancelled.is_set():
+                raise ArchiveCancelled()
+            try:
+                self._chunks.put(chunk, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+
+class ParallelGzipWriter(io.RawIOBase):
+    """
+    Gzip writer that compresses fixed-size blocks on several threads.
+
+    Each block becomes its own gzip member; concatenated members are a
+    valid gzip stream that gzip, tar and Python's gzip module read as one.
+    zlib releases the GIL while compressing, so blocks compress in
+    parallel, and at most ``workers * 2`` blocks are in flight.
+    """
+
+    def __init__(
+        self,
+        raw: io.RawIOBase,
+        level: int = 6,
+        workers: Optional[int] = None,
+        block_size: int = GZIP_BLOCK_SIZE,
+    ):
+        self._raw = raw
+        self._level = level
+        self._block_size = block_size
+        self._workers = workers or os.cpu_count() or 1
+        self._pool = ThreadPoolExecutor(self._workers)
+        self._pending: Deque[Future] = deque()
+        self._buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        while len(self._buffer) >= self._block_size:
+            block = bytes(self._buffer[: self._block_size])
+            del self._buffer[: self._block_size]
+            self._submit(block)
+        return len(data)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            while self._pending:
+                self._raw.write(self._pending.popleft().result())
+        finally:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            super().close()
+
+    def _submit(self, block: bytes) -> None:
+        self._pending.append(
+            self._pool.submit(gzip.compress, block, self._level, mtime=0)
+        )
+        # Write finished members in order, keeping a bounded number queued
+        while self._pending and (
+            self._pending[0].done() or len(self._pending) >= self._workers * 2
+        ):
+            self._raw.write(self._pending.popleft().result())
+
+
+def _write_zip(writer: io.RawIOBase, path: str, level: int) -> None:
+    base = os.path.dirname(path)
+    # zipfile writes data descriptors instead of seeking back when the
+    # output is not seekable
+    with zipfile.ZipFile(
+        writer, "w", zipfile.ZIP_DEFLATED, compresslevel=level
+    ) as archive:
+        for current, dirs, files in os.walk(path):
+            dirs.sort()
+            relative = os.path.relpath(current, base)
+            if not files and not dirs:
+                archive.write(current, relative + "/")
+            for name in sorted(files):
+                file_path = os.path.join(current, name)
+                if os.path.islink(file_path) or not os.path.isfile(file_path):
+                    continue
+                info = zipfile.ZipInfo.from_file(
+                    file_path, os.path.join(relative, name)
+                )
+                info.compress_type = zipfile.ZIP_DEFLATED
+                with open(file_path, "rb") as src, archive.open(
+                    info, "w", force_zip64=True
+                ) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+        if os.path.isfile(path):
+            archive.write(path, os.path.basename(path))
+
+
+def _write_tar(
+    writer: io.RawIOBase, path: str, archive_format: str, level: int, workers: int
+) -> None:
+    if archive_format == "tar.zst":
+        compressed = zstandard.ZstdCompressor(
+            level=level, threads=workers
+        ).stream_writer(writer, closefd=False)
+    else:
+        compressed = ParallelGzipWriter(writer, level, workers)
+    try:
+        with tarfile.open(fileobj=compressed, mode="w|") as archive:
+            archive.add(path, os.path.basename(path))
+    finally:
+        compressed.close()
+
+
+def iter_archive(
+    path: str,
+    archive_format: str = "zip",
+    level: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> Iterator[bytes]:
+    """
+    Stream a file or folder as an archive.
+
+    The archive is written by a background thread into a small bounded
+    queue, so memory use does not depend on the size of the folder and the
+    thread waits while the client is slow. tar.gz is compressed in blocks
+    on several threads and tar.zst with zstd's own worker threads; zip
+    entries are compressed one after another.
+
+    Args:
+        path: File or folder to archive
+        archive_format: One of ARCHIVE_FORMATS
+        level: Compression level; a fast default per format if omitted
+        workers: Compression threads (defaults to the CPU count)
+
+    Yields:
+        Archive bytes
+
+    Raises:
+        ArchiveError: If the format is not available
+    """
+    check_format(archive_format)
+    workers = workers or os.cpu_count() or 1
+    chunks: "queue.Queue" = queue.Queue(_QUEUE_CHUNKS)
+    cancelled = threading.Event()
+    done = object()
+    failure: Dict[str, Any] = {}
+
+    def produce() -> None:
+        writer = _QueueWriter(chunks, cancelled)
+        try:
+            if archive_format == "zip":
+                _write_zip(writer, path, 6 if level is None else level)
+            else:
+                default = 3 if archive_format == "tar.zst" else 6
+                _write_tar(
+                    writer,
+                    path,
+                    archive_format,
+                    default if level is None else level,
+                    workers,
+                )
+            writer.flush()
+        except ArchiveCancelled:
+            return
+        except BaseException as e:
+            failure["error"] = e
+        try:
+            writer._put(done)
+        except ArchiveCancelled:
+            pass
+
+    thread = threading.Thread(target=produce, name="smartwork-archive", daemon=True)
+    thread.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is done:
+                break
+            yield chunk
+        if "error" in failure:
+            raise failure["error"]
+    finally:
+        # Stops the thread at its next write if the client went away
+        cancelled.set()
+
+
+class BodyReader(io.RawIOBase):
+    """
+    Blocking reader over chunks fed from another thread.
+
+    Used to extract an archive on a worker thread while the request body
+    is still arriving; feed() blocks once ``max_chunks`` are waiting.
+    """
+
+    def __init__(self, max_chunks: int = _QUEUE_CHUNKS):
+        self._chunks: "queue.Queue" = queue.Queue(max_chunks)
+        self._current = memoryview(b"")
+        self._eof = False
+        self._aborted = False
+
+    def readable(self) -> bool:
+        return True
+
+    def feed(self, data: Optional[bytes]) -> None:
+        """
+        Add body data; None marks the end of the body.
+        """
+        while not self._aborted:
+            try:
+                self._chunks.put(data, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def abort(self) -> None:
+        """
+        Stop reading; unblocks both feed() and readinto().
+        """
+        self._aborted = True
+        try:
+            self._chunks.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def readinto(self, buffer) -> int:
+        while not self._current:
+            if self._eof:
+                return 0
+            chunk = self._chunks.get()
+            if chunk is None or self._aborted:
+                self._eof = True
+                return 0
+            self._current = memoryview(chunk)
+        count = min(len(buffer), len(self._current))
+        buffer[:count] = self._current[:count]
+        self._current = self._current[count:]
+        return count
+
+
+def _tar_filter(
+    destination: str,
+    overwrite: bool,
+    stats: Dict[str, int],
+    preserve: Optional[PreserveCallback],
+):
+    def check(member: tarfile.TarInfo, path: str) -> Optional[tarfile.TarInfo]:
+        # The data filter rejects absolute paths, paths leaving the
+        # destination, links pointing outside it and device files
+        member = tarfile.data_filter(member, path)
+        target = os.path.join(destination, member.name)
+        if member.isfile() and os.path.lexists(target):
+            if not overwrite:
+                raise FileExistsError(f"File exists: {member.name}")
+            preserve_tree(target, preserve)
+        if member.isfile():
+            stats["files"] += 1
+            stats["bytes"] += member.size
+        return member
+
+    return check
+
+
+def extract_archive(
+    reader: io.RawIOBase,
+    destination: str,
+    archive_format: str,
+    overwrite: bool = False,
+    preserve: Optional[PreserveCallback] = None,
+) -> Dict[str, Any]:
+    """
+    Extract an archive read sequentially from a stream.
+
+    tar archives are extracted member by member as they arrive. zip keeps
+    its index at the end, so zip data is first spooled to a temporary file
+    in the destination folder; memory use stays constant either way.
+
+    Args:
+        reader: Readable stream of archive bytes
+        destination: Folder to extract into, created if missing
+        archive_format: One of ARCHIVE_FORMATS
+        overwrite: Replace existing files instead of failing
+        preserve: Called for every existing file before it is overwritten
+
+    Returns:
+        Number of files and bytes extracted
+
+    Raises:
+        ArchiveError: If the format is not available or the data is invalid
+        FileExistsError: If a file exists and overwrite is not set
+    """
+    check_format(archive_format)
+    destination = os.path.abspath(destination)
+    os.makedirs(destination, exist_ok=True)
+    stats = {"files": 0, "bytes": 0}
+
+    try:
+        if archive_format == "zip":
+            _extract_zip(reader, destination, overwrite, stats, preserve)
+        else:
+            if archive_format == "tar.zst":
+                source = zstandard.ZstdDecompressor().stream_reader(reader)
+            else:
+                # tarfile's own gzip stream stops after the first member,
+                # GzipFile reads the multi-member output of ParallelGzipWriter
+                source = gzip.GzipFile(fileobj=reader, mode="rb")
+            with tarfile.open(fileobj=source, mode="r|") as archive:
+                archive.extractall(
+                    destination,
+                    filter=_tar_filter(destination, overwrite, stats, preserve),
+                )
+    except (
+        tarfile.TarError,
+        zipfile.BadZipFile,
+        gzip.BadGzipFile,
+        zlib.error,
+        EOFError,
+    ) as e:
+        raise ArchiveError(f"Invalid archive: {e}")
+    except Exception as e:
+        if zstandard is not None and isinstance(e, zstandard.ZstdError):
+            raise ArchiveError(f"Invalid archive: {e}")
+        raise
+
+    return {"path": destination, **stats}
+
+
+def _zip_target(name: str) -> str:
+    # Same clean-up ZipFile.extract() applies: no drive, root or ".." parts
+    name = os.path.splitdrive(name.replace("/", os.path.sep))[1]
+    parts = name.split(os.path.sep)
+    return os.path.sep.join(p for p in parts if p not in ("", os.curdir, os.pardir))
+
+
+def _extract_zip(
+    reader: io.RawIOBase,
+    destination: str,
+    overwrite: bool,
+    stats: Dict[str, int],
+    preserve: Optional[PreserveCallback],
+) -> None:
+    with tempfile.TemporaryFile(dir=destination, prefix=".smartwork-") as spool:
+        shutil.copyfileobj(reader, spool, 1024 * 1024)
+        spool.seek(0)
+        with zipfile.ZipFile(spool) as archive:
+            members = archive.infolist()
+            if not overwrite:
+                for member in members:
+                    target = os.path.join(destination, _zip_target(member.filename))
+                    if not member.is_dir() and os.path.lexists(target):
+                        raise FileExistsError(f"File exists: {member.filename}")
+            for member in members:
+                if not member.is_dir():
+                    target = os.path.join(destination, _zip_target(member.filename))
+                    preserve_tree(target, preserve)
+                archive.extract(member, destination)
+                if not member.is_dir():
+                    stats["files"] += 1
+                    stats["bytes"] += member.file_size
@@ -0,0 +1,343 @@
+import logging
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .transfer import PreserveCallback, TransferJob, preserve_tree
+
+logger = logging.getLogger(__name__)
+
+BATCH_OPERATIONS = ("rename", "move", "copy", "delete", "mkdir")
+MAX_BATCH_OPERATIONS = 1000
+
+ResultCallback = Callable[[Dict[str, Any]], None]
+
+
+def _overlaps(a: str, b: str) -> bool:
+    return a == b or a.startswith(b + os.sep) or b.startswith(a + os.sep)
+
+
+def _remove(path: str) -> None:
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.unlink(path)
+
+
+class BatchRunner:
+    """
+    Run a batch of file operations on a bounded thread pool.
+
+    Operations that touch overlapping paths run in submission order; all
+    others run concurrently. In atomic mode deletions and overwritten
+    destinations are first renamed into a staging directory next to them,
+    every completed operation records how to undo itself, and the first
+    failure rolls the whole batch back.
+    """
+
+    def __init__(
+        self,
+        operations: List[Dict[str, Any]],
+        atomic: bool = False,
+        max_workers: int = 8,
+        preserve: Optional[PreserveCallback] = None,
+    ):
+        """
+        Initialize the runner.
+
+        Args:
+            operations: Dicts with op, path, optional destination and overwrite
+            atomic: Roll back every completed operation if any one fails
+            max_workers: Maximum operations running at once
+            preserve: Called for every file that is deleted or overwritten
+        """
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            raise ValueError(f"At most {MAX_BATCH_OPERATIONS} operations per batch")
+
+        self.operations = operations
+        self.atomic = atomic
+        self.max_workers = max_workers
+        self.preserve = preserve
+        self.batch_id = uuid.uuid4().hex[:12]
+
+        self._lock = threading.Lock()
+        self._undo: Dict[int, List[Tuple[str, ...]]] = {}
+        self._staging_dirs: Set[str] = set()
+        self._stash_counter = 0
+
+    def run(self, on_result: Optional[ResultCallback] = None) -> Dict[str, Any]:
+        """
+        Execute the batch.
+
+        Args:
+            on_result: Called from worker threads with each item's result as
+                soon as it is known
+
+        Returns:
+            Summary with success flag, counts, rollback state and per-item results
+        """
+        results: Dict[int, Dict[str, Any]] = {}
+
+        def report(result: Dict[str, Any]) -> None:
+            results[result["index"]] = result
+            if on_result is not None:
+                on_result(result)
+
+        normalized: Dict[int, Dict[str, Any]] = {}
+        for index, operation in enumerate(self.operations):
+            try:
+                normalized[index] = self._normalize(operation)
+            except ValueError as e:
+                report(self._result(index, operation, error=str(e)))
+
+        if self.atomic and results:
+            for index, operation in normalized.items():
+                report(self._result(index, operation, error="skipped: batch invalid"))
+            return self._summary(results, rolled_back=False)
+
+        completed = self._execute(normalized, report)
+
+        rolled_back = False
+        if self.atomic and any(not r["success"] for r in results.values()):
+            self._rollback(completed)
+            for index in completed:
+                results[index]["rolled_back"] = True
+            rolled_back = True
+
+        self._cleanup_staging()
+        return self._summary(results, rolled_back)
+
+    def _execute(
+        self, operations: Dict[int, Dict[str, Any]], report: ResultCallback
+    ) -> List[int]:
+        order = sorted(operations)
+        touched = {i: self._touched(operations[i]) for i in order}
+
+        dependents: Dict[int, List[int]] = {i: [] for i in order}
+        waiting_on: Dict[int, int] = {}
+        for pos, i in enumerate(order):
+            count = 0
+            for j in order[:pos]:
+                if any(_overlaps(a, b) for a in touched[i] for b in touched[j]):
+                    dependents[j].append(i)
+                    count += 1
+            waiting_on[i] = count
+
+        completed: List[int] = []
+        finished: Set[int] = set()
+        failed = False
+        ready = [i for i in order if waiting_on[i] == 0]
+        running: Dict[Future, int] = {}
+        skipped: Set[int] = set()
+
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            while ready or running:
+                if not (self.atomic and failed):
+                    for i in ready:
+                        running[pool.submit(self._apply, i, operations[i])] = i
+                ready = []
+
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i = running.pop(future)
+                    finished.add(i)
+                    error = future.exception()
+                    if error is None:
+                        completed.append(i)
+                        report(self._result(i, operations[i]))
+                    else:
+                        failed = True
+                        report(self._result(i, operations[i], error=str(error)))
+                        skipped.update(self._descendants(i, dependents))
+
+                    for j in dependents[i]:
+                        waiting_on[j] -= 1
+                        if waiting_on[j] == 0 and j not in skipped:
+                            ready.append(j)
+
+        for i in order:
+            if i in finished:
+                continue
+            if i in skipped:
+                reason = "skipped: depends on a failed operation"
+            else:
+                reason = "skipped: batch aborted"
+            report(self._result(i, operations[i], error=reason))
+
+        return completed
+
+    @staticmethod
+    def _descendants(index: int, dependents: Dict[int, List[int]]) -> Set[int]:
+        found: Set[int] = set()
+        stack = list(dependents[index])
+        while stack:
+            i = stack.pop()
+            if i not in found:
+                found.add(i)
+                stack.extend(dependents[i])
+        return found
+
+    def _normalize(self, operation: Dict[str, Any]) -> Dict[str, Any]:
+        op = operation.get("op")
+        if op not in BATCH_OPERATIONS:
+            raise ValueError(f"Unknown operation: {op}")
+
+        path = os.path.abspath(os.path.expanduser(operation["path"]))
+        destination = operation.get("destination")
+
+        if op in ("rename", "move", "copy"):
+            if not destination:
+                raise ValueError(f"{op} requires a destination")
+            if op == "rename" and os.sep not in destination:
+                destination = os.path.join(os.path.dirname(path), destination)
+            destination = os.path.abspath(os.path.expanduser(destination))
+            if destination.startswith(path + os.sep):
+                raise ValueError("Destination is inside the source")
+        else:
+            destination = None
+
+        return {
+            "op": op,
+            "path": path,
+            "destination": destination,
+            "overwrite": bool(operation.get("overwrite", False)),
+        }
+
+    @staticmethod
+    def _touched(operation: Dict[str, Any]) -> List[str]:
+        paths = [operation["path"]]
+        if operation["destination"]:
+            paths.append(operation["destination"])
+        return paths
+
+    def _apply(self, index: int, operation: Dict[str, Any]) -> None:
+        undo: List[Tuple[str, ...]] = []
+        op = operation["op"]
+        path = operation["path"]
+        destination = operation["destination"]
+
+        try:
+            if op == "mkdir":
+                self._mkdir(path, undo)
+            elif op == "delete":
+                if not os.path.lexists(path):
+                    raise FileNotFoundError(f"Path does not exist: {path}")
+                preserve_tree(path, self.preserve, "delete")
+                self._discard(path, undo)
+            else:
+                if not os.path.lexists(path):
+                    raise FileNotFoundError(f"Path does not exist: {path}")
+                if path == destination:
+                    return
+                self._prepare_destination(destination, operation["overwrite"], undo)
+
+                if op == "copy":
+                    TransferJob(path, destination, max_workers=4).run()
+                    undo.append(("remove", destination))
+                else:
+                    TransferJob(path, destination, move=True, max_workers=4).run()
+                    undo.append(("move", destination, path))
+        except Exception:
+            # Undo the partial work of this operation before reporting it
+            self._undo_actions(undo)
+            raise
+
+        with self._lock:
+            self._undo[index] = undo
+
+    def _mkdir(self, path: str, undo: List[Tuple[str, ...]]) -> None:
+        top_created = None
+        probe = path
+        while not os.path.lexists(probe):
+            top_created = probe
+            probe = os.path.dirname(probe)
+
+        os.makedirs(path, exist_ok=True)
+        if top_created is not None:
+            undo.append(("remove", top_created))
+
+    def _prepare_destination(
+        self, destination: str, overwrite: bool, undo: List[Tuple[str, ...]]
+    ) -> None:
+        if os.path.lexists(destination):
+            if not overwrite:
+                raise FileExistsError(f"Destination exists: {destination}")
+            preserve_tree(destination, self.preserve)
+            self._discard(destination, undo)
+        else:
+            self._mkdir(os.path.dirname(destination), undo)
+
+    def _discard(self, path: str, undo: List[Tuple[str, ...]]) -> None:
+        if not self.atomic:
+            _remove(path)
+            return
+
+        staging_dir = os.path.join(
+            os.path.dirname(path), f".smartwork-batch-{self.batch_id}"
+        )
+        with self._lock:
+            self._stash_counter += 1
+            stashed = os.path.join(
+                staging_dir, f"{self._stash_counter}-{os.path.basename(path)}"
+            )
+            self._staging_dirs.add(staging_dir)
+
+        os.makedirs(staging_dir, exist_ok=True)
+        os.rename(path, stashed)
+        undo.append(("move", stashed, path))
+
+    def _rollback(self, completed: List[int]) -> None:
+        for index in reversed(completed):
+            self._undo_actions(self._undo.get(index, []))
+
+    def _undo_actions(self, actions: List[Tuple[str, ...]]) -> None:
+        for action in reversed(actions):
+            try:
+                if action[0] == "remove":
+                    _remove(action[1])
+                elif action[0] == "move":
+                    os.makedirs(os.path.dirname(action[2]), exist_ok=True)
+                    shutil.move(action[1], action[2])
+            except OSError as e:
+                logger.error(
+                    f"Batch {self.batch_id} rollback step {action} failed: {e}"
+                )
+
+    def _cleanup_staging(self) -> None:
+        for staging_dir in self._staging_dirs:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    @staticmethod
+    def _result(
+        index: int, operation: Dict[str, Any], error: Optional[str] = None
+    ) -> Dict[str, Any]:
+        return {
+            "index": index,
+            "op": operation.get("op"),
+            "path": operation.get("path"),
+            "destination": operation.get("destination"),
+            "success": error is None,
+            "error": error,
+            "rolled_back": False,
+        }
+
+    @staticmethod
+    def _summary(
+        results: Dict[int, Dict[str, Any]], rolled_back: bool
+    ) -> Dict[str, Any]:
+        ordered = [results[i] for i in sorted(results)]
+        succeeded = sum(1 for r in ordered if r["success"])
+        return {
+            "success": succeeded == len(ordered) and not rolled_back,
+            "total": len(ordered),
+            "succeeded": succeeded,
+            "failed": len(ordered) - succeeded,
+            "rolled_back": rolled_back,
+            "results": ordered,
+        }
@@ -0,0 +1,173 @@
+import base64
+import errno
+import json
+import os
+import stat
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from .streaming import file_etag
+
+MAX_BULK_FILES = 5000
+
+_TEXT_SAMPLE_SIZE = 8192
+
+
+def expand_glob(root: str, pattern: str, limit: int) -> Tuple[List[str], bool]:
+    """
+    Find the files below root matching a glob pattern.
+
+    Args:
+        root: Directory the pattern is relative to
+        pattern: Glob such as ``src/**/*.py``
+        limit: Maximum number of files returned
+
+    Returns:
+        Matching file paths, and whether more files matched than the limit
+
+    Raises:
+        NotADirectoryError: If root is not a directory
+    """
+    base = Path(root).expanduser().resolve()
+    if not base.is_dir():
+        raise NotADirectoryError(root)
+
+    paths = []
+    for match in base.glob(pattern):
+        if not match.is_file():
+            continue
+        if len(paths) == limit:
+            return paths, True
+        paths.append(str(match))
+    return paths, False
+
+
+def _decode_text(data: bytes, truncated: bool) -> Optional[str]:
+    if b"\x00" in data[:_TEXT_SAMPLE_SIZE]:
+        return None
+    try:
+        return data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the size cap is fine
+        if truncated and e.start >= len(data) - 3:
+            try:
+                return data[: e.start].decode("utf-8")
+            except UnicodeDecodeError:
+                return None
+        return None
+
+
+def _error(path: str, status: int, message: str) -> Dict[str, Any]:
+    return {"path": path, "status": status, "error": message}
+
+
+def read_entry(
+    path: str,
+    max_bytes: int,
+    truncate: bool = False,
+    include_binary: bool = False,
+    raw: bool = False,
+) -> Dict[str, Any]:
+    """
+    Read one file of a bulk read, reporting failures instead of raising.
+
+    Args:
+        path: File path
+        max_bytes: Largest file read; bigger files are an error unless
+            truncate is set
+        truncate: Return the first max_bytes of bigger files
+        include_binary: Return binary files instead of an error
+        raw: Return content as bytes rather than text or base64
+
+    Returns:
+        Dictionary with path, size, etag, encoding, content and truncated,
+        or with path, status and error if the file could not be read
+    """
+    file_path = os.path.abspath(os.path.expanduser(path))
+    try:
+        with open(file_path, "rb") as f:
+            st = os.fstat(f.fileno())
+            if not stat.S_ISREG(st.st_mode):
+                return _error(file_path, 400, "Not a regular file")
+            truncated = st.st_size > max_bytes
+            if truncated and not truncate:
+                return _error(file_path, 413, f"File is larger than {max_bytes} bytes")
+            data = f.read(max_bytes)
+    except FileNotFoundError:
+        return _error(file_path, 404, "File not found")
+    except IsADirectoryError:
+        return _error(file_path, 400, "Not a regular file")
+    except PermissionError:
+        return _error(file_path, 403, "Permission denied")
+    except OSError as e:
+        status = 400 if e.errno == errno.ENXIO else 500
+        return _error(file_path, status, str(e))
+
+    content = _decode_text(data, truncated)
+    encoding = "utf-8"
+    if content is None:
+        if not include_binary:
+            return _error(file_path, 415, "Binary file")
+        encoding = "base64"
+        content = data if raw else base64.b64encode(data).decode("ascii")
+    elif raw:
+        content = data
+
+    return {
+        "path": file_path,
+        "size": st.st_size,
+        "mtime": st.st_mtime,
+        "etag": file_etag(st),
+        "encoding": encoding,
+        "truncated": truncated,
+        "content": content,
+    }
+
+
+def new_boundary() -> str:
+    return f"smartwork-{uuid.uuid4().hex}"
+
+
+def multipart_part(boundary: str, entry: Dict[str, Any]) -> bytes:
+    """
+    Encode a bulk read result as one part of a multipart/mixed body.
+
+    File contents are sent as raw bytes, so binary files need no base64;
+    errors and the final summary are sent as JSON parts.
+
+    Args:
+        boundary: Multipart boundary
+        entry: Result of read_entry() with raw content, or a summary
+
+    Returns:
+        Encoded part, starting with its boundary line
+    """
+    headers = []
+    if "path" in entry:
+        headers.append(f"Content-Location: {quote(entry['path'])}")
+
+    if "content" in entry:
+        body = entry["content"]
+        if entry["encoding"] == "base64":
+            headers.append("Content-Type: application/octet-stream")
+        else:
+            headers.append("Content-Type: text/plain; charset=utf-8")
+        headers.append(f"ETag: {entry['etag']}")
+        headers.append(f"X-File-Size: {entry['size']}")
+        if entry["truncated"]:
+            headers.append("X-Truncated: true")
+    else:
+        body = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        headers.append("Content-Type: application/json")
+        if "status" in entry:
+            headers.append(f"X-Status: {entry['status']}")
+
+    headers.append(f"Content-Length: {len(body)}")
+    head = f"--{boundary}\r\n" + "\r\n".join(headers) + "\r\n\r\n"
+    return head.encode("latin-1") + body + b"\r\n"
+
+
+def multipart_end(boundary: str) -> bytes:
+    return f"--{boundary}--\r\n".encode("latin-1")
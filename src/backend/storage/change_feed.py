@@ -0,0 +1,411 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from .watcher import (
+    IN_ATTRIB,
+    IN_CLOSE_WRITE,
+    IN_CREATE,
+    IN_DELETE,
+    IN_DELETE_SELF,
+    IN_ISDIR,
+    IN_MODIFY,
+    IN_MOVE_SELF,
+    IN_MOVED_FROM,
+    IN_MOVED_TO,
+    ChangeWatcher,
+)
+
+logger = logging.getLogger(__name__)
+
+CREATED = "created"
+MODIFIED = "modified"
+DELETED = "deleted"
+
+
+def _event_type(mask: int) -> Optional[str]:
+    if mask & (IN_CREATE | IN_MOVED_TO):
+        return CREATED
+    if mask & (IN_DELETE | IN_MOVED_FROM | IN_DELETE_SELF | IN_MOVE_SELF):
+        return DELETED
+    if mask & (IN_MODIFY | IN_CLOSE_WRITE | IN_ATTRIB):
+        return MODIFIED
+    return None
+
+
+def _coalesce(previous: Optional[str], current: str) -> Optional[str]:
+    """Merge two events on one path; None means they cancel out."""
+    if previous == CREATED:
+        return None if current == DELETED else CREATED
+    if previous == DELETED and current == CREATED:
+        return MODIFIED
+    return current
+
+
+def _covers(root: str, path: str) -> bool:
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+class Subscription:
+    """
+    A client's view of the change feed for one subtree.
+
+    Events are buffered up to ``buffer_size``. A subscriber that falls
+    further behind loses its buffered events and gets a single resync
+    message instead, after which it should list the folder again.
+    """
+
+    def __init__(
+        self,
+        feed: "ChangeFeed",
+        root: str,
+        buffer_size: int,
+        loop: asyncio.AbstractEventLoop,
+    ):
+        self.feed = feed
+        self.root = root
+        self.buffer_size = buffer_size
+        self.complete = True
+        self.overflowed = False
+        self.dropped = 0
+
+        self._loop = loop
+        self._ready = asyncio.Event()
+        self._lock = threading.Lock()
+        self._events: Deque[Dict[str, Any]] = deque()
+        self._closed = False
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Wait for the next batch of changes.
+
+        Args:
+            timeout: Seconds to wait before giving up
+
+        Returns:
+            {"type": "changes", "events": [...]} or {"type": "resync"}, or
+            None on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return None
+            try:
+                await asyncio.wait_for(self._ready.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+            self._ready.clear()
+
+            with self._lock:
+                if self.overflowed:
+                    self.overflowed = False
+                    return {"type": "resync", "root": self.root}
+                if self._events:
+                    events = list(self._events)
+                    self._events.clear()
+                    return {"type": "changes", "root": self.root, "events": events}
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self.feed.unsubscribe(self)
+
+    def _push(self, events: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            if self.overflowed:
+                self.dropped += len(events)
+                return
+            if len(self._events) + len(events) > self.buffer_size:
+                self.dropped += len(self._events) + len(events)
+                self._events.clear()
+                self.overflowed = True
+            else:
+                self._events.extend(events)
+        self._wake()
+
+    def _resync(self) -> None:
+        with self._lock:
+            self.dropped += len(self._events)
+            self._events.clear()
+            self.overflowed = True
+        self._wake()
+
+    def _wake(self) -> None:
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            # The subscriber's event loop is gone
+            pass
+
+
+class ChangeFeed:
+    """
+    Push-based change notifications for directory subtrees.
+
+    Subscribing to a folder watches it and every folder below it with
+    inotify; folders created or moved in later are watched as they appear.
+    Raw events are coalesced per path (a create followed by any number of
+    writes is one "created"; a create followed by a delete is nothing) and
+    flushed once the subtree has been quiet for ``debounce`` seconds, or at
+    the latest ``max_delay`` seconds after the first pending event.
+    """
+
+    def __init__(
+        self,
+        watcher: Optional[ChangeWatcher] = None,
+        debounce: float = 0.1,
+        max_delay: float = 1.0,
+        buffer_size: int = 1000,
+        max_watches: int = 50_000,
+    ):
+        """
+        Initialize the feed.
+
+        Args:
+            watcher: Change watcher; a new one is created if omitted
+            debounce: Quiet period before pending events are sent
+            max_delay: Longest an event is held back while changes continue
+            buffer_size: Events buffered per subscriber before it must resync
+            max_watches: Maximum directories watched across all subscriptions
+        """
+        self.watcher = watcher or ChangeWatcher()
+        self.watcher.add_listener(self._on_change)
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.buffer_size = buffer_size
+        self.max_watches = max_watches
+
+        self._lock = threading.Lock()
+        self._flush = threading.Condition(self._lock)
+        self._subscriptions: List[Subscription] = []
+        self._watched: Set[str] = set()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._first_pending = 0.0
+        self._last_pending = 0.0
+        self._resync_all = False
+        self._thread: Optional[threading.Thread] = None
+        self._stop = False
+
+        self.events = 0
+        self.batches = 0
+
+    @property
+    def available(self) -> bool:
+        return self.watcher.available
+
+    def subscribe(
+        self,
+        root: str,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        buffer_size: Optional[int] = None,
+    ) -> Subscription:
+        """
+        Start receiving changes below a folder.
+
+        Watching a large tree walks it once; call this off the event loop.
+
+        Args:
+            root: Absolute directory path
+            loop: Event loop the subscriber waits on; defaults to the
+                running loop
+            buffer_size: Overrides the feed's per-subscriber buffer size
+
+        Returns:
+            Subscription; close() it when the client goes away
+        """
+        subscription = Subscription(
+            self,
+            root,
+            buffer_size or self.buffer_size,
+            loop or asyncio.get_running_loop(),
+        )
+        with self._lock:
+            self._subscriptions.append(subscription)
+            self._ensure_thread()
+        subscription.complete = self._watch_tree(root) and self.available
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+            roots = [s.root for s in self._subscriptions]
+            unused = [
+                path
+                for path in self._watched
+                if _covers(subscription.root, path)
+                and not any(_covers(root, path) for root in roots)
+            ]
+            for path in unused:
+                self._watched.discard(path)
+        for path in unused:
+            self.watcher.unwatch(path)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscriptions),
+                "watched_directories": len(self._watched),
+                "pending": len(self._pending),
+                "events": self.events,
+                "batches": self.batches,
+                "inotify": self.available,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._stop = True
+            self._flush.notify_all()
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.close()
+        self.watcher.remove_listener(self._on_change)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="smartwork-change-feed", daemon=True
+            )
+            self._thread.start()
+
+    def _watch_tree(self, root: str) -> bool:
+        """Watch root and its subdirectories; False if the limit was hit."""
+        complete = True
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            with self._lock:
+                if len(self._watched) >= self.max_watches:
+                    logger.warning(f"Change feed watch limit reached under {root}")
+                    return False
+                known = directory in self._watched
+                if not known:
+                    self._watched.add(directory)
+            if not known and not self.watcher.watch(directory):
+                with self._lock:
+                    self._watched.discard(directory)
+                complete = False
+                continue
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+            except OSError:
+                continue
+        return complete
+
+    def _on_change(self, directory: str, name: str, mask: int) -> None:
+        if not directory:
+            # Kernel queue overflow: events were lost
+            with self._lock:
+                self._resync_all = True
+                self._mark_pending()
+            return
+
+        event_type = _event_type(mask)
+        if event_type is None:
+            return
+
+        path = os.path.join(directory, name) if name else directory
+        gone = []
+        if name and event_type == DELETED and mask & IN_ISDIR:
+            # Events below a removed folder stop; forget its watches
+            with self._lock:
+                gone = [p for p in self._watched if _covers(path, p)]
+                self._watched.difference_update(gone)
+        elif not name and event_type == DELETED:
+            with self._lock:
+                self._watched.discard(directory)
+            gone = [directory]
+        # A moved folder keeps its watches; drop them so events are not
+        # reported under the old path and a new folder there gets watched
+        for p in gone:
+            self.watcher.unwatch(p)
+
+        is_dir = bool(mask & IN_ISDIR) or not name
+        with self._lock:
+            if not any(_covers(s.root, path) for s in self._subscriptions):
+                return
+            self._add_pending(path, event_type, is_dir)
+
+        if name and event_type == CREATED and mask & IN_ISDIR:
+            # Files may appear in a new folder before it is watched
+            self._watch_tree(path)
+            self._report_contents(path)
+
+    def _report_contents(self, directory: str) -> None:
+        stack = [directory]
+        found = []
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                        found.append((entry.path, is_dir))
+                        if is_dir:
+                            stack.append(entry.path)
+            except OSError:
+                continue
+        if found:
+            with self._lock:
+                for path, is_dir in found:
+                    self._add_pending(path, CREATED, is_dir)
+
+    def _add_pending(self, path: str, event_type: str, is_dir: bool) -> None:
+        self.events += 1
+        previous = self._pending.get(path)
+        merged = _coalesce(previous["type"] if previous else None, event_type)
+        if merged is None:
+            self._pending.pop(path, None)
+        else:
+            self._pending[path] = {"path": path, "type": merged, "is_dir": is_dir}
+        self._mark_pending()
+
+    def _mark_pending(self) -> None:
+        now = time.monotonic()
+        if not self._first_pending:
+            self._first_pending = now
+        self._last_pending = now
+        self._flush.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._stop and not self._first_pending:
+                    self._flush.wait()
+                if self._stop:
+                    return
+
+                while not self._stop:
+                    deadline = min(
+                        self._last_pending + self.debounce,
+                        self._first_pending + self.max_delay,
+                    )
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._flush.wait(remaining)
+
+                batch = list(self._pending.values())
+                resync_all = self._resync_all
+                self._pending = {}
+                self._resync_all = False
+                self._first_pending = 0.0
+                subscriptions = list(self._subscriptions)
+                if batch:
+                    self.batches += 1
+
+            for subscription in subscriptions:
+                if resync_all:
+                    subscription._resync()
+                    continue
+                events = [e for e in batch if _covers(subscription.root, e["path"])]
+                if events:
+                    subscription._push(events)
@@ -0,0 +1,465 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .text_extract import extract_text, is_extractable
+from .trash import VOLUME_TRASH_NAME
+
+logger = logging.getLogger(__name__)
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_CJK_CHAR = re.compile(f"([{_CJK}])")
+_CJK_SPACING = re.compile(f"\\s*([{_CJK}])\\s*")
+_WORD = re.compile(r"\w+")
+
+SNIPPET_START = "<mark>"
+SNIPPET_END = "</mark>"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    hash TEXT,
+    indexed_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(body, tokenize='unicode61');
+"""
+
+
+def segment(text: str) -> str:
+    """
+    Split CJK characters into separate tokens for the unicode61 tokenizer.
+
+    unicode61 treats a run of CJK characters as one token, so words inside
+    Chinese or Japanese sentences would be unsearchable. Indexing every CJK
+    character as its own token and querying words as phrases fixes that.
+
+    Args:
+        text: Raw text
+
+    Returns:
+        Text with spaces around every CJK character
+    """
+    return _CJK_CHAR.sub(r" \1 ", text)
+
+
+def build_match_query(query: str) -> str:
+    """
+    Turn free text into an FTS5 query that requires every word.
+
+    Args:
+        query: User search text
+
+    Returns:
+        FTS5 MATCH expression, or "" if the query has no words
+    """
+    phrases = []
+    for word in _WORD.findall(query):
+        phrases.append('"' + " ".join(segment(word).split()) + '"')
+    return " ".join(phrases)
+
+
+def _prefix_range(root: str) -> Tuple[str, str]:
+    # Bounds of the paths under root, for range scans on the path index
+    prefix = root.rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _index_worker(
+    path: str, known_hash: Optional[str], max_chars: int
+) -> Tuple[str, Optional[str], Optional[str], Optional[str]]:
+    """
+    Hash a file and extract its text in a worker process.
+
+    Returns:
+        (path, hash, segmented text, error). Text is None when the content
+        hash matches known_hash or the format cannot be extracted.
+    """
+    try:
+        digest = _file_hash(path)
+        if digest == known_hash:
+            return path, digest, None, None
+
+        text = extract_text(path, max_chars)
+        return path, digest, segment(text) if text else None, None
+    except Exception as e:
+        return path, None, None, str(e)
+
+
+class ContentIndex:
+    """
+    Full-text index over the content of files in granted folders.
+
+    Text is stored in an SQLite FTS5 table and ranked with BM25. Refreshes
+    are incremental: files whose mtime and size are unchanged are skipped
+    without being opened, and files whose content hash is unchanged are not
+    re-extracted. Hashing and extraction run on a process pool driven from a
+    background thread, so neither the event loop nor a single core limits
+    indexing.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_workers: Optional[int] = None,
+        max_file_bytes: int = 50 * 1024 * 1024,
+        max_chars: int = 1_000_000,
+    ):
+        """
+        Initialize the index and create the schema if needed.
+
+        Args:
+            db_path: SQLite database file
+            max_workers: Worker processes (defaults to the CPU count)
+            max_file_bytes: Skip files larger than this
+            max_chars: Maximum characters indexed per file
+        """
+        self.db_path = db_path
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_file_bytes = max_file_bytes
+        self.max_chars = max_chars
+
+        self._local = threading.local()
+        self._refresh_lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self.last_refresh: Dict[str, Any] = {}
+
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    def refresh(self, roots: List[str]) -> Dict[str, Any]:
+        """
+        Bring the index up to date with the given folders.
+
+        Blocks until done; use refresh_in_background() from request handlers.
+
+        Args:
+            roots: Folders to index
+
+        Returns:
+            Counters for scanned, indexed, unchanged, removed and failed files
+        """
+        with self._refresh_lock:
+            started = time.monotonic()
+            stats: Dict[str, Any] = dict.fromkeys(
+                ("scanned", "indexed", "unchanged", "removed", "failed"), 0
+            )
+            conn = self._connect()
+
+            for root in roots:
+                self._refresh_root(conn, root, stats)
+
+            stats["seconds"] = round(time.monotonic() - started, 3)
+            self.last_refresh = stats
+            return stats
+
+    def refresh_in_background(self, roots: List[str]) -> bool:
+        """
+        Start a refresh on a background thread.
+
+        Args:
+            roots: Folders to index
+
+        Returns:
+            False if a refresh is already running
+        """
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return False
+
+        self._refresh_thread = threading.Thread(
+            target=self.refresh,
+            args=(list(roots),),
+            name="smartwork-content-index",
+            daemon=True,
+        )
+        self._refresh_thread.start()
+        return True
+
+    def refresh_path(self, path: str) -> threading.Thread:
+        """
+        Index a file or folder that reappeared, e.g. restored from the trash.
+
+        Runs on a background thread once any running refresh has finished.
+
+        Args:
+            path: File or folder inside an indexed root
+
+        Returns:
+            The started thread
+        """
+
+        def run():
+            with self._refresh_lock:
+                stats = dict.fromkeys(
+                    ("scanned", "indexed", "unchanged", "removed", "failed"), 0
+                )
+                self._refresh_root(self._connect(), path, stats)
+
+        thread = threading.Thread(
+            target=run, name="smartwork-content-index-path", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def remove_root(self, root: str) -> int:
+        """
+        Drop every document under a folder whose access was revoked.
+
+        Waits for a running refresh, which may still be indexing the folder.
+
+        Args:
+            root: Folder previously indexed
+
+        Returns:
+            Number of documents removed
+        """
+        with self._refresh_lock:
+            return self.remove_path(root)
+
+    def remove_path(self, path: str) -> int:
+        """
+        Drop a deleted document, or every document under a deleted folder.
+
+        Args:
+            path: File or folder that no longer exists
+
+        Returns:
+            Number of documents removed
+        """
+        lower, upper = _prefix_range(path)
+        where = "path = ? OR (path >= ? AND path < ?)"
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                f"DELETE FROM docs_fts WHERE rowid IN (SELECT id FROM docs WHERE {where})",
+                (path, lower, upper),
+            )
+            return conn.execute(
+                f"DELETE FROM docs WHERE {where}", (path, lower, upper)
+            ).rowcount
+
+    def search(
+        self,
+        query: str,
+        root: Optional[str] = None,
+        limit: int = 20,
+        roots: Optional[List[str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search file contents, best matches first.
+
+        Args:
+            query: Words to search for; all must match
+            root: Optional folder to restrict results to
+            limit: Maximum number of results
+            roots: Optional granted folders; documents outside all of them
+                are never returned
+
+        Returns:
+            List of dicts with path, score and a highlighted snippet
+        """
+        match = build_match_query(query)
+        if not match or roots == []:
+            return []
+
+        sql = (
+            "SELECT d.path, bm25(docs_fts) AS rank, "
+            f"snippet(docs_fts, 0, '{SNIPPET_START}', '{SNIPPET_END}', '…', 24) "
+            "FROM docs_fts JOIN docs d ON d.id = docs_fts.rowid "
+            "WHERE docs_fts MATCH ?"
+        )
+        params: List[Any] = [match]
+
+        if root:
+            sql += " AND d.path >= ? AND d.path < ?"
+            params.extend(_prefix_range(root))
+
+        if roots is not None:
+            sql += " AND (" + " OR ".join("d.path >= ? AND d.path < ?" for _ in roots)
+            sql += ")"
+            for granted in roots:
+                params.extend(_prefix_range(granted))
+
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        return [
+            {
+                "path": path,
+                "score": round(-rank, 4),
+                "snippet": _CJK_SPACING.sub(r"\1", snippet).strip(),
+            }
+            for path, rank, snippet in self._connect().execute(sql, params)
+        ]
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Get index status.
+
+        Returns:
+            Document count, refresh state and last refresh counters
+        """
+        conn = self._connect()
+        return {
+            "documents": conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0],
+            "refreshing": self._refresh_lock.locked(),
+            "workers": self.max_workers,
+            "last_refresh": self.last_refresh,
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _iter_candidates(self, root: str) -> Iterator[Tuple[str, os.stat_result]]:
+        if os.path.isfile(root):
+            # A single file refreshed on its own
+            try:
+                stat_result = os.stat(root)
+            except OSError:
+                return
+            if is_extractable(root) and stat_result.st_size <= self.max_file_bytes:
+                yield root, stat_result
+            return
+
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name == VOLUME_TRASH_NAME:
+                            continue
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.is_file() and is_extractable(entry.name):
+                                stat_result = entry.stat()
+                                if stat_result.st_size <= self.max_file_bytes:
+                                    yield entry.path, stat_result
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+    def _refresh_root(
+        self, conn: sqlite3.Connection, root: str, stats: Dict[str, Any]
+    ) -> None:
+        prefix, upper = _prefix_range(root)
+        known = {
+            path: (doc_id, size, mtime, digest)
+            for doc_id, path, size, mtime, digest in conn.execute(
+                "SELECT id, path, size, mtime, hash FROM docs "
+                "WHERE path = ? OR (path >= ? AND path < ?)",
+                (root, prefix, upper),
+            )
+        }
+
+        seen = set()
+        pending: Dict[Any, os.stat_result] = {}
+        max_in_flight = self.max_workers * 4
+        written = 0
+
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self.max_workers, mp_context=context) as pool:
+            for path, stat_result in self._iter_candidates(root):
+                stats["scanned"] += 1
+                seen.add(path)
+
+                previous = known.get(path)
+                if previous is not None and previous[1:3] == (
+                    stat_result.st_size,
+                    stat_result.st_mtime,
+                ):
+                    stats["unchanged"] += 1
+                    continue
+
+                known_hash = previous[3] if previous else None
+                future = pool.submit(_index_worker, path, known_hash, self.max_chars)
+                pending[future] = stat_result
+
+                if len(pending) >= max_in_flight:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    written += self._store_results(conn, done, pending, known, stats)
+                    if written >= 200:
+                        conn.commit()
+                        written = 0
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                self._store_results(conn, done, pending, known, stats)
+
+        removed = [known[path][0] for path in known.keys() - seen]
+        for doc_id in removed:
+            conn.execute("DELETE FROM docs_fts WHERE rowid = ?", (doc_id,))
+            conn.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+        stats["removed"] += len(removed)
+        conn.commit()
+
+    def _store_results(
+        self,
+        conn: sqlite3.Connection,
+        done,
+        pending: Dict[Any, os.stat_result],
+        known: Dict[str, tuple],
+        stats: Dict[str, Any],
+    ) -> int:
+        now = time.time()
+        for future in done:
+            stat_result = pending.pop(future)
+            path, digest, body, error = future.result()
+
+            if error is not None:
+                stats["failed"] += 1
+                logger.debug(f"Content index skipped {path}: {error}")
+                continue
+
+            previous = known.get(path)
+            if previous is not None:
+                doc_id = previous[0]
+                conn.execute(
+                    "UPDATE docs SET size = ?, mtime = ?, hash = ?, indexed_at = ? "
+                    "WHERE id = ?",
+                    (stat_result.st_size, stat_result.st_mtime, digest, now, doc_id),
+                )
+                if digest == previous[3]:
+                    stats["unchanged"] += 1
+                    continue
+                conn.execute("DELETE FROM docs_fts WHERE rowid = ?", (doc_id,))
+            else:
+                doc_id = conn.execute(
+                    "INSERT INTO docs (path, size, mtime, hash, indexed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (path, stat_result.st_size, stat_result.st_mtime, digest, now),
+                ).lastrowid
+
+            if body:
+                conn.execute(
+                    "INSERT INTO docs_fts (rowid, body) VALUES (?, ?)", (doc_id, body)
+                )
+            stats["indexed"] += 1
+
+        return len(done)
@@ -0,0 +1,410 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    partial BLOB,
+    full BLOB,
+    used_at REAL NOT NULL,
+    PRIMARY KEY (dev, ino)
+);
+"""
+
+PARTIAL = "partial"
+FULL = "full"
+
+# Files handed to a worker process per task, and the most bytes per task,
+# so small files do not each pay a round trip to the pool
+_BATCH_FILES = 64
+_BATCH_BYTES = 64 * 1024 * 1024
+
+ProgressCallback = Callable[[str, float], None]
+FileKey = Tuple[int, int]
+FileEntry = Tuple[str, os.stat_result]
+
+
+def _digest(path: str, kind: str, block_size: int) -> bytes:
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, "rb") as f:
+        if kind == PARTIAL:
+            digest.update(f.read(block_size))
+            size = os.fstat(f.fileno()).st_size
+            if size > block_size:
+                f.seek(max(block_size, size - block_size))
+                digest.update(f.read(block_size))
+        else:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.digest()
+
+
+def _hash_worker(
+    paths: List[str], kind: str, block_size: int
+) -> List[Tuple[str, Optional[bytes], Optional[str]]]:
+    """
+    Hash a batch of files in a worker process.
+
+    Returns:
+        (path, digest, error) per file
+    """
+    results = []
+    for path in paths:
+        try:
+            results.append((path, _digest(path, kind, block_size), None))
+        except OSError as e:
+            results.append((path, None, str(e)))
+    return results
+
+
+class DuplicateFinder:
+    """
+    Find files with identical content in a set of folders.
+
+    Files are bucketed by size first; only sizes shared by several files
+    are read at all. Those files are then hashed on their first and last
+    blocks, and only files that still collide are hashed in full. Hashing
+    runs on a process pool. Digests are cached in SQLite keyed by device
+    and inode and validated against size and mtime, so a rerun over
+    unchanged folders only has to walk them.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_workers: Optional[int] = None,
+        block_size: int = 64 * 1024,
+        max_groups: int = 1000,
+    ):
+        """
+        Initialize the finder and create the hash cache if needed.
+
+        Args:
+            db_path: SQLite database file for cached digests
+            max_workers: Worker processes (defaults to the CPU count)
+            block_size: Bytes hashed from each end of a file for the
+                partial hash
+            max_groups: Most duplicate groups returned, largest waste first
+        """
+        self.db_path = db_path
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.block_size = block_size
+        self.max_groups = max_groups
+
+        self._local = threading.local()
+
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+    def find(
+        self,
+        roots: List[str],
+        min_size: int = 1,
+        on_progress: Optional[ProgressCallback] = None,
+        cancelled: Optional[threading.Event] = None,
+    ) -> Dict[str, Any]:
+        """
+        Find duplicate files below the given folders.
+
+        Blocks until done; run it off the event loop.
+
+        Args:
+            roots: Folders to search
+            min_size: Ignore files smaller than this many bytes
+            on_progress: Called with a stage message and percent complete
+            cancelled: Stops the search when set
+
+        Returns:
+            Duplicate groups with their size and wasted bytes, and counters
+        """
+        started = time.monotonic()
+        stats = {
+            "scanned_files": 0,
+            "hashed_files": 0,
+            "hashed_bytes": 0,
+            "cache_hits": 0,
+            "errors": 0,
+        }
+
+        def progress(message: str, percent: float) -> None:
+            if cancelled is not None and cancelled.is_set():
+                raise InterruptedError("Duplicate search cancelled")
+            if on_progress is not None:
+                on_progress(message, percent)
+
+        by_size: Dict[int, Dict[FileKey, FileEntry]] = defaultdict(dict)
+        for path, st in self._iter_files(roots, min_size):
+            stats["scanned_files"] += 1
+            # Hard links share an inode and take no extra space; report the
+            # first of their paths
+            entries = by_size[st.st_size]
+            key = (st.st_dev, st.st_ino)
+            if key not in entries or path < entries[key][0]:
+                entries[key] = (path, st)
+            if stats["scanned_files"] % 10000 == 0:
+                progress(f"Scanned {stats['scanned_files']} files", 5)
+        progress(f"Scanned {stats['scanned_files']} files", 10)
+
+        files: Dict[FileKey, FileEntry] = {}
+        buckets: List[List[FileKey]] = []
+        for entries in by_size.values():
+            if len(entries) > 1:
+                files.update(entries)
+                buckets.append(list(entries))
+        del by_size
+
+        conn = self._connect()
+        cached = self._load_cache(conn, files)
+
+        # Files that fit in one block skip the partial hash
+        large = [k for g in buckets for k in g if files[k][1].st_size > self.block_size]
+        progress(f"Hashing {len(large)} candidates by their first and last blocks", 20)
+        partial = self._hash(
+            conn, files, large, PARTIAL, cached, stats, progress, 20, 40
+        )
+
+        next_buckets = []
+        for group in buckets:
+            if files[group[0]][1].st_size <= self.block_size:
+                next_buckets.append(group)
+                continue
+            by_partial = defaultdict(list)
+            for key in group:
+                if key in partial:
+                    by_partial[partial[key]].append(key)
+            next_buckets.extend(g for g in by_partial.values() if len(g) > 1)
+
+        candidates = [k for g in next_buckets for k in g]
+        progress(f"Hashing {len(candidates)} candidates in full", 40)
+        full = self._hash(
+            conn, files, candidates, FULL, cached, stats, progress, 40, 95
+        )
+        conn.commit()
+
+        groups = []
+        for group in next_buckets:
+            by_full = defaultdict(list)
+            for key in group:
+                if key in full:
+                    by_full[full[key]].append(files[key][0])
+            for digest, paths in by_full.items():
+                if len(paths) > 1:
+                    size = files[group[0]][1].st_size
+                    groups.append(
+                        {
+                            "hash": digest.hex(),
+                            "size": size,
+                            "count": len(paths),
+                            "wasted_bytes": size * (len(paths) - 1),
+                            "paths": sorted(paths),
+                        }
+                    )
+
+        groups.sort(key=lambda g: (-g["wasted_bytes"], g["paths"][0]))
+        progress(f"Found {len(groups)} groups of duplicates", 100)
+        return {
+            "roots": roots,
+            "groups": groups[: self.max_groups],
+            "total_groups": len(groups),
+            "duplicate_files": sum(g["count"] - 1 for g in groups),
+            "wasted_bytes": sum(g["wasted_bytes"] for g in groups),
+            **stats,
+            "seconds": round(time.monotonic() - started, 3),
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _iter_files(
+        roots: List[str], min_size: int
+    ) -> Iterator[Tuple[str, os.stat_result]]:
+        stack = list(roots)
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                st = entry.stat(follow_symlinks=False)
+                                if st.st_size >= min_size:
+                                    yield entry.path, st
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+    def _load_cache(
+        self,
+        conn: sqlite3.Connection,
+        files: Dict[FileKey, FileEntry],
+    ) -> Dict[FileKey, Tuple[Optional[bytes], Optional[bytes]]]:
+        cached = {}
+        keys = list(files)
+        for start in range(0, len(keys), 400):
+            chunk = keys[start : start + 400]
+            clause = " OR ".join("(dev = ? AND ino = ?)" for _ in chunk)
+            params = [value for key in chunk for value in key]
+            rows = conn.execute(
+                "SELECT dev, ino, size, mtime_ns, partial, full FROM hashes "
+                f"WHERE {clause}",
+                params,
+            )
+            for dev, ino, size, mtime_ns, partial, full in rows:
+                st = files[(dev, ino)][1]
+                if (size, mtime_ns) == (st.st_size, st.st_mtime_ns):
+                    cached[(dev, ino)] = (partial, full)
+        return cached
+
+    def _hash(
+        self,
+        conn: sqlite3.Connection,
+        files: Dict[FileKey, FileEntry],
+        keys: List[FileKey],
+        kind: str,
+        cached: Dict[FileKey, Tuple[Optional[bytes], Optional[bytes]]],
+        stats: Dict[str, Any],
+        progress: Callable[[str, float], None],
+        start_percent: float,
+        end_percent: float,
+    ) -> Dict[FileKey, bytes]:
+        column = 0 if kind == PARTIAL else 1
+        digests: Dict[FileKey, bytes] = {}
+        missing = []
+        for key in keys:
+            digest = cached.get(key, (None, None))[column]
+            if digest is None:
+                missing.append(key)
+            else:
+                digests[key] = digest
+                stats["cache_hits"] += 1
+        if not missing:
+            return digests
+
+        by_path = {files[key][0]: key for key in missing}
+        batches = self._batches(files, missing, kind)
+        done_files = 0
+        now = time.time()
+
+        # The pool is only started when something is not cached
+        context = multiprocessing.get_context("spawn")
+        workers = min(self.max_workers, len(batches))
+        with ProcessPoolExecutor(workers, mp_context=context) as pool:
+            pending = set()
+            queued = iter(batches)
+            for batch in queued:
+                pending.add(pool.submit(_hash_worker, batch, kind, self.block_size))
+                if len(pending) >= workers * 2:
+                    break
+            try:
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        for path, digest, error in future.result():
+                            done_files += 1
+                            key = by_path[path]
+                            if error is not None:
+                                stats["errors"] += 1
+                                logger.debug(
+                                    f"Duplicate search skipped {path}: {error}"
+                                )
+                                continue
+                            digests[key] = digest
+                            self._store(conn, key, files[key][1], kind, digest, now)
+                            stats["hashed_files"] += 1
+                            stats["hashed_bytes"] += (
+                                min(files[key][1].st_size, 2 * self.block_size)
+                                if kind == PARTIAL
+                                else files[key][1].st_size
+                            )
+                        next_batch = next(queued, None)
+                        if next_batch is not None:
+                            pending.add(
+                                pool.submit(
+                                    _hash_worker, next_batch, kind, self.block_size
+                                )
+                            )
+                    percent = start_percent + (end_percent - start_percent) * (
+                        done_files / len(missing)
+                    )
+                    progress(f"Hashed {done_files}/{len(missing)} files", percent)
+            except BaseException:
+                for future in pending:
+                    future.cancel()
+                raise
+        return digests
+
+    def _batches(
+        self,
+        files: Dict[FileKey, FileEntry],
+        keys: List[FileKey],
+        kind: str,
+    ) -> List[List[str]]:
+        batches: List[List[str]] = []
+        batch: List[str] = []
+        batch_bytes = 0
+        for key in keys:
+            path, st = files[key]
+            size = (
+                min(st.st_size, 2 * self.block_size) if kind == PARTIAL else st.st_size
+            )
+            if batch and (
+                len(batch) >= _BATCH_FILES or batch_bytes + size > _BATCH_BYTES
+            ):
+                batches.append(batch)
+                batch, batch_bytes = [], 0
+            batch.append(path)
+            batch_bytes += size
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _store(
+        self,
+        conn: sqlite3.Connection,
+        key: FileKey,
+        st: os.stat_result,
+        kind: str,
+        digest: bytes,
+        now: float,
+    ) -> None:
+        column = "partial" if kind == PARTIAL else "full"
+        # A file that changed since its last hash starts with a clean row
+        conn.execute(
+            "INSERT INTO hashes (dev, ino, size, mtime_ns, used_at) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT(dev, ino) DO UPDATE SET "
+            "partial = CASE WHEN size = excluded.size AND mtime_ns = "
+            "excluded.mtime_ns THEN partial END, "
+            "full = CASE WHEN size = excluded.size AND mtime_ns = "
+            "excluded.mtime_ns THEN full END, "
+            "size = excluded.size, mtime_ns = excluded.mtime_ns, "
+            "used_at = excluded.used_at",
+            (key[0], key[1], st.st_size, st.st_mtime_ns, now),
+        )
+        conn.execute(
+            f"UPDATE hashes SET {column} = ? WHERE dev = ? AND ino = ?",
+            (digest, key[0], key[1]),
+        )
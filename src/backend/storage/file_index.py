@@ -0,0 +1,487 @@
+import logging
+import os
+import queue
+import re
+import sqlite3
+import stat
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .watcher import (
+    IN_CREATE,
+    IN_DELETE_SELF,
+    IN_ISDIR,
+    IN_MODIFY,
+    IN_MOVE_SELF,
+    IN_MOVED_TO,
+    IN_Q_OVERFLOW,
+    ChangeWatcher,
+)
+from .trash import VOLUME_TRASH_NAME, is_trash_path
+
+logger = logging.getLogger(__name__)
+
+SEARCH_MODES = ("glob", "prefix", "substring")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots (
+    path TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    is_dir INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    scan_id INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS files_name_lower ON files(name_lower);
+"""
+
+# Trigram index over lowercase names; only touched when a row's name changes
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS files_trigram USING fts5(
+    name_lower, content='files', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS files_ai AFTER INSERT ON files BEGIN
+    INSERT INTO files_trigram(rowid, name_lower) VALUES (new.id, new.name_lower);
+END;
+CREATE TRIGGER IF NOT EXISTS files_ad AFTER DELETE ON files BEGIN
+    INSERT INTO files_trigram(files_trigram, rowid, name_lower)
+    VALUES ('delete', old.id, old.name_lower);
+END;
+CREATE TRIGGER IF NOT EXISTS files_au AFTER UPDATE OF name_lower ON files BEGIN
+    INSERT INTO files_trigram(files_trigram, rowid, name_lower)
+    VALUES ('delete', old.id, old.name_lower);
+    INSERT INTO files_trigram(rowid, name_lower) VALUES (new.id, new.name_lower);
+END;
+"""
+
+_UPSERT = """
+INSERT INTO files (path, name, name_lower, is_dir, size, mtime, scan_id)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(path) DO UPDATE SET
+    is_dir = excluded.is_dir,
+    size = excluded.size,
+    mtime = excluded.mtime,
+    scan_id = excluded.scan_id
+"""
+
+
+def _glob_escape(text: str) -> str:
+    return re.sub(r"([*?\[])", r"[\1]", text)
+
+
+def _subtree_bounds(path: str) -> Tuple[str, str]:
+    # Every descendant of path sorts between "path/" and "path0" ("0" follows "/")
+    return path.rstrip(os.sep) + os.sep, path.rstrip(os.sep) + chr(ord(os.sep) + 1)
+
+
+class FileIndex:
+    """
+    Persistent filename index over granted folders, stored in SQLite.
+
+    A background writer thread builds the index with os.scandir and applies
+    inotify change events incrementally. Prefix lookups use a B-tree index
+    on the lowercase name; substring and glob lookups use an FTS5 trigram
+    index when SQLite provides one and fall back to a table scan otherwise.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        watcher: Optional[ChangeWatcher] = None,
+        batch_size: int = 5000,
+    ):
+        """
+        Initialize the index and create the schema if needed.
+
+        Args:
+            db_path: SQLite database file
+            watcher: Change watcher; a new one is created if omitted
+            batch_size: Rows written per transaction during scans
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.watcher = watcher or ChangeWatcher()
+
+        self._local = threading.local()
+        self._updates: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._current_scan: Optional[str] = None
+
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        try:
+            conn.executescript(_FTS_SCHEMA)
+            self.fts_enabled = True
+        except sqlite3.OperationalError:
+            logger.info("SQLite trigram tokenizer unavailable, using table scans")
+            self.fts_enabled = False
+        conn.commit()
+
+        self._scan_id = conn.execute(
+            "SELECT COALESCE(MAX(scan_id), 0) FROM files"
+        ).fetchone()[0]
+
+    def start(self) -> None:
+        """
+        Start the writer thread and rescan every known root.
+
+        Rescans are incremental: unchanged rows are kept and rows for files
+        that disappeared while the server was down are removed.
+        """
+        if self._writer is not None:
+            return
+
+        self.watcher.add_listener(self._on_change)
+        self._writer = threading.Thread(
+            target=self._run, name="smartwork-file-index", daemon=True
+        )
+        self._writer.start()
+
+        for root in self.roots():
+            self._updates.put(("scan", root))
+
+    def close(self) -> None:
+        """
+        Stop the writer thread and the watcher.
+        """
+        if self._writer is not None:
+            self._updates.put(None)
+            self._writer.join(timeout=5)
+            self._writer = None
+        self.watcher.remove_listener(self._on_change)
+        self.watcher.close()
+
+    def add_root(self, path: str) -> None:
+        """
+        Grant a folder and schedule it for indexing.
+
+        Args:
+            path: Absolute directory path
+        """
+        conn = self._connect()
+        conn.execute("INSERT OR IGNORE INTO roots (path) VALUES (?)", (path,))
+        conn.commit()
+        self._updates.put(("scan", path))
+
+    def remove_root(self, path: str) -> None:
+        """
+        Remove a granted folder and drop its entries from the index.
+
+        Args:
+            path: Directory path passed to add_root()
+        """
+        conn = self._connect()
+        conn.execute("DELETE FROM roots WHERE path = ?", (path,))
+        conn.commit()
+        self._updates.put(("remove", path))
+
+    def refresh_path(self, path: str) -> None:
+        """
+        Schedule a path to be re-checked, e.g. after the server removed or
+        restored it. Folders are rescanned with their contents.
+
+        Args:
+            path: Absolute file or directory path
+        """
+        new_dir = os.path.isdir(path) and not os.path.islink(path)
+        self._updates.put(("path", path, new_dir))
+
+    def roots(self) -> List[str]:
+        rows = self._connect().execute("SELECT path FROM roots ORDER BY path")
+        return [row[0] for row in rows]
+
+    def search(
+        self,
+        query: str,
+        mode: str = "substring",
+        root: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search indexed names.
+
+        Matching is case-insensitive. A glob containing a path separator is
+        matched against the full path instead of the name.
+
+        Args:
+            query: Search text or glob pattern
+            mode: One of "glob", "prefix" or "substring"
+            root: Optional directory to restrict results to
+            limit: Maximum number of results
+
+        Returns:
+            List of matching entries
+
+        Raises:
+            ValueError: If the mode is unknown
+        """
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+
+        columns = "f.path, f.name, f.is_dir, f.size, f.mtime"
+        where: List[str] = []
+        params: List[Any] = []
+
+        if root:
+            low, high = _subtree_bounds(root)
+            where.append("f.path >= ? AND f.path < ?")
+            params.extend([low, high])
+
+        needle = query.lower()
+
+        if mode == "prefix":
+            sql = f"SELECT {columns} FROM files f"
+            where.insert(0, "f.name_lower >= ? AND f.name_lower < ?")
+            params[0:0] = [needle, needle + "\uffff"]
+            order = " ORDER BY f.name_lower"
+        elif mode == "glob" and os.sep in query:
+            sql = f"SELECT {columns} FROM files f"
+            where.insert(0, "LOWER(f.path) GLOB ?")
+            params.insert(0, needle)
+            order = ""
+        else:
+            pattern = needle if mode == "glob" else f"*{_glob_escape(needle)}*"
+            if self.fts_enabled:
+                sql = (
+                    f"SELECT {columns} FROM files_trigram t "
+                    "JOIN files f ON f.id = t.rowid"
+                )
+                where.insert(0, "t.name_lower GLOB ?")
+            else:
+                sql = f"SELECT {columns} FROM files f"
+                where.insert(0, "f.name_lower GLOB ?")
+            params.insert(0, pattern)
+            order = ""
+
+        sql += " WHERE " + " AND ".join(where) + order + " LIMIT ?"
+        params.append(limit)
+
+        return [
+            {
+                "path": path,
+                "name": name,
+                "is_dir": bool(is_dir),
+                "size": size,
+                "mtime": mtime,
+            }
+            for path, name, is_dir, size, mtime in self._connect().execute(sql, params)
+        ]
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Get index status.
+
+        Returns:
+            Dictionary with entry count, roots and background work state
+        """
+        count = self._connect().execute("SELECT COUNT(*) FROM files").fetchone()[0]
+        return {
+            "entries": count,
+            "roots": self.roots(),
+            "pending_updates": self._updates.unfinished_tasks,
+            "scanning": self._current_scan,
+            "watched_directories": self.watcher.watched_count(),
+            "trigram_index": self.fts_enabled,
+        }
+
+    def wait_until_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until all queued scans and events are applied.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            True if the index is idle
+        """
+        with self._updates.all_tasks_done:
+            return self._updates.all_tasks_done.wait_for(
+                lambda: not self._updates.unfinished_tasks, timeout
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _on_change(self, directory: str, name: str, mask: int) -> None:
+        if mask & ~IN_ISDIR == IN_MODIFY:
+            # Writes in progress; the final size arrives with IN_CLOSE_WRITE
+            return
+        if mask & IN_Q_OVERFLOW:
+            for root in self.roots():
+                self._updates.put(("scan", root))
+        elif not name or mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+            self._updates.put(("path", directory, False))
+        else:
+            new_dir = bool(mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO))
+            self._updates.put(("path", os.path.join(directory, name), new_dir))
+
+    def _run(self) -> None:
+        conn = self._connect()
+        while True:
+            ops = [self._updates.get()]
+            # Change events come in bursts; apply the queued ones together
+            while (
+                len(ops) < self.batch_size
+                and ops[-1] is not None
+                and ops[-1][0] == "path"
+            ):
+                try:
+                    ops.append(self._updates.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                paths: Dict[str, bool] = {}
+                for op in ops:
+                    if op is not None and op[0] == "path":
+                        paths[op[1]] = paths.get(op[1], False) or op[2]
+                        continue
+                    self._apply_paths(conn, paths)
+                    paths = {}
+                    if op is None:
+                        return
+                    try:
+                        if op[0] == "scan":
+                            self._scan(conn, op[1])
+                        elif op[0] == "remove":
+                            self._remove_root(conn, op[1])
+                    except Exception as e:
+                        logger.warning(f"File index update {op} failed: {e}")
+                self._apply_paths(conn, paths)
+            finally:
+                for _ in ops:
+                    self._updates.task_done()
+
+    def _scan(self, conn: sqlite3.Connection, root: str) -> None:
+        self._scan_id += 1
+        scan_id = self._scan_id
+        self._current_scan = root
+
+        try:
+            root_stat = os.lstat(root)
+        except OSError:
+            self._delete_subtree(conn, root)
+            conn.commit()
+            self._current_scan = None
+            return
+
+        rows = [self._row(root, root_stat, scan_id)]
+        stack = [root]
+
+        while stack:
+            directory = stack.pop()
+            self.watcher.watch(directory)
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name == VOLUME_TRASH_NAME:
+                            continue
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                            stat_result = entry.stat(follow_symlinks=False)
+                            rows.append(
+                                self._row(entry.path, stat_result, scan_id, is_dir)
+                            )
+                        except OSError:
+                            continue
+                        if is_dir:
+                            stack.append(entry.path)
+
+                        if len(rows) >= self.batch_size:
+                            conn.executemany(_UPSERT, rows)
+                            conn.commit()
+                            rows = []
+            except OSError:
+                continue
+
+        conn.executemany(_UPSERT, rows)
+
+        low, high = _subtree_bounds(root)
+        conn.execute(
+            "DELETE FROM files WHERE path >= ? AND path < ? AND scan_id != ?",
+            (low, high, scan_id),
+        )
+        conn.commit()
+        self._current_scan = None
+
+    def _remove_root(self, conn: sqlite3.Connection, root: str) -> None:
+        low, high = _subtree_bounds(root)
+        directories = conn.execute(
+            "SELECT path FROM files WHERE is_dir = 1 AND "
+            "(path = ? OR (path >= ? AND path < ?))",
+            (root, low, high),
+        ).fetchall()
+        for (directory,) in directories:
+            self.watcher.unwatch(directory)
+
+        self._delete_subtree(conn, root)
+        conn.commit()
+
+    def _apply_paths(self, conn: sqlite3.Connection, paths: Dict[str, bool]) -> None:
+        if not paths:
+            return
+        roots = self.roots()
+        for path, new_dir in paths.items():
+            try:
+                self._apply_path(conn, roots, path, new_dir)
+            except Exception as e:
+                logger.warning(f"File index update of {path} failed: {e}")
+        conn.commit()
+
+    def _apply_path(
+        self, conn: sqlite3.Connection, roots: List[str], path: str, new_dir: bool
+    ) -> None:
+        if is_trash_path(path) or not any(
+            path == root or path.startswith(_subtree_bounds(root)[0]) for root in roots
+        ):
+            return
+
+        try:
+            stat_result = os.lstat(path)
+        except OSError:
+            self._delete_subtree(conn, path)
+            return
+
+        if new_dir:
+            self._scan(conn, path)
+            return
+
+        conn.execute(_UPSERT, self._row(path, stat_result, self._scan_id))
+
+    def _delete_subtree(self, conn: sqlite3.Connection, path: str) -> None:
+        low, high = _subtree_bounds(path)
+        conn.execute(
+            "DELETE FROM files WHERE path = ? OR (path >= ? AND path < ?)",
+            (path, low, high),
+        )
+
+    @staticmethod
+    def _row(
+        path: str,
+        stat_result: os.stat_result,
+        scan_id: int,
+        is_dir: Optional[bool] = None,
+    ) -> tuple:
+        if is_dir is None:
+            is_dir = stat.S_ISDIR(stat_result.st_mode)
+        name = os.path.basename(path.rstrip(os.sep)) or path
+        return (
+            path,
+            name,
+            name.lower(),
+            int(is_dir),
+            0 if is_dir else stat_result.st_size,
+            stat_result.st_mtime,
+            scan_id,
+        )
@@ -0,0 +1,261 @@
+import asyncio
+import functools
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+_MOUNTS_FILE = "/proc/self/mounts"
+_OCTAL_ESCAPE = re.compile(r"\\([0-7]{3})")
+
+
+def _unescape_mount(path: str) -> str:
+    # /proc/self/mounts escapes spaces, tabs and backslashes as \ooo
+    return _OCTAL_ESCAPE.sub(lambda m: chr(int(m.group(1), 8)), path)
+
+
+def read_mount_points(mounts_file: str = _MOUNTS_FILE) -> List[str]:
+    """
+    Read the mount table.
+
+    Args:
+        mounts_file: Path of the mount table to parse
+
+    Returns:
+        Mount points, longest first; just the filesystem root if the table
+        cannot be read
+    """
+    try:
+        with open(mounts_file, "r", encoding="utf-8", errors="replace") as f:
+            mounts = {
+                _unescape_mount(line.split()[1]) for line in f if len(line.split()) > 1
+            }
+    except OSError:
+        mounts = set()
+
+    mounts.add(os.path.abspath(os.sep))
+    return sorted(mounts, key=len, reverse=True)
+
+
+class IOExecutor:
+    """
+    Bounded thread pools for blocking file I/O, one per mount.
+
+    Route handlers await file operations here instead of running them on the
+    event loop, so a slow disk or network share stalls only requests that
+    touch it. Each mount gets its own pool, so a saturated NFS mount cannot
+    use up the threads that serve local files. Long jobs such as copies and
+    archive extraction run on a second, smaller pool per mount, so they
+    cannot hold the threads that serve short requests. Mounts are matched
+    against the mount table by path prefix, without touching the filesystem.
+    """
+
+    def __init__(
+        self,
+        default_workers: int = 8,
+        mount_workers: Optional[Dict[str, int]] = None,
+        mount_refresh: float = 30.0,
+        job_workers: int = 2,
+    ):
+        """
+        Initialize the executor.
+
+        Args:
+            default_workers: Threads per mount without an explicit limit
+            mount_workers: Thread limits for specific mount points
+            mount_refresh: Seconds between re-reads of the mount table
+            job_workers: Threads per mount for long jobs
+        """
+        self.default_workers = default_workers
+        self.mount_workers = {
+            os.path.abspath(mount): workers
+            for mount, workers in (mount_workers or {}).items()
+        }
+        self.mount_refresh = mount_refresh
+        self.job_workers = job_workers
+
+        self._lock = threading.Lock()
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        self._running: Dict[str, int] = {}
+        self._job_pools: Dict[str, ThreadPoolExecutor] = {}
+        self._jobs: Dict[str, int] = {}
+        self._mounts: List[str] = []
+        self._mounts_loaded_at = 0.0
+
+    def mount_point(self, path: str) -> str:
+        """
+        Find the mount point a path lives on.
+
+        Args:
+            path: File or directory path
+
+        Returns:
+            Longest mount point that prefixes the absolute path
+        """
+        path = os.path.abspath(os.path.expanduser(path))
+        for mount in self._mount_table():
+            if path == mount or path.startswith(mount.rstrip(os.sep) + os.sep):
+                return mount
+        return os.path.abspath(os.sep)
+
+    def executor_for(self, path: str) -> ThreadPoolExecutor:
+        """
+        Get the thread pool serving a path's mount.
+
+        Args:
+            path: File or directory path
+
+        Returns:
+            Thread pool for the mount, created on first use
+        """
+        return self._pool(self.mount_point(path))
+
+    async def run(self, path: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking call on the pool for a path's mount.
+
+        Args:
+            path: Path the call operates on, used to pick the mount pool
+            func: Blocking callable
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Result of func
+        """
+        mount = self.mount_point(path)
+        call = functools.partial(
+            self._call, self._running, mount, func, *args, **kwargs
+        )
+        return await asyncio.get_running_loop().run_in_executor(self._pool(mount), call)
+
+    async def run_job(
+        self, path: str, func: Callable[..., Any], *args, **kwargs
+    ) -> Any:
+        """
+        Run a long blocking job on the job pool for a path's mount.
+
+        Args:
+            path: Path the job writes to, used to pick the mount pool
+            func: Blocking callable, e.g. a copy or an extraction
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Result of func
+        """
+        mount = self.mount_point(path)
+        call = functools.partial(self._call, self._jobs, mount, func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(
+            self._job_pool(mount), call
+        )
+
+    async def iterate(self, path: str, iterator: Iterator[Any]) -> AsyncIterator[Any]:
+        """
+        Drive a blocking iterator from the pool for a path's mount.
+
+        Each item is fetched as a separate pool task, so a long stream holds
+        a thread only while it is reading, not while the client is slow.
+
+        Args:
+            path: Path the iterator reads from
+            iterator: Blocking iterator
+
+        Yields:
+            Items of the iterator
+        """
+        sentinel = object()
+        try:
+            while True:
+                item = await self.run(path, next, iterator, sentinel)
+                if item is sentinel:
+                    break
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get per-mount pool usage.
+
+        Returns:
+            Dictionary mapping mount points to worker limits and running calls
+        """
+        with self._lock:
+            return {
+                mount: {
+                    "workers": pool._max_workers,
+                    "running": self._running.get(mount, 0),
+                    "job_workers": self.job_workers,
+                    "jobs": self._jobs.get(mount, 0),
+                }
+                for mount, pool in self._pools.items()
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            pools = list(self._pools.values()) + list(self._job_pools.values())
+            self._pools.clear()
+            self._running.clear()
+            self._job_pools.clear()
+            self._jobs.clear()
+        for pool in pools:
+            pool.shutdown(wait=wait)
+
+    def _pool(self, mount: str) -> ThreadPoolExecutor:
+        with self._lock:
+            pool = self._pools.get(mount)
+            if pool is None:
+                workers = self.mount_workers.get(mount, self.default_workers)
+                pool = ThreadPoolExecutor(
+                    max_workers=workers,
+                    thread_name_prefix=f"smartwork-io-{len(self._pools)}",
+                )
+                self._pools[mount] = pool
+                self._running[mount] = 0
+            return pool
+
+    def _job_pool(self, mount: str) -> ThreadPoolExecutor:
+        # Created with the request pool, so stats() lists every mount in use
+        self._pool(mount)
+        with self._lock:
+            pool = self._job_pools.get(mount)
+            if pool is None:
+                pool = ThreadPoolExecutor(
+                    max_workers=self.job_workers,
+                    thread_name_prefix=f"smartwork-job-{len(self._job_pools)}",
+                )
+                self._job_pools[mount] = pool
+                self._jobs[mount] = 0
+            return pool
+
+    def _call(
+        self,
+        counts: Dict[str, int],
+        mount: str,
+        func: Callable[..., Any],
+        *args,
+        **kwargs,
+    ) -> Any:
+        with self._lock:
+            counts[mount] = counts.get(mount, 0) + 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                counts[mount] = counts.get(mount, 1) - 1
+
+    def _mount_table(self) -> List[str]:
+        now = time.monotonic()
+        if not self._mounts or now - self._mounts_loaded_at > self.mount_refresh:
+            mounts = read_mount_points()
+            for mount in self.mount_workers:
+                if mount not in mounts:
+                    mounts.append(mount)
+            self._mounts = sorted(mounts, key=len, reverse=True)
+            self._mounts_loaded_at = now
+        return self._mounts
@@ -0,0 +1,321 @@
+import base64
+import hashlib
+import heapq
+import json
+import os
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .trash import VOLUME_TRASH_NAME
+
+SORT_KEYS: Dict[str, Callable[[Dict[str, Any]], tuple]] = {
+    "type": lambda item: (not item["is_dir"], item["name"]),
+    "name": lambda item: (item["name"],),
+    "size": lambda item: (item["size"], item["name"]),
+    "mtime": lambda item: (item["mtime"] or 0.0, item["name"]),
+}
+SORT_NONE = "none"
+# Field types of the cursor for each sort: the values of its SORT_KEYS
+# tuple, or the offset for "none"
+CURSOR_FIELDS: Dict[str, Tuple[Any, ...]] = {
+    "type": (bool, str),
+    "name": (str,),
+    "size": (int, str),
+    "mtime": ((int, float), str),
+    SORT_NONE: (int,),
+}
+
+
+def encode_cursor(key: tuple) -> str:
+    """
+    Encode a sort key as an opaque, URL-safe cursor.
+
+    Args:
+        key: Sort key of the last item on a page
+
+    Returns:
+        Cursor string
+    """
+    raw = json.dumps(list(key), ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, sort: str = "type") -> tuple:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor: Cursor string
+        sort: Sort the cursor was made for; its fields must match
+
+    Returns:
+        Sort key tuple
+
+    Raises:
+        ValueError: If the cursor is malformed or does not fit sort
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii"))
+        key = json.loads(raw.decode("utf-8"))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    fields = CURSOR_FIELDS.get(sort)
+    if fields is None:
+        raise ValueError(f"Unknown sort key: {sort}")
+    if (
+        not isinstance(key, list)
+        or len(key) != len(fields)
+        or not all(_fits(value, kind) for value, kind in zip(key, fields))
+        or (sort == SORT_NONE and key[0] < 0)
+    ):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return tuple(key)
+
+
+def _fits(value: Any, kind: Any) -> bool:
+    # JSON true and false would pass as ints
+    if isinstance(value, bool):
+        return kind is bool
+    return isinstance(value, kind)
+
+
+def entry_to_item(entry: os.DirEntry, stat_dirs: bool = False) -> Dict[str, Any]:
+    """
+    Convert a DirEntry into a listing item.
+
+    The file type comes from the cached d_type, so directories cost no
+    syscall unless stat_dirs is set; files need a single stat for size.
+
+    Args:
+        entry: Entry yielded by os.scandir
+        stat_dirs: Also stat directories to fill in mtime
+
+    Returns:
+        Dictionary with name, is_dir, size, mtime and path
+    """
+    is_dir = entry.is_dir()
+    size = 0
+    mtime = None
+
+    if not is_dir or stat_dirs:
+        stat_result = entry.stat()
+        mtime = stat_result.st_mtime
+        if not is_dir:
+            size = stat_result.st_size
+
+    return {
+        "name": entry.name,
+        "is_dir": is_dir,
+        "size": size,
+        "mtime": mtime,
+        "path": entry.path,
+    }
+
+
+class DirectoryListing(list):
+    """
+    List of listing items that remembers its ETag once computed.
+    """
+
+    etag: Optional[str] = None
+
+
+def listing_etag(items: List[Dict[str, Any]], variant: str = "") -> str:
+    """
+    Build a weak ETag from the names, types, sizes and mtimes of a listing.
+
+    The digest is memoized on DirectoryListing instances, so repeated polls
+    of a cached listing cost nothing.
+
+    Args:
+        items: Listing items
+        variant: Representation detail (e.g. the sort key) mixed into the tag
+
+    Returns:
+        Quoted weak ETag string
+    """
+    digest = getattr(items, "etag", None)
+    if digest is None:
+        hasher = hashlib.blake2b(digest_size=12)
+        for item in items:
+            line = "{name}\0{is_dir:d}\0{size}\0{mtime}\n".format(**item)
+            hasher.update(line.encode("utf-8", "surrogateescape"))
+        digest = hasher.hexdigest()
+        if isinstance(items, DirectoryListing):
+            items.etag = digest
+
+    return f'W/"{digest}-{variant}"' if variant else f'W/"{digest}"'
+
+
+def iter_entries(path: str, stat_dirs: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate a directory in scandir order, skipping unreadable entries.
+
+    Args:
+        path: Directory to scan
+        stat_dirs: Also stat directories to fill in mtime
+
+    Yields:
+        Listing items
+    """
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.name == VOLUME_TRASH_NAME:
+                continue
+            try:
+                yield entry_to_item(entry, stat_dirs)
+            except (PermissionError, OSError):
+                continue
+
+
+def sort_items(
+    items: Iterable[Dict[str, Any]], sort: str = "type"
+) -> List[Dict[str, Any]]:
+    """
+    Sort listing items by one of SORT_KEYS.
+
+    Args:
+        items: Listing items
+        sort: One of SORT_KEYS or "none" to keep the input order
+
+    Returns:
+        New sorted list
+    """
+    if sort == SORT_NONE:
+        return list(items)
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key: {sort}")
+    return sorted(items, key=SORT_KEYS[sort])
+
+
+def page_items(
+    items: Iterable[Dict[str, Any]],
+    limit: int,
+    cursor: Optional[str] = None,
+    sort: str = "type",
+    descending: bool = False,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Select one page of listing items using keyset pagination.
+
+    Only the requested page is ordered (a bounded heap of limit + 1 items),
+    so the cost is one pass plus O(n log limit) regardless of folder size.
+    The cursor stores the sort key of the last item, which keeps paging
+    stable when entries are added or removed between requests.
+
+    Args:
+        items: Listing items in directory order
+        limit: Maximum number of items to return
+        cursor: Cursor from a previous page, or None for the first page
+        sort: One of SORT_KEYS or "none" (directory order, offset cursor)
+        descending: Reverse the sort order
+
+    Returns:
+        Tuple of (items, next_cursor); next_cursor is None on the last page
+
+    Raises:
+        ValueError: If sort or cursor is invalid
+    """
+    after = decode_cursor(cursor, sort) if cursor else None
+
+    if sort == SORT_NONE:
+        offset = after[0] if after else 0
+        page = list(islice(items, offset, offset + limit + 1))
+        next_cursor = encode_cursor((offset + limit,)) if len(page) > limit else None
+        return page[:limit], next_cursor
+
+    if sort not in SORT_KEYS:
+        raise ValueError(f"Unknown sort key: {sort}")
+
+    key = SORT_KEYS[sort]
+
+    if after is not None:
+        if descending:
+            items = (item for item in items if key(item) < after)
+        else:
+            items = (item for item in items if key(item) > after)
+
+    select = heapq.nlargest if descending else heapq.nsmallest
+    page = select(limit + 1, items, key=key)
+
+    next_cursor = encode_cursor(key(page[limit - 1])) if len(page) > limit else None
+    return page[:limit], next_cursor
+
+
+def list_directory(path: str, sort: str = "type") -> List[Dict[str, Any]]:
+    """
+    List a whole directory, sorted.
+
+    Args:
+        path: Directory to list
+        sort: One of SORT_KEYS or "none"
+
+    Returns:
+        List of listing items
+    """
+    return sort_items(iter_entries(path, stat_dirs=sort == "mtime"), sort)
+
+
+def list_page(
+    path: str,
+    limit: int,
+    cursor: Optional[str] = None,
+    sort: str = "type",
+    descending: bool = False,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Scan a directory and return one page of it; see page_items.
+
+    Args:
+        path: Directory to list
+        limit: Maximum number of items to return
+        cursor: Cursor from a previous page
+        sort: One of SORT_KEYS or "none"
+        descending: Reverse the sort order
+
+    Returns:
+        Tuple of (items, next_cursor)
+    """
+    entries = iter_entries(path, stat_dirs=sort == "mtime")
+    return page_items(entries, limit, cursor=cursor, sort=sort, descending=descending)
+
+
+def iter_items_ndjson(
+    items: Iterable[Dict[str, Any]], batch_size: int = 256
+) -> Iterator[bytes]:
+    """
+    Serialize listing items as NDJSON chunks.
+
+    Lines are grouped into batches so each chunk carries many entries.
+
+    Args:
+        items: Listing items
+        batch_size: Number of entries per yielded chunk
+
+    Yields:
+        UTF-8 encoded NDJSON chunks
+    """
+    batch = []
+    for item in items:
+        batch.append(json.dumps(item, ensure_ascii=False))
+        if len(batch) >= batch_size:
+            yield ("\n".join(batch) + "\n").encode("utf-8")
+            batch = []
+
+    if batch:
+        yield ("\n".join(batch) + "\n").encode("utf-8")
+
+
+def iter_ndjson(path: str, batch_size: int = 256) -> Iterator[bytes]:
+    """
+    Stream a directory listing as NDJSON in scandir order.
+
+    Args:
+        path: Directory to list
+        batch_size: Number of entries per yielded chunk
+
+    Yields:
+        UTF-8 encoded NDJSON chunks
+    """
+    return iter_items_ndjson(iter_entries(path), batch_size)
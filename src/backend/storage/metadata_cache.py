@@ -0,0 +1,288 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .listing import DirectoryListing, iter_entries
+from .watcher import IN_DELETE_SELF, IN_IGNORED, IN_MOVE_SELF, ChangeWatcher
+
+Listing = List[Dict[str, Any]]
+
+
+class _CacheEntry:
+    __slots__ = ("value", "mtime_ns", "loaded_at", "watched")
+
+    def __init__(self, value: Any, mtime_ns: int, watched: bool):
+        self.value = value
+        self.mtime_ns = mtime_ns
+        self.loaded_at = time.monotonic()
+        self.watched = watched
+
+
+class MetadataCache:
+    """
+    Bounded LRU cache of directory listings and file stats.
+
+    Entries stay valid while an inotify watch on their directory reports no
+    changes. Without inotify (or when the watch limit is hit) a listing is
+    revalidated with a single stat of the directory mtime and expires after
+    ``poll_ttl`` seconds, since file size changes do not touch the directory
+    mtime. File stats are only cached while their parent directory is watched.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        poll_ttl: float = 5.0,
+        watcher: Optional[ChangeWatcher] = None,
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of cached listings and stats
+            poll_ttl: Lifetime of entries validated by mtime polling
+            watcher: Change watcher; a new one is created if omitted
+        """
+        self.max_entries = max_entries
+        self.poll_ttl = poll_ttl
+        self.watcher = watcher or ChangeWatcher()
+        self.watcher.add_listener(self._on_change)
+
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[Tuple[str, str], _CacheEntry]" = OrderedDict()
+        # Loads in progress per path, and a counter bumped when such a path
+        # is invalidated so the racing load is not stored; both are dropped
+        # once the last load of the path finishes
+        self._loading: Dict[str, int] = {}
+        self._versions: Dict[str, int] = {}
+        # Number of watched entries per directory; the watch is dropped at zero
+        self._watch_refs: Dict[str, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_listing(self, path: str, stat_dirs: bool = False) -> Listing:
+        """
+        Get the unsorted listing of a directory, loading it on a miss.
+
+        Args:
+            path: Absolute directory path
+            stat_dirs: Include mtime for subdirectories
+
+        Returns:
+            List of listing items; callers must not mutate it
+        """
+        kind = "listing+stat" if stat_dirs else "listing"
+        return self._get(
+            (kind, path), path, lambda: DirectoryListing(iter_entries(path, stat_dirs))
+        )
+
+    def get_stat(self, path: str) -> os.stat_result:
+        """
+        Get the stat of a file, served from cache while its directory is watched.
+
+        Args:
+            path: Absolute file path
+
+        Returns:
+            os.stat_result for the path
+
+        Raises:
+            OSError: If the path cannot be stat'ed
+        """
+        key = ("stat", path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.watched:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            version = self._start_load(path)
+
+        parent = os.path.dirname(path)
+        watched = self.watcher.watch(parent)
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            self._release_watch(parent)
+            self._finish_load(path)
+            raise
+
+        if watched:
+            self._store(key, path, version, _CacheEntry(stat_result, 0, True))
+        else:
+            self._finish_load(path)
+        return stat_result
+
+    def invalidate(self, path: str) -> None:
+        """
+        Drop cached data for a path and its parent directory listing.
+
+        Args:
+            path: File or directory that changed
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            self._drop_path(path)
+            self._drop_path(os.path.dirname(path))
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in self._loading:
+                self._versions[path] = self._versions.get(path, 0) + 1
+            for key in list(self._entries):
+                self._remove(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters.
+
+        Returns:
+            Dictionary with hits, misses, hit_rate, entries and watch counts
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "watched_directories": self.watcher.watched_count(),
+                "inotify": self.watcher.available,
+            }
+
+    def _get(self, key: Tuple[str, str], path: str, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._is_fresh(entry, path):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            version = self._start_load(path)
+
+        # Watch before loading so changes made during the scan invalidate it
+        watched = self.watcher.watch(path)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            value = loader()
+        except Exception:
+            self._release_watch(path)
+            self._finish_load(path)
+            raise
+
+        self._store(key, path, version, _CacheEntry(value, mtime_ns, watched))
+        return value
+
+    def _is_fresh(self, entry: _CacheEntry, path: str) -> bool:
+        if entry.watched:
+            return True
+
+        if time.monotonic() - entry.loaded_at > self.poll_ttl:
+            return False
+
+        try:
+            return os.stat(path).st_mtime_ns == entry.mtime_ns
+        except OSError:
+            return False
+
+    def _store(
+        self, key: Tuple[str, str], path: str, version: int, entry: _CacheEntry
+    ) -> None:
+        directory = self._watch_dir(key)
+        with self._lock:
+            current = self._finish_load(path)
+            if current != version:
+                if entry.watched:
+                    self._release_watch(directory)
+                return
+
+            if key in self._entries:
+                self._remove(key)
+
+            # The watch may have been released by a concurrent eviction
+            if entry.watched and not self.watcher.is_watched(directory):
+                entry.watched = False
+
+            self._entries[key] = entry
+            if entry.watched:
+                self._watch_refs[directory] = self._watch_refs.get(directory, 0) + 1
+
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _start_load(self, path: str) -> int:
+        self._loading[path] = self._loading.get(path, 0) + 1
+        return self._versions.get(path, 0)
+
+    def _finish_load(self, path: str) -> int:
+        with self._lock:
+            version = self._versions.get(path, 0)
+            loads = self._loading.get(path, 0) - 1
+            if loads > 0:
+                self._loading[path] = loads
+            else:
+                self._loading.pop(path, None)
+                self._versions.pop(path, None)
+            return version
+
+    def _remove(self, key: Tuple[str, str]) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+
+        if entry.watched:
+            directory = self._watch_dir(key)
+            refs = self._watch_refs.get(directory, 0) - 1
+            if refs > 0:
+                self._watch_refs[directory] = refs
+            else:
+                self._watch_refs.pop(directory, None)
+                self.watcher.unwatch(directory)
+        return True
+
+    def _release_watch(self, directory: str) -> None:
+        with self._lock:
+            if directory not in self._watch_refs:
+                self.watcher.unwatch(directory)
+
+    @staticmethod
+    def _watch_dir(key: Tuple[str, str]) -> str:
+        kind, path = key
+        return os.path.dirname(path) if kind == "stat" else path
+
+    def _drop_path(self, path: str) -> None:
+        if path in self._loading:
+            self._versions[path] = self._versions.get(path, 0) + 1
+        for kind in ("listing", "listing+stat", "stat"):
+            if self._remove((kind, path)):
+                self.invalidations += 1
+
+    def _on_change(self, directory: str, name: str, mask: int) -> None:
+        with self._lock:
+            if not directory:
+                self.clear()
+                return
+
+            self._drop_path(directory)
+            if name:
+                self._drop_path(os.path.join(directory, name))
+
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED) or not name:
+                self._drop_path(os.path.dirname(directory))
+            else:
+                # The directory's own mtime changed, which its parent lists
+                self._remove(("listing+stat", os.path.dirname(directory)))
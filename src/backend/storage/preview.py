@@ -0,0 +1,323 @@
+import hashlib
+import json
+import os
+import posixpath
+import threading
+import xml.etree.ElementTree as ET
+import zipfile
+from datetime import date, datetime, time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .streaming import is_probably_text
+from .text_extract import TEXT_EXTENSIONS
+
+try:
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+except ImportError:
+    load_workbook = None
+    InvalidFileException = ValueError
+
+PREVIEW_VERSION = 1
+TEXT_PREFIX_BYTES = 64 * 1024
+MAX_CELL_CHARS = 200
+
+_NS = {
+    "a": "http://schemas.openxmlformats.org/drawingml/2006/main",
+    "p": "http://schemas.openxmlformats.org/presentationml/2006/main",
+    "r": "http://schemas.openxmlformats.org/officeDocument/2006/relationships",
+    "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
+}
+_TITLE_TYPES = {"title", "ctrTitle"}
+
+# Raised by the xlsx and pptx readers for damaged or mislabelled files
+_UNREADABLE = (zipfile.BadZipFile, KeyError, ET.ParseError, InvalidFileException)
+
+
+def build_preview(path: str, lines: int = 20, rows: int = 10) -> Dict[str, Any]:
+    """
+    Build a bounded preview of a file.
+
+    Only a prefix of text files is read, workbooks are opened in read-only
+    mode and only the first sheet's top rows are loaded, and presentations
+    are parsed for slide titles without loading slide content.
+
+    Args:
+        path: File path
+        lines: Maximum text lines
+        rows: Maximum spreadsheet rows
+
+    Returns:
+        Dictionary with a "kind" of text, xlsx, pptx or none and its fields;
+        none also for workbooks and decks that cannot be read
+    """
+    suffix = Path(path).suffix.lower()
+
+    try:
+        if suffix == ".xlsx":
+            return _preview_xlsx(path, rows)
+        if suffix == ".pptx":
+            return _preview_pptx(path)
+    except _UNREADABLE:
+        return {"kind": "none"}
+    if suffix in TEXT_EXTENSIONS or is_probably_text(Path(path)):
+        return _preview_text(path, lines)
+    return {"kind": "none"}
+
+
+def _preview_text(path: str, max_lines: int) -> Dict[str, Any]:
+    with open(path, "rb") as f:
+        prefix = f.read(TEXT_PREFIX_BYTES + 1)
+
+    truncated = len(prefix) > TEXT_PREFIX_BYTES
+    text = prefix[:TEXT_PREFIX_BYTES].decode("utf-8", errors="replace")
+    all_lines = text.splitlines()
+    if truncated and len(all_lines) > 1:
+        # The last line may have been cut at the byte limit
+        all_lines.pop()
+
+    return {
+        "kind": "text",
+        "lines": all_lines[:max_lines],
+        "truncated": truncated or len(all_lines) > max_lines,
+    }
+
+
+def _cell_value(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value)[:MAX_CELL_CHARS]
+
+
+def _preview_xlsx(path: str, max_rows: int, max_cols: int = 20) -> Dict[str, Any]:
+    if load_workbook is None:
+        return {"kind": "none"}
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheets = wb.sheetnames
+        top_rows: List[List[Any]] = []
+        if sheets:
+            ws = wb[sheets[0]]
+            for row in ws.iter_rows(
+                max_row=max_rows, max_col=max_cols, values_only=True
+            ):
+                values = [_cell_value(v) for v in row]
+                # max_col pads short rows with None
+                while values and values[-1] is None:
+                    values.pop()
+                top_rows.append(values)
+    finally:
+        wb.close()
+
+    return {"kind": "xlsx", "sheets": sheets, "rows": top_rows}
+
+
+def _slide_title(archive: zipfile.ZipFile, name: str) -> Optional[str]:
+    root = ET.fromstring(archive.read(name))
+    for shape in root.iter(f"{{{_NS['p']}}}sp"):
+        placeholder = shape.find("p:nvSpPr/p:nvPr/p:ph", _NS)
+        if placeholder is None or placeholder.get("type") not in _TITLE_TYPES:
+            continue
+        paragraphs = []
+        for paragraph in shape.iter(f"{{{_NS['a']}}}p"):
+            paragraphs.append(
+                "".join(t.text or "" for t in paragraph.iter(f"{{{_NS['a']}}}t"))
+            )
+        return " ".join(p for p in paragraphs if p) or None
+    return None
+
+
+def _preview_pptx(path: str) -> Dict[str, Any]:
+    with zipfile.ZipFile(path) as archive:
+        presentation = ET.fromstring(archive.read("ppt/presentation.xml"))
+        rels = ET.fromstring(archive.read("ppt/_rels/presentation.xml.rels"))
+        targets = {
+            rel.get("Id"): rel.get("Target")
+            for rel in rels.findall("rel:Relationship", _NS)
+        }
+
+        titles = []
+        for slide_id in presentation.findall("p:sldIdLst/p:sldId", _NS):
+            target = targets.get(slide_id.get(f"{{{_NS['r']}}}id"))
+            if target is None:
+                continue
+            name = posixpath.normpath(posixpath.join("ppt", target))
+            titles.append(_slide_title(archive, name))
+
+    return {"kind": "pptx", "slides": len(titles), "titles": titles}
+
+
+class PreviewCache:
+    """
+    Size-bounded on-disk cache of file previews.
+
+    Entries are keyed by a hash of the file's path, size and mtime plus the
+    preview options, so a changed file simply misses and its stale entry
+    ages out. Hits refresh the entry's mtime; when the cache grows past
+    ``max_bytes`` the least recently used entries are deleted.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            directory: Directory to store cached previews in
+            max_bytes: Total size the cache is trimmed back under
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(path: str, stat_result: os.stat_result, **options: Any) -> str:
+        """
+        Compute the cache key for a file version and preview options.
+
+        Args:
+            path: Absolute file path
+            stat_result: Current stat of the file
+            **options: Preview options that change the output
+
+        Returns:
+            Hex digest
+        """
+        raw = json.dumps(
+            [
+                PREVIEW_VERSION,
+                path,
+                stat_result.st_size,
+                stat_result.st_mtime_ns,
+                sorted(options.items()),
+            ],
+            ensure_ascii=False,
+        )
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=20).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached preview.
+
+        Args:
+            key: Key from key()
+
+        Returns:
+            Cached preview, or None on a miss
+        """
+        entry = self._entry_path(key)
+        try:
+            with open(entry, "r", encoding="utf-8") as f:
+                preview = json.load(f)
+            os.utime(entry)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return preview
+
+    def put(self, key: str, preview: Dict[str, Any]) -> None:
+        """
+        Store a preview, trimming the cache if it grew too large.
+
+        Args:
+            key: Key from key()
+            preview: JSON-serializable preview
+        """
+        entry = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+
+        data = json.dumps(preview, ensure_ascii=False).encode("utf-8")
+        temp = f"{entry}.{threading.get_ident()}.tmp"
+        with open(temp, "wb") as f:
+            f.write(data)
+
+        with self._lock:
+            total = self._current_total()
+            try:
+                # A rebuilt preview replaces the entry it was keyed to
+                total -= os.path.getsize(entry)
+            except FileNotFoundError:
+                pass
+            os.replace(temp, entry)
+            total += len(data)
+            self._total_bytes = total
+            if total > self.max_bytes:
+                self._trim()
+
+    def get_or_build(self, path: str, builder, **options: Any) -> Dict[str, Any]:
+        """
+        Get a preview from cache, building and storing it on a miss.
+
+        Args:
+            path: Absolute file path
+            builder: Called as builder(path, **options) on a miss
+            **options: Preview options
+
+        Returns:
+            Preview dictionary
+        """
+        stat_result = os.stat(path)
+        key = self.key(path, stat_result, **options)
+
+        preview = self.get(key)
+        if preview is None:
+            preview = builder(path, **options)
+            self.put(key, preview)
+        return preview
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "bytes": self._current_total(),
+                "max_bytes": self.max_bytes,
+            }
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def _entries(self) -> List[os.DirEntry]:
+        entries = []
+        with os.scandir(self.directory) as shards:
+            for shard in shards:
+                if shard.is_dir():
+                    with os.scandir(shard.path) as files:
+                        entries.extend(f for f in files if f.name.endswith(".json"))
+        return entries
+
+    def _current_total(self) -> int:
+        if self._total_bytes is None:
+            self._total_bytes = sum(e.stat().st_size for e in self._entries())
+        return self._total_bytes
+
+    def _trim(self) -> None:
+        # Trim to 90% so a full cache does not rescan on every insert
+        target = self.max_bytes * 0.9
+        entries = sorted(
+            ((e.stat().st_mtime, e.stat().st_size, e.path) for e in self._entries())
+        )
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(entry)
+                total -= size
+            except FileNotFoundError:
+                pass
+        self._total_bytes = total
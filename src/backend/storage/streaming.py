@@ -0,0 +1,272 @@
+import asyncio
+import mimetypes
+import os
+from concurrent.futures import Executor
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+ZEROCOPY_EXTENSION = "http.response.zerocopy"
+
+
+class RangeNotSatisfiable(Exception):
+    """
+    Raised when a Range header cannot be served for the given file size.
+    """
+
+    def __init__(self, size: int):
+        super().__init__(f"Range not satisfiable for size {size}")
+        self.size = size
+
+
+def file_etag(stat_result: os.stat_result) -> str:
+    """
+    Build a strong ETag from inode, size and modification time.
+
+    Args:
+        stat_result: Result of os.stat for the file
+
+    Returns:
+        Quoted ETag string
+    """
+    return '"{:x}-{:x}-{:x}"'.format(
+        stat_result.st_ino, stat_result.st_size, stat_result.st_mtime_ns
+    )
+
+
+def last_modified(stat_result: os.stat_result) -> str:
+    """
+    Format the modification time as an HTTP date.
+
+    Args:
+        stat_result: Result of os.stat for the file
+
+    Returns:
+        RFC 7231 date string
+    """
+    return formatdate(stat_result.st_mtime, usegmt=True)
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range "bytes=" Range header.
+
+    Multi-range requests are ignored (None) so the caller serves the full
+    body, which RFC 7233 allows.
+
+    Args:
+        header: Raw Range header value
+        size: Size of the file in bytes
+
+    Returns:
+        Inclusive (start, end) tuple, or None if the header should be ignored
+
+    Raises:
+        RangeNotSatisfiable: If the range lies outside the file
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec or "," in spec:
+        return None
+
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+
+    try:
+        if first == "":
+            suffix = int(last)
+            if suffix <= 0 or size == 0:
+                raise RangeNotSatisfiable(size)
+            return max(size - suffix, 0), size - 1
+
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise RangeNotSatisfiable(size)
+    if start > end:
+        return None
+
+    return start, min(end, size - 1)
+
+
+def if_range_matches(if_range: str, stat_result: os.stat_result) -> bool:
+    """
+    Check whether an If-Range validator still matches the file.
+
+    Args:
+        if_range: Raw If-Range header value (ETag or HTTP date)
+        stat_result: Current stat of the file
+
+    Returns:
+        True if the range may be served, False if the full body is required
+    """
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == file_etag(stat_result)
+
+    try:
+        since = parsedate_to_datetime(if_range).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(stat_result.st_mtime) <= int(since)
+
+
+def is_probably_text(path: Path, sample_size: int = 8192) -> bool:
+    """
+    Guess whether a file is UTF-8 text from a prefix sample.
+
+    Args:
+        path: File to inspect
+        sample_size: Number of bytes to sniff
+
+    Returns:
+        True if the sample has no NUL bytes and decodes as UTF-8
+    """
+    with open(path, "rb") as f:
+        sample = f.read(sample_size)
+
+    if b"\x00" in sample:
+        return False
+
+    try:
+        sample.decode("utf-8")
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the sample boundary is fine
+        return e.start >= len(sample) - 3
+    return True
+
+
+def iter_file_range(
+    path: Path, start: int, end: int, chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Yield an inclusive byte range of a file in fixed-size chunks.
+
+    Chunks are read with positional reads on one descriptor, so only one
+    chunk is materialised at a time. Short reads are continued; if the file
+    is truncated while streaming, iteration stops at the new end of file.
+
+    Args:
+        path: File to read
+        start: First byte offset
+        end: Last byte offset (inclusive)
+        chunk_size: Maximum size of each yielded chunk
+
+    Yields:
+        Consecutive chunks of the requested range
+    """
+    if end < start:
+        return
+
+    with open(path, "rb", buffering=0) as f:
+        fd = f.fileno()
+        offset = start
+        while offset <= end:
+            chunk = os.pread(fd, min(chunk_size, end + 1 - offset), offset)
+            if not chunk:
+                return
+            offset += len(chunk)
+            yield chunk
+
+
+class FileRangeResponse(Response):
+    """
+    Streaming file response with Range support.
+
+    Uses the ASGI zero-copy extension (sendfile) when the server offers it,
+    and falls back to fixed-size chunks read off the event loop,
+    on ``executor`` when given or the default thread pool otherwise.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        stat_result: os.stat_result,
+        byte_range: Optional[Tuple[int, int]] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        media_type: Optional[str] = None,
+        headers: Optional[dict] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.executor = executor
+        size = stat_result.st_size
+
+        if byte_range is None:
+            self.start, self.end = 0, size - 1
+            status_code = 200
+        else:
+            self.start, self.end = byte_range
+            status_code = 206
+
+        if media_type is None:
+            media_type = (
+                mimetypes.guess_type(str(path))[0] or "application/octet-stream"
+            )
+
+        self.status_code = status_code
+        self.media_type = media_type
+        self.background = None
+        self.init_headers(headers)
+
+        self.headers["content-length"] = str(self.end - self.start + 1)
+        self.headers["accept-ranges"] = "bytes"
+        self.headers.setdefault("etag", file_etag(stat_result))
+        self.headers.setdefault("last-modified", last_modified(stat_result))
+        if byte_range is not None:
+            self.headers["content-range"] = f"bytes {self.start}-{self.end}/{size}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+
+        count = self.end - self.start + 1
+        if scope.get("method") == "HEAD" or count <= 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send(
+                    {
+                        "type": ZEROCOPY_EXTENSION,
+                        "file": f.fileno(),
+                        "offset": self.start,
+                        "count": count,
+                    }
+                )
+            return
+
+        chunks = iter_file_range(self.path, self.start, self.end, self.chunk_size)
+        try:
+            while True:
+                chunk = await self._read_chunk(chunks)
+                if chunk is None:
+                    break
+                await send(
+                    {"type": "http.response.body", "body": chunk, "more_body": True}
+                )
+        finally:
+            chunks.close()
+
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _read_chunk(self, chunks: Iterator[bytes]) -> Optional[bytes]:
+        if self.executor is None:
+            return await anyio.to_thread.run_sync(next, chunks, None)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, next, chunks, None)
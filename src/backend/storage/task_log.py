@@ -0,0 +1,440 @@
+import asyncio
+import bisect
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+LEVELS = {
+    "debug": logging.DEBUG,
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+_LEVEL_NAMES = {number: name for name, number in LEVELS.items()}
+
+DEFAULT_CAPACITY = 256
+KEEP_FINISHED = 64
+KEEP_RELEASED = 4096
+MAX_MESSAGE_LENGTH = 1024
+SEGMENT_BYTES = 1024 * 1024
+
+
+class _Ring:
+    """
+    Newest log records of one task.
+
+    Records are numbered from 0 in append order. Those from ``first`` up to
+    ``next`` are in memory, those below ``on_disk`` are in segment files;
+    the two ranges overlap once records are spilled but not yet evicted.
+    """
+
+    __slots__ = (
+        "times",
+        "levels",
+        "messages",
+        "first",
+        "next",
+        "on_disk",
+        "segment",
+        "segment_size",
+    )
+
+    def __init__(self, capacity: int, start: int = 0):
+        self.times = array("q", bytes(8 * capacity))
+        self.levels = array("b", bytes(capacity))
+        self.messages: List[Optional[str]] = [None] * capacity
+        self.first = start
+        self.next = start
+        self.on_disk = start
+        self.segment: Optional[Path] = None
+        self.segment_size = 0
+
+
+class TaskLogStore:
+    """
+    Task logs with bounded memory per task.
+
+    Each task keeps its newest ``capacity`` records in a ring buffer of
+    fixed-size slots: a microsecond timestamp, a level and a reference to an
+    interned message, so repeated messages are stored once. Messages are
+    truncated to MAX_MESSAGE_LENGTH characters. When a ring fills, its
+    oldest quarter is evicted and handed to a background thread, which
+    appends it to the task's current segment file under ``spill_dir`` in
+    one write; segments are named after their first record and rotate at
+    ``segment_bytes``. Without a spill directory evicted records are dropped.
+
+    close() and release() write the records still in memory to disk, so
+    with a spill directory logs survive restarts. Without one, the rings of
+    the newest ``keep_finished`` released tasks stay in memory and older
+    ones are dropped.
+    """
+
+    def __init__(
+        self,
+        spill_dir: Optional[str] = None,
+        capacity: int = DEFAULT_CAPACITY,
+        segment_bytes: int = SEGMENT_BYTES,
+        keep_finished: int = KEEP_FINISHED,
+        keep_released: int = KEEP_RELEASED,
+    ):
+        """
+        Initialize the store.
+
+        Args:
+            spill_dir: Directory for segment files; None keeps only the
+                newest records
+            capacity: Records per task kept in memory
+            segment_bytes: Size at which a new segment file is started
+            keep_finished: Released tasks kept in memory without a spill
+                directory
+            keep_released: Record counts of tasks without a ring kept;
+                older ones are counted again from their segments, if any
+        """
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+        self.capacity = max(capacity, 4)
+        self.segment_bytes = segment_bytes
+        self.keep_finished = keep_finished
+        self.keep_released = keep_released
+        self._lock = threading.Lock()
+        self._rings: Dict[str, _Ring] = {}
+        # Record counts of tasks without a ring, so segments are scanned once;
+        # only tasks with records, oldest first
+        self._released: "OrderedDict[str, int]" = OrderedDict()
+        # Released tasks whose rings are kept, oldest first
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        self._waiters: Dict[str, List[Tuple[asyncio.AbstractEventLoop, Any]]] = {}
+        # Segment appends, written in order by the writer thread
+        self._writes: "queue.Queue[Optional[Tuple[str, Path, bytes]]]" = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
+    def append(self, task_id: str, message: str, level: str = "info") -> int:
+        """
+        Append a record to a task's log.
+
+        Args:
+            task_id: Task identifier
+            message: Log message
+            level: One of LEVELS
+
+        Returns:
+            Sequence number of the record
+        """
+        if len(message) > MAX_MESSAGE_LENGTH:
+            message = message[: MAX_MESSAGE_LENGTH - 1] + "…"
+        message = sys.intern(message)
+        timestamp = time.time_ns() // 1000
+
+        self._load(task_id)
+        with self._lock:
+            ring = self._ring(task_id)
+            self._finished.pop(task_id, None)
+            if ring.next - ring.first == self.capacity:
+                self._evict(task_id, ring, self.capacity // 4)
+            slot = ring.next % self.capacity
+            ring.times[slot] = timestamp
+            ring.levels[slot] = LEVELS[level]
+            ring.messages[slot] = message
+            seq = ring.next
+            ring.next += 1
+            waiters = self._waiters.pop(task_id, [])
+
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+        return seq
+
+    def size(self, task_id: str) -> int:
+        """
+        Get the number of records ever appended to a task's log.
+
+        Args:
+            task_id: Task identifier
+
+        Returns:
+            Sequence number the next record will get
+        """
+        self._load(task_id)
+        with self._lock:
+            return self._ring(task_id, create=False).next
+
+    def read(
+        self,
+        task_id: str,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        level: Optional[str] = None,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Read a page of a task's log, oldest first.
+
+        Records evicted from memory are read from the segment files, so
+        call this off the event loop for old offsets.
+
+        Args:
+            task_id: Task identifier
+            offset: First sequence number; negative counts back from the end
+            limit: Maximum number of records
+            level: Minimum level to include
+
+        Returns:
+            Records with seq, timestamp, level and message, and the offset
+            to continue from
+        """
+        min_level = LEVELS[level] if level else 0
+        self._load(task_id)
+        with self._lock:
+            ring = self._ring(task_id, create=False)
+            end = ring.next
+            if offset < 0:
+                offset = max(end + offset, 0)
+            memory = [
+                self._record(ring, seq)
+                for seq in range(max(offset, ring.first), end)
+                if ring.levels[seq % self.capacity] >= min_level
+            ]
+            first = ring.first
+
+        records: List[Dict[str, Any]] = []
+        if offset < first and self.spill_dir is not None:
+            # Evicted records may still be on their way to disk
+            self.flush()
+            records = self._read_segments(task_id, offset, first, limit, min_level)
+        records.extend(memory)
+
+        if limit is not None and len(records) >= limit:
+            records = records[:limit]
+            return records, records[-1]["seq"] + 1
+        return records, max(offset, end)
+
+    async def wait(self, task_id: str, offset: int, timeout: float) -> bool:
+        """
+        Wait until a task's log has a record at or after an offset.
+
+        Args:
+            task_id: Task identifier
+            offset: Sequence number to wait for
+            timeout: Longest wait in seconds
+
+        Returns:
+            True if the record exists, False on timeout
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._load(task_id)
+        with self._lock:
+            if self._ring(task_id, create=False).next > offset:
+                return True
+            self._waiters.setdefault(task_id, []).append((loop, future))
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(task_id, [])
+                if (loop, future) in waiters:
+                    waiters.remove((loop, future))
+                    if not waiters:
+                        del self._waiters[task_id]
+
+    def release(self, task_id: str) -> None:
+        """
+        Free a finished task's ring, writing its records to disk first.
+
+        Without a spill directory the ring is kept until ``keep_finished``
+        newer tasks are released; dropped tasks keep their record count,
+        so later offsets stay valid.
+
+        Args:
+            task_id: Task identifier
+        """
+        with self._lock:
+            if task_id not in self._rings:
+                return
+            if self.spill_dir is None:
+                self._finished[task_id] = None
+                if len(self._finished) <= self.keep_finished:
+                    return
+                task_id, _ = self._finished.popitem(last=False)
+            ring = self._rings.pop(task_id)
+            self._evict(task_id, ring, ring.next - ring.first)
+            self._remember(task_id, ring.next)
+
+    def flush(self) -> None:
+        """Wait until all evicted records are written to their segments."""
+        self._writes.join()
+
+    def close(self) -> None:
+        """Write all records still in memory to disk."""
+        if self.spill_dir is None:
+            return
+        with self._lock:
+            for task_id, ring in self._rings.items():
+                self._spill(task_id, ring, ring.next)
+            writer, self._writer = self._writer, None
+            if writer is not None:
+                self._writes.put(None)
+        if writer is not None:
+            writer.join()
+
+    def _load(self, task_id: str) -> None:
+        # Count the records of a task seen for the first time, scanning its
+        # segments outside the lock
+        if task_id in self._rings or task_id in self._released:
+            return
+        count = self._scan(task_id)
+        if not count:
+            # Unknown tasks are not remembered, or polling arbitrary ids
+            # would grow the map
+            return
+        with self._lock:
+            if task_id not in self._rings and task_id not in self._released:
+                self._remember(task_id, count)
+
+    def _remember(self, task_id: str, count: int) -> None:
+        self._released[task_id] = count
+        while len(self._released) > self.keep_released:
+            self._released.popitem(last=False)
+
+    def _ring(self, task_id: str, create: bool = True) -> _Ring:
+        ring = self._rings.get(task_id)
+        if ring is not None:
+            return ring
+        ring = _Ring(self.capacity, self._released.get(task_id, 0))
+        if not create:
+            # Reads of finished tasks must not allocate a ring
+            return ring
+        self._released.pop(task_id, None)
+        self._rings[task_id] = ring
+        return ring
+
+    def _evict(self, task_id: str, ring: _Ring, count: int) -> None:
+        if self.spill_dir is not None:
+            self._spill(task_id, ring, ring.first + count)
+        for seq in range(ring.first, ring.first + count):
+            ring.messages[seq % self.capacity] = None
+        ring.first += count
+
+    def _spill(self, task_id: str, ring: _Ring, until: int) -> None:
+        start = max(ring.on_disk, ring.first)
+        if start >= until:
+            return
+        lines = "".join(
+            json.dumps(
+                [
+                    seq,
+                    ring.times[seq % self.capacity],
+                    ring.levels[seq % self.capacity],
+                    ring.messages[seq % self.capacity],
+                ],
+                ensure_ascii=False,
+            )
+            + "\n"
+            for seq in range(start, until)
+        ).encode("utf-8")
+
+        if ring.segment is None or ring.segment_size >= self.segment_bytes:
+            ring.segment = self._task_dir(task_id) / f"{start:012d}.log"
+            ring.segment_size = 0
+        ring.segment_size += len(lines)
+        ring.on_disk = until
+
+        self._writes.put((task_id, ring.segment, lines))
+        if self._writer is None:
+            self._writer = threading.Thread(
+                target=self._write_segments, name="smartwork-task-log", daemon=True
+            )
+            self._writer.start()
+
+    def _write_segments(self) -> None:
+        while True:
+            item = self._writes.get()
+            try:
+                if item is None:
+                    return
+                task_id, path, data = item
+                try:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    with open(path, "ab") as f:
+                        f.write(data)
+                except OSError as e:
+                    # Losing old log lines must not fail the task that wrote them
+                    logger.warning(f"Cannot spill logs of task {task_id}: {e}")
+            finally:
+                self._writes.task_done()
+
+    def _scan(self, task_id: str) -> int:
+        segments = self._segments(task_id)
+        if not segments:
+            return 0
+        first, path = segments[-1]
+        try:
+            with open(path, "rb") as f:
+                return first + sum(
+                    chunk.count(b"\n") for chunk in iter(lambda: f.read(65536), b"")
+                )
+        except OSError:
+            return first
+
+    def _read_segments(
+        self, task_id: str, start: int, end: int, limit: Optional[int], min_level: int
+    ) -> List[Dict[str, Any]]:
+        segments = self._segments(task_id)
+        index = max(bisect.bisect_right([s[0] for s in segments], start) - 1, 0)
+        records = []
+        for _, path in segments[index:]:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        seq, timestamp, level, message = json.loads(line)
+                        if seq >= end:
+                            return records
+                        if seq < start or level < min_level:
+                            continue
+                        records.append(_format(seq, timestamp, level, message))
+                        if limit is not None and len(records) >= limit:
+                            return records
+            except (OSError, ValueError) as e:
+                logger.warning(f"Cannot read log segment {path}: {e}")
+        return records
+
+    def _segments(self, task_id: str) -> List[Tuple[int, Path]]:
+        if self.spill_dir is None:
+            return []
+        try:
+            paths = list(self._task_dir(task_id).glob("*.log"))
+        except OSError:
+            return []
+        return sorted((int(path.stem), path) for path in paths if path.stem.isdigit())
+
+    def _task_dir(self, task_id: str) -> Path:
+        return self.spill_dir / quote(task_id, safe="")
+
+    def _record(self, ring: _Ring, seq: int) -> Dict[str, Any]:
+        slot = seq % self.capacity
+        return _format(seq, ring.times[slot], ring.levels[slot], ring.messages[slot])
+
+
+def _format(seq: int, timestamp: int, level: int, message: str) -> Dict[str, Any]:
+    return {
+        "seq": seq,
+        "timestamp": datetime.fromtimestamp(timestamp / 1e6).isoformat(),
+        "level": _LEVEL_NAMES.get(level, "info"),
+        "message": message,
+    }
+
+
+def _wake(future: "asyncio.Future") -> None:
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,557 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.task import Task, TaskPriority, TaskStatus
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, created_at);
+CREATE INDEX IF NOT EXISTS tasks_priority ON tasks (priority, created_at);
+CREATE INDEX IF NOT EXISTS tasks_created_at ON tasks (created_at);
+CREATE TABLE IF NOT EXISTS states (
+    task_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS states_state ON states (state);
+CREATE TABLE IF NOT EXISTS results (
+    task_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+# Executor states of tasks that were still running when the process died
+INTERRUPTED_STATES = ("preparing", "running", "paused")
+
+
+def _value(enum_or_str: Any) -> str:
+    return enum_or_str.value if hasattr(enum_or_str, "value") else str(enum_or_str)
+
+
+class TaskStore(ABC):
+    """
+    Storage for tasks and their execution state and results.
+
+    TaskPlanner and TaskExecutor keep everything here, so one store can be
+    shared between them and swapped for a persistent one.
+    """
+
+    @abstractmethod
+    def save_task(self, task: Task) -> None:
+        """Insert or replace a task."""
+
+    @abstractmethod
+    def get_task(self, task_id: str) -> Optional[Task]:
+        """Get a task, or None if it does not exist."""
+
+    @abstractmethod
+    def list_tasks(
+        self,
+        status: Optional[TaskStatus] = None,
+        priority: Optional[TaskPriority] = None,
+        created_after: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> List[Task]:
+        """
+        List tasks, oldest first.
+
+        Args:
+            status: Only tasks with this status
+            priority: Only tasks with this priority
+            created_after: Only tasks created after this time
+            limit: Maximum number of tasks
+
+        Returns:
+            Matching tasks
+        """
+
+    @abstractmethod
+    def count_tasks(self) -> int:
+        """Get the number of stored tasks."""
+
+    @abstractmethod
+    def set_state(self, task_id: str, state: str) -> None:
+        """Record the execution state of a task."""
+
+    @abstractmethod
+    def get_state(self, task_id: str) -> Optional[str]:
+        """Get the execution state of a task, or None."""
+
+    @abstractmethod
+    def state_ids(self) -> List[str]:
+        """Get the IDs of all tasks with an execution state."""
+
+    @abstractmethod
+    def set_result(self, task_id: str, result: Dict[str, Any]) -> None:
+        """Record the execution result of a task."""
+
+    @abstractmethod
+    def get_result(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Get the execution result of a task, or None."""
+
+    def flush(self) -> None:
+        """Wait until all writes so far are durable."""
+
+    def close(self) -> None:
+        """Flush and release resources; the store reopens on next use."""
+
+
+class MemoryTaskStore(TaskStore):
+    """
+    Task store in process memory.
+
+    Nothing survives a restart. Tasks are kept as the objects passed in, so
+    in-place changes are visible without saving.
+    """
+
+    def __init__(self):
+        self.tasks: Dict[str, Task] = {}
+        self.states: Dict[str, str] = {}
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def save_task(self, task: Task) -> None:
+        self.tasks[task.id] = task
+
+    def get_task(self, task_id: str) -> Optional[Task]:
+        return self.tasks.get(task_id)
+
+    def list_tasks(
+        self,
+        status: Optional[TaskStatus] = None,
+        priority: Optional[TaskPriority] = None,
+        created_after: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> List[Task]:
+        tasks = [
+            task
+            for task in self.tasks.values()
+            if (status is None or _value(task.status) == _value(status))
+            and (priority is None or _value(task.priority) == _value(priority))
+            and (created_after is None or task.created_at > created_after)
+        ]
+        tasks.sort(key=lambda task: task.created_at)
+        return tasks[:limit] if limit is not None else tasks
+
+    def count_tasks(self) -> int:
+        return len(self.tasks)
+
+    def set_state(self, task_id: str, state: str) -> None:
+        self.states[task_id] = state
+
+    def get_state(self, task_id: str) -> Optional[str]:
+        return self.states.get(task_id)
+
+    def state_ids(self) -> List[str]:
+        return list(self.states)
+
+    def set_result(self, task_id: str, result: Dict[str, Any]) -> None:
+        self.results[task_id] = result
+
+    def get_result(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return self.results.get(task_id)
+
+
+class _Batch:
+    """Writes waiting for the next group commit."""
+
+    def __init__(self):
+        self.tasks: Dict[str, Tuple[str, str, str, str, str]] = {}
+        self.states: Dict[str, Tuple[str, str, float]] = {}
+        self.results: Dict[str, Tuple[str, str]] = {}
+        self.writes = 0
+
+
+class SQLiteTaskStore(TaskStore):
+    """
+    Task store in a SQLite database in WAL mode.
+
+    Writes are acknowledged immediately and committed in groups by a
+    background thread, every ``flush_interval`` seconds or once
+    ``max_batch`` writes are waiting, so a burst of state transitions costs
+    one transaction instead of one each. Repeated writes to the same
+    task's state, result or data collapse to the last one before commit.
+    A crash loses at most the last flush_interval of writes; flush()
+    waits for everything written so far.
+
+    Reads see writes that are not committed yet. An optional write-through
+    LRU cache of ``cache_size`` entries serves hot tasks, states and
+    results from memory; cached tasks are returned as the same object, so
+    callers can change them in place before saving them again.
+
+    Tasks that were running when the process stopped are marked failed
+    when the store is opened.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        flush_interval: float = 0.05,
+        max_batch: int = 1000,
+        cache_size: int = 1024,
+    ):
+        """
+        Initialize the store; the database is opened on first use.
+
+        Args:
+            db_path: SQLite database file
+            flush_interval: Longest time a write waits for its commit
+            max_batch: Waiting writes that trigger an early commit
+            cache_size: Entries in the hot cache; 0 disables it
+        """
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.cache_size = cache_size
+
+        self._local = threading.local()
+        self._changed = threading.Condition()
+        self._pending = _Batch()
+        self._in_flight = _Batch()
+        self._cache: "OrderedDict[Tuple[str, str], Any]" = OrderedDict()
+        self._written = 0
+        self._committed = 0
+        self._flush_waiters = 0
+        self._opened = False
+        self._writer: Optional[threading.Thread] = None
+        self._stopping = False
+        self._error: Optional[BaseException] = None
+
+    def save_task(self, task: Task) -> None:
+        row = (
+            task.id,
+            _value(task.status),
+            _value(task.priority),
+            task.created_at.isoformat(),
+            task.model_dump_json(),
+        )
+        self._write(lambda batch: batch.tasks.__setitem__(task.id, row))
+        self._cache_put(("task", task.id), task)
+
+    def get_task(self, task_id: str) -> Optional[Task]:
+        cached = self._cache_get(("task", task_id))
+        if cached is not None:
+            return cached
+
+        row = self._pending_row("tasks", task_id)
+        if row is None:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT id, status, priority, created_at, data FROM tasks "
+                    "WHERE id = ?",
+                    (task_id,),
+                )
+                .fetchone()
+            )
+        if row is None:
+            return None
+        task = self._load_task(row)
+        self._cache_put(("task", task_id), task)
+        return task
+
+    def list_tasks(
+        self,
+        status: Optional[TaskStatus] = None,
+        priority: Optional[TaskPriority] = None,
+        created_after: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> List[Task]:
+        # Queries run on the indexes, so they see committed rows only
+        self.flush()
+        clauses, params = [], []
+        if status is not None:
+            clauses.append("status = ?")
+            params.append(_value(status))
+        if priority is not None:
+            clauses.append("priority = ?")
+            params.append(_value(priority))
+        if created_after is not None:
+            clauses.append("created_at > ?")
+            params.append(created_after.isoformat())
+        sql = "SELECT id, status, priority, created_at, data FROM tasks"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY created_at"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        tasks = []
+        for row in self._connect().execute(sql, params):
+            # Prefer the cached object so in-place changes stay shared
+            cached = self._cache_get(("task", row[0]), touch=False)
+            tasks.append(cached if cached is not None else self._load_task(row))
+        return tasks
+
+    def count_tasks(self) -> int:
+        self.flush()
+        return self._connect().execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def set_state(self, task_id: str, state: str) -> None:
+        row = (task_id, state, time.time())
+        self._write(lambda batch: batch.states.__setitem__(task_id, row))
+        self._cache_put(("state", task_id), state)
+
+    def get_state(self, task_id: str) -> Optional[str]:
+        cached = self._cache_get(("state", task_id))
+        if cached is not None:
+            return cached
+        row = self._pending_row("states", task_id)
+        if row is None:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT task_id, state FROM states WHERE task_id = ?", (task_id,)
+                )
+                .fetchone()
+            )
+        if row is None:
+            return None
+        self._cache_put(("state", task_id), row[1])
+        return row[1]
+
+    def state_ids(self) -> List[str]:
+        self.flush()
+        return [row[0] for row in self._connect().execute("SELECT task_id FROM states")]
+
+    def set_result(self, task_id: str, result: Dict[str, Any]) -> None:
+        row = (task_id, json.dumps(result, ensure_ascii=False, default=str))
+        self._write(lambda batch: batch.results.__setitem__(task_id, row))
+        self._cache_put(("result", task_id), result)
+
+    def get_result(self, task_id: str) -> Optional[Dict[str, Any]]:
+        cached = self._cache_get(("result", task_id))
+        if cached is not None:
+            return cached
+        row = self._pending_row("results", task_id)
+        if row is None:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT task_id, data FROM results WHERE task_id = ?", (task_id,)
+                )
+                .fetchone()
+            )
+        if row is None:
+            return None
+        result = json.loads(row[1])
+        self._cache_put(("result", task_id), result)
+        return result
+
+    def flush(self) -> None:
+        self._open()
+        with self._changed:
+            target = self._written
+            # Commit now rather than at the end of the interval
+            self._flush_waiters += 1
+            self._changed.notify_all()
+            try:
+                while self._committed < target:
+                    if self._error is not None:
+                        raise self._error
+                    self._changed.wait(0.5)
+            finally:
+                self._flush_waiters -= 1
+
+    def close(self) -> None:
+        if not self._opened:
+            return
+        self.flush()
+        with self._changed:
+            self._stopping = True
+            self._changed.notify_all()
+            writer = self._writer
+        if writer is not None:
+            writer.join()
+        with self._changed:
+            self._writer = None
+            self._stopping = False
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get write and cache counters.
+
+        Returns:
+            Writes acknowledged and committed so far, and cached entries
+        """
+        with self._changed:
+            return {
+                "written": self._written,
+                "committed": self._committed,
+                "pending": self._pending.writes,
+                "cached": len(self._cache),
+            }
+
+    def _write(self, apply) -> None:
+        self._open()
+        with self._changed:
+            if self._error is not None:
+                raise self._error
+            apply(self._pending)
+            self._pending.writes += 1
+            self._written += 1
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._write_loop, name="smartwork-task-store", daemon=True
+                )
+                self._writer.start()
+            if self._pending.writes >= self.max_batch:
+                self._changed.notify_all()
+
+    def _write_loop(self) -> None:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            while True:
+                with self._changed:
+                    deadline = time.monotonic() + self.flush_interval
+                    while (
+                        self._pending.writes < self.max_batch
+                        and not self._stopping
+                        and not (self._flush_waiters and self._pending.writes)
+                    ):
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._changed.wait(remaining)
+                    if not self._pending.writes:
+                        if self._stopping:
+                            return
+                        continue
+                    batch, self._pending = self._pending, _Batch()
+                    self._in_flight = batch
+
+                try:
+                    self._commit(conn, batch)
+                except Exception as e:
+                    logger.exception("Task store commit failed")
+                    with self._changed:
+                        self._error = e
+                        self._changed.notify_all()
+                    return
+
+                with self._changed:
+                    self._in_flight = _Batch()
+                    self._committed += batch.writes
+                    self._changed.notify_all()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _commit(conn: sqlite3.Connection, batch: _Batch) -> None:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?)",
+                batch.tasks.values(),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO states VALUES (?, ?, ?)",
+                batch.states.values(),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?)",
+                batch.results.values(),
+            )
+
+    def _pending_row(self, table: str, task_id: str) -> Optional[tuple]:
+        self._open()
+        with self._changed:
+            for batch in (self._pending, self._in_flight):
+                row = getattr(batch, table).get(task_id)
+                if row is not None:
+                    return row
+        return None
+
+    def _cache_get(self, key: Tuple[str, str], touch: bool = True) -> Any:
+        if not self.cache_size:
+            return None
+        with self._changed:
+            value = self._cache.get(key)
+            if value is not None and touch:
+                self._cache.move_to_end(key)
+            return value
+
+    def _cache_put(self, key: Tuple[str, str], value: Any) -> None:
+        if not self.cache_size:
+            return
+        with self._changed:
+            self._cache[key] = value
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    @staticmethod
+    def _load_task(row: tuple) -> Task:
+        task = Task.model_validate_json(row[4])
+        # The status column is authoritative; recovery updates only it
+        task.status = TaskStatus(row[1])
+        return task
+
+    def _connect(self) -> sqlite3.Connection:
+        self._open()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _open(self) -> None:
+        if self._opened:
+            return
+        with self._changed:
+            if self._opened:
+                return
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                self._recover(conn)
+            finally:
+                conn.close()
+            self._opened = True
+
+    @staticmethod
+    def _recover(conn: sqlite3.Connection) -> None:
+        marks = ", ".join("?" for _ in INTERRUPTED_STATES)
+        interrupted = [
+            row[0]
+            for row in conn.execute(
+                f"SELECT task_id FROM states WHERE state IN ({marks})",
+                INTERRUPTED_STATES,
+            )
+        ]
+        if not interrupted:
+            return
+        result = json.dumps({"success": False, "error": "Interrupted by a restart"})
+        with conn:
+            conn.executemany(
+                "UPDATE states SET state = 'failed', updated_at = ? WHERE task_id = ?",
+                [(time.time(), task_id) for task_id in interrupted],
+            )
+            conn.executemany(
+                "UPDATE tasks SET status = ? WHERE id = ?",
+                [(TaskStatus.FAILED.value, task_id) for task_id in interrupted],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?)",
+                [(task_id, result) for task_id in interrupted],
+            )
+        logger.info(f"Marked {len(interrupted)} interrupted tasks as failed")
@@ -0,0 +1,179 @@
+from pathlib import Path
+from typing import Optional
+
+try:
+    from openpyxl import load_workbook
+except ImportError:
+    load_workbook = None
+
+try:
+    from pptx import Presentation
+except ImportError:
+    Presentation = None
+
+try:
+    from docx import Document
+except ImportError:
+    Document = None
+
+try:
+    from pypdf import PdfReader
+except ImportError:
+    PdfReader = None
+
+TEXT_EXTENSIONS = {
+    ".txt",
+    ".md",
+    ".markdown",
+    ".rst",
+    ".csv",
+    ".tsv",
+    ".log",
+    ".json",
+    ".yaml",
+    ".yml",
+    ".toml",
+    ".ini",
+    ".cfg",
+    ".xml",
+    ".html",
+    ".htm",
+    ".css",
+    ".py",
+    ".js",
+    ".jsx",
+    ".ts",
+    ".tsx",
+    ".java",
+    ".go",
+    ".rs",
+    ".c",
+    ".h",
+    ".cpp",
+    ".hpp",
+    ".cs",
+    ".rb",
+    ".php",
+    ".sh",
+    ".sql",
+}
+DOCUMENT_EXTENSIONS = {".xlsx", ".pptx", ".docx", ".pdf"}
+
+
+def is_extractable(path: str) -> bool:
+    """
+    Check whether text can be extracted from a file, by extension.
+
+    Args:
+        path: File path
+
+    Returns:
+        True for plain-text/code files and supported office/PDF documents
+    """
+    suffix = Path(path).suffix.lower()
+    return suffix in TEXT_EXTENSIONS or suffix in DOCUMENT_EXTENSIONS
+
+
+def extract_text(path: str, max_chars: int = 1_000_000) -> Optional[str]:
+    """
+    Extract plain text from a file.
+
+    Office documents are read with their optional libraries; when a library
+    is missing the file is skipped.
+
+    Args:
+        path: File path
+        max_chars: Stop after this many characters
+
+    Returns:
+        Extracted text, or None if the format is unsupported
+    """
+    suffix = Path(path).suffix.lower()
+
+    if suffix in TEXT_EXTENSIONS:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read(max_chars)
+    if suffix == ".xlsx":
+        return _extract_xlsx(path, max_chars)
+    if suffix == ".pptx":
+        return _extract_pptx(path, max_chars)
+    if suffix == ".docx":
+        return _extract_docx(path, max_chars)
+    if suffix == ".pdf":
+        return _extract_pdf(path, max_chars)
+    return None
+
+
+class _TextBuffer:
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.parts = []
+        self.length = 0
+
+    @property
+    def full(self) -> bool:
+        return self.length >= self.max_chars
+
+    def add(self, text: str) -> None:
+        if text and not self.full:
+            self.parts.append(text)
+            self.length += len(text) + 1
+
+    def text(self) -> str:
+        return "\n".join(self.parts)[: self.max_chars]
+
+
+def _extract_xlsx(path: str, max_chars: int) -> Optional[str]:
+    if load_workbook is None:
+        return None
+
+    buffer = _TextBuffer(max_chars)
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            buffer.add(ws.title)
+            for row in ws.iter_rows(values_only=True):
+                buffer.add(" ".join(str(v) for v in row if v is not None))
+                if buffer.full:
+                    return buffer.text()
+    finally:
+        wb.close()
+    return buffer.text()
+
+
+def _extract_pptx(path: str, max_chars: int) -> Optional[str]:
+    if Presentation is None:
+        return None
+
+    buffer = _TextBuffer(max_chars)
+    for slide in Presentation(path).slides:
+        for shape in slide.shapes:
+            if shape.has_text_frame:
+                buffer.add(shape.text_frame.text)
+        if buffer.full:
+            break
+    return buffer.text()
+
+
+def _extract_docx(path: str, max_chars: int) -> Optional[str]:
+    if Document is None:
+        return None
+
+    buffer = _TextBuffer(max_chars)
+    for paragraph in Document(path).paragraphs:
+        buffer.add(paragraph.text)
+        if buffer.full:
+            break
+    return buffer.text()
+
+
+def _extract_pdf(path: str, max_chars: int) -> Optional[str]:
+    if PdfReader is None:
+        return None
+
+    buffer = _TextBuffer(max_chars)
+    for page in PdfReader(path).pages:
+        buffer.add(page.extract_text() or "")
+        if buffer.full:
+            break
+    return buffer.text()
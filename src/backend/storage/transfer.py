@@ -0,0 +1,490 @@
+import errno
+import logging
+import os
+import shutil
+import stat
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+COPY_SUFFIX = ".smartwork-copy"
+
+# Bytes handed to the kernel per copy_file_range/sendfile call; small enough
+# to report progress and notice cancellation between calls
+COPY_CHUNK_SIZE = 16 * 1024 * 1024
+
+# ioctl(FICLONE) shares the source's extents on btrfs, XFS and other
+# copy-on-write filesystems
+_FICLONE = 0x40049409
+
+# Errors meaning "this kernel or filesystem cannot do that", as opposed to
+# real I/O errors
+_UNSUPPORTED = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.ENOTTY,
+    errno.EOPNOTSUPP,
+    errno.EBADF,
+    errno.EPERM,
+}
+
+ProgressCallback = Callable[[Dict[str, Any]], None]
+# Called with a file path and a reason ("overwrite" or "delete") just before
+# the file is replaced or removed, e.g. to record it in a VersionStore
+PreserveCallback = Callable[[str, str], Any]
+
+
+class TransferCancelled(Exception):
+    pass
+
+
+def copy_partial_path(path: str) -> str:
+    """
+    Get the temporary file a copy to path is written to.
+
+    It lives in the destination directory so the final rename is atomic,
+    and survives an interrupted copy so the next attempt can resume it.
+
+    Args:
+        path: Absolute destination path
+
+    Returns:
+        Hidden sibling path for the partial copy
+    """
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}{COPY_SUFFIX}")
+
+
+def _reflink(src_fd: int, dst_fd: int) -> bool:
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(dst_fd, _FICLONE, src_fd)
+        return True
+    except OSError as e:
+        if e.errno in _UNSUPPORTED:
+            return False
+        raise
+
+
+def _copy_range(
+    src_fd: int,
+    dst_fd: int,
+    offset: int,
+    size: int,
+    on_bytes: Callable[[int], None],
+) -> Tuple[str, int]:
+    """
+    Copy src[offset:size] to the same position in dst inside the kernel.
+
+    Tries copy_file_range, then sendfile, then a plain read/write loop,
+    moving on whenever the kernel or filesystem does not support a method.
+
+    Returns:
+        Name of the method that finished the copy, and the final offset
+    """
+    method = "copy_file_range"
+    copy_file_range = getattr(os, "copy_file_range", None)
+    while copy_file_range is not None and offset < size:
+        try:
+            copied = copy_file_range(
+                src_fd, dst_fd, min(COPY_CHUNK_SIZE, size - offset), offset, offset
+            )
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+            copy_file_range = None
+            break
+        if copied == 0:
+            return method, offset
+        offset += copied
+        on_bytes(copied)
+    if copy_file_range is not None:
+        return method, offset
+
+    method = "sendfile"
+    use_sendfile = hasattr(os, "sendfile")
+    if use_sendfile:
+        os.lseek(dst_fd, offset, os.SEEK_SET)
+    while use_sendfile and offset < size:
+        try:
+            copied = os.sendfile(
+                dst_fd, src_fd, offset, min(COPY_CHUNK_SIZE, size - offset)
+            )
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED:
+                raise
+            use_sendfile = False
+            break
+        if copied == 0:
+            return method, offset
+        offset += copied
+        on_bytes(copied)
+    if use_sendfile:
+        return method, offset
+
+    method = "read_write"
+    buffer = bytearray(1024 * 1024)
+    view = memoryview(buffer)
+    while offset < size:
+        count = os.preadv(src_fd, [view[: min(len(buffer), size - offset)]], offset)
+        if count == 0:
+            break
+        written = 0
+        while written < count:
+            written += os.pwrite(dst_fd, view[written:count], offset + written)
+        offset += count
+        on_bytes(count)
+    return method, offset
+
+
+def preserve_tree(
+    path: str, preserve: Optional[PreserveCallback], reason: str = "overwrite"
+) -> None:
+    """
+    Pass every regular file at or under a path to a preserve callback.
+
+    Args:
+        path: File or folder about to be replaced or removed
+        preserve: Callback, or None to do nothing
+        reason: Reason passed on to the callback
+    """
+    if preserve is None or os.path.islink(path):
+        return
+    if os.path.isfile(path):
+        preserve(path, reason)
+        return
+    for directory, _, names in os.walk(path):
+        for name in names:
+            file_path = os.path.join(directory, name)
+            if os.path.isfile(file_path) and not os.path.islink(file_path):
+                preserve(file_path, reason)
+
+
+class TransferJob:
+    """
+    Copy or move a file or folder on the server.
+
+    Moves within a filesystem are a single rename. Everything else is
+    copied inside the kernel: a reflink where the filesystem supports it,
+    otherwise copy_file_range or sendfile, so data never passes through
+    Python. Folder contents are copied by a pool of threads, each file into
+    a hidden partial file beside its destination that is renamed into place
+    once complete. An interrupted copy leaves those partial files and the
+    completed files behind; running the same job again with ``resume``
+    skips files that are already complete and continues partial files from
+    where they stopped.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        destination: str,
+        move: bool = False,
+        overwrite: bool = False,
+        resume: bool = False,
+        max_workers: int = 8,
+        progress_interval: float = 0.25,
+        preserve: Optional[PreserveCallback] = None,
+    ):
+        """
+        Initialize the job.
+
+        Args:
+            source: Absolute path to copy or move
+            destination: Absolute path the source ends up at
+            move: Remove the source once it has been copied
+            overwrite: Replace an existing destination
+            resume: Continue an interrupted transfer into an existing
+                destination instead of failing
+            max_workers: Files copied at once
+            progress_interval: Minimum seconds between progress callbacks
+            preserve: Called for every file of an overwritten destination
+                before it is removed
+        """
+        self.source = os.path.abspath(source)
+        self.destination = os.path.abspath(destination)
+        self.move = move
+        self.overwrite = overwrite
+        self.resume = resume
+        self.max_workers = max_workers
+        self.progress_interval = progress_interval
+        self.preserve = preserve
+
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._on_progress: Optional[ProgressCallback] = None
+        self._last_progress = 0.0
+
+        self.files_total = 0
+        self.files_done = 0
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self.skipped_files = 0
+        self.resumed_bytes = 0
+        self.methods: Dict[str, int] = {}
+
+    def cancel(self) -> None:
+        """
+        Stop the job after the current chunk; it can be resumed later.
+        """
+        self._cancelled.set()
+
+    def run(self, on_progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """
+        Execute the transfer.
+
+        Args:
+            on_progress: Called from worker threads with progress counters,
+                at most every ``progress_interval`` seconds
+
+        Returns:
+            Summary with counters, copy methods used and elapsed time
+
+        Raises:
+            FileNotFoundError: If the source does not exist
+            FileExistsError: If the destination exists and neither
+                overwrite nor resume is set
+            ValueError: If the destination is the source or inside it
+            TransferCancelled: If cancel() was called
+        """
+        self._on_progress = on_progress
+        started = time.monotonic()
+
+        st = self.check()
+        exists = os.path.lexists(self.destination)
+        parent = os.path.dirname(self.destination)
+        os.makedirs(parent, exist_ok=True)
+
+        renamed = False
+        if self.move and os.stat(parent).st_dev == st.st_dev:
+            # Nothing to resume within a filesystem: the rename is atomic
+            if exists and not self.overwrite:
+                raise FileExistsError(f"Destination exists: {self.destination}")
+            if exists:
+                preserve_tree(self.destination, self.preserve)
+                self._remove(self.destination)
+            os.rename(self.source, self.destination)
+            renamed = True
+            self.files_total = self.files_done = 1
+        else:
+            if exists and self.overwrite and not self.resume:
+                preserve_tree(self.destination, self.preserve)
+                self._remove(self.destination)
+            self._copy(st)
+            if self.move:
+                self._remove(self.source)
+
+        self._report(force=True)
+        return {
+            "source": self.source,
+            "destination": self.destination,
+            "operation": "move" if self.move else "copy",
+            "renamed": renamed,
+            **self.progress(),
+            "skipped_files": self.skipped_files,
+            "resumed_bytes": self.resumed_bytes,
+            "methods": dict(self.methods),
+            "elapsed": round(time.monotonic() - started, 3),
+        }
+
+    def check(self) -> os.stat_result:
+        """
+        Validate the job before running it.
+
+        Returns:
+            lstat() of the source
+
+        Raises:
+            FileNotFoundError: If the source does not exist
+            FileExistsError: If the destination exists and neither
+                overwrite nor resume is set
+            ValueError: If the destination is the source or inside it
+        """
+        st = os.lstat(self.source)
+        if self.destination == self.source:
+            raise ValueError("Source and destination are the same")
+        if self.destination.startswith(self.source + os.sep):
+            raise ValueError("Destination is inside the source")
+        if os.path.lexists(self.destination) and not (self.overwrite or self.resume):
+            raise FileExistsError(f"Destination exists: {self.destination}")
+        return st
+
+    def progress(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "files_done": self.files_done,
+                "files_total": self.files_total,
+                "bytes_done": self.bytes_done,
+                "bytes_total": self.bytes_total,
+            }
+
+    def _copy(self, st: os.stat_result) -> None:
+        if not stat.S_ISDIR(st.st_mode):
+            self.files_total = 1
+            self.bytes_total = st.st_size if stat.S_ISREG(st.st_mode) else 0
+            self._copy_entry(self.source, self.destination, st)
+            return
+
+        directories, files = self._plan()
+        self.files_total = len(files)
+        self.bytes_total = sum(
+            s.st_size for _, _, s in files if stat.S_ISREG(s.st_mode)
+        )
+        for _, target in directories:
+            os.makedirs(target, exist_ok=True)
+
+        # Largest files first, so one big file does not finish the job alone
+        files.sort(key=lambda item: item[2].st_size, reverse=True)
+        with ThreadPoolExecutor(self.max_workers) as pool:
+            futures = [pool.submit(self._copy_entry, *item) for item in files]
+            done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+            errors = [f.exception() for f in done if f.exception() is not None]
+            if errors:
+                # Stop the other workers at their next chunk
+                self._cancelled.set()
+                for future in pending:
+                    future.cancel()
+                raise errors[0]
+
+        # Folder times last, as copying files into them changes their mtime
+        for source, target in reversed(directories):
+            self._copy_metadata(source, target)
+
+    def _plan(
+        self,
+    ) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str, os.stat_result]]]:
+        directories = []
+        files = []
+        stack = [(self.source, self.destination)]
+        while stack:
+            source, target = stack.pop()
+            directories.append((source, target))
+            with os.scandir(source) as entries:
+                for entry in entries:
+                    entry_target = os.path.join(target, entry.name)
+                    if entry.name.endswith(COPY_SUFFIX):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append((entry.path, entry_target))
+                    else:
+                        files.append(
+                            (
+                                entry.path,
+                                entry_target,
+                                entry.stat(follow_symlinks=False),
+                            )
+                        )
+        return directories, files
+
+    def _copy_entry(self, source: str, target: str, st: os.stat_result) -> None:
+        if self._cancelled.is_set():
+            raise TransferCancelled(self.source)
+
+        if stat.S_ISLNK(st.st_mode):
+            if os.path.lexists(target):
+                os.unlink(target)
+            os.symlink(os.readlink(source), target)
+            self._count("symlink", files=1)
+        elif stat.S_ISREG(st.st_mode):
+            self._copy_file(source, target, st)
+        else:
+            logger.warning(f"Skipping special file {source}")
+            self._count(None, files=1)
+
+    def _copy_file(self, source: str, target: str, st: os.stat_result) -> None:
+        try:
+            target_st = os.stat(target)
+            if (
+                target_st.st_size == st.st_size
+                and target_st.st_mtime_ns == st.st_mtime_ns
+            ):
+                # Finished by an earlier run
+                with self._lock:
+                    self.skipped_files += 1
+                self._count(None, files=1, size=st.st_size)
+                return
+        except FileNotFoundError:
+            pass
+
+        partial = copy_partial_path(target)
+        offset = 0
+        try:
+            partial_st = os.stat(partial)
+            # Resume only if the source has not changed since the partial
+            # file was last written
+            if (
+                partial_st.st_size <= st.st_size
+                and partial_st.st_mtime_ns >= st.st_mtime_ns
+            ):
+                offset = partial_st.st_size
+        except FileNotFoundError:
+            pass
+
+        with open(source, "rb") as src, open(partial, "r+b" if offset else "wb") as dst:
+            src_fd, dst_fd = src.fileno(), dst.fileno()
+            if offset:
+                with self._lock:
+                    self.resumed_bytes += offset
+                self._count(None, size=offset)
+                method, end = _copy_range(
+                    src_fd, dst_fd, offset, st.st_size, self._bytes
+                )
+            elif st.st_size and _reflink(src_fd, dst_fd):
+                method, end = "reflink", st.st_size
+                self._bytes(st.st_size)
+            else:
+                method, end = _copy_range(src_fd, dst_fd, 0, st.st_size, self._bytes)
+            if end < st.st_size:
+                raise OSError(errno.EIO, f"{source} shrank while being copied")
+            os.ftruncate(dst_fd, end)
+
+        self._copy_metadata(source, partial)
+        os.replace(partial, target)
+        self._count(method, files=1)
+
+    @staticmethod
+    def _copy_metadata(source: str, target: str) -> None:
+        try:
+            shutil.copystat(source, target, follow_symlinks=False)
+        except OSError as e:
+            logger.debug(f"Could not copy metadata of {source}: {e}")
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        if os.path.isdir(path) and not os.path.islink(path):
+            shutil.rmtree(path)
+        else:
+            os.unlink(path)
+
+    def _bytes(self, count: int) -> None:
+        if self._cancelled.is_set():
+            raise TransferCancelled(self.source)
+        self._count(None, size=count)
+
+    def _count(self, method: Optional[str], files: int = 0, size: int = 0) -> None:
+        with self._lock:
+            self.files_done += files
+            self.bytes_done += size
+            if method is not None:
+                self.methods[method] = self.methods.get(method, 0) + 1
+        self._report()
+
+    def _report(self, force: bool = False) -> None:
+        if self._on_progress is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_progress < self.progress_interval:
+                return
+            self._last_progress = now
+        self._on_progress(self.progress())
@@ -0,0 +1,438 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Name of the trash folder created at the top of volumes other than the
+# one holding the data directory
+VOLUME_TRASH_NAME = ".smartwork-trash"
+
+
+def is_trash_path(path: str) -> bool:
+    """
+    Check whether a path is a volume trash folder or lies inside one.
+
+    Args:
+        path: Absolute path
+
+    Returns:
+        True for paths that indexers and listings must skip
+    """
+    return VOLUME_TRASH_NAME in path.split(os.sep)
+
+
+_ITEM = "item"
+_INFO = "info.json"
+_VOLUMES = "volumes.json"
+
+TRASHED = "trashed"
+PURGING = "purging"
+
+
+class TrashError(Exception):
+    pass
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def _read_json(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class TrashManager:
+    """
+    Deletion by rename into a trash folder, with background purging.
+
+    Deleting renames the target into a trash folder on the same volume, so
+    it takes one metadata operation whatever the size of the tree, and can
+    be undone until the item is purged. Items are purged ``retention``
+    seconds after deletion by a background thread that removes at most
+    ``max_ops_per_second`` files and folders per second, so a purge of a
+    huge tree does not starve other disk I/O. Trash state lives on disk
+    (an info.json beside each item), so recover() can pick up items and
+    half-finished purges left by a previous process.
+    """
+
+    def __init__(
+        self,
+        home: str,
+        retention: float = 3600.0,
+        max_ops_per_second: int = 2000,
+    ):
+        """
+        Initialize the manager.
+
+        Args:
+            home: Trash folder for the volume holding the data directory;
+                also records the trash folders created on other volumes
+            retention: Seconds an item stays restorable before it is purged
+            max_ops_per_second: Purge rate limit in unlink/rmdir calls
+        """
+        self.home = home
+        self.retention = retention
+        self.max_ops_per_second = max_ops_per_second
+
+        os.makedirs(home, exist_ok=True)
+        self._home_dev = os.stat(home).st_dev
+        self._volume_dirs: Dict[int, str] = {self._home_dev: home}
+
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = False
+
+        self.purged = 0
+
+    def trash(self, path: str) -> Dict[str, Any]:
+        """
+        Move a file or folder into the trash.
+
+        Args:
+            path: Absolute path to delete
+
+        Returns:
+            Trash entry
+
+        Raises:
+            FileNotFoundError: If path does not exist
+            TrashError: If no trash folder can be used on path's volume, or
+                path cannot be moved there
+        """
+        path = os.path.abspath(path)
+        st = os.lstat(path)
+        trash_dir = self._trash_dir_for(path, st.st_dev)
+
+        entry_id = f"{int(time.time())}-{uuid.uuid4().hex[:12]}"
+        entry_dir = os.path.join(trash_dir, entry_id)
+        os.makedirs(entry_dir)
+        info = {
+            "id": entry_id,
+            "path": path,
+            "is_dir": os.path.isdir(path) and not os.path.islink(path),
+            "deleted_at": time.time(),
+            "state": TRASHED,
+        }
+        # The info file goes first: an entry without an item is an
+        # interrupted trash() and is dropped by recover()
+        _write_json(os.path.join(entry_dir, _INFO), info)
+        try:
+            os.rename(path, os.path.join(entry_dir, _ITEM))
+        except FileNotFoundError:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            raise
+        except OSError as e:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            # EXDEV across bind mounts, EBUSY for mount points, EINVAL for
+            # a folder containing the trash
+            raise TrashError(f"Cannot move {path} to the trash: {e}") from e
+
+        entry = {**info, "directory": entry_dir}
+        entry["purge_at"] = info["deleted_at"] + self.retention
+        with self._lock:
+            self._entries[entry_id] = entry
+            self._ensure_thread()
+            self._wake.notify()
+        return self._public(entry)
+
+    def restore(self, entry_id: str) -> Dict[str, Any]:
+        """
+        Move a trashed item back to where it was deleted from.
+
+        Args:
+            entry_id: Trash entry id
+
+        Returns:
+            The restored entry
+
+        Raises:
+            KeyError: If the entry does not exist or is being purged
+            FileExistsError: If something now exists at the original path
+        """
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None or entry["state"] != TRASHED:
+                raise KeyError(entry_id)
+            if os.path.lexists(entry["path"]):
+                raise FileExistsError(entry["path"])
+
+            os.makedirs(os.path.dirname(entry["path"]), exist_ok=True)
+            os.rename(os.path.join(entry["directory"], _ITEM), entry["path"])
+            shutil.rmtree(entry["directory"], ignore_errors=True)
+            del self._entries[entry_id]
+        return self._public(entry)
+
+    def purge(self, entry_id: Optional[str] = None) -> int:
+        """
+        Purge trashed items now instead of after the retention period.
+
+        Args:
+            entry_id: Entry to purge; all entries if omitted
+
+        Returns:
+            Number of entries scheduled
+        """
+        with self._lock:
+            entries = (
+                list(self._entries.values())
+                if entry_id is None
+                else [self._entries[entry_id]] if entry_id in self._entries else []
+            )
+            for entry in entries:
+                entry["purge_at"] = 0.0
+            if entries:
+                self._ensure_thread()
+                self._wake.notify()
+        return len(entries)
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """
+        List trash entries, newest first.
+
+        Returns:
+            Entries with their state and purge progress
+        """
+        with self._lock:
+            entries = [self._public(e) for e in self._entries.values()]
+        return sorted(entries, key=lambda e: e["deleted_at"], reverse=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "purging": sum(
+                    1 for e in self._entries.values() if e["state"] == PURGING
+                ),
+                "purged": self.purged,
+                "trash_dirs": sorted(self._volume_dirs.values()),
+            }
+
+    def recover(self) -> int:
+        """
+        Load trash left by a previous process and resume its purges.
+
+        Returns:
+            Number of entries found
+        """
+        registry = _read_json(os.path.join(self.home, _VOLUMES)) or {}
+        trash_dirs = [self.home] + [
+            d for d in registry.get("trash_dirs", []) if d != self.home
+        ]
+
+        found = 0
+        for trash_dir in trash_dirs:
+            try:
+                names = os.listdir(trash_dir)
+                dev = os.stat(trash_dir).st_dev
+            except OSError:
+                continue
+            with self._lock:
+                self._volume_dirs.setdefault(dev, trash_dir)
+
+            for name in names:
+                entry_dir = os.path.join(trash_dir, name)
+                if not os.path.isdir(entry_dir):
+                    continue
+                if self._recover_entry(entry_dir, name):
+                    found += 1
+
+        with self._lock:
+            if self._entries:
+                self._ensure_thread()
+                self._wake.notify()
+        return found
+
+    def close(self) -> None:
+        """
+        Stop the purge thread; an unfinished purge resumes on recover().
+        """
+        with self._lock:
+            self._stop = True
+            self._wake.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _recover_entry(self, entry_dir: str, name: str) -> bool:
+        info = _read_json(os.path.join(entry_dir, _INFO))
+        has_item = os.path.lexists(os.path.join(entry_dir, _ITEM))
+
+        if info is None:
+            if not has_item:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                return False
+            # Without its info the item cannot be restored; purge it
+            info = {"id": name, "path": None, "is_dir": True, "state": PURGING}
+            info["deleted_at"] = os.stat(entry_dir).st_mtime
+        elif not has_item and info.get("state") != PURGING:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return False
+
+        entry = {**info, "id": name, "directory": entry_dir}
+        if entry["state"] == PURGING:
+            entry["purge_at"] = 0.0
+        else:
+            entry["purge_at"] = entry["deleted_at"] + self.retention
+        with self._lock:
+            self._entries.setdefault(name, entry)
+        return True
+
+    def _trash_dir_for(self, path: str, dev: int) -> str:
+        with self._lock:
+            trash_dir = self._volume_dirs.get(dev)
+        if trash_dir is not None:
+            return trash_dir
+
+        # Use the topmost writable folder on the same volume, so one trash
+        # folder serves every deletion on it
+        top = None
+        current = os.path.dirname(path)
+        while True:
+            try:
+                if os.stat(current).st_dev != dev:
+                    break
+            except OSError:
+                break
+            if os.access(current, os.W_OK):
+                top = current
+            parent = os.path.dirname(current)
+            if parent == current:
+                break
+            current = parent
+        if top is None:
+            raise TrashError(f"No writable trash location on the volume of {path}")
+
+        trash_dir = os.path.join(top, VOLUME_TRASH_NAME)
+        os.makedirs(trash_dir, exist_ok=True)
+        with self._lock:
+            self._volume_dirs[dev] = trash_dir
+            registry = sorted(set(self._volume_dirs.values()))
+        _write_json(os.path.join(self.home, _VOLUMES), {"trash_dirs": registry})
+        return trash_dir
+
+    @staticmethod
+    def _public(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            key: entry.get(key)
+            for key in (
+                "id",
+                "path",
+                "is_dir",
+                "deleted_at",
+                "purge_at",
+                "state",
+                "progress",
+            )
+        }
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None and not self._stop:
+            self._thread = threading.Thread(
+                target=self._run, name="smartwork-trash-purge", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._stop:
+                    due = min(
+                        self._entries.values(),
+                        key=lambda e: e["purge_at"],
+                        default=None,
+                    )
+                    if due is None:
+                        self._wake.wait()
+                        continue
+                    remaining = due["purge_at"] - time.time()
+                    if remaining <= 0:
+                        break
+                    self._wake.wait(remaining)
+                if self._stop:
+                    return
+                due["state"] = PURGING
+                due["progress"] = {"removed": 0, "total": None, "bytes": 0}
+
+            try:
+                self._purge_entry(due)
+            except Exception as e:
+                logger.warning(f"Trash purge of {due['directory']} failed: {e}")
+                with self._lock:
+                    # Retry later rather than spinning on a failing purge
+                    due["purge_at"] = time.time() + 60
+                continue
+
+            with self._lock:
+                if not os.path.exists(due["directory"]):
+                    self._entries.pop(due["id"], None)
+                    self.purged += 1
+
+    def _purge_entry(self, entry: Dict[str, Any]) -> None:
+        directory = entry["directory"]
+        info = {k: entry[k] for k in ("id", "path", "is_dir", "deleted_at")}
+        _write_json(os.path.join(directory, _INFO), {**info, "state": PURGING})
+
+        progress = entry["progress"]
+        item = os.path.join(directory, _ITEM)
+        if entry.get("is_dir") and os.path.isdir(item) and not os.path.islink(item):
+            total = 0
+            for _, dirs, files in os.walk(item):
+                total += len(dirs) + len(files)
+            progress["total"] = total + 1
+        else:
+            progress["total"] = 1
+
+        interval = 1.0 / self.max_ops_per_second if self.max_ops_per_second else 0.0
+        started = time.monotonic()
+
+        def removed(size: int = 0) -> None:
+            progress["removed"] += 1
+            progress["bytes"] += size
+            # Sleep whenever removal runs ahead of the allowed rate
+            ahead = started + progress["removed"] * interval - time.monotonic()
+            if ahead > 0.01:
+                time.sleep(ahead)
+
+        if os.path.isdir(item) and not os.path.islink(item):
+            for current, dirs, files in os.walk(item, topdown=False):
+                if self._stop:
+                    return
+                for name in files:
+                    file_path = os.path.join(current, name)
+                    try:
+                        size = os.lstat(file_path).st_size
+                        os.unlink(file_path)
+                    except FileNotFoundError:
+                        size = 0
+                    removed(size)
+                for name in dirs:
+                    sub = os.path.join(current, name)
+                    # Symlinks to folders are listed in dirs but not walked
+                    if os.path.islink(sub):
+                        os.unlink(sub)
+                    else:
+                        os.rmdir(sub)
+                    removed()
+            os.rmdir(item)
+            removed()
+        elif os.path.lexists(item):
+            size = os.lstat(item).st_size
+            os.unlink(item)
+            removed(size)
+
+        shutil.rmtree(directory)
@@ -0,0 +1,390 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional, Tuple
+
+from .watcher import (
+    IN_DELETE,
+    IN_DELETE_SELF,
+    IN_IGNORED,
+    IN_ISDIR,
+    IN_MOVE_SELF,
+    IN_MOVED_FROM,
+    ChangeWatcher,
+)
+from .trash import VOLUME_TRASH_NAME
+
+# (size, files, dirs) of a whole subtree
+Totals = Tuple[int, int, int]
+
+
+class _DirNode:
+    __slots__ = (
+        "own_size",
+        "own_files",
+        "children",
+        "mtime_ns",
+        "scanned_at",
+        "watched",
+        "stale",
+        "total",
+    )
+
+    def __init__(
+        self,
+        own_size: int,
+        own_files: int,
+        children: List[str],
+        mtime_ns: int,
+        watched: bool,
+    ):
+        self.own_size = own_size
+        self.own_files = own_files
+        self.children = children
+        self.mtime_ns = mtime_ns
+        self.scanned_at = time.monotonic()
+        self.watched = watched
+        self.stale = False
+        self.total: Optional[Totals] = None
+
+
+class TreeAggregator:
+    """
+    Cached per-directory size and file-count aggregates.
+
+    Each directory is scanned on its own (one scandir, no recursion), and
+    scans of a subtree run in parallel on a thread pool. Subtree totals are
+    memoized. When the change watcher reports an event in a directory, only
+    that directory is marked for rescan and the memoized totals of it and
+    its ancestors are dropped. The next query rescans that one directory
+    and re-adds the cached totals of its untouched siblings.
+    Directories inotify refuses to watch are revalidated by mtime and
+    expire after ``poll_ttl`` seconds.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 8,
+        max_nodes: int = 200_000,
+        poll_ttl: float = 30.0,
+        watcher: Optional[ChangeWatcher] = None,
+    ):
+        """
+        Initialize the aggregator.
+
+        Args:
+            max_workers: Threads used to scan directories
+            max_nodes: Maximum number of cached directories
+            poll_ttl: Lifetime of directories that are not watched
+            watcher: Change watcher; a new one is created if omitted
+        """
+        self.max_nodes = max_nodes
+        self.poll_ttl = poll_ttl
+        self.watcher = watcher or ChangeWatcher()
+        self.watcher.add_listener(self._on_change)
+
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="smartwork-tree"
+        )
+        self._lock = threading.RLock()
+        self._nodes: "OrderedDict[str, _DirNode]" = OrderedDict()
+        # Bumped on every change so scans racing a change are marked stale
+        self._versions: Dict[str, int] = {}
+
+        self.scans = 0
+
+    def tree(
+        self,
+        root: str,
+        depth: int = 2,
+        max_entries: int = 100_000,
+        limit: int = 100,
+    ) -> Dict[str, Any]:
+        """
+        Get the folder tree under root with aggregate sizes.
+
+        Args:
+            root: Absolute directory path
+            depth: Levels of subdirectories to include in the result
+            max_entries: Maximum files and folders to scan; larger trees are
+                reported with complete=False
+            limit: Maximum subdirectories per directory, largest first
+
+        Returns:
+            Dictionary with the tree, whether it is complete, and how many
+            directories had to be scanned
+        """
+        root = os.path.abspath(root)
+        scans_before = self.scans
+        truncated = self._ensure(root, max_entries)
+
+        with self._lock:
+            if root not in self._nodes:
+                raise FileNotFoundError(root)
+            totals = self._compute_totals(root)
+            tree = self._build(root, depth, limit, totals)
+
+        return {
+            "root": root,
+            "complete": tree["complete"] and not truncated,
+            "scanned": self.scans - scans_before,
+            "tree": tree,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "directories": len(self._nodes),
+                "max_directories": self.max_nodes,
+                "memoized": sum(1 for n in self._nodes.values() if n.total),
+                "scans": self.scans,
+                "inotify": self.watcher.available,
+            }
+
+    def close(self) -> None:
+        self.watcher.remove_listener(self._on_change)
+        self._pool.shutdown(wait=False)
+        with self._lock:
+            for path, node in self._nodes.items():
+                if node.watched:
+                    self.watcher.unwatch(path)
+            self._nodes.clear()
+
+    def _ensure(self, root: str, max_entries: int) -> bool:
+        budget = max_entries
+        truncated = False
+        frontier = [root]
+        running: Dict[Any, str] = {}
+
+        while frontier or running:
+            while frontier:
+                path = frontier.pop()
+                with self._lock:
+                    node = self._nodes.get(path)
+                    fresh = node is not None and self._is_fresh(path, node)
+                    if fresh:
+                        self._nodes.move_to_end(path)
+                        if node.total is not None:
+                            continue
+                        children = list(node.children)
+
+                if not fresh:
+                    if budget <= 0:
+                        truncated = True
+                        continue
+                    running[self._pool.submit(self._scan, path)] = path
+                    continue
+
+                budget -= node.own_files + len(children)
+                frontier.extend(children)
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                running.pop(future)
+                result = future.result()
+                if result is None:
+                    continue
+                _, node = result
+                budget -= node.own_files + len(node.children)
+                if budget <= 0 and node.children:
+                    truncated = True
+                    continue
+                frontier.extend(node.children)
+
+        return truncated
+
+    def _is_fresh(self, path: str, node: _DirNode) -> bool:
+        if node.stale:
+            return False
+        if node.watched:
+            return True
+        if time.monotonic() - node.scanned_at > self.poll_ttl:
+            return False
+        try:
+            return os.stat(path).st_mtime_ns == node.mtime_ns
+        except OSError:
+            return False
+
+    def _scan(self, path: str) -> Optional[Tuple[str, _DirNode]]:
+        with self._lock:
+            version = self._versions.get(path, 0)
+            previous = self._nodes.get(path)
+            was_watched = previous is not None and previous.watched
+
+        # Watch before scanning so changes made during the scan are seen
+        watched = self.watcher.watch(path)
+        own_size = 0
+        own_files = 0
+        children: List[str] = []
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.name == VOLUME_TRASH_NAME:
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            children.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            own_size += entry.stat(follow_symlinks=False).st_size
+                            own_files += 1
+                    except OSError:
+                        continue
+        except FileNotFoundError:
+            with self._lock:
+                self._drop(path)
+            if watched and not was_watched:
+                self.watcher.unwatch(path)
+            return None
+        except OSError:
+            # Unreadable directory: keep an empty node so it is not retried
+            mtime_ns = 0
+
+        node = _DirNode(own_size, own_files, children, mtime_ns, watched)
+        with self._lock:
+            self.scans += 1
+            if self._versions.get(path, 0) != version:
+                node.stale = True
+
+            if previous is not None:
+                for child in set(previous.children) - set(children):
+                    self._drop(child)
+
+            self._nodes[path] = node
+            self._nodes.move_to_end(path)
+            self._invalidate_totals(path)
+
+            while len(self._nodes) > self.max_nodes:
+                oldest = next(iter(self._nodes))
+                self._evict(oldest)
+
+        return path, node
+
+    def _compute_totals(self, root: str) -> Dict[str, Tuple[int, int, int, bool]]:
+        totals: Dict[str, Tuple[int, int, int, bool]] = {}
+        # Subtrees containing unwatched directories are recomputed every time
+        cacheable: Dict[str, bool] = {}
+        stack = [(root, False)]
+
+        while stack:
+            path, expanded = stack.pop()
+            if path in totals:
+                continue
+
+            node = self._nodes.get(path)
+            if node is None:
+                totals[path] = (0, 0, 0, False)
+                continue
+            if node.total is not None:
+                totals[path] = node.total + (True,)
+                cacheable[path] = True
+                continue
+            if not expanded:
+                stack.append((path, True))
+                stack.extend((child, False) for child in node.children)
+                continue
+
+            size, files, dirs = node.own_size, node.own_files, len(node.children)
+            complete = not node.stale
+            memoize = node.watched
+            for child in node.children:
+                child_size, child_files, child_dirs, child_complete = totals[child]
+                size += child_size
+                files += child_files
+                dirs += child_dirs
+                complete = complete and child_complete
+                memoize = memoize and cacheable.get(child, False)
+
+            cacheable[path] = complete and memoize
+            if cacheable[path]:
+                node.total = (size, files, dirs)
+            totals[path] = (size, files, dirs, complete)
+
+        return totals
+
+    def _build(
+        self,
+        path: str,
+        depth: int,
+        limit: int,
+        totals: Dict[str, Tuple[int, int, int, bool]],
+    ) -> Dict[str, Any]:
+        if path not in totals:
+            totals.update(self._compute_totals(path))
+        size, files, dirs, complete = totals[path]
+
+        result: Dict[str, Any] = {
+            "name": os.path.basename(path) or path,
+            "path": path,
+            "size": size,
+            "files": files,
+            "dirs": dirs,
+            "complete": complete,
+        }
+
+        node = self._nodes.get(path)
+        if depth > 0 and node is not None:
+            children = [
+                self._build(child, depth - 1, limit, totals) for child in node.children
+            ]
+            children.sort(key=lambda c: (-c["size"], c["name"]))
+            result["children"] = children[:limit]
+            result["more_children"] = max(len(children) - limit, 0)
+        return result
+
+    def _invalidate_totals(self, path: str) -> None:
+        while True:
+            node = self._nodes.get(path)
+            if node is not None:
+                node.total = None
+            parent = os.path.dirname(path)
+            if parent == path:
+                return
+            path = parent
+
+    def _drop(self, path: str) -> None:
+        stack = [path]
+        while stack:
+            current = stack.pop()
+            self._versions[current] = self._versions.get(current, 0) + 1
+            node = self._nodes.pop(current, None)
+            if node is None:
+                continue
+            if node.watched:
+                self.watcher.unwatch(current)
+            stack.extend(node.children)
+        self._invalidate_totals(os.path.dirname(path))
+
+    def _evict(self, path: str) -> None:
+        node = self._nodes.pop(path)
+        if node.watched:
+            self.watcher.unwatch(path)
+        # Changes below an evicted directory are no longer observed
+        self._invalidate_totals(os.path.dirname(path))
+
+    def _on_change(self, directory: str, name: str, mask: int) -> None:
+        with self._lock:
+            if not directory:
+                for node in self._nodes.values():
+                    node.stale = True
+                    node.total = None
+                return
+
+            self._versions[directory] = self._versions.get(directory, 0) + 1
+
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                self._drop(directory)
+                return
+
+            node = self._nodes.get(directory)
+            if node is not None:
+                node.stale = True
+            self._invalidate_totals(directory)
+
+            if name and mask & IN_ISDIR and mask & (IN_DELETE | IN_MOVED_FROM):
+                self._drop(os.path.join(directory, name))
@@ -0,0 +1,213 @@
+import hashlib
+import os
+import threading
+from typing import Any, Dict, Optional, Set
+
+UPLOAD_SUFFIX = ".smartwork-upload"
+HASH_ALGORITHMS = ("md5", "sha1", "sha256", "blake2b")
+
+_active_lock = threading.Lock()
+_active: Set[str] = set()
+
+
+class UploadConflict(Exception):
+    """
+    Raised when an upload cannot continue at the requested offset.
+
+    Attributes:
+        offset: Number of bytes already received, if known
+    """
+
+    def __init__(self, message: str, offset: Optional[int] = None):
+        super().__init__(message)
+        self.offset = offset
+
+
+class ChecksumMismatch(Exception):
+    """
+    Raised when a completed upload does not match the expected digest.
+    """
+
+
+def partial_path(path: str) -> str:
+    """
+    Get the temporary file an upload to path is written to.
+
+    It lives in the destination directory so the final rename is atomic.
+
+    Args:
+        path: Absolute destination path
+
+    Returns:
+        Hidden sibling path for the partial upload
+    """
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}{UPLOAD_SUFFIX}")
+
+
+def upload_status(path: str) -> Dict[str, Any]:
+    """
+    Report how much of an interrupted upload has been received.
+
+    Args:
+        path: Absolute destination path
+
+    Returns:
+        Dictionary with path, offset and whether a partial upload exists
+    """
+    try:
+        offset = os.stat(partial_path(path)).st_size
+        in_progress = True
+    except FileNotFoundError:
+        offset = 0
+        in_progress = False
+
+    with _active_lock:
+        active = path in _active
+
+    return {
+        "path": path,
+        "offset": offset,
+        "in_progress": in_progress,
+        "active": active,
+    }
+
+
+class UploadWriter:
+    """
+    Write an upload to a partial file and atomically move it into place.
+
+    Data is appended at an explicit offset, so an interrupted upload can be
+    resumed from the size reported by upload_status(). Only one writer per
+    destination may be open at a time. Methods block and are meant to run
+    off the event loop.
+    """
+
+    def __init__(self, path: str, offset: int = 0, hash_name: Optional[str] = None):
+        """
+        Initialize the writer.
+
+        Args:
+            path: Absolute destination path
+            offset: Byte offset the incoming data starts at
+            hash_name: Optional digest to compute over the whole file
+        """
+        if hash_name is not None and hash_name not in HASH_ALGORITHMS:
+            raise ValueError(f"Unsupported hash algorithm: {hash_name}")
+
+        self.path = path
+        self.partial = partial_path(path)
+        self.offset = offset
+        self.hash_name = hash_name
+        self.received = 0
+
+        self._file = None
+        self._hasher = None
+        self._registered = False
+
+    def open(self) -> None:
+        """
+        Open the partial file positioned at the requested offset.
+
+        A smaller offset than already received discards the extra bytes, so
+        a client can retry its last chunk.
+
+        Raises:
+            UploadConflict: If another upload is writing this path, or the
+                offset is past the data received so far
+        """
+        with _active_lock:
+            if self.path in _active:
+                raise UploadConflict("Upload already in progress")
+            _active.add(self.path)
+            self._registered = True
+
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            try:
+                current = os.stat(self.partial).st_size
+            except FileNotFoundError:
+                current = 0
+
+            if self.offset > current:
+                raise UploadConflict(
+                    f"Offset {self.offset} is past the {current} bytes received",
+                    current,
+                )
+
+            self._file = open(self.partial, "r+b" if current else "wb")
+            self._file.truncate(self.offset)
+            self._file.seek(self.offset)
+
+            if self.hash_name is not None:
+                self._hasher = hashlib.new(self.hash_name)
+                self._hash_prefix()
+        except BaseException:
+            self.close()
+            raise
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        if self._hasher is not None:
+            self._hasher.update(data)
+        self.received += len(data)
+
+    def commit(self, expected_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Flush the partial file and rename it over the destination.
+
+        Args:
+            expected_hash: Hex digest the file must match, if any
+
+        Returns:
+            Dictionary with path, size and digest (if computed)
+
+        Raises:
+            ChecksumMismatch: If the digest differs; the partial file is removed
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        size = self._file.tell()
+        self._file.close()
+
+        digest = self._hasher.hexdigest() if self._hasher is not None else None
+        if expected_hash and digest != expected_hash.lower():
+            self.abort()
+            raise ChecksumMismatch(f"{self.hash_name} mismatch: got {digest}")
+
+        os.replace(self.partial, self.path)
+        self.close()
+        return {"path": self.path, "size": size, "hash": digest}
+
+    def abort(self) -> None:
+        """
+        Discard the partial file.
+        """
+        self.close()
+        try:
+            os.unlink(self.partial)
+        except FileNotFoundError:
+            pass
+
+    def close(self) -> None:
+        """
+        Close the partial file, keeping it for a later resume.
+        """
+        if self._file is not None and not self._file.closed:
+            self._file.flush()
+            self._file.close()
+        if self._registered:
+            with _active_lock:
+                _active.discard(self.path)
+            self._registered = False
+
+    def _hash_prefix(self) -> None:
+        # Resumed upload: the digest must cover the bytes already on disk
+        remaining = self.offset
+        with open(self.partial, "rb") as f:
+            while remaining > 0:
+                block = f.read(min(remaining, 1024 * 1024))
+                if not block:
+                    break
+                self._hasher.update(block)
+                remaining -= len(block)
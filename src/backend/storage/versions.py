@@ -0,0 +1,731 @@
+import difflib
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DIGEST_SIZE = 20
+
+# Gear table for the rolling hash; derived from blake2b so that chunk
+# boundaries are identical across processes and machines
+_GEAR = tuple(
+    int.from_bytes(hashlib.blake2b(bytes([i]), digest_size=4).digest(), "little")
+    for i in range(256)
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS versions (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    created REAL NOT NULL,
+    reason TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    chunks BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS versions_path ON versions(path, id);
+CREATE TABLE IF NOT EXISTS chunks (
+    id BLOB PRIMARY KEY,
+    size INTEGER NOT NULL,
+    lines INTEGER NOT NULL,
+    stored INTEGER NOT NULL,
+    refs INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS heads (
+    path TEXT PRIMARY KEY,
+    version_id INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+"""
+
+# Chunk file codecs, stored as the first byte of every chunk file
+_RAW = b"-"
+_ZLIB = b"d"
+_ZSTD = b"z"
+
+
+class VersionNotFound(Exception):
+    pass
+
+
+def find_cut(data: bytes, start: int, min_size: int, max_size: int, mask: int) -> int:
+    """
+    Find the end of the content-defined chunk starting at start.
+
+    A gear rolling hash runs over the bytes after min_size; the chunk ends
+    where the masked hash bits are all zero, or at max_size. Boundaries
+    depend only on the preceding 32 bytes, so an insert or delete moves the
+    boundaries near it and leaves later chunks identical.
+
+    Args:
+        data: Buffer holding the chunk
+        start: Offset of the chunk in data
+        min_size: Smallest chunk length
+        max_size: Largest chunk length
+        mask: Hash bits that must be zero at a boundary
+
+    Returns:
+        Offset just past the end of the chunk
+    """
+    end = min(len(data), start + max_size)
+    position = start + min_size
+    if end <= position:
+        return end
+
+    gear = _GEAR
+    h = 0
+    for byte in memoryview(data)[position:end]:
+        h = ((h << 1) + gear[byte]) & 0xFFFFFFFF
+        position += 1
+        if not h & mask:
+            return position
+    return end
+
+
+def iter_chunks(
+    f, min_size: int = 4096, avg_bits: int = 12, max_size: int = 65536
+) -> Iterator[bytes]:
+    """
+    Split a binary file object into content-defined chunks.
+
+    Args:
+        f: File object opened for binary reading
+        min_size: Smallest chunk length
+        avg_bits: Boundary probability is 2**-avg_bits per byte after
+            min_size, so chunks average about min_size + 2**avg_bits bytes
+        max_size: Largest chunk length
+
+    Yields:
+        Chunks in file order
+    """
+    mask = ((1 << avg_bits) - 1) << (32 - avg_bits)
+    read_size = max(max_size * 16, 1024 * 1024)
+    buffer = b""
+    offset = 0
+    eof = False
+
+    while True:
+        if not eof and len(buffer) - offset < max_size:
+            block = f.read(read_size)
+            if block:
+                buffer = buffer[offset:] + block
+                offset = 0
+                continue
+            eof = True
+        if offset >= len(buffer):
+            return
+
+        cut = find_cut(buffer, offset, min_size, max_size, mask)
+        yield buffer[offset:cut]
+        offset = cut
+
+
+class VersionStore:
+    """
+    Deduplicated history of file contents.
+
+    Before a file is overwritten or deleted, its content is split into
+    content-defined chunks. Each chunk is stored once, compressed with zstd
+    when available and zlib otherwise, in a file named by its blake2b
+    digest. A version is a row in SQLite holding the ordered chunk digests,
+    so successive edits of a large file only add the chunks that changed.
+    Versions are indexed by (path, id), which makes "restore the previous
+    version" a single index lookup. Old versions are pruned past a per-file
+    count and a total stored-bytes budget; unreferenced chunks are deleted
+    with them.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_versions: int = 20,
+        max_bytes: int = 1024 * 1024 * 1024,
+        max_file_size: int = 64 * 1024 * 1024,
+        min_chunk: int = 4096,
+        avg_bits: int = 12,
+        max_chunk: int = 65536,
+    ):
+        """
+        Initialize the store and create the schema if needed.
+
+        Args:
+            directory: Directory holding the index and chunk files
+            max_versions: Versions kept per file
+            max_bytes: Budget for stored chunk bytes across all files
+            max_file_size: Files larger than this are not versioned
+            min_chunk: Smallest chunk length
+            avg_bits: Controls average chunk length, see iter_chunks()
+            max_chunk: Largest chunk length
+        """
+        self.directory = directory
+        self.max_versions = max_versions
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self.chunking = {
+            "min_size": min_chunk,
+            "avg_bits": avg_bits,
+            "max_size": max_chunk,
+        }
+
+        os.makedirs(os.path.join(directory, "chunks"), exist_ok=True)
+        self._local = threading.local()
+        # Serializes snapshots, restores and pruning so a chunk is never
+        # deleted while a new version starts referencing it
+        self._lock = threading.RLock()
+
+        conn = self._connect()
+        conn.executescript(_SCHEMA)
+        conn.commit()
+
+        self.skipped = 0
+
+    def snapshot(
+        self, path: str, reason: str = "write", keep: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Record the current content of a file as a new version.
+
+        Args:
+            path: Absolute file path
+            reason: Why the snapshot is taken, e.g. "write" or "delete"
+            keep: Version id that pruning must not remove
+
+        Returns:
+            The version, or None if the file does not exist or is too large
+        """
+        with self._lock:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                return None
+            if not os.path.isfile(path):
+                return None
+            if st.st_size > self.max_file_size:
+                self.skipped += 1
+                return None
+
+            conn = self._connect()
+            latest = self._latest(conn, path)
+            if (
+                latest is not None
+                and latest["size"] == st.st_size
+                and latest["mtime_ns"] == st.st_mtime_ns
+            ):
+                return latest
+
+            digests = []
+            with open(path, "rb") as f:
+                for chunk in iter_chunks(f, **self.chunking):
+                    digests.append(self._put_chunk(conn, chunk))
+
+            cursor = conn.execute(
+                "INSERT INTO versions (path, created, reason, size, mtime_ns, chunks) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    path,
+                    time.time(),
+                    reason,
+                    st.st_size,
+                    st.st_mtime_ns,
+                    b"".join(digests),
+                ),
+            )
+            conn.commit()
+            version_id = cursor.lastrowid
+
+            self._prune(conn, path, keep)
+            return self.get_version(version_id)
+
+    def list_versions(self, path: str, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        List versions of a file, newest first.
+
+        Args:
+            path: Absolute file path
+            limit: Maximum number of versions
+
+        Returns:
+            Version dicts
+        """
+        rows = self._connect().execute(
+            "SELECT id, path, created, reason, size, mtime_ns FROM versions "
+            "WHERE path = ? ORDER BY id DESC LIMIT ?",
+            (path, limit),
+        )
+        return [self._version_dict(row) for row in rows]
+
+    def get_version(self, version_id: int) -> Dict[str, Any]:
+        """
+        Get a version by id.
+
+        Args:
+            version_id: Version id
+
+        Returns:
+            Version dict
+
+        Raises:
+            VersionNotFound: If the version does not exist
+        """
+        row = (
+            self._connect()
+            .execute(
+                "SELECT id, path, created, reason, size, mtime_ns FROM versions "
+                "WHERE id = ?",
+                (version_id,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            raise VersionNotFound(version_id)
+        return self._version_dict(row)
+
+    def read_version(self, version_id: int) -> Iterator[bytes]:
+        """
+        Stream the content of a version.
+
+        Args:
+            version_id: Version id
+
+        Yields:
+            Content in chunk order
+        """
+        for digest in self._chunk_ids(self._connect(), version_id):
+            yield self._read_chunk(digest)
+
+    def restore(self, path: str, version_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Replace a file with one of its versions.
+
+        Without version_id this is undo: the newest version is restored, and
+        calling it again while the file is unchanged steps further back.
+        The content being replaced is snapshotted first, so a restore can
+        itself be undone by restoring that version.
+
+        Args:
+            path: Absolute file path
+            version_id: Version to restore; defaults to the previous one
+
+        Returns:
+            The restored version
+
+        Raises:
+            VersionNotFound: If there is no such version for path
+        """
+        with self._lock:
+            conn = self._connect()
+            head = conn.execute(
+                "SELECT version_id, size, mtime_ns FROM heads WHERE path = ?", (path,)
+            ).fetchone()
+            try:
+                st = os.stat(path)
+                at_head = head is not None and (st.st_size, st.st_mtime_ns) == head[1:]
+            except FileNotFoundError:
+                at_head = False
+
+            if version_id is None:
+                # Step back from the version last restored, if the file
+                # still holds it; otherwise from the newest version
+                before = head[0] if at_head else None
+                row = conn.execute(
+                    "SELECT id FROM versions WHERE path = ? AND id < ? "
+                    "ORDER BY id DESC LIMIT 1",
+                    (path, before if before is not None else 2**63 - 1),
+                ).fetchone()
+                if row is None:
+                    raise VersionNotFound(path)
+                version_id = row[0]
+
+            version = self.get_version(version_id)
+            if version["path"] != path:
+                raise VersionNotFound(version_id)
+
+            if not at_head:
+                # The version being restored may be the oldest one; it must
+                # survive the pruning this snapshot triggers
+                self.snapshot(path, "restore", keep=version_id)
+
+            directory = os.path.dirname(path)
+            os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(
+                dir=directory, prefix=".smartwork-restore-"
+            )
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    for data in self.read_version(version_id):
+                        f.write(data)
+                os.replace(temp_path, path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+
+            st = os.stat(path)
+            conn.execute(
+                "INSERT OR REPLACE INTO heads (path, version_id, size, mtime_ns) "
+                "VALUES (?, ?, ?, ?)",
+                (path, version_id, st.st_size, st.st_mtime_ns),
+            )
+            conn.commit()
+            return version
+
+    def diff(
+        self,
+        path: str,
+        from_version: int,
+        to_version: Optional[int] = None,
+        context: int = 3,
+        max_bytes: int = 8 * 1024 * 1024,
+    ) -> Iterator[str]:
+        """
+        Stream a unified diff between two versions of a file.
+
+        Chunks shared at the start and end of both versions are skipped
+        without being read, so only the changed region (plus context lines)
+        is decompressed and compared.
+
+        Args:
+            path: Absolute file path
+            from_version: Old version id
+            to_version: New version id; defaults to the current file
+            context: Context lines around each change
+            max_bytes: Largest changed region that is diffed line by line
+
+        Yields:
+            Diff lines, each ending with a newline
+        """
+        old = self._version_source(path, from_version)
+        if to_version is None:
+            new = self._file_source(path)
+            new_label = path
+        else:
+            new = self._version_source(path, to_version)
+            new_label = f"{path}@{to_version}"
+
+        old_ids, new_ids = old[0], new[0]
+        prefix = 0
+        while (
+            prefix < min(len(old_ids), len(new_ids))
+            and old_ids[prefix] == new_ids[prefix]
+        ):
+            prefix += 1
+        suffix = 0
+        while (
+            suffix < min(len(old_ids), len(new_ids)) - prefix
+            and old_ids[-1 - suffix] == new_ids[-1 - suffix]
+        ):
+            suffix += 1
+        if prefix == len(old_ids) == len(new_ids):
+            return
+
+        old_start, old_text = self._changed_region(old, prefix, suffix, context)
+        new_start, new_text = self._changed_region(new, prefix, suffix, context)
+
+        yield f"--- {path}@{from_version}\n"
+        yield f"+++ {new_label}\n"
+
+        if len(old_text) + len(new_text) > max_bytes:
+            yield "@@ 变更区域过大，未逐行比较 @@\n"
+            return
+        if b"\0" in old_text or b"\0" in new_text:
+            yield "@@ 二进制文件不同 @@\n"
+            return
+
+        a = old_text.decode("utf-8", errors="replace").splitlines(keepends=True)
+        b = new_text.decode("utf-8", errors="replace").splitlines(keepends=True)
+        matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+        for group in matcher.get_grouped_opcodes(context):
+            first, last = group[0], group[-1]
+            yield (
+                f"@@ -{_hunk_range(old_start + first[1], last[2] - first[1])} "
+                f"+{_hunk_range(new_start + first[3], last[4] - first[3])} @@\n"
+            )
+            for tag, i1, i2, j1, j2 in group:
+                if tag == "equal":
+                    for line in a[i1:i2]:
+                        yield " " + _terminated(line)
+                    continue
+                for line in a[i1:i2]:
+                    yield "-" + _terminated(line)
+                for line in b[j1:j2]:
+                    yield "+" + _terminated(line)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get storage counters.
+
+        Returns:
+            Version and chunk counts, logical bytes (sum of version sizes)
+            and stored bytes (compressed, deduplicated chunks)
+        """
+        conn = self._connect()
+        versions, logical = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM versions"
+        ).fetchone()
+        chunks, unique, stored = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored), 0) "
+            "FROM chunks"
+        ).fetchone()
+        return {
+            "versions": versions,
+            "chunks": chunks,
+            "logical_bytes": logical,
+            "unique_bytes": unique,
+            "stored_bytes": stored,
+            "max_bytes": self.max_bytes,
+            "skipped_large_files": self.skipped,
+            "codec": "zstd" if zstandard is not None else "zlib",
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                os.path.join(self.directory, "versions.db"), timeout=30
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _version_dict(row: Tuple) -> Dict[str, Any]:
+        version_id, path, created, reason, size, mtime_ns = row
+        return {
+            "id": version_id,
+            "path": path,
+            "created": created,
+            "reason": reason,
+            "size": size,
+            "mtime_ns": mtime_ns,
+        }
+
+    def _latest(self, conn: sqlite3.Connection, path: str) -> Optional[Dict[str, Any]]:
+        row = conn.execute(
+            "SELECT id, path, created, reason, size, mtime_ns FROM versions "
+            "WHERE path = ? ORDER BY id DESC LIMIT 1",
+            (path,),
+        ).fetchone()
+        return self._version_dict(row) if row else None
+
+    def _chunk_ids(self, conn: sqlite3.Connection, version_id: int) -> List[bytes]:
+        row = conn.execute(
+            "SELECT chunks FROM versions WHERE id = ?", (version_id,)
+        ).fetchone()
+        if row is None:
+            raise VersionNotFound(version_id)
+        blob = row[0]
+        return [blob[i : i + DIGEST_SIZE] for i in range(0, len(blob), DIGEST_SIZE)]
+
+    def _chunk_path(self, digest: bytes) -> str:
+        name = digest.hex()
+        return os.path.join(self.directory, "chunks", name[:2], name)
+
+    def _put_chunk(self, conn: sqlite3.Connection, data: bytes) -> bytes:
+        digest = hashlib.blake2b(data, digest_size=DIGEST_SIZE).digest()
+        updated = conn.execute(
+            "UPDATE chunks SET refs = refs + 1 WHERE id = ?", (digest,)
+        ).rowcount
+        if updated:
+            return digest
+
+        payload = _compress(data)
+        chunk_path = self._chunk_path(digest)
+        os.makedirs(os.path.dirname(chunk_path), exist_ok=True)
+        temp_path = f"{chunk_path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(payload)
+        os.replace(temp_path, chunk_path)
+
+        conn.execute(
+            "INSERT INTO chunks (id, size, lines, stored, refs) VALUES (?, ?, ?, ?, 1)",
+            (digest, len(data), data.count(b"\n"), len(payload)),
+        )
+        return digest
+
+    def _read_chunk(self, digest: bytes) -> bytes:
+        with open(self._chunk_path(digest), "rb") as f:
+            payload = f.read()
+        return _decompress(payload)
+
+    def _prune(
+        self, conn: sqlite3.Connection, path: str, keep: Optional[int] = None
+    ) -> None:
+        # A kept version counts towards max_versions but is never expired
+        kept = 0 if keep is None else 1
+        expired = [
+            row[0]
+            for row in conn.execute(
+                "SELECT id FROM versions WHERE path = ? AND id IS NOT ? "
+                "ORDER BY id DESC LIMIT -1 OFFSET ?",
+                (path, keep, max(self.max_versions - kept, 0)),
+            )
+        ]
+
+        stored = conn.execute("SELECT COALESCE(SUM(stored), 0) FROM chunks").fetchone()
+        if stored[0] > self.max_bytes:
+            # Drop the oldest versions overall until the store fits again,
+            # leaving some headroom so this does not run on every snapshot
+            excess = stored[0] - int(self.max_bytes * 0.9)
+            for version_id, blob in conn.execute(
+                "SELECT id, chunks FROM versions ORDER BY id"
+            ).fetchall():
+                if excess <= 0:
+                    break
+                if version_id == keep:
+                    continue
+                expired.append(version_id)
+                excess -= self._version_weight(conn, blob)
+
+        for version_id in expired:
+            self._drop_version(conn, version_id)
+        conn.commit()
+
+    def _version_weight(self, conn: sqlite3.Connection, blob: bytes) -> int:
+        # Bytes freed if only this version used its chunks; an estimate,
+        # since other versions may share them
+        weight = 0
+        for i in range(0, len(blob), DIGEST_SIZE):
+            row = conn.execute(
+                "SELECT stored, refs FROM chunks WHERE id = ?",
+                (blob[i : i + DIGEST_SIZE],),
+            ).fetchone()
+            if row is not None and row[1] <= 1:
+                weight += row[0]
+        return weight
+
+    def _drop_version(self, conn: sqlite3.Connection, version_id: int) -> None:
+        try:
+            digests = self._chunk_ids(conn, version_id)
+        except VersionNotFound:
+            return
+        conn.execute("DELETE FROM versions WHERE id = ?", (version_id,))
+        conn.execute("DELETE FROM heads WHERE version_id = ?", (version_id,))
+        for digest in digests:
+            conn.execute("UPDATE chunks SET refs = refs - 1 WHERE id = ?", (digest,))
+        for digest in set(digests):
+            deleted = conn.execute(
+                "DELETE FROM chunks WHERE id = ? AND refs <= 0", (digest,)
+            ).rowcount
+            if deleted:
+                try:
+                    os.unlink(self._chunk_path(digest))
+                except FileNotFoundError:
+                    pass
+
+    def _version_source(
+        self, path: str, version_id: int
+    ) -> Tuple[List[bytes], List[Tuple[int, int]], Callable[[int], bytes]]:
+        if self.get_version(version_id)["path"] != path:
+            raise VersionNotFound(version_id)
+
+        conn = self._connect()
+        ids = self._chunk_ids(conn, version_id)
+        info = {}
+        for digest in set(ids):
+            row = conn.execute(
+                "SELECT size, lines FROM chunks WHERE id = ?", (digest,)
+            ).fetchone()
+            info[digest] = row
+        return ids, [info[d] for d in ids], lambda i: self._read_chunk(ids[i])
+
+    def _file_source(
+        self, path: str
+    ) -> Tuple[List[bytes], List[Tuple[int, int]], Callable[[int], bytes]]:
+        ids = []
+        sizes = []
+        offsets = []
+        offset = 0
+        with open(path, "rb") as f:
+            for chunk in iter_chunks(f, **self.chunking):
+                ids.append(hashlib.blake2b(chunk, digest_size=DIGEST_SIZE).digest())
+                sizes.append((len(chunk), chunk.count(b"\n")))
+                offsets.append(offset)
+                offset += len(chunk)
+
+        def read(i: int) -> bytes:
+            with open(path, "rb") as f:
+                f.seek(offsets[i])
+                return f.read(sizes[i][0])
+
+        return ids, sizes, read
+
+    @staticmethod
+    def _changed_region(
+        source: Tuple[List[bytes], List[Tuple[int, int]], Callable[[int], bytes]],
+        prefix: int,
+        suffix: int,
+        context: int,
+    ) -> Tuple[int, bytes]:
+        ids, sizes, read = source
+        end = len(ids) - suffix
+        text = b"".join(read(i) for i in range(prefix, end))
+
+        # Pull in bytes from the shared chunks around the change so the
+        # region starts and ends on whole lines, with context lines around
+        head = b""
+        i = prefix
+        while i > 0 and head.count(b"\n") <= context:
+            i -= 1
+            head = read(i) + head
+        if head.count(b"\n") > context:
+            cut = len(head)
+            for _ in range(context + 1):
+                cut = head.rfind(b"\n", 0, cut)
+            head = head[cut + 1 :]
+        start_line = sum(lines for _, lines in sizes[:prefix]) - head.count(b"\n")
+
+        text = head + text
+        need = context + (0 if not text or text.endswith(b"\n") else 1)
+        tail = b""
+        j = end
+        while j < len(ids) and tail.count(b"\n") < need:
+            tail += read(j)
+            j += 1
+        if tail.count(b"\n") >= need:
+            cut = -1
+            for _ in range(need):
+                cut = tail.find(b"\n", cut + 1)
+            tail = tail[: cut + 1]
+
+        return start_line, text + tail
+
+
+def _hunk_range(start: int, length: int) -> str:
+    if length == 1:
+        return str(start + 1)
+    return f"{start + 1 if length else start},{length}"
+
+
+def _terminated(line: str) -> str:
+    return line if line.endswith("\n") else line + "\n"
+
+
+def _compress(data: bytes) -> bytes:
+    if zstandard is not None:
+        payload = _ZSTD + zstandard.ZstdCompressor(level=3).compress(data)
+    else:
+        payload = _ZLIB + zlib.compress(data, 6)
+    if len(payload) >= len(data) + 1:
+        return _RAW + data
+    return payload
+
+
+def _decompress(payload: bytes) -> bytes:
+    codec, body = payload[:1], payload[1:]
+    if codec == _ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this version")
+        return zstandard.ZstdDecompressor().decompress(body)
+    if codec == _ZLIB:
+        return zlib.decompress(body)
+    return body
@@ -0,0 +1,234 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Listener signature: (directory, name, mask). name is "" for events on the
+# directory itself; directory is "" for IN_Q_OVERFLOW.
+ChangeListener = Callable[[str, str, int], None]
+
+
+def _load_libc():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+        libc.inotify_rm_watch
+    except (OSError, AttributeError, TypeError):
+        return None
+    return libc
+
+
+_libc = _load_libc()
+
+
+class ChangeWatcher:
+    """
+    Directory change watcher backed by Linux inotify.
+
+    Watches are per directory (not recursive). A daemon thread reads events
+    and dispatches them to registered listeners. When inotify is unavailable
+    ``available`` is False and every watch request is refused, so callers
+    fall back to polling.
+    """
+
+    def __init__(self):
+        self._fd: Optional[int] = None
+        self._lock = threading.Lock()
+        self._wd_to_path: Dict[int, str] = {}
+        self._path_to_wd: Dict[str, int] = {}
+        self._listeners: List[ChangeListener] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        if _libc is not None:
+            fd = _libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd >= 0:
+                self._fd = fd
+            else:
+                logger.info("inotify unavailable, falling back to polling")
+
+    @property
+    def available(self) -> bool:
+        return self._fd is not None
+
+    def add_listener(self, listener: ChangeListener) -> None:
+        """
+        Register a callback for change events.
+
+        Args:
+            listener: Called with (directory, name, mask) from the watcher thread
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: ChangeListener) -> None:
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def watch(self, path: str) -> bool:
+        """
+        Start watching a directory.
+
+        Args:
+            path: Absolute directory path
+
+        Returns:
+            True if the directory is watched, False if inotify refused it
+        """
+        if self._fd is None:
+            return False
+
+        with self._lock:
+            if path in self._path_to_wd:
+                return True
+
+            wd = _libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+            if wd < 0:
+                logger.debug(
+                    f"inotify_add_watch failed for {path}: {ctypes.get_errno()}"
+                )
+                return False
+
+            self._wd_to_path[wd] = path
+            self._path_to_wd[path] = wd
+
+        self._ensure_thread()
+        return True
+
+    def unwatch(self, path: str) -> None:
+        """
+        Stop watching a directory.
+
+        Args:
+            path: Directory path passed to watch()
+        """
+        if self._fd is None:
+            return
+
+        with self._lock:
+            wd = self._path_to_wd.pop(path, None)
+            if wd is None:
+                return
+            self._wd_to_path.pop(wd, None)
+            _libc.inotify_rm_watch(self._fd, wd)
+
+    def is_watched(self, path: str) -> bool:
+        with self._lock:
+            return path in self._path_to_wd
+
+    def watched_count(self) -> int:
+        with self._lock:
+            return len(self._path_to_wd)
+
+    def close(self) -> None:
+        """
+        Stop the reader thread and release the inotify descriptor.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+        with self._lock:
+            self._wd_to_path.clear()
+            self._path_to_wd.clear()
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name="smartwork-inotify", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                readable, _, _ = select.select([self._fd], [], [], 0.5)
+            except (OSError, ValueError, TypeError):
+                return
+            if not readable:
+                continue
+
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            except OSError:
+                return
+
+            for directory, name, mask in self._parse(data):
+                self._dispatch(directory, name, mask)
+
+    def _parse(self, data: bytes):
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            raw_name = data[offset : offset + length].rstrip(b"\x00")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                yield "", "", mask
+                continue
+
+            with self._lock:
+                directory = self._wd_to_path.get(wd)
+                if mask & IN_IGNORED and directory is not None:
+                    self._wd_to_path.pop(wd, None)
+                    self._path_to_wd.pop(directory, None)
+
+            if directory is not None:
+                yield directory, os.fsdecode(raw_name), mask
+
+    def _dispatch(self, directory: str, name: str, mask: int) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+
+        for listener in listeners:
+            try:
+                listener(directory, name, mask)
+            except Exception as e:
+                logger.warning(f"Change listener failed: {e}")
@@ -0,0 +1,352 @@
+import os
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ZEROCOPY_EXTENSION = "http.response.zerocopy"
+
+# Content types that are already compressed, or are binary formats that
+# rarely shrink, are sent as-is
+INCOMPRESSIBLE_PREFIXES = ("image/", "video/", "audio/", "font/woff")
+INCOMPRESSIBLE_TYPES = {
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/x-7z-compressed",
+    "application/x-rar-compressed",
+    "application/x-bzip2",
+    "application/x-xz",
+    "application/zstd",
+    "application/pdf",
+    "application/octet-stream",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+}
+
+
+class _Encoder:
+    """
+    Incremental compressor that flushes after every chunk.
+
+    Flushing keeps streamed responses (NDJSON listings, batch progress)
+    arriving as they are produced instead of sitting in the compressor.
+    """
+
+    def __init__(self, encoding: str, level: Optional[int] = None):
+        self.encoding = encoding
+        if encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(
+                level=level if level is not None else 3
+            ).compressobj()
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(
+                quality=level if level is not None else 4
+            )
+        else:
+            self._compressor = zlib.compressobj(
+                level if level is not None else 6, zlib.DEFLATED, 31
+            )
+
+    def compress(self, data: bytes) -> bytes:
+        if self.encoding == "zstd":
+            return self._compressor.compress(data) + self._compressor.flush(
+                zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            )
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(
+            zlib.Z_SYNC_FLUSH
+        )
+
+    def finish(self) -> bytes:
+        if self.encoding == "zstd":
+            return self._compressor.flush()
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def available_encodings() -> List[str]:
+    """
+    List the content codings this process can produce, most preferred first.
+
+    Returns:
+        Subset of zstd, br and gzip
+    """
+    encodings = []
+    if zstandard is not None:
+        encodings.append("zstd")
+    if brotli is not None:
+        encodings.append("br")
+    encodings.append("gzip")
+    return encodings
+
+
+def negotiate_encoding(
+    accept_encoding: str, encodings: Optional[List[str]] = None
+) -> Optional[str]:
+    """
+    Pick a content coding from an Accept-Encoding header.
+
+    The highest q-value wins; ties go to the earlier entry in ``encodings``.
+
+    Args:
+        accept_encoding: Raw Accept-Encoding header value
+        encodings: Supported codings in order of preference
+
+    Returns:
+        Chosen coding, or None to send the identity encoding
+    """
+    encodings = encodings if encodings is not None else available_encodings()
+    weights: Dict[str, float] = {}
+
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    best: Optional[Tuple[float, int, str]] = None
+    for rank, encoding in enumerate(encodings):
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q <= 0:
+            continue
+        candidate = (q, -rank, encoding)
+        if best is None or candidate > best:
+            best = candidate
+    return best[2] if best else None
+
+
+def is_compressible(content_type: str) -> bool:
+    """
+    Check whether a response content type is worth compressing.
+
+    Args:
+        content_type: Content-Type header value
+
+    Returns:
+        False for media, already-compressed formats and event streams
+    """
+    media_type = content_type.split(";", 1)[0].strip().lower()
+    if not media_type or media_type == "text/event-stream":
+        # Events must reach the client immediately, not wait in the buffer
+        # until minimum_size bytes have accumulated
+        return False
+    if media_type in INCOMPRESSIBLE_TYPES:
+        return False
+    return not media_type.startswith(INCOMPRESSIBLE_PREFIXES)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware that compresses responses with zstd, brotli or gzip.
+
+    The coding is negotiated from Accept-Encoding. Bodies smaller than
+    ``minimum_size`` are sent uncompressed, as are partial content, responses
+    that already carry a Content-Encoding, and media or archive types.
+    Streamed responses are compressed chunk by chunk, so they stay streaming.
+    The first chunks are buffered only until ``minimum_size`` bytes arrive.
+    Responses of compressible types carry ``Vary: Accept-Encoding`` even when
+    sent uncompressed, so shared caches keep the variants apart.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        encodings: Optional[List[str]] = None,
+        levels: Optional[Dict[str, int]] = None,
+    ):
+        """
+        Initialize the middleware.
+
+        Args:
+            app: Wrapped ASGI application
+            minimum_size: Smallest body, in bytes, that is compressed
+            encodings: Codings to offer, most preferred first; defaults to
+                every installed one
+            levels: Optional compression level per coding
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = encodings or available_encodings()
+        self.levels = levels or {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = negotiate_encoding(
+            headers.get("accept-encoding", ""), self.encodings
+        )
+        responder = _CompressionResponder(
+            send, encoding, self.levels.get(encoding), self.minimum_size
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    # With encoding None nothing is compressed, but Vary is still added
+    def __init__(
+        self,
+        send: Send,
+        encoding: Optional[str],
+        level: Optional[int],
+        minimum_size: int,
+    ):
+        self._send = send
+        self.encoding = encoding
+        self.level = level
+        self.minimum_size = minimum_size
+
+        self.start: Optional[Message] = None
+        self.buffer: List[bytes] = []
+        self.buffered = 0
+        self.encoder: Optional[_Encoder] = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            self.start = message
+            self.passthrough = not self._should_compress(message)
+            if self.passthrough:
+                await self._send(_vary_start(message))
+            return
+
+        if self.passthrough or self.start is None:
+            await self._send(message)
+            return
+
+        if message_type == ZEROCOPY_EXTENSION:
+            await self._send_file(message)
+            return
+
+        if message_type != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            self.buffer.append(body)
+            self.buffered += len(body)
+            if self.buffered < self.minimum_size and more_body:
+                return
+
+            body = b"".join(self.buffer)
+            self.buffer = []
+            if self.buffered < self.minimum_size:
+                # The whole body turned out to be small
+                self.passthrough = True
+                await self._send(_vary_start(self.start))
+                await self._send({"type": "http.response.body", "body": body})
+                return
+
+            self.encoder = _Encoder(self.encoding, self.level)
+            await self._send(self._compressed_start())
+
+        data = self.encoder.compress(body) if body else b""
+        if not more_body:
+            data += self.encoder.finish()
+        if data or not more_body:
+            await self._send(
+                {"type": "http.response.body", "body": data, "more_body": more_body}
+            )
+
+    def _should_compress(self, message: Message) -> bool:
+        if self.encoding is None:
+            return False
+        status = message.get("status", 200)
+        if status < 200 or status in (204, 206, 304):
+            return False
+
+        headers = Headers(raw=message.get("headers", []))
+        if "content-encoding" in headers or "content-range" in headers:
+            return False
+        if not is_compressible(headers.get("content-type", "")):
+            return False
+
+        content_length = headers.get("content-length")
+        if content_length is not None and int(content_length) < self.minimum_size:
+            return False
+        return True
+
+    def _compressed_start(self) -> Message:
+        start = dict(self.start)
+        start["headers"] = list(self.start.get("headers", []))
+        headers = MutableHeaders(raw=start["headers"])
+        if "content-length" in headers:
+            del headers["content-length"]
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+
+        # The compressed bytes are a different representation
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        return start
+
+    async def _send_file(self, message: Message) -> None:
+        # The server offered sendfile, but the bytes must pass through the
+        # compressor; read the requested range instead
+        fd = message["file"]
+        offset = message.get("offset") or 0
+        count = message.get("count")
+        if count is None:
+            count = os.fstat(fd).st_size - offset
+        more_body = message.get("more_body", False)
+
+        while count > 0:
+            chunk = await anyio.to_thread.run_sync(
+                os.pread, fd, min(count, 256 * 1024), offset
+            )
+            if not chunk:
+                break
+            offset += len(chunk)
+            count -= len(chunk)
+            await self.send(
+                {"type": "http.response.body", "body": chunk, "more_body": True}
+            )
+
+        if not more_body:
+            await self.send({"type": "http.response.body", "body": b""})
+
+
+def _vary_start(message: Message) -> Message:
+    # The body would have been compressed for another Accept-Encoding
+    headers = Headers(raw=message.get("headers", []))
+    if "content-encoding" in headers or not is_compressible(
+        headers.get("content-type", "")
+    ):
+        return message
+    start = dict(message)
+    start["headers"] = list(message.get("headers", []))
+    MutableHeaders(raw=start["headers"]).add_vary_header("Accept-Encoding")
+    return start
@@ -0,0 +1,70 @@
+import os
+from pathlib import Path
+from typing import Dict, Tuple
+
+
+def get_data_dir() -> Path:
+    """
+    Get the directory for SmartWork's persistent state.
+
+    Indexes, caches and history live here. Override with the
+    SMARTWORK_DATA_DIR environment variable.
+
+    Returns:
+        Existing data directory path
+    """
+    path = Path(os.environ.get("SMARTWORK_DATA_DIR", "~/.smartwork")).expanduser()
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def get_io_concurrency() -> Tuple[int, Dict[str, int]]:
+    """
+    Get the file I/O concurrency limits.
+
+    SMARTWORK_IO_WORKERS sets the number of blocking I/O threads per mount
+    (default 8). SMARTWORK_IO_MOUNT_WORKERS overrides it for individual
+    mounts, e.g. "/mnt/nas=2,/media/usb=1".
+
+    Returns:
+        Default workers per mount and per-mount overrides
+    """
+    default = int(os.environ.get("SMARTWORK_IO_WORKERS", "8"))
+
+    overrides: Dict[str, int] = {}
+    for item in os.environ.get("SMARTWORK_IO_MOUNT_WORKERS", "").split(","):
+        mount, sep, workers = item.rpartition("=")
+        if sep and mount.strip():
+            overrides[mount.strip()] = int(workers)
+    return default, overrides
+
+
+def get_task_concurrency() -> int:
+    """
+    Get how many subtasks of a task may run at the same time.
+
+    Override with the SMARTWORK_TASK_WORKERS environment variable
+    (default 4).
+
+    Returns:
+        Maximum number of concurrently running subtasks
+    """
+    return max(1, int(os.environ.get("SMARTWORK_TASK_WORKERS", "4")))
+
+
+def get_cpu_workers() -> int:
+    """
+    Get the number of worker processes for CPU-bound subtasks.
+
+    Defaults to the cores this process may run on, which respects CPU
+    affinity and container cpusets. Override with the
+    SMARTWORK_CPU_WORKERS environment variable.
+
+    Returns:
+        Number of worker processes
+    """
+    if "SMARTWORK_CPU_WORKERS" in os.environ:
+        return max(1, int(os.environ["SMARTWORK_CPU_WORKERS"]))
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return os.cpu_count() or 1
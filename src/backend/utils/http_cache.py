@@ -0,0 +1,172 @@
+import threading
+import uuid
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Hashable, Mapping, Optional
+
+from fastapi import Response
+
+# Ask clients to cache but revalidate every time, which suits polling
+REVALIDATE = "no-cache"
+PRIVATE_REVALIDATE = "private, no-cache"
+
+# In-memory version counters restart at zero; this keeps ETags handed out
+# by a previous process from matching new state
+BOOT_ID = uuid.uuid4().hex[:8]
+
+# Keys whose change counters are kept exactly, see ChangeCounter
+MAX_COUNTED_KEYS = 10000
+
+
+class ChangeCounter:
+    """
+    Per-key change counters for ETags, bounded in memory.
+
+    Every change takes the next number of one sequence, and a key reports
+    the number of its last change. Beyond max_keys the least recently
+    changed keys are forgotten; they report the highest number forgotten so
+    far. That is never below their last change, so an unchanged key may get
+    a new value (one needless refetch) but a changed key never gets back an
+    old one.
+    """
+
+    def __init__(self, max_keys: int = MAX_COUNTED_KEYS):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._last = 0
+        self._forgotten = 0
+        self._changes: "OrderedDict[Hashable, int]" = OrderedDict()
+
+    def touch(self, key: Hashable) -> None:
+        """
+        Record a change of a key.
+
+        Args:
+            key: Changed key, e.g. a task id
+        """
+        with self._lock:
+            self._last += 1
+            self._changes[key] = self._last
+            self._changes.move_to_end(key)
+            while len(self._changes) > self.max_keys:
+                _, number = self._changes.popitem(last=False)
+                self._forgotten = max(self._forgotten, number)
+
+    def get(self, key: Hashable) -> int:
+        """
+        Get the counter of a key.
+
+        Args:
+            key: Key to look up
+
+        Returns:
+            Number of the key's last change, 0 if it never changed
+        """
+        with self._lock:
+            return self._changes.get(key, self._forgotten)
+
+    def __len__(self) -> int:
+        return len(self._changes)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag using weak comparison.
+
+    Args:
+        if_none_match: Raw header value, possibly a list or "*"
+        etag: Current ETag of the resource
+
+    Returns:
+        True if any listed tag matches
+    """
+    if if_none_match.strip() == "*":
+        return True
+
+    current = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == current:
+            return True
+    return False
+
+
+def is_not_modified(
+    headers: Mapping[str, str],
+    etag: Optional[str] = None,
+    last_modified: Optional[float] = None,
+) -> bool:
+    """
+    Evaluate If-None-Match / If-Modified-Since for a GET request.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted when
+    the request has no If-None-Match, as RFC 7232 requires.
+
+    Args:
+        headers: Request headers
+        etag: Current ETag of the resource
+        last_modified: Current modification time as a Unix timestamp
+
+    Returns:
+        True if a 304 Not Modified response should be sent
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag is not None and etag_matches(if_none_match, etag)
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(last_modified) <= int(since)
+
+
+def cache_headers(
+    etag: Optional[str] = None,
+    last_modified: Optional[float] = None,
+    cache_control: str = REVALIDATE,
+) -> dict:
+    """
+    Build validator and Cache-Control headers for a response.
+
+    Args:
+        etag: ETag of the resource
+        last_modified: Modification time as a Unix timestamp
+        cache_control: Cache-Control value
+
+    Returns:
+        Header dictionary
+    """
+    headers = {"Cache-Control": cache_control}
+    if etag is not None:
+        headers["ETag"] = etag
+    if last_modified is not None:
+        headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+    return headers
+
+
+def not_modified_response(
+    etag: Optional[str] = None,
+    last_modified: Optional[float] = None,
+    cache_control: str = REVALIDATE,
+) -> Response:
+    """
+    Build an empty 304 response carrying the current validators.
+
+    Args:
+        etag: ETag of the resource
+        last_modified: Modification time as a Unix timestamp
+        cache_control: Cache-Control value
+
+    Returns:
+        304 Not Modified response
+    """
+    return Response(
+        status_code=304, headers=cache_headers(etag, last_modified, cache_control)
+    )
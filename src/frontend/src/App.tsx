@@ -2,6 +2,7 @@ import { useState, useEffect } from 'react';
 import { FileBrowser } from './components/FileBrowser';
 import { TaskQueue } from './components/TaskQueue';
 import { ChatInterface } from './components/ChatInterface';
+import { apiClient } from './api/client';
 import './App.css';
 
 interface FileItem {
@@ -28,9 +29,11 @@ function App() {
   useEffect(() => {
     const electronAvailable = window.electronAPI !== undefined;
 
-    if (electronAvailable) {
-      loadFiles();
-    }
+    if (!electronAvailable) return;
+
+    loadFiles();
+    // Reload when the backend reports changes instead of polling
+    return apiClient.watchFiles('.', () => loadFiles());
   }, []);
 
   const loadFiles = async () => {
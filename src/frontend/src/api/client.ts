@@ -6,13 +6,30 @@ interface ApiResponse<T> {
   error?: string;
 }
 
-const cache = new Map<string, { data: any; timestamp: number }>();
+// Listings also record the resolved folder the server reported, the form
+// change events use, so watchFiles() can find them whatever path was asked
+const cache = new Map<
+  string,
+  { data: any; timestamp: number; path?: string }
+>();
 const CACHE_DURATION = 5 * 60 * 1000;
+const RESOLVED_PATH_HEADER = 'X-Resolved-Path';
 
 function isCacheValid(entry: { data: any; timestamp: number }): boolean {
   return Date.now() - entry.timestamp < CACHE_DURATION;
 }
 
+export interface FileChange {
+  path: string;
+  type: 'created' | 'modified' | 'deleted';
+  is_dir: boolean;
+}
+
+function parentPath(path: string): string {
+  const index = path.lastIndexOf('/');
+  return index > 0 ? path.slice(0, index) : '/';
+}
+
 export const apiClient = {
   async listFiles(path: string = '.') {
     const cacheKey = `files:${path}`;
@@ -22,17 +39,21 @@ export const apiClient = {
       return cached.data;
     }
 
-    const response = await fetch(`${API_BASE}/files/list/?path=${path}`);
+    const response = await fetch(
+      `${API_BASE}/files/list/?path=${encodeURIComponent(path)}`,
+    );
     const data = await response.json();
 
-    if (data.success && data.files) {
+    // The server answers with the bare list of entries
+    if (response.ok && Array.isArray(data)) {
       cache.set(cacheKey, {
-        data: data.files,
+        data,
         timestamp: Date.now(),
+        path: response.headers.get(RESOLVED_PATH_HEADER) ?? undefined,
       });
     }
 
-    return data.files;
+    return data;
   },
 
   async createTask(description: string) {
@@ -112,6 +133,53 @@ export const apiClient = {
     return await response.json();
   },
 
+  /**
+   * Subscribe to file changes below a folder.
+   *
+   * Cached listings of changed folders are dropped as events arrive, so
+   * the next listFiles() call fetches fresh data. On "resync" every cached
+   * listing is dropped, since some events were missed.
+   *
+   * Returns a function that closes the subscription.
+   */
+  watchFiles(
+    path: string,
+    onChange: (changes: FileChange[] | null) => void,
+  ): () => void {
+    const source = new EventSource(
+      `${API_BASE}/files/changes?path=${encodeURIComponent(path)}`,
+    );
+
+    source.addEventListener('changes', (event) => {
+      const { events } = JSON.parse((event as MessageEvent).data) as {
+        events: FileChange[];
+      };
+      const changed = new Set<string>();
+      for (const change of events) {
+        changed.add(parentPath(change.path));
+        changed.add(change.path);
+      }
+      cache.forEach((value, key) => {
+        const folder = value.path ?? key.slice('files:'.length);
+        if (key.startsWith('files:') && changed.has(folder)) {
+          cache.delete(key);
+        }
+      });
+      onChange(events);
+    });
+
+    source.addEventListener('resync', () => {
+      cache.forEach((_value, key) => {
+        if (key.startsWith('files:')) {
+          cache.delete(key);
+        }
+      });
+      onChange(null);
+    });
+
+    return () => source.close();
+  },
+
   clearCache(): void {
     cache.clear();
   },
@@ -0,0 +1,75 @@
+import { describe, it, expect, vi, beforeEach, afterEach } from 'vitest';
+import { apiClient } from '../api/client';
+
+class FakeEventSource {
+  static last: FakeEventSource;
+  listeners = new Map<string, (event: MessageEvent) => void>();
+
+  constructor(public url: string) {
+    FakeEventSource.last = this;
+  }
+
+  addEventListener(type: string, listener: (event: MessageEvent) => void) {
+    this.listeners.set(type, listener);
+  }
+
+  emit(type: string, data: unknown) {
+    this.listeners.get(type)!({ data: JSON.stringify(data) } as MessageEvent);
+  }
+
+  close() {}
+}
+
+function listing(resolved: string, files: unknown[]) {
+  return new Response(JSON.stringify(files), {
+    headers: { 'X-Resolved-Path': resolved },
+  });
+}
+
+describe('apiClient.watchFiles', () => {
+  const fetchMock = vi.fn();
+
+  beforeEach(() => {
+    apiClient.clearCache();
+    fetchMock.mockReset();
+    vi.stubGlobal('fetch', fetchMock);
+    vi.stubGlobal('EventSource', FakeEventSource);
+  });
+
+  afterEach(() => {
+    vi.unstubAllGlobals();
+  });
+
+  it('drops cached listings of relative paths on absolute change events', async () => {
+    fetchMock.mockResolvedValueOnce(listing('/home/me/docs', []));
+    expect(await apiClient.listFiles('.')).toEqual([]);
+    expect(await apiClient.listFiles('.')).toEqual([]);
+    expect(fetchMock).toHaveBeenCalledTimes(1);
+
+    const onChange = vi.fn();
+    const close = apiClient.watchFiles('.', onChange);
+    const events = [
+      { path: '/home/me/docs/a.txt', type: 'created', is_dir: false },
+    ];
+    FakeEventSource.last.emit('changes', { events });
+    expect(onChange).toHaveBeenCalledWith(events);
+
+    const files = [{ name: 'a.txt', is_dir: false, size: 1 }];
+    fetchMock.mockResolvedValueOnce(listing('/home/me/docs', files));
+    expect(await apiClient.listFiles('.')).toEqual(files);
+    expect(fetchMock).toHaveBeenCalledTimes(2);
+    close();
+  });
+
+  it('keeps listings of unrelated folders', async () => {
+    fetchMock.mockResolvedValueOnce(listing('/home/me/other', []));
+    await apiClient.listFiles('other');
+
+    apiClient.watchFiles('.', () => {});
+    FakeEventSource.last.emit('changes', {
+      events: [{ path: '/home/me/docs/a.txt', type: 'modified', is_dir: false }],
+    });
+
+    expect(apiClient.getCacheStats().keys).toEqual(['files:other']);
+  });
+});
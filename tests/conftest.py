@@ -0,0 +1,9 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Keep indexes, task stores and trash out of the real ~/.smartwork."""
+    path = tmp_path / "smartwork"
+    monkeypatch.setenv("SMARTWORK_DATA_DIR", str(path))
+    return path
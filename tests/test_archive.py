@@ -0,0 +1,125 @@
+import pytest
+from fastapi.testclient import TestClient
+from pathlib import Path
+import tempfile
+import shutil
+import random
+import gzip
+import io
+import tarfile
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from main import app
+from storage.archive import ParallelGzipWriter, available_formats
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def temp_dir():
+    temp_path = Path(tempfile.mkdtemp()).resolve()
+    rnd = random.Random(5)
+    source = temp_path / "项目"
+    (source / "docs").mkdir(parents=True)
+    (source / "docs" / "readme.md").write_text("# 说明\n" * 100)
+    (source / "data.bin").write_bytes(rnd.randbytes(3 * 1024 * 1024))
+    (source / "empty").mkdir()
+    yield temp_path
+    shutil.rmtree(temp_path, ignore_errors=True)
+
+
+def _files(root: Path) -> dict:
+    return {
+        str(p.relative_to(root)): p.read_bytes() for p in root.rglob("*") if p.is_file()
+    }
+
+
+def test_parallel_gzip_members():
+    data = random.Random(1).randbytes(300_000) + b"a" * 500_000
+    out = io.BytesIO()
+    writer = ParallelGzipWriter(out, level=6, workers=4, block_size=64 * 1024)
+    for start in range(0, len(data), 10_000):
+        writer.write(data[start : start + 10_000])
+    writer.close()
+
+    assert gzip.decompress(out.getvalue()) == data
+
+
+@pytest.mark.parametrize("archive_format", ["zip", "tar.gz", "tar.zst"])
+def test_archive_roundtrip(temp_dir, archive_format):
+    if archive_format not in available_formats():
+        pytest.skip(f"{archive_format} support is not installed")
+
+    source = temp_dir / "项目"
+    response = client.get(
+        "/api/files/archive", params={"path": str(source), "format": archive_format}
+    )
+    assert response.status_code == 200
+    assert "attachment" in response.headers["content-disposition"]
+
+    target = temp_dir / "out"
+    response = client.post(
+        "/api/files/extract",
+        params={"path": str(target), "format": archive_format},
+        content=response.content,
+    )
+    assert response.status_code == 200
+    assert response.json()["files"] == 2
+    assert _files(target / "项目") == _files(source)
+    assert (target / "项目" / "empty").is_dir()
+
+    # Extracting again would overwrite the files
+    archive = client.get(
+        "/api/files/archive", params={"path": str(source), "format": archive_format}
+    ).content
+    response = client.post(
+        "/api/files/extract",
+        params={"path": str(target), "format": archive_format},
+        content=archive,
+    )
+    assert response.status_code == 409
+
+    response = client.post(
+        "/api/files/extract",
+        params={"path": str(target), "format": archive_format, "overwrite": True},
+        content=archive,
+    )
+    assert response.status_code == 200
+
+
+def test_extract_rejects_unsafe_members(temp_dir):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        info = tarfile.TarInfo("../escape.txt")
+        info.size = 3
+        archive.addfile(info, io.BytesIO(b"bad"))
+
+    response = client.post(
+        "/api/files/extract",
+        params={"path": str(temp_dir / "out"), "format": "tar.gz"},
+        content=buffer.getvalue(),
+    )
+    assert response.status_code == 400
+    assert not (temp_dir / "escape.txt").exists()
+
+    response = client.post(
+        "/api/files/extract",
+        params={"path": str(temp_dir / "out"), "format": "tar.gz"},
+        content=b"not an archive",
+    )
+    assert response.status_code == 400
+
+
+def test_archive_errors(temp_dir):
+    response = client.get(
+        "/api/files/archive", params={"path": str(temp_dir / "missing")}
+    )
+    assert response.status_code == 404
+
+    response = client.get(
+        "/api/files/archive",
+        params={"path": str(temp_dir / "项目"), "format": "zip", "level": 15},
+    )
+    assert response.status_code == 400
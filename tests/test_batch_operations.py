@@ -0,0 +1,163 @@
+import pytest
+from fastapi.testclient import TestClient
+from pathlib import Path
+import tempfile
+import shutil
+import json
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from main import app
+from storage.batch import BatchRunner
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def temp_dir():
+    temp_path = Path(tempfile.mkdtemp())
+    yield temp_path
+    shutil.rmtree(temp_path, ignore_errors=True)
+
+
+class TestBatchRunner:
+    """Test batch file operations."""
+
+    def test_independent_operations(self, temp_dir):
+        """Test many independent operations in one batch."""
+        operations = []
+        for i in range(50):
+            (temp_dir / f"f{i}.txt").write_text(str(i))
+            operations.append(
+                {
+                    "op": "copy",
+                    "path": str(temp_dir / f"f{i}.txt"),
+                    "destination": str(temp_dir / "copies" / f"f{i}.txt"),
+                }
+            )
+
+        summary = BatchRunner(operations, max_workers=4).run()
+
+        assert summary["success"] is True
+        assert summary["succeeded"] == 50
+        assert len(list((temp_dir / "copies").iterdir())) == 50
+
+    def test_dependent_operations_run_in_order(self, temp_dir):
+        """Test that operations on overlapping paths keep their order."""
+        (temp_dir / "a.txt").write_text("a")
+        operations = [
+            {"op": "rename", "path": str(temp_dir / "a.txt"), "destination": "b.txt"},
+            {
+                "op": "copy",
+                "path": str(temp_dir / "b.txt"),
+                "destination": str(temp_dir / "c.txt"),
+            },
+            {"op": "delete", "path": str(temp_dir / "b.txt")},
+        ]
+
+        summary = BatchRunner(operations).run()
+
+        assert summary["success"] is True
+        assert sorted(p.name for p in temp_dir.iterdir()) == ["c.txt"]
+
+    def test_failure_skips_dependents(self, temp_dir):
+        """Test that operations depending on a failed one are skipped."""
+        (temp_dir / "other.txt").write_text("x")
+        operations = [
+            {"op": "rename", "path": str(temp_dir / "missing.txt"), "destination": "b"},
+            {"op": "delete", "path": str(temp_dir / "b")},
+            {"op": "delete", "path": str(temp_dir / "other.txt")},
+        ]
+
+        summary = BatchRunner(operations).run()
+        results = summary["results"]
+
+        assert summary["success"] is False
+        assert results[0]["success"] is False
+        assert results[1]["error"].startswith("skipped")
+        assert results[2]["success"] is True
+
+    def test_atomic_rollback(self, temp_dir):
+        """Test that atomic batches restore everything on failure."""
+        (temp_dir / "keep.txt").write_text("keep")
+        (temp_dir / "move.txt").write_text("move")
+        (temp_dir / "target.txt").write_text("old target")
+        operations = [
+            {"op": "delete", "path": str(temp_dir / "keep.txt")},
+            {
+                "op": "move",
+                "path": str(temp_dir / "move.txt"),
+                "destination": str(temp_dir / "target.txt"),
+                "overwrite": True,
+            },
+            {"op": "mkdir", "path": str(temp_dir / "new" / "nested")},
+            {"op": "delete", "path": str(temp_dir / "does-not-exist")},
+        ]
+
+        summary = BatchRunner(operations, atomic=True, max_workers=1).run()
+
+        assert summary["success"] is False
+        assert summary["rolled_back"] is True
+        assert (temp_dir / "keep.txt").read_text() == "keep"
+        assert (temp_dir / "move.txt").read_text() == "move"
+        assert (temp_dir / "target.txt").read_text() == "old target"
+        assert not (temp_dir / "new").exists()
+        assert sorted(p.name for p in temp_dir.iterdir()) == [
+            "keep.txt",
+            "move.txt",
+            "target.txt",
+        ]
+
+    def test_atomic_invalid_batch_runs_nothing(self, temp_dir):
+        """Test that an invalid operation aborts an atomic batch up front."""
+        (temp_dir / "a.txt").write_text("a")
+        operations = [
+            {"op": "delete", "path": str(temp_dir / "a.txt")},
+            {"op": "copy", "path": str(temp_dir / "a.txt")},
+        ]
+
+        summary = BatchRunner(operations, atomic=True).run()
+
+        assert summary["success"] is False
+        assert (temp_dir / "a.txt").exists()
+
+
+def test_batch_endpoint(temp_dir):
+    (temp_dir / "a.txt").write_text("a")
+
+    response = client.post(
+        "/api/files/batch",
+        json={
+            "operations": [
+                {
+                    "op": "copy",
+                    "path": str(temp_dir / "a.txt"),
+                    "destination": str(temp_dir / "b.txt"),
+                },
+                {"op": "mkdir", "path": str(temp_dir / "dir")},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    assert response.json()["succeeded"] == 2
+
+
+def test_batch_endpoint_stream(temp_dir):
+    (temp_dir / "a.txt").write_text("a")
+
+    response = client.post(
+        "/api/files/batch",
+        json={
+            "stream": True,
+            "operations": [
+                {"op": "delete", "path": str(temp_dir / "a.txt")},
+                {"op": "delete", "path": str(temp_dir / "missing.txt")},
+            ],
+        },
+    )
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    assert [line["type"] for line in lines] == ["result", "result", "summary"]
+    assert lines[-1]["succeeded"] == 1
+    assert lines[-1]["failed"] == 1
@@ -0,0 +1,130 @@
+import pytest
+from fastapi.testclient import TestClient
+from pathlib import Path
+import tempfile
+import shutil
+import base64
+import email
+import json
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from main import app
+from storage.bulk_read import read_entry
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def temp_dir():
+    temp_path = Path(tempfile.mkdtemp()).resolve()
+    (temp_path / "src" / "pkg").mkdir(parents=True)
+    for i in range(30):
+        (temp_path / "src" / "pkg" / f"m{i}.py").write_text(f"x = {i}\n")
+    (temp_path / "src" / "README.md").write_text("# 项目说明\n")
+    (temp_path / "logo.png").write_bytes(b"\x89PNG\r\n\x1a\n\x00\x00")
+    yield temp_path
+    shutil.rmtree(temp_path, ignore_errors=True)
+
+
+def _ndjson(response) -> list:
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+class TestReadEntry:
+    """Test per-file reads and error reporting."""
+
+    def test_size_cap(self, temp_dir):
+        """Test that big files fail unless truncation is requested."""
+        path = temp_dir / "big.txt"
+        path.write_text("汉" * 100)
+
+        assert read_entry(str(path), 100)["status"] == 413
+
+        entry = read_entry(str(path), 100, truncate=True)
+        assert entry["truncated"]
+        assert entry["content"] == "汉" * 33
+        assert entry["size"] == 300
+
+    def test_binary(self, temp_dir):
+        """Test that binary files are only returned when asked for."""
+        path = str(temp_dir / "logo.png")
+        assert read_entry(path, 1000)["status"] == 415
+
+        entry = read_entry(path, 1000, include_binary=True)
+        assert entry["encoding"] == "base64"
+        assert (
+            base64.b64decode(entry["content"]) == (temp_dir / "logo.png").read_bytes()
+        )
+
+
+def test_bulk_read_ndjson(temp_dir):
+    response = client.post(
+        "/api/files/read/bulk",
+        json={
+            "root": str(temp_dir),
+            "pattern": "src/**/*.py",
+            "paths": [str(temp_dir / "src" / "README.md"), str(temp_dir / "gone.txt")],
+        },
+    )
+    assert response.status_code == 200
+    lines = _ndjson(response)
+    summary = lines.pop()
+    assert summary == {
+        "type": "summary",
+        "requested": 32,
+        "files": 31,
+        "errors": 1,
+        "limit_reached": False,
+    }
+
+    results = {entry["path"]: entry for entry in lines}
+    assert results[str(temp_dir / "src" / "pkg" / "m7.py")]["content"] == "x = 7\n"
+    assert results[str(temp_dir / "src" / "README.md")]["content"] == "# 项目说明\n"
+    assert results[str(temp_dir / "gone.txt")]["status"] == 404
+
+
+def test_bulk_read_limits(temp_dir):
+    response = client.post(
+        "/api/files/read/bulk",
+        json={"root": str(temp_dir), "pattern": "**/*.py", "max_files": 10},
+    )
+    summary = _ndjson(response)[-1]
+    assert summary["files"] == 10
+    assert summary["limit_reached"]
+
+    response = client.post("/api/files/read/bulk", json={})
+    assert response.status_code == 400
+
+    response = client.post(
+        "/api/files/read/bulk",
+        json={"root": str(temp_dir / "missing"), "pattern": "*.py"},
+    )
+    assert response.status_code == 404
+
+
+def test_bulk_read_multipart(temp_dir):
+    response = client.post(
+        "/api/files/read/bulk",
+        json={
+            "paths": [str(temp_dir / "logo.png"), str(temp_dir / "src" / "README.md")],
+            "include_binary": True,
+            "format": "multipart",
+        },
+    )
+    assert response.status_code == 200
+    content_type = response.headers["content-type"]
+    assert content_type.startswith("multipart/mixed; boundary=")
+
+    message = email.message_from_bytes(
+        f"Content-Type: {content_type}\r\n\r\n".encode() + response.content
+    )
+    parts = {
+        part["Content-Location"]: part.get_payload(decode=True)
+        for part in message.get_payload()
+    }
+    assert parts[str(temp_dir / "logo.png")] == (temp_dir / "logo.png").read_bytes()
+    readme = parts[str(temp_dir / "src" / "README.md")]
+    assert readme.decode("utf-8") == "# 项目说明\n"
+    assert json.loads(parts[None])["files"] == 2
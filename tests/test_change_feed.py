@@ -0,0 +1,151 @@
+import pytest
+from fastapi.testclient import TestClient
+from pathlib import Path
+import tempfile
+import shutil
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from main import app
+from api.file_system import get_change_feed
+from storage.change_feed import ChangeFeed
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def temp_dir():
+    temp_path = Path(tempfile.mkdtemp()).resolve()
+    (temp_path / "docs").mkdir()
+    yield temp_path
+    shutil.rmtree(temp_path, ignore_errors=True)
+
+
+@pytest.fixture
+def feed():
+    instance = ChangeFeed(debounce=0.05, max_delay=0.5)
+    if not instance.available:
+        pytest.skip("inotify unavailable")
+    yield instance
+    instance.close()
+
+
+async def _collect(subscription, count: int, timeout: float = 2.0) -> dict:
+    """Gather events until count paths are seen or the timeout expires."""
+    events = {}
+    while len(events) < count:
+        message = await subscription.get(timeout)
+        if message is None:
+            break
+        assert message["type"] == "changes"
+        for event in message["events"]:
+            events[event["path"]] = event["type"]
+    return events
+
+
+class TestChangeFeed:
+    """Test the inotify-backed change feed."""
+
+    @pytest.mark.asyncio
+    async def test_coalesced_events(self, temp_dir, feed):
+        """Test that a create plus writes arrives as one created event."""
+        subscription = feed.subscribe(str(temp_dir))
+        assert subscription.complete
+
+        path = temp_dir / "docs" / "a.txt"
+        with open(path, "w") as f:
+            for _ in range(10):
+                f.write("x")
+                f.flush()
+        (temp_dir / "tmp.txt").write_text("gone")
+        (temp_dir / "tmp.txt").unlink()
+
+        message = await subscription.get(2.0)
+        assert message["type"] == "changes"
+        assert message["events"] == [
+            {"path": str(path), "type": "created", "is_dir": False}
+        ]
+        subscription.close()
+
+    @pytest.mark.asyncio
+    async def test_new_folders_are_watched(self, temp_dir, feed):
+        """Test that changes inside newly created folders are reported."""
+        subscription = feed.subscribe(str(temp_dir))
+
+        (temp_dir / "new" / "deep").mkdir(parents=True)
+        (temp_dir / "new" / "deep" / "b.txt").write_text("b")
+        await _collect(subscription, 3)
+
+        (temp_dir / "new" / "deep" / "b.txt").write_text("changed")
+        events = await _collect(subscription, 1)
+        assert events == {str(temp_dir / "new" / "deep" / "b.txt"): "modified"}
+        subscription.close()
+
+    @pytest.mark.asyncio
+    async def test_moved_folders_are_unwatched(self, temp_dir, feed):
+        """Test that a folder recreated after a move away is watched."""
+        subscription = feed.subscribe(str(temp_dir))
+        outside = Path(tempfile.mkdtemp()).resolve()
+        try:
+            (temp_dir / "docs").rename(outside / "docs")
+            await _collect(subscription, 1)
+
+            (outside / "docs" / "moved.txt").write_text("x")
+            (temp_dir / "docs").mkdir()
+            (temp_dir / "docs" / "c.txt").write_text("c")
+            events = await _collect(subscription, 2)
+            assert events == {
+                str(temp_dir / "docs"): "created",
+                str(temp_dir / "docs" / "c.txt"): "created",
+            }
+
+            (temp_dir / "docs" / "c.txt").write_text("changed")
+            events = await _collect(subscription, 1)
+            assert events == {str(temp_dir / "docs" / "c.txt"): "modified"}
+        finally:
+            shutil.rmtree(outside, ignore_errors=True)
+        subscription.close()
+
+    @pytest.mark.asyncio
+    async def test_subtree_filter(self, temp_dir, feed):
+        """Test that subscribers only see their own subtree."""
+        docs = feed.subscribe(str(temp_dir / "docs"))
+        (temp_dir / "outside.txt").write_text("x")
+        (temp_dir / "docs" / "inside.txt").write_text("x")
+
+        events = await _collect(docs, 1)
+        assert list(events) == [str(temp_dir / "docs" / "inside.txt")]
+        docs.close()
+        assert feed.stats()["watched_directories"] == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_subscriber_resyncs(self, temp_dir, feed):
+        """Test that a full buffer turns into a single resync message."""
+        subscription = feed.subscribe(str(temp_dir), buffer_size=3)
+        for i in range(10):
+            (temp_dir / f"f{i}.txt").write_text("x")
+
+        message = await subscription.get(2.0)
+        assert message == {"type": "resync", "root": str(temp_dir)}
+        assert subscription.dropped >= 10
+        subscription.close()
+
+
+def test_change_feed_socket(temp_dir):
+    if not get_change_feed().available:
+        pytest.skip("inotify unavailable")
+
+    with client.websocket_connect(f"/api/files/changes/ws?path={temp_dir}") as ws:
+        hello = ws.receive_json()
+        assert hello == {"type": "subscribed", "root": str(temp_dir), "complete": True}
+
+        (temp_dir / "docs" / "report.md").write_text("# 报告")
+        message = ws.receive_json()
+        assert message["type"] == "changes"
+        assert message["events"][0]["path"] == str(temp_dir / "docs" / "report.md")
+
+    with client.websocket_connect(
+        f"/api/files/changes/ws?path={temp_dir / 'missing'}"
+    ) as ws:
+        assert ws.receive_json()["type"] == "error"
@@ -0,0 +1,193 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from fastapi.testclient import TestClient
+from pathlib import Path
+import tempfile
+import shutil
+import asyncio
+import gzip
+import zlib
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from main import app
+from utils.compression import (
+    CompressionMiddleware,
+    is_compressible,
+    negotiate_encoding,
+)
+
+TEXT = "SmartWork 文件列表 " * 200
+
+compress_app = FastAPI()
+
+
+@compress_app.get("/text")
+async def text():
+    return PlainTextResponse(TEXT, headers={"ETag": '"abc"'})
+
+
+@compress_app.get("/small")
+async def small():
+    return PlainTextResponse("tiny")
+
+
+@compress_app.get("/zip")
+async def zipped():
+    return Response(b"PK" * 2000, media_type="application/zip")
+
+
+@compress_app.get("/stream")
+async def stream():
+    async def lines():
+        for i in range(100):
+            yield f'{{"name": "file-{i}.txt", "size": {i}}}\n'
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+compress_app.add_middleware(CompressionMiddleware, minimum_size=500)
+compress_client = TestClient(compress_app)
+
+
+def _raw(path: str, encoding: str):
+    """Fetch without letting httpx decode the body."""
+    with compress_client.stream(
+        "GET", path, headers={"Accept-Encoding": encoding}
+    ) as r:
+        return r, b"".join(r.iter_raw())
+
+
+class TestNegotiation:
+    """Test Accept-Encoding negotiation."""
+
+    def test_preference_order(self):
+        """Test that server preference breaks q-value ties."""
+        encodings = ["zstd", "br", "gzip"]
+        assert negotiate_encoding("gzip, br, zstd", encodings) == "zstd"
+        assert negotiate_encoding("gzip, br", encodings) == "br"
+        assert negotiate_encoding("gzip;q=1.0, br;q=0.5", encodings) == "gzip"
+        assert negotiate_encoding("*", encodings) == "zstd"
+
+    def test_identity_only(self):
+        """Test that missing or refused codings fall back to identity."""
+        assert negotiate_encoding("", ["gzip"]) is None
+        assert negotiate_encoding("identity", ["gzip"]) is None
+        assert negotiate_encoding("gzip;q=0, *;q=0", ["gzip"]) is None
+
+    def test_compressible_types(self):
+        """Test that media and archives are skipped."""
+        assert is_compressible("application/json")
+        assert is_compressible("text/plain; charset=utf-8")
+        assert not is_compressible("image/png")
+        assert not is_compressible("application/zip")
+        assert not is_compressible("")
+
+
+class TestCompressionMiddleware:
+    """Test response compression."""
+
+    def test_gzip(self):
+        """Test that large bodies are gzipped with adjusted headers."""
+        response, body = _raw("/text", "gzip")
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["etag"] == 'W/"abc"'
+        assert "content-length" not in response.headers
+        assert gzip.decompress(body).decode() == TEXT
+        assert len(body) < len(TEXT.encode()) / 10
+
+    def test_brotli(self):
+        brotli = pytest.importorskip("brotli")
+        response, body = _raw("/text", "br")
+
+        assert response.headers["content-encoding"] == "br"
+        assert brotli.decompress(body).decode() == TEXT
+
+    def test_zstd(self):
+        zstandard = pytest.importorskip("zstandard")
+        response, body = _raw("/text", "zstd")
+
+        assert response.headers["content-encoding"] == "zstd"
+        decompressed = zstandard.ZstdDecompressor().decompressobj().decompress(body)
+        assert decompressed.decode() == TEXT
+
+    def test_small_and_binary_untouched(self):
+        """Test that small bodies and archives are sent as-is."""
+        for path in ("/small", "/zip"):
+            response, body = _raw(path, "gzip")
+            assert "content-encoding" not in response.headers
+            assert response.headers["content-length"] == str(len(body))
+        # The small text would be compressed at another size, the zip never
+        assert _raw("/small", "gzip")[0].headers["vary"] == "Accept-Encoding"
+        assert "vary" not in _raw("/zip", "gzip")[0].headers
+
+    def test_identity_request(self):
+        """Test that clients without Accept-Encoding get plain bodies."""
+        response, body = _raw("/text", "identity")
+
+        assert "content-encoding" not in response.headers
+        assert body.decode() == TEXT
+        assert response.headers["vary"] == "Accept-Encoding"
+
+    @pytest.mark.asyncio
+    async def test_streamed(self):
+        """Test that chunked responses are compressed as they stream."""
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/stream",
+            "raw_path": b"/stream",
+            "root_path": "",
+            "scheme": "http",
+            "query_string": b"",
+            "headers": [(b"accept-encoding", b"gzip")],
+            "server": ("testserver", 80),
+            "client": ("testclient", 50000),
+        }
+        messages = []
+
+        async def receive():
+            # Never disconnects
+            await asyncio.Event().wait()
+
+        async def send(message):
+            messages.append(message)
+
+        await compress_app(scope, receive, send)
+
+        assert dict(messages[0]["headers"])[b"content-encoding"] == b"gzip"
+        chunks = [m["body"] for m in messages[1:]]
+        assert len(chunks) > 50
+        assert messages[-1]["more_body"] is False
+        decoder = zlib.decompressobj(31)
+        lines = b"".join(decoder.decompress(c) for c in chunks).splitlines()
+        assert len(lines) == 100
+
+
+def test_file_api_compression():
+    temp_path = Path(tempfile.mkdtemp())
+    try:
+        for i in range(100):
+            (temp_path / f"report-{i:03d}.txt").write_text("x")
+        (temp_path / "big.txt").write_text("line of text\n" * 1000)
+        client = TestClient(app)
+
+        response = client.get(
+            f"/api/files/list/?path={temp_path}", headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert len(response.json()) == 101
+
+        response = client.get(
+            f"/api/files/read/?path={temp_path / 'big.txt'}",
+            headers={"Accept-Encoding": "gzip", "Range": "bytes=0-99"},
+        )
+        assert response.status_code == 206
+        assert "content-encoding" not in response.headers
+    finally:
+        shutil.rmtree(temp_path, ignore_errors=True)
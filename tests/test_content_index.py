@@ -0,0 +1,145 @@
+import pytest
+from fastapi.testclient import TestClient
+from pathlib import Path
+import tempfile
+import shutil
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+import api.file_system as fs_api
+from main import app
+from storage.content_index import ContentIndex, build_match_query
+from storage.file_index import FileIndex
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+
+@pytest.fixture
+def temp_dir():
+    temp_path = Path(tempfile.mkdtemp())
+    yield temp_path
+    shutil.rmtree(temp_path, ignore_errors=True)
+
+
+@pytest.fixture
+def root(temp_dir):
+    root = temp_dir / "docs"
+    root.mkdir()
+    (root / "plan.md").write_text("# Plan\n\nQ3 revenue targets for the sales team.")
+    (root / "notes.txt").write_text("本季度营收增长明显，需要继续跟进。")
+    (root / "image.png").write_bytes(b"\x89PNG revenue")
+    return root
+
+
+class TestContentIndex:
+    """Test the full-text content index."""
+
+    def test_build_match_query(self):
+        """Test that words become required phrases and CJK is split."""
+        assert build_match_query("Q3 revenue") == '"Q3" "revenue"'
+        assert build_match_query("营收") == '"营 收"'
+        assert build_match_query("***") == ""
+
+    def test_refresh_and_search(self, temp_dir, root):
+        """Test indexing text files and ranked search with snippets."""
+        index = ContentIndex(str(temp_dir / "content.db"), max_workers=2)
+        stats = index.refresh([str(root)])
+
+        assert stats["scanned"] == 2
+        assert stats["indexed"] == 2
+
+        results = index.search("q3 revenue")
+        assert [Path(r["path"]).name for r in results] == ["plan.md"]
+        assert "<mark>revenue</mark>" in results[0]["snippet"]
+
+        results = index.search("营收")
+        assert [Path(r["path"]).name for r in results] == ["notes.txt"]
+        assert "<mark>营收</mark>" in results[0]["snippet"]
+
+    def test_incremental_refresh(self, temp_dir, root):
+        """Test that unchanged files are skipped and removed files dropped."""
+        index = ContentIndex(str(temp_dir / "content.db"), max_workers=2)
+        index.refresh([str(root)])
+
+        stats = index.refresh([str(root)])
+        assert stats["indexed"] == 0
+        assert stats["unchanged"] == 2
+
+        (root / "plan.md").write_text("Budget only.")
+        (root / "notes.txt").unlink()
+        stats = index.refresh([str(root)])
+        assert stats["indexed"] == 1
+        assert stats["removed"] == 1
+        assert index.search("revenue") == []
+        assert len(index.search("budget")) == 1
+
+    def test_refresh_single_path(self, temp_dir, root):
+        """Test that a file reappearing is indexed without a full refresh."""
+        index = ContentIndex(str(temp_dir / "content.db"), max_workers=2)
+        index.refresh([str(root)])
+        plan = str(root / "plan.md")
+
+        assert index.remove_path(plan) == 1
+        assert index.search("revenue") == []
+        index.refresh_path(plan).join(timeout=30)
+        assert [r["path"] for r in index.search("revenue")] == [plan]
+        # An unchanged file is not indexed twice
+        index.refresh_path(plan).join(timeout=30)
+        assert len(index.search("revenue")) == 1
+
+    def test_xlsx_extraction(self, temp_dir, root):
+        """Test that spreadsheet cells are indexed."""
+        if Workbook is None:
+            pytest.skip("openpyxl not installed")
+
+        wb = Workbook()
+        wb.active.append(["Region", "Forecast"])
+        wb.active.append(["EMEA", 1200])
+        wb.save(root / "forecast.xlsx")
+
+        index = ContentIndex(str(temp_dir / "content.db"), max_workers=2)
+        index.refresh([str(root)])
+
+        results = index.search("emea")
+        assert [Path(r["path"]).name for r in results] == ["forecast.xlsx"]
+
+
+def test_revoked_root_is_not_searchable(temp_dir, root, monkeypatch):
+    """Test that content search forgets a folder once access is revoked."""
+    file_index = FileIndex(str(temp_dir / "index.db"))
+    file_index.start()
+    content_index = ContentIndex(str(temp_dir / "content.db"), max_workers=2)
+    monkeypatch.setattr(fs_api, "_file_index", file_index)
+    monkeypatch.setattr(fs_api, "_content_index", content_index)
+    client = TestClient(app)
+
+    try:
+        response = client.post("/api/files/index/roots", params={"path": str(root)})
+        assert response.status_code == 200
+        content_index._refresh_thread.join(timeout=30)
+
+        response = client.get("/api/files/content-search", params={"q": "revenue"})
+        assert [Path(r["path"]).name for r in response.json()["results"]] == ["plan.md"]
+
+        response = client.delete("/api/files/index/roots", params={"path": str(root)})
+        assert response.status_code == 200
+        assert content_index.status()["documents"] == 0
+
+        response = client.get("/api/files/content-search", params={"q": "revenue"})
+        assert response.json()["results"] == []
+    finally:
+        file_index.close()
+
+
+def test_search_limited_to_granted_roots(temp_dir, root):
+    """Test that documents outside the granted folders are filtered out."""
+    index = ContentIndex(str(temp_dir / "content.db"), max_workers=2)
+    index.refresh([str(root)])
+
+    assert len(index.search("revenue", roots=[str(root)])) == 1
+    assert index.search("revenue", roots=[str(temp_dir / "other")]) == []
+    assert index.search("revenue", roots=[]) == []
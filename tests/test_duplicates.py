@@ -0,0 +1,112 @@
+import pytest
+from fastapi.testclient import TestClient
+from pathlib import Path
+import tempfile
+import shutil
+import random
+import time
+import os
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from main import app
+import api.tasks as tasks_api
+from storage.duplicates import DuplicateFinder
+
+
+@pytest.fixture
+def temp_dir():
+    temp_path = Path(tempfile.mkdtemp()).resolve()
+    yield temp_path
+    shutil.rmtree(temp_path, ignore_errors=True)
+
+
+@pytest.fixture
+def root(temp_dir):
+    rnd = random.Random(11)
+    root = temp_dir / "files"
+    (root / "a").mkdir(parents=True)
+    (root / "b").mkdir()
+
+    photo = rnd.randbytes(300_000)
+    (root / "a" / "photo.jpg").write_bytes(photo)
+    (root / "b" / "photo copy.jpg").write_bytes(photo)
+    # Same size, first and last blocks as the photo; differs in the middle
+    (root / "b" / "edited.jpg").write_bytes(
+        photo[:100_000] + b"x" * 100_000 + photo[200_000:]
+    )
+    os.link(root / "a" / "photo.jpg", root / "a" / "photo-link.jpg")
+
+    (root / "a" / "note.txt").write_text("same note")
+    (root / "b" / "note.txt").write_text("same note")
+    (root / "b" / "other.txt").write_text("diff note")
+    (root / "a" / "unique.bin").write_bytes(rnd.randbytes(5000))
+    return root
+
+
+class TestDuplicateFinder:
+    """Test staged duplicate detection and the hash cache."""
+
+    def test_find_groups(self, temp_dir, root):
+        """Test that only identical content is grouped."""
+        finder = DuplicateFinder(str(temp_dir / "dups.db"), max_workers=2)
+        result = finder.find([str(root)])
+
+        groups = [[Path(p).name for p in g["paths"]] for g in result["groups"]]
+        # Hard links are one file, listed under their first path
+        assert groups == [
+            ["photo-link.jpg", "photo copy.jpg"],
+            ["note.txt", "note.txt"],
+        ]
+        assert result["wasted_bytes"] == 300_000 + 9
+        assert result["scanned_files"] == 8
+
+        # The unique size was never read; the partial-hash collision was
+        # hashed in full, the note files only once
+        assert result["hashed_files"] == 3 + 3 + 3
+
+    def test_rerun_uses_cache(self, temp_dir, root):
+        """Test that unchanged files are not hashed again."""
+        finder = DuplicateFinder(str(temp_dir / "dups.db"), max_workers=2)
+        first = finder.find([str(root)])
+
+        rerun = DuplicateFinder(str(temp_dir / "dups.db")).find([str(root)])
+        assert rerun["groups"] == first["groups"]
+        assert rerun["hashed_files"] == 0
+        assert rerun["cache_hits"] == first["hashed_files"]
+
+        (root / "b" / "note.txt").write_text("new  note")
+        changed = finder.find([str(root)])
+        assert changed["hashed_files"] == 1
+        assert len(changed["groups"]) == 1
+
+
+def test_duplicate_task(temp_dir, root, monkeypatch):
+    class GrantedRoots:
+        def roots(self):
+            return [str(root)]
+
+    monkeypatch.setattr(tasks_api, "get_file_index", lambda: GrantedRoots())
+    monkeypatch.setattr(
+        tasks_api, "_duplicate_finder", DuplicateFinder(str(temp_dir / "dups.db"))
+    )
+
+    with TestClient(app) as client:
+        response = client.post("/api/tasks/duplicates", json={"roots": [str(temp_dir)]})
+        assert response.status_code == 403
+
+        response = client.post("/api/tasks/duplicates", json={"min_size": 100})
+        assert response.status_code == 200
+        task_id = response.json()["task"]["id"]
+
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            body = client.get(f"/api/tasks/{task_id}").json()
+            if body["task"]["status"] not in ("pending", "in_progress"):
+                break
+            time.sleep(0.05)
+
+        assert body["task"]["status"] == "completed"
+        assert body["result"]["total_groups"] == 1
+        assert any("Hashed" in log["message"] for log in body["logs"])
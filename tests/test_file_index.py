@@ -0,0 +1,121 @@
+import pytest
+from pathlib import Path
+import tempfile
+import shutil
+import time
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from storage.file_index import FileIndex
+
+
+@pytest.fixture
+def temp_dir():
+    temp_path = Path(tempfile.mkdtemp())
+    yield temp_path
+    shutil.rmtree(temp_path, ignore_errors=True)
+
+
+@pytest.fixture
+def index(temp_dir):
+    root = temp_dir / "root"
+    (root / "reports" / "2026").mkdir(parents=True)
+    (root / "reports" / "2026" / "Q3_Revenue.xlsx").write_text("x")
+    (root / "reports" / "summary.md").write_text("x")
+    (root / "notes.txt").write_text("x")
+
+    file_index = FileIndex(str(temp_dir / "index.db"))
+    file_index.start()
+    file_index.add_root(str(root))
+    assert file_index.wait_until_idle(timeout=5)
+    yield file_index
+    file_index.close()
+
+
+def _names(results):
+    return sorted(item["name"] for item in results)
+
+
+def _wait_for(predicate, timeout: float = 3.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return predicate()
+
+
+class TestFileIndex:
+    """Test the persistent filename index."""
+
+    def test_build_indexes_tree(self, index):
+        """Test that the background scan indexes every entry."""
+        assert index.status()["entries"] == 6
+
+    def test_substring_search(self, index):
+        """Test case-insensitive substring matching."""
+        assert _names(index.search("revenue")) == ["Q3_Revenue.xlsx"]
+
+    def test_prefix_search(self, index):
+        """Test prefix matching."""
+        assert _names(index.search("sum", mode="prefix")) == ["summary.md"]
+
+    def test_glob_search(self, index):
+        """Test glob matching on names and paths."""
+        assert _names(index.search("*.md", mode="glob")) == ["summary.md"]
+        assert _names(index.search("*/2026/*", mode="glob")) == ["Q3_Revenue.xlsx"]
+        assert _names(index.search("*/REPORTS/*q3*", mode="glob")) == [
+            "Q3_Revenue.xlsx"
+        ]
+
+    def test_search_restricted_to_root(self, index, temp_dir):
+        """Test that root limits results to a subtree."""
+        reports = str(temp_dir / "root" / "reports")
+        assert _names(index.search("m", root=reports)) == ["summary.md"]
+
+    def test_incremental_update(self, index, temp_dir):
+        """Test that change events update the index without a rescan."""
+        if not index.watcher.available:
+            pytest.skip("inotify not available")
+
+        root = temp_dir / "root"
+        (root / "forecast.csv").write_text("x")
+        assert _wait_for(lambda: _names(index.search("forecast")) == ["forecast.csv"])
+
+        (root / "notes.txt").unlink()
+        assert _wait_for(lambda: index.search("notes") == [])
+
+    def test_burst_of_changes(self, index, temp_dir):
+        """Test that a burst of events ends with the final sizes indexed."""
+        if not index.watcher.available:
+            pytest.skip("inotify not available")
+
+        root = temp_dir / "root"
+        for i in range(200):
+            (root / f"burst-{i}.log").write_text("x" * i)
+        with open(root / "notes.txt", "a") as f:
+            for _ in range(50):
+                f.write("more\n")
+                f.flush()
+
+        def indexed():
+            results = index.search("burst-", limit=1000)
+            notes = index.search("notes.txt")
+            return (
+                len(results) == 200
+                and {r["size"] for r in results} == set(range(200))
+                and notes
+                and notes[0]["size"] == 1 + 50 * 5
+            )
+
+        assert _wait_for(indexed)
+
+    def test_index_persists_across_restarts(self, index, temp_dir):
+        """Test that the index reopens with its roots and entries."""
+        index.close()
+
+        reopened = FileIndex(str(temp_dir / "index.db"))
+        assert reopened.roots() == [str(temp_dir / "root")]
+        assert _names(reopened.search("notes")) == ["notes.txt"]
+        reopened.close()
@@ -3,12 +3,19 @@ from fastapi.testclient import TestClient
 from pathlib import Path
 import tempfile
 import shutil
+import json
+import hashlib
 
 import sys
 
 sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
 
+import api.file_system as fs_api
 from main import app
+from storage.listing import encode_cursor
+from storage.metadata_cache import MetadataCache
+from storage.streaming import iter_file_range
+from storage.watcher import ChangeWatcher
 
 client = TestClient(app)
 
@@ -34,6 +41,26 @@ def test_list_files(temp_dir):
     assert data[0]["size"] == len(test_content)
 
 
+def test_list_through_symlink_sees_writes(temp_dir, monkeypatch):
+    watcher = ChangeWatcher()
+    watcher.close()
+    # Without inotify only explicit invalidation refreshes a listing
+    monkeypatch.setattr(fs_api, "metadata_cache", MetadataCache(watcher=watcher))
+    real = temp_dir / "real"
+    real.mkdir()
+    (temp_dir / "link").symlink_to(real)
+    test_file = real / "a.txt"
+    test_file.write_text("a")
+
+    response = client.get(f"/api/files/list/?path={temp_dir / 'link'}")
+    assert response.json()[0]["size"] == 1
+    assert response.headers["x-resolved-path"] == str(real.resolve())
+
+    client.post(f"/api/files/write/?path={test_file}", json={"content": "abc"})
+    response = client.get(f"/api/files/list/?path={temp_dir / 'link'}")
+    assert response.json()[0]["size"] == 3
+
+
 def test_read_file(temp_dir):
     test_file = temp_dir / "test_read.txt"
     test_content = "读取测试"
@@ -76,3 +103,275 @@ def test_list_root():
     assert response.status_code == 200
     data = response.json()
     assert isinstance(data, list)
+
+
+def test_read_file_stream(temp_dir):
+    test_file = temp_dir / "large.bin"
+    payload = bytes(range(256)) * 1024
+    test_file.write_bytes(payload)
+
+    response = client.get(f"/api/files/read/?path={test_file}&stream=true")
+    assert response.status_code == 200
+    assert response.headers["accept-ranges"] == "bytes"
+    assert int(response.headers["content-length"]) == len(payload)
+    assert response.content == payload
+
+
+def test_read_file_range(temp_dir):
+    test_file = temp_dir / "range.txt"
+    test_file.write_bytes(b"0123456789")
+
+    response = client.get(
+        f"/api/files/read/?path={test_file}", headers={"Range": "bytes=2-5"}
+    )
+    assert response.status_code == 206
+    assert response.content == b"2345"
+    assert response.headers["content-range"] == "bytes 2-5/10"
+
+    response = client.get(
+        f"/api/files/read/?path={test_file}", headers={"Range": "bytes=-3"}
+    )
+    assert response.status_code == 206
+    assert response.content == b"789"
+
+    response = client.get(
+        f"/api/files/read/?path={test_file}", headers={"Range": "bytes=20-"}
+    )
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */10"
+
+
+def test_iter_file_range_stops_on_truncation(temp_dir):
+    test_file = temp_dir / "shrinking.bin"
+    test_file.write_bytes(b"a" * 10_000)
+
+    chunks = iter_file_range(test_file, 0, 9_999, chunk_size=4096)
+    assert next(chunks) == b"a" * 4096
+    with open(test_file, "r+b") as f:
+        f.truncate(5_000)
+    # Reading past the new end of file ends the stream instead of crashing
+    assert list(chunks) == [b"a" * 904]
+
+    assert list(iter_file_range(test_file, 4_000, 4_009, chunk_size=4)) == [
+        b"aaaa",
+        b"aaaa",
+        b"aa",
+    ]
+
+
+def test_read_file_if_range_mismatch(temp_dir):
+    test_file = temp_dir / "if_range.txt"
+    test_file.write_bytes(b"0123456789")
+
+    response = client.get(
+        f"/api/files/read/?path={test_file}",
+        headers={"Range": "bytes=0-1", "If-Range": '"stale-etag"'},
+    )
+    assert response.status_code == 200
+    assert response.content == b"0123456789"
+
+
+def test_read_binary_requires_stream(temp_dir):
+    test_file = temp_dir / "image.bin"
+    test_file.write_bytes(b"\x00\x01\x02")
+
+    response = client.get(f"/api/files/read/?path={test_file}")
+    assert response.status_code == 415
+
+
+def test_list_files_page(temp_dir):
+    (temp_dir / "sub").mkdir()
+    for i in range(7):
+        (temp_dir / f"file{i}.txt").write_text("x" * i)
+
+    names = []
+    cursor = None
+    while True:
+        url = f"/api/files/list/page?path={temp_dir}&limit=3"
+        if cursor:
+            url += f"&cursor={cursor}"
+        response = client.get(url)
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["items"]) <= 3
+        names.extend(item["name"] for item in data["items"])
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+
+    assert names == ["sub"] + [f"file{i}.txt" for i in range(7)]
+
+
+def test_list_files_page_sort_size_desc(temp_dir):
+    for i in range(5):
+        (temp_dir / f"file{i}.txt").write_text("x" * i)
+
+    response = client.get(
+        f"/api/files/list/page?path={temp_dir}&limit=2&sort=size&descending=true"
+    )
+    data = response.json()
+    assert [item["size"] for item in data["items"]] == [4, 3]
+    assert data["next_cursor"]
+
+
+def test_list_files_page_invalid_cursor(temp_dir):
+    response = client.get(f"/api/files/list/page?path={temp_dir}&cursor=!!!")
+    assert response.status_code == 400
+
+    (temp_dir / "a.txt").write_text("a")
+    # Well-formed cursors whose fields do not fit the sort
+    for sort, key in (
+        ("type", []),
+        ("size", ["big", "a.txt"]),
+        ("name", [1]),
+        ("none", [-1]),
+        ("none", [True]),
+    ):
+        cursor = encode_cursor(key)
+        response = client.get(
+            f"/api/files/list/page?path={temp_dir}&sort={sort}&cursor={cursor}"
+        )
+        assert response.status_code == 400, (sort, key)
+
+
+def test_list_files_stream(temp_dir):
+    for i in range(3):
+        (temp_dir / f"file{i}.txt").write_text("x")
+
+    response = client.get(f"/api/files/list/stream?path={temp_dir}")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(item["name"] for item in lines) == [
+        "file0.txt",
+        "file1.txt",
+        "file2.txt",
+    ]
+
+
+def test_upload_file_binary(temp_dir):
+    target = temp_dir / "sub" / "data.bin"
+    payload = bytes(range(256)) * 8192
+
+    def body():
+        for i in range(0, len(payload), 65536):
+            yield payload[i : i + 65536]
+
+    response = client.put(
+        "/api/files/upload",
+        params={"path": str(target), "hash": "sha256"},
+        content=body(),
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["size"] == len(payload)
+    assert data["hash"] == hashlib.sha256(payload).hexdigest()
+    assert target.read_bytes() == payload
+    assert [p.name for p in target.parent.iterdir()] == ["data.bin"]
+
+
+def test_upload_file_resume(temp_dir):
+    target = temp_dir / "resume.bin"
+    payload = b"0123456789" * 1000
+    digest = hashlib.md5(payload).hexdigest()
+
+    response = client.put(
+        "/api/files/upload",
+        params={"path": str(target), "complete": "false"},
+        content=payload[:4000],
+    )
+    assert response.json()["offset"] == 4000
+    assert not target.exists()
+
+    status = client.get("/api/files/upload/status", params={"path": str(target)})
+    assert status.json()["offset"] == 4000
+
+    response = client.put(
+        "/api/files/upload",
+        params={"path": str(target), "offset": 5000},
+        content=payload[5000:],
+    )
+    assert response.status_code == 409
+    assert response.headers["upload-offset"] == "4000"
+
+    response = client.put(
+        "/api/files/upload",
+        params={
+            "path": str(target),
+            "offset": 4000,
+            "hash": "md5",
+            "expected_hash": digest,
+        },
+        content=payload[4000:],
+    )
+    assert response.status_code == 200
+    assert response.json()["hash"] == digest
+    assert target.read_bytes() == payload
+
+
+def test_upload_file_checksum_mismatch(temp_dir):
+    target = temp_dir / "bad.bin"
+    target.write_bytes(b"original")
+
+    response = client.put(
+        "/api/files/upload",
+        params={"path": str(target), "hash": "sha256", "expected_hash": "00"},
+        content=b"new content",
+    )
+    assert response.status_code == 422
+    assert target.read_bytes() == b"original"
+    assert [p.name for p in temp_dir.iterdir()] == ["bad.bin"]
+
+
+def test_list_files_not_modified(temp_dir):
+    (temp_dir / "a.txt").write_text("a")
+
+    response = client.get(f"/api/files/list/?path={temp_dir}")
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "no-cache"
+
+    response = client.get(
+        f"/api/files/list/?path={temp_dir}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = client.get(
+        f"/api/files/list/?path={temp_dir}&sort=size", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+
+    (temp_dir / "a.txt").write_text("changed size")
+    response = client.get(
+        f"/api/files/list/?path={temp_dir}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_read_file_not_modified(temp_dir):
+    test_file = temp_dir / "poll.txt"
+    test_file.write_text("v1")
+
+    response = client.get(f"/api/files/read/?path={test_file}")
+    etag = response.headers["etag"]
+    last_modified = response.headers["last-modified"]
+
+    response = client.get(
+        f"/api/files/read/?path={test_file}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+
+    response = client.get(
+        f"/api/files/read/?path={test_file}&stream=true",
+        headers={"If-Modified-Since": last_modified},
+    )
+    assert response.status_code == 304
+
+    test_file.write_text("version 2")
+    response = client.get(
+        f"/api/files/read/?path={test_file}", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["content"] == "version 2"
@@ -0,0 +1,72 @@
+from fastapi.testclient import TestClient
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from main import app
+from utils.http_cache import ChangeCounter, etag_matches, is_not_modified
+
+client = TestClient(app)
+
+
+class TestConditionalHelpers:
+    """Test If-None-Match / If-Modified-Since evaluation."""
+
+    def test_etag_matches(self):
+        """Test weak comparison against lists and wildcards."""
+        assert etag_matches('"a"', '"a"')
+        assert etag_matches('W/"a"', '"a"')
+        assert etag_matches('"x", W/"a"', 'W/"a"')
+        assert etag_matches("*", '"a"')
+        assert not etag_matches('"b"', '"a"')
+
+    def test_if_none_match_takes_precedence(self):
+        """Test that If-Modified-Since is ignored when If-None-Match is sent."""
+        headers = {
+            "if-none-match": '"old"',
+            "if-modified-since": "Thu, 01 Jan 2099 00:00:00 GMT",
+        }
+        assert not is_not_modified(headers, '"new"', 0)
+
+    def test_if_modified_since(self):
+        """Test date comparison at one-second resolution."""
+        headers = {"if-modified-since": "Thu, 01 Jan 1970 00:00:10 GMT"}
+        assert is_not_modified(headers, None, 10.5)
+        assert not is_not_modified(headers, None, 11.0)
+        assert not is_not_modified({"if-modified-since": "garbage"}, None, 1.0)
+
+    def test_change_counter_is_bounded(self):
+        """Test that forgotten keys never report a value they had before."""
+        counter = ChangeCounter(max_keys=2)
+        counter.touch("a")
+        seen = counter.get("a")
+        for key in ("b", "c", "d"):
+            counter.touch(key)
+        assert len(counter) == 2
+        # "a" was forgotten; its value moved but is above any it had
+        assert counter.get("a") > seen
+        assert counter.get("unknown") == counter.get("a")
+
+        counter.touch("a")
+        assert counter.get("a") > counter.get("b")
+        assert len(counter) == 2
+
+
+def test_get_task_not_modified():
+    created = client.post("/api/tasks/", json={"description": "整理文件"})
+    assert created.status_code == 200
+    task_id = created.json()["task"]["id"]
+
+    response = client.get(f"/api/tasks/{task_id}")
+    etag = response.headers["etag"]
+
+    response = client.get(f"/api/tasks/{task_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+    client.post(f"/api/tasks/{task_id}/execute")
+
+    response = client.get(f"/api/tasks/{task_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["task"]["status"] == "completed"
@@ -0,0 +1,122 @@
+import pytest
+from pathlib import Path
+import asyncio
+import tempfile
+import threading
+import shutil
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from storage.io_executor import IOExecutor, read_mount_points
+
+
+@pytest.fixture
+def temp_dir():
+    temp_path = Path(tempfile.mkdtemp())
+    yield temp_path
+    shutil.rmtree(temp_path, ignore_errors=True)
+
+
+class TestIOExecutor:
+    """Test the per-mount blocking I/O executor."""
+
+    def test_read_mount_points(self, temp_dir):
+        """Test parsing of escaped mount table entries."""
+        mounts_file = temp_dir / "mounts"
+        mounts_file.write_text(
+            "/dev/sda1 / ext4 rw 0 0\n"
+            "nas:/share /mnt/my\\040share nfs rw 0 0\n"
+            "tmpfs /mnt tmpfs rw 0 0\n"
+        )
+
+        mounts = read_mount_points(str(mounts_file))
+
+        assert mounts == ["/mnt/my share", "/mnt", "/"]
+
+    def test_configured_mount_gets_own_pool(self, temp_dir):
+        """Test that configured mounts are matched by longest prefix."""
+        nas = temp_dir / "nas"
+        executor = IOExecutor(default_workers=4, mount_workers={str(nas): 1})
+
+        try:
+            assert executor.mount_point(str(nas / "a" / "b.txt")) == str(nas)
+            assert executor.mount_point(str(temp_dir / "nasty")) != str(nas)
+            assert executor.executor_for(str(nas / "x"))._max_workers == 1
+            assert executor.executor_for(str(nas)) is executor.executor_for(
+                str(nas / "y")
+            )
+        finally:
+            executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_saturated_mount_does_not_block_others(self, temp_dir):
+        """Test that a stalled mount leaves other mounts responsive."""
+        nas = temp_dir / "nas"
+        executor = IOExecutor(default_workers=2, mount_workers={str(nas): 1})
+        release = threading.Event()
+
+        try:
+            stalled = asyncio.ensure_future(
+                executor.run(str(nas / "big.bin"), release.wait, 5)
+            )
+            queued = asyncio.ensure_future(executor.run(str(nas / "x"), lambda: 1))
+            await asyncio.sleep(0.05)
+
+            local = await asyncio.wait_for(
+                executor.run(str(temp_dir / "local.txt"), lambda: "local"), 1
+            )
+
+            assert local == "local"
+            assert not queued.done()
+            assert executor.stats()[str(nas)]["running"] == 1
+
+            release.set()
+            assert await stalled is True
+            assert await queued == 1
+        finally:
+            release.set()
+            executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_jobs_leave_request_threads_free(self, temp_dir):
+        """Test that long jobs run on their own pool."""
+        executor = IOExecutor(default_workers=1, job_workers=1)
+        release = threading.Event()
+
+        try:
+            job = asyncio.ensure_future(
+                executor.run_job(str(temp_dir / "copy"), release.wait, 5)
+            )
+            await asyncio.sleep(0.05)
+
+            read = await asyncio.wait_for(
+                executor.run(str(temp_dir / "a.txt"), lambda: "read"), 1
+            )
+
+            assert read == "read"
+            stats = executor.stats()[executor.mount_point(str(temp_dir))]
+            assert (stats["running"], stats["jobs"]) == (0, 1)
+
+            release.set()
+            assert await job is True
+        finally:
+            release.set()
+            executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_iterate(self, temp_dir):
+        """Test driving a blocking iterator from the pool."""
+        executor = IOExecutor()
+        main_thread = threading.get_ident()
+
+        def produce():
+            for i in range(3):
+                yield i, threading.get_ident() != main_thread
+
+        try:
+            items = [item async for item in executor.iterate(str(temp_dir), produce())]
+        finally:
+            executor.shutdown()
+
+        assert items == [(0, True), (1, True), (2, True)]
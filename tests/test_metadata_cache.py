@@ -0,0 +1,122 @@
+import pytest
+from pathlib import Path
+import tempfile
+import shutil
+import time
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from storage.metadata_cache import MetadataCache
+from storage.watcher import ChangeWatcher
+
+
+@pytest.fixture
+def temp_dir():
+    temp_path = Path(tempfile.mkdtemp())
+    yield temp_path
+    shutil.rmtree(temp_path, ignore_errors=True)
+
+
+def _polling_watcher() -> ChangeWatcher:
+    watcher = ChangeWatcher()
+    watcher.close()
+    return watcher
+
+
+def _wait_for(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+class TestMetadataCache:
+    """Test the directory metadata cache."""
+
+    def test_repeated_listing_hits_cache(self, temp_dir):
+        """Test that a second listing is served from cache."""
+        (temp_dir / "a.txt").write_text("a")
+        cache = MetadataCache()
+
+        first = cache.get_listing(str(temp_dir))
+        second = cache.get_listing(str(temp_dir))
+
+        assert [item["name"] for item in first] == ["a.txt"]
+        assert second is first
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_inotify_invalidates_on_change(self, temp_dir):
+        """Test that an external change drops the cached listing."""
+        cache = MetadataCache()
+        if not cache.watcher.available:
+            pytest.skip("inotify not available")
+
+        cache.get_listing(str(temp_dir))
+        (temp_dir / "new.txt").write_text("new")
+
+        assert _wait_for(lambda: cache.stats()["invalidations"] > 0)
+        names = [item["name"] for item in cache.get_listing(str(temp_dir))]
+        assert names == ["new.txt"]
+        cache.watcher.close()
+
+    def test_polling_fallback_uses_mtime(self, temp_dir):
+        """Test that without inotify the directory mtime is revalidated."""
+        cache = MetadataCache(watcher=_polling_watcher())
+
+        cache.get_listing(str(temp_dir))
+        time.sleep(0.01)
+        (temp_dir / "new.txt").write_text("new")
+
+        names = [item["name"] for item in cache.get_listing(str(temp_dir))]
+        assert names == ["new.txt"]
+        assert cache.stats()["misses"] == 2
+
+    def test_lru_eviction(self, temp_dir):
+        """Test that the cache is bounded."""
+        cache = MetadataCache(max_entries=2, watcher=_polling_watcher())
+        for name in ["a", "b", "c"]:
+            (temp_dir / name).mkdir()
+            cache.get_listing(str(temp_dir / name))
+
+        stats = cache.stats()
+        assert stats["entries"] == 2
+        assert stats["evictions"] == 1
+
+    def test_explicit_invalidate(self, temp_dir):
+        """Test that invalidate drops the parent listing."""
+        test_file = temp_dir / "a.txt"
+        test_file.write_text("a")
+        cache = MetadataCache(watcher=_polling_watcher())
+
+        cache.get_listing(str(temp_dir))
+        cache.invalidate(str(test_file))
+
+        assert cache.stats()["entries"] == 0
+
+    def test_invalidation_counters_are_bounded(self, temp_dir):
+        """Test that invalidations keep no state once loads are finished."""
+        cache = MetadataCache(watcher=_polling_watcher())
+        cache.get_listing(str(temp_dir))
+        for i in range(100):
+            cache.invalidate(str(temp_dir / f"file-{i}.txt"))
+
+        assert cache._versions == {}
+        assert cache._loading == {}
+
+    def test_load_racing_invalidation_not_stored(self, temp_dir):
+        """Test that a listing invalidated while loading is not cached."""
+        cache = MetadataCache(watcher=_polling_watcher())
+        path = str(temp_dir)
+
+        def loader():
+            cache.invalidate(str(temp_dir / "new.txt"))
+            return []
+
+        cache._get(("listing", path), path, loader)
+
+        assert cache.stats()["entries"] == 0
+        assert cache._versions == {}
@@ -0,0 +1,159 @@
+import pytest
+from fastapi.testclient import TestClient
+from pathlib import Path
+import tempfile
+import shutil
+import os
+import zipfile
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from main import app
+from storage.preview import PreviewCache, build_preview
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def temp_dir():
+    temp_path = Path(tempfile.mkdtemp())
+    yield temp_path
+    shutil.rmtree(temp_path, ignore_errors=True)
+
+
+class TestBuildPreview:
+    """Test preview builders."""
+
+    def test_text_preview(self, temp_dir):
+        """Test that text previews return the first lines only."""
+        path = temp_dir / "notes.md"
+        path.write_text("\n".join(f"line {i}" for i in range(100)))
+
+        preview = build_preview(str(path), lines=3)
+
+        assert preview == {
+            "kind": "text",
+            "lines": ["line 0", "line 1", "line 2"],
+            "truncated": True,
+        }
+
+    def test_xlsx_preview(self, temp_dir):
+        """Test that workbook previews list sheets and top rows."""
+        openpyxl = pytest.importorskip("openpyxl")
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        ws.title = "销售"
+        for i in range(50):
+            ws.append([f"r{i}", i])
+        wb.create_sheet("Summary")
+        path = temp_dir / "book.xlsx"
+        wb.save(path)
+
+        preview = build_preview(str(path), rows=2)
+
+        assert preview["kind"] == "xlsx"
+        assert preview["sheets"] == ["销售", "Summary"]
+        assert preview["rows"] == [["r0", 0], ["r1", 1]]
+
+    def test_pptx_preview(self, temp_dir):
+        """Test that presentation previews list slide titles in order."""
+        pptx = pytest.importorskip("pptx")
+        prs = pptx.Presentation()
+        for title in ("季度汇报", "Roadmap"):
+            slide = prs.slides.add_slide(prs.slide_layouts[1])
+            slide.shapes.title.text = title
+            slide.placeholders[1].text = "body text"
+        prs.slides.add_slide(prs.slide_layouts[6])
+        path = temp_dir / "deck.pptx"
+        prs.save(path)
+
+        preview = build_preview(str(path))
+
+        assert preview == {
+            "kind": "pptx",
+            "slides": 3,
+            "titles": ["季度汇报", "Roadmap", None],
+        }
+
+    def test_unreadable_office_files_have_no_preview(self, temp_dir):
+        """Test that damaged decks and workbooks are reported like binaries."""
+        deck = temp_dir / "broken.pptx"
+        with zipfile.ZipFile(deck, "w") as archive:
+            archive.writestr("[Content_Types].xml", "<Types/>")
+        workbook = temp_dir / "broken.xlsx"
+        workbook.write_bytes(b"not a zip")
+
+        assert build_preview(str(deck)) == {"kind": "none"}
+        assert build_preview(str(workbook)) == {"kind": "none"}
+
+    def test_binary_has_no_preview(self, temp_dir):
+        """Test that unknown binary files are not previewed."""
+        path = temp_dir / "blob.bin"
+        path.write_bytes(b"\x00\x01\x02")
+
+        assert build_preview(str(path)) == {"kind": "none"}
+
+
+class TestPreviewCache:
+    """Test the on-disk preview cache."""
+
+    def test_cache_hit_and_invalidation(self, temp_dir):
+        """Test that previews are reused until the file changes."""
+        cache = PreviewCache(str(temp_dir / "cache"))
+        path = temp_dir / "a.txt"
+        path.write_text("first")
+        calls = []
+
+        def builder(p, **options):
+            calls.append(p)
+            return build_preview(p, **options)
+
+        assert cache.get_or_build(str(path), builder, lines=5)["lines"] == ["first"]
+        assert cache.get_or_build(str(path), builder, lines=5)["lines"] == ["first"]
+        assert len(calls) == 1
+
+        path.write_text("second version")
+        assert cache.get_or_build(str(path), builder, lines=5)["lines"] == [
+            "second version"
+        ]
+        assert len(calls) == 2
+
+    def test_replaced_entry_is_not_counted_twice(self, temp_dir):
+        """Test that storing a key again replaces its size in the total."""
+        cache = PreviewCache(str(temp_dir / "cache"))
+        cache.put("k", {"kind": "text", "lines": ["x" * 100]})
+        size = cache.stats()["bytes"]
+
+        for _ in range(5):
+            cache.put("k", {"kind": "text", "lines": ["x" * 100]})
+
+        assert cache.stats()["bytes"] == size
+
+    def test_cache_is_size_bounded(self, temp_dir):
+        """Test that old entries are evicted past max_bytes."""
+        cache = PreviewCache(str(temp_dir / "cache"), max_bytes=2000)
+
+        for i in range(20):
+            path = temp_dir / f"f{i}.txt"
+            path.write_text(f"{i}" * 300)
+            os.utime(path, (i, i))
+            cache.get_or_build(str(path), build_preview)
+
+        assert cache.stats()["bytes"] <= 2000
+        assert cache.get_or_build(str(temp_dir / "f19.txt"), build_preview)
+        assert cache.stats()["hits"] == 1
+
+
+def test_preview_endpoint(temp_dir):
+    path = temp_dir / "readme.txt"
+    path.write_text("hello\nworld\n")
+
+    response = client.get(f"/api/files/preview?path={path}&lines=1")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["kind"] == "text"
+    assert data["lines"] == ["hello"]
+
+    response = client.get(f"/api/files/preview?path={temp_dir / 'missing.txt'}")
+    assert response.status_code == 404
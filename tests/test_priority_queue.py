@@ -0,0 +1,145 @@
+import pytest
+import asyncio
+from pathlib import Path
+import random
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from core.priority_queue import PRIORITY_RANKS, PriorityTaskQueue
+from core.task_queue import TaskQueue
+from models.task import Task, TaskPriority, TaskStatus
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _task(task_id: str, priority: TaskPriority = TaskPriority.MEDIUM) -> Task:
+    return Task(id=task_id, description=task_id, priority=priority)
+
+
+def _drain(queue: PriorityTaskQueue) -> list:
+    return [queue.pop().id for _ in range(len(queue))]
+
+
+class TestPriorityTaskQueue:
+    """Test priority ordering, aging and updates."""
+
+    def test_priority_then_fifo(self):
+        """Test that higher priorities go first, FIFO within a priority."""
+        queue = PriorityTaskQueue(aging_seconds=None)
+        queue.push(_task("low-1", TaskPriority.LOW))
+        queue.push(_task("medium-1"))
+        queue.push(_task("critical", TaskPriority.CRITICAL))
+        queue.push(_task("low-2", TaskPriority.LOW))
+        queue.push(_task("medium-2"))
+
+        assert queue.peek().id == "critical"
+        assert _drain(queue) == ["critical", "medium-1", "medium-2", "low-1", "low-2"]
+        with pytest.raises(IndexError):
+            queue.pop()
+
+    def test_aging(self):
+        """Test that a long-waiting LOW task overtakes newer CRITICAL ones."""
+        clock = FakeClock()
+        queue = PriorityTaskQueue(aging_seconds=10, clock=clock)
+        queue.push(_task("old-low", TaskPriority.LOW))
+
+        clock.now += 29
+        queue.push(_task("critical-1", TaskPriority.CRITICAL))
+        clock.now += 2
+        queue.push(_task("critical-2", TaskPriority.CRITICAL))
+
+        # Waiting 30s is worth three levels: LOW has caught up with CRITICAL
+        assert _drain(queue) == ["critical-1", "old-low", "critical-2"]
+
+    def test_reprioritize_and_remove(self):
+        """Test updates in the middle of the heap."""
+        queue = PriorityTaskQueue(aging_seconds=None)
+        for i in range(10):
+            queue.push(_task(f"t{i}", TaskPriority.LOW))
+
+        queue.reprioritize("t7", TaskPriority.HIGH)
+        assert queue.remove("t3").id == "t3"
+        assert "t3" not in queue
+        with pytest.raises(KeyError):
+            queue.remove("t3")
+        with pytest.raises(ValueError):
+            queue.push(_task("t1"))
+
+        order = _drain(queue)
+        assert order == ["t7", "t0", "t1", "t2", "t4", "t5", "t6", "t8", "t9"]
+
+    def test_random_operations(self):
+        """Test the heap against a sorted reference under random updates."""
+        rnd = random.Random(3)
+        clock = FakeClock()
+        queue = PriorityTaskQueue(aging_seconds=5, clock=clock)
+        reference = {}
+        priorities = list(TaskPriority)
+
+        for i in range(3000):
+            clock.now += rnd.random()
+            action = rnd.random()
+            if action < 0.5 or not reference:
+                task = _task(f"t{i}", rnd.choice(priorities))
+                queue.push(task)
+                reference[task.id] = [clock.now, PRIORITY_RANKS[task.priority], i]
+            elif action < 0.7:
+                task_id = rnd.choice(list(reference))
+                priority = rnd.choice(priorities)
+                queue.reprioritize(task_id, priority)
+                reference[task_id][1] = PRIORITY_RANKS[priority]
+            elif action < 0.8:
+                task_id = rnd.choice(list(reference))
+                queue.remove(task_id)
+                del reference[task_id]
+            else:
+                expected = min(
+                    reference,
+                    key=lambda t: (
+                        reference[t][0] + reference[t][1] * 5,
+                        reference[t][2],
+                    ),
+                )
+                assert queue.pop().id == expected
+                del reference[expected]
+            assert len(queue) == len(reference)
+
+
+@pytest.mark.asyncio
+async def test_task_queue_starts_by_priority():
+    queue = TaskQueue(max_concurrent=1)
+    release = asyncio.Event()
+    started = []
+
+    async def job(task, report):
+        started.append(task.id)
+        await release.wait()
+        return {}
+
+    for task in (
+        _task("low", TaskPriority.LOW),
+        _task("medium"),
+        _task("dropped"),
+        _task("critical", TaskPriority.CRITICAL),
+    ):
+        await queue.add_task(task, job=job)
+    for _ in range(5):
+        await asyncio.sleep(0)
+    assert started == ["critical"]
+
+    assert await queue.reprioritize_task("low", TaskPriority.HIGH)
+    assert (await queue.remove_task("dropped")).status == TaskStatus.CANCELLED
+    assert await queue.remove_task("dropped") is None
+    assert [task.id for task in queue.queue] == ["low", "medium"]
+
+    release.set()
+    await queue.join()
+    assert started == ["critical", "low", "medium"]
+    await queue.shutdown()
@@ -0,0 +1,108 @@
+import pytest
+import asyncio
+from pathlib import Path
+import tempfile
+import shutil
+import time
+import os
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from core.process_pool import CPUJob, CPUPool, generate_document
+from core.task_executor import TaskExecutor
+from models.task import Task, TaskStatus
+
+
+def burn(seconds: float) -> dict:
+    """Keep a core busy, like an openpyxl cell loop."""
+    deadline = time.perf_counter() + seconds
+    count = 0
+    while time.perf_counter() < deadline:
+        count += 1
+    return {"pid": os.getpid(), "iterations": count}
+
+
+def square(value: int) -> int:
+    return value * value
+
+
+@pytest.fixture
+def pool():
+    pool = CPUPool(max_workers=2)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_pool_runs_in_workers(pool):
+    assert await pool.warm() >= 1
+
+    result = await pool.run(burn, 0.01)
+    assert result["pid"] != os.getpid()
+    assert await pool.run(square, 12) == 144
+
+    temp_dir = Path(tempfile.mkdtemp())
+    try:
+        output = str(temp_dir / "notes.md")
+        result = await pool.run(
+            generate_document,
+            "generators.document_generator.MarkdownGenerator",
+            "# 会议纪要\n",
+            output,
+        )
+        assert result == {"success": True, "output_path": output}
+        assert Path(output).read_text(encoding="utf-8") == "# 会议纪要\n"
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@pytest.mark.asyncio
+async def test_cpu_subtasks_do_not_block_loop(pool):
+    await pool.warm()
+    executor = TaskExecutor(cpu_pool=pool)
+    task = Task(
+        id="export",
+        description="Export",
+        subtasks=[
+            Task(id="sheet-1", description="Sheet 1"),
+            Task(id="sheet-2", description="Sheet 2"),
+            Task(id="sheet-3", description="Sheet 3"),
+            Task(id="notify", description="Notify"),
+            Task(id="square", description="Square", dependencies=["sheet-1"]),
+        ],
+    )
+    jobs = {
+        "sheet-1": CPUJob(burn, 0.3),
+        "sheet-2": CPUJob(burn, 0.3),
+        "sheet-3": CPUJob(burn, 0.3),
+        "square": CPUJob(square, 7),
+    }
+
+    gaps = []
+
+    async def ticker():
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(0.01)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+
+    ticking = asyncio.create_task(ticker())
+    await executor.execute_task(task, subtask_jobs=jobs)
+    ticking.cancel()
+
+    assert task.status == TaskStatus.COMPLETED
+    # The event loop kept running while the sheets were built
+    assert max(gaps) < 0.2
+
+    results = {
+        r["task_id"]: r for r in executor.get_task_result("export")["subtask_results"]
+    }
+    assert results["sheet-1"]["pid"] != os.getpid()
+    assert results["square"]["result"] == 49
+    # I/O subtasks keep the default behaviour
+    assert results["notify"]["description"] == "Notify"
+
+    await executor.cleanup()
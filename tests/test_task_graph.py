@@ -0,0 +1,146 @@
+import pytest
+from pathlib import Path
+import time
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from core.task_executor import TaskExecutor
+from core.task_graph import TaskGraph, TaskGraphError
+from models.task import Task, TaskStatus
+
+
+def _task(task_id: str, *dependencies: str) -> Task:
+    return Task(id=task_id, description=task_id, dependencies=list(dependencies))
+
+
+class TestTaskGraph:
+    """Test dependency layering and validation."""
+
+    def test_layers(self):
+        """Test that subtasks are layered by their longest dependency chain."""
+        graph = TaskGraph(
+            [
+                _task("a"),
+                _task("b"),
+                _task("c", "a", "b"),
+                _task("d", "a"),
+                _task("e", "c", "d", "parent"),
+            ]
+        )
+        assert graph.layers == [["a", "b"], ["c", "d"], ["e"]]
+        assert graph.roots() == ["a", "b"]
+        assert graph.depth() == 3
+
+    def test_cycle(self):
+        """Test that cycles and duplicate IDs are rejected up front."""
+        with pytest.raises(TaskGraphError, match="b, c"):
+            TaskGraph([_task("a"), _task("b", "a", "c"), _task("c", "b")])
+
+        with pytest.raises(TaskGraphError, match="Duplicate"):
+            TaskGraph([_task("a"), _task("a")])
+
+
+class TestDagExecution:
+    """Test concurrent subtask execution."""
+
+    @pytest.mark.asyncio
+    async def test_wide_plan_runs_concurrently(self):
+        """Test that a wide plan takes about as long as its critical path."""
+        executor = TaskExecutor(max_parallel_subtasks=8)
+        subtasks = [_task("setup")]
+        subtasks += [_task(f"part-{i}", "setup") for i in range(8)]
+        subtasks.append(_task("merge", *(f"part-{i}" for i in range(8))))
+        task = Task(id="wide", description="Wide plan", subtasks=subtasks)
+
+        progress = []
+        started = time.perf_counter()
+        await executor.execute_task(task, lambda _, p: progress.append(p))
+        elapsed = time.perf_counter() - started
+
+        result = executor.get_task_result("wide")
+        assert task.status == TaskStatus.COMPLETED
+        assert result["completed_subtasks"] == 10
+        assert result["critical_path"] == 3
+        # Each subtask takes 0.2s; sequentially this would be 2s
+        assert elapsed < 1.2
+        assert progress == sorted(progress)
+        assert progress[-1] == pytest.approx(100)
+
+        await executor.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_parallel_limit(self):
+        """Test that no more than max_parallel_subtasks run at once."""
+        executor = TaskExecutor(max_parallel_subtasks=2)
+        running = []
+        peak = []
+        single = executor._execute_single_task
+
+        async def tracked(subtask, progress_callback=None):
+            running.append(subtask.id)
+            peak.append(len(running))
+            try:
+                return await single(subtask, progress_callback)
+            finally:
+                running.remove(subtask.id)
+
+        executor._execute_single_task = tracked
+        task = Task(
+            id="limited",
+            description="Limited plan",
+            subtasks=[_task(f"part-{i}") for i in range(6)],
+        )
+        await executor.execute_task(task)
+
+        assert executor.get_task_result("limited")["completed_subtasks"] == 6
+        assert max(peak) == 2
+
+        await executor.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_failure_skips_dependents(self):
+        """Test that subtasks after a failed subtask do not run."""
+        executor = TaskExecutor()
+        single = executor._execute_single_task
+
+        async def flaky(subtask, progress_callback=None):
+            if subtask.id == "b":
+                raise RuntimeError("disk full")
+            return await single(subtask, progress_callback)
+
+        executor._execute_single_task = flaky
+        task = Task(
+            id="failing",
+            description="Failing plan",
+            subtasks=[_task("a"), _task("b"), _task("c", "b"), _task("d", "a")],
+        )
+        await executor.execute_task(task)
+
+        result = executor.get_task_result("failing")
+        assert task.status == TaskStatus.FAILED
+        outcomes = {r["task_id"]: r for r in result["subtask_results"]}
+        assert outcomes["a"]["success"] and outcomes["d"]["success"]
+        assert outcomes["b"]["error"] == "disk full"
+        assert outcomes["c"]["skipped"]
+        assert result["skipped_subtasks"] == 1
+
+        await executor.cleanup()
+
+    @pytest.mark.asyncio
+    async def test_cycle_fails_task(self):
+        """Test that a cyclic plan fails without running any subtask."""
+        executor = TaskExecutor()
+        task = Task(
+            id="cyclic",
+            description="Cyclic plan",
+            subtasks=[_task("a", "b"), _task("b", "a")],
+        )
+        await executor.execute_task(task)
+
+        assert task.status == TaskStatus.FAILED
+        assert "cycle" in executor.get_task_result("cyclic")["error"]
+        logs = executor.get_task_logs("cyclic")
+        assert not any("Executing subtask" in log["message"] for log in logs)
+
+        await executor.cleanup()
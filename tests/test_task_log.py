@@ -0,0 +1,160 @@
+import pytest
+import asyncio
+import json
+from fastapi.testclient import TestClient
+from pathlib import Path
+import tempfile
+import shutil
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from main import app
+from storage.task_log import MAX_MESSAGE_LENGTH, TaskLogStore
+
+
+@pytest.fixture
+def temp_dir():
+    temp_path = Path(tempfile.mkdtemp())
+    yield temp_path
+    shutil.rmtree(temp_path, ignore_errors=True)
+
+
+def messages(records):
+    return [record["message"] for record in records]
+
+
+def test_ring_spills_to_segments(temp_dir):
+    logs = TaskLogStore(str(temp_dir), capacity=8, segment_bytes=200)
+    for i in range(50):
+        logs.append("t", f"step {i}", "error" if i % 10 == 0 else "info")
+
+    ring = logs._rings["t"]
+    # Memory is capped; the rest went to disk in batches
+    assert ring.next - ring.first <= 8
+    logs.flush()
+    assert len(list((temp_dir / "t").glob("*.log"))) > 1
+    assert logs.size("t") == 50
+
+    records, next_offset = logs.read("t")
+    assert messages(records) == [f"step {i}" for i in range(50)]
+    assert [r["seq"] for r in records] == list(range(50))
+    assert next_offset == 50
+
+    records, next_offset = logs.read("t", offset=3, limit=5)
+    assert messages(records) == [f"step {i}" for i in range(3, 8)]
+    assert next_offset == 8
+
+    records, _ = logs.read("t", level="error")
+    assert messages(records) == ["step 0", "step 10", "step 20", "step 30", "step 40"]
+    assert records[0]["level"] == "error"
+
+    records, _ = logs.read("t", offset=-2)
+    assert messages(records) == ["step 48", "step 49"]
+    assert logs.read("unknown") == ([], 0)
+
+
+def test_messages_interned_and_truncated(temp_dir):
+    logs = TaskLogStore(capacity=4, keep_finished=1)
+    for i in range(10):
+        logs.append("t", "".join(["Hashed ", "files"]))
+    logs.append("t", "x" * 5000)
+
+    ring = logs._rings["t"]
+    first, second = ring.messages[7 % 4], ring.messages[8 % 4]
+    assert first is second
+    # Without a spill directory only the newest records are kept
+    records, _ = logs.read("t")
+    assert [r["seq"] for r in records] == [7, 8, 9, 10]
+    assert len(records[-1]["message"]) == MAX_MESSAGE_LENGTH
+
+    # Finished rings are kept up to keep_finished, then only their count
+    logs.release("t")
+    assert logs.read("t")[1] == 11
+    logs.append("u", "other")
+    logs.release("u")
+    assert list(logs._rings) == ["u"]
+    assert logs.size("t") == 11
+    assert logs.read("t") == ([], 11)
+
+    # So are the record counts, up to keep_released
+    logs.keep_released = 1
+    logs.append("v", "third")
+    logs.release("v")
+    assert list(logs._released) == ["u"]
+
+
+def test_logs_survive_restart(temp_dir):
+    logs = TaskLogStore(str(temp_dir), capacity=4)
+    for i in range(6):
+        logs.append("task/1", f"line {i}")
+    logs.release("task/1")
+    assert "task/1" not in logs._rings
+    assert messages(logs.read("task/1", offset=4)[0]) == ["line 4", "line 5"]
+    logs.append("task/1", "line 6")
+    logs.close()
+
+    reopened = TaskLogStore(str(temp_dir), capacity=4)
+    assert reopened.size("task/1") == 7
+    # The segments are scanned once, not on every read
+    assert reopened._released == {"task/1": 7}
+    # Unknown ids are not remembered
+    assert reopened.read("missing") == ([], 0)
+    assert reopened._released == {"task/1": 7}
+    reopened.append("task/1", "line 7")
+    records, _ = reopened.read("task/1")
+    assert messages(records) == [f"line {i}" for i in range(8)]
+    assert [r["seq"] for r in records] == list(range(8))
+
+
+@pytest.mark.asyncio
+async def test_wait_for_new_records():
+    logs = TaskLogStore()
+    logs.append("t", "first")
+    assert await logs.wait("t", 0, timeout=1)
+    assert not await logs.wait("t", 1, timeout=0.05)
+
+    waiting = asyncio.ensure_future(logs.wait("t", 1, timeout=5))
+    await asyncio.sleep(0)
+    assert not waiting.done()
+    logs.append("t", "second")
+    assert await waiting
+    assert logs._waiters == {}
+
+
+def test_log_api_pages_and_follows():
+    with TestClient(app) as client:
+        task_id = client.post("/api/tasks/", json={"description": "生成周报"}).json()[
+            "task"
+        ]["id"]
+        client.post(f"/api/tasks/{task_id}/execute")
+
+        body = client.get(f"/api/tasks/{task_id}/logs", params={"limit": 2}).json()
+        assert [r["seq"] for r in body["logs"]] == [0, 1]
+        assert body["next_offset"] == 2
+
+        body = client.get(
+            f"/api/tasks/{task_id}/logs", params={"offset": body["next_offset"]}
+        ).json()
+        assert body["logs"][-1]["message"] == "Task completed successfully"
+        total = body["next_offset"]
+
+        task = client.get(f"/api/tasks/{task_id}").json()
+        assert task["log_count"] == total
+        assert task["logs"][-1]["seq"] == total - 1
+
+        body = client.get(
+            f"/api/tasks/{task_id}/logs", params={"level": "warning"}
+        ).json()
+        assert body["logs"] == []
+
+        # The task has finished, so following ends after the backlog
+        response = client.get(
+            f"/api/tasks/{task_id}/logs", params={"offset": -1, "follow": True}
+        )
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [r["seq"] for r in lines] == [total - 1]
+
+        response = client.get("/api/tasks/missing/logs", params={"follow": True})
+        assert response.status_code == 404
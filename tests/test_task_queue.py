@@ -1,13 +1,32 @@
 import pytest
+import asyncio
 from pathlib import Path
 import sys
 
-sys.path.insert(0, str(Path(__file__).parent / "src" / "backend"))
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
 
-from core.task_queue import TaskQueue
+from core.task_queue import QueueClosedError, QueueFullError, TaskQueue
 from models.task import Task, TaskStatus, TaskPriority
 
 
+class Gate:
+    """Job that runs until released, recording which tasks started."""
+
+    def __init__(self):
+        self.started = []
+        self.release = asyncio.Event()
+
+    async def __call__(self, task, report):
+        self.started.append(task.id)
+        await self.release.wait()
+        return {"task_id": task.id}
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
 class TestTaskQueue:
     """Test task queue system."""
 
@@ -25,55 +44,78 @@ class TestTaskQueue:
         assert status["pending"] == 1
         assert status["running"] == 0
 
+        await queue.join()
+        status = await queue.get_status()
+        assert status["pending"] == 0
+        assert status["completed"] == 1
+        assert task1.status == TaskStatus.COMPLETED
+
+        await queue.shutdown()
+
     @pytest.mark.asyncio
     async def test_add_multiple_tasks(self):
         """Test adding multiple tasks."""
         queue = TaskQueue(max_concurrent=2)
+        gate = Gate()
 
         task1 = Task(id="1", description="Task 1")
         task2 = Task(id="2", description="Task 2")
         task3 = Task(id="3", description="Task 3")
 
-        await queue.add_task(task1)
-        await queue.add_task(task2)
-        await queue.add_task(task3)
+        await queue.add_task(task1, job=gate)
+        await queue.add_task(task2, job=gate)
+        await queue.add_task(task3, job=gate)
 
-        await asyncio.sleep(2.5)
+        await _settle()
 
         status = await queue.get_status()
         assert status["pending"] == 1
         assert status["running"] == 2
-        assert status["completed"] == 1
+        assert status["completed"] == 0
+
+        gate.release.set()
+        await queue.join()
+        assert (await queue.get_status())["completed"] == 3
+
+        await queue.shutdown()
 
     @pytest.mark.asyncio
     async def test_concurrent_limit(self):
         """Test max concurrent limit."""
         queue = TaskQueue(max_concurrent=2)
+        gate = Gate()
 
         for i in range(5):
             task = Task(id=f"{i}", description=f"Task {i}")
-            await queue.add_task(task)
+            await queue.add_task(task, job=gate)
 
-        await asyncio.sleep(3)
+        await _settle()
 
         status = await queue.get_status()
         assert status["pending"] == 3
         assert status["running"] == 2
-        assert status["completed"] == 2
+        assert gate.started == ["0", "1"]
+
+        gate.release.set()
+        await queue.join()
+        assert len(gate.started) == 5
+
+        await queue.shutdown()
 
     @pytest.mark.asyncio
     async def test_get_completed_tasks(self):
         """Test retrieving completed tasks."""
         queue = TaskQueue(max_concurrent=2)
+        gate = Gate()
 
         task1 = Task(id="1", description="Task 1")
         task2 = Task(id="2", description="Task 2")
 
         await queue.add_task(task1)
-        await asyncio.sleep(2)
+        await queue.join()
 
-        task2_id = await queue.add_task(task2)
-        await asyncio.sleep(1.5)
+        await queue.add_task(task2, job=gate)
+        await _settle()
 
         status = await queue.get_status()
         assert status["completed"] == 1
@@ -82,19 +124,43 @@ class TestTaskQueue:
         assert len(completed_tasks) == 1
         assert completed_tasks[0].id == "1"
 
+        gate.release.set()
+        await queue.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_finished_tasks_are_bounded(self):
+        """Test that only the newest finished tasks are kept."""
+        queue = TaskQueue(max_concurrent=2, max_finished=3)
+
+        for i in range(10):
+            await queue.add_task(Task(id=str(i), description=f"Task {i}"))
+        await queue.join()
+
+        status = await queue.get_status()
+        assert status["completed"] == 10
+        completed = [task.id for task in await queue.get_completed_tasks()]
+        assert len(completed) == 3
+
+        await queue.shutdown()
+
     @pytest.mark.asyncio
     async def test_get_running_tasks(self):
         """Test retrieving running tasks."""
         queue = TaskQueue(max_concurrent=2)
+        gate = Gate()
 
         task1 = Task(id="1", description="Task 1")
-        await queue.add_task(task1)
+        await queue.add_task(task1, job=gate)
 
-        await asyncio.sleep(0.5)
+        await _settle()
 
         running_tasks = await queue.get_running_tasks()
         assert len(running_tasks) == 1
         assert running_tasks[0].id == "1"
+        assert running_tasks[0].status == TaskStatus.IN_PROGRESS
+
+        gate.release.set()
+        await queue.shutdown()
 
     @pytest.mark.asyncio
     async def test_queue_status(self):
@@ -106,3 +172,112 @@ class TestTaskQueue:
         assert status["pending"] == 0
         assert status["running"] == 0
         assert status["completed"] == 0
+
+
+class TestWorkerPool:
+    """Test backpressure, cancellation, shutdown and metrics."""
+
+    @pytest.mark.asyncio
+    async def test_backpressure(self):
+        """Test that a full queue blocks producers or rejects tasks."""
+        queue = TaskQueue(max_concurrent=1, max_pending=2)
+        gate = Gate()
+        for i in range(2):
+            await queue.add_task(Task(id=f"{i}", description="t"), job=gate)
+        await _settle()
+        # One running, one waiting: there is room for one more
+        await queue.add_task(Task(id="x", description="t"), job=gate, block=False)
+
+        with pytest.raises(QueueFullError):
+            await queue.add_task(Task(id="y", description="t"), block=False)
+        with pytest.raises(QueueFullError):
+            await queue.add_task(Task(id="y", description="t"), timeout=0.05)
+
+        blocked = asyncio.ensure_future(
+            queue.add_task(Task(id="y", description="t"), job=gate)
+        )
+        await _settle()
+        assert not blocked.done()
+
+        gate.release.set()
+        assert await blocked == "y"
+        await queue.join()
+        assert (await queue.get_status())["completed"] == 4
+
+        await queue.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_cancel(self):
+        """Test cancelling running and pending tasks."""
+        queue = TaskQueue(max_concurrent=1)
+        gate = Gate()
+        running = Task(id="running", description="t")
+        pending = Task(id="pending", description="t")
+        await queue.add_task(running, job=gate)
+        await queue.add_task(pending, job=gate)
+        await _settle()
+
+        assert await queue.cancel_task("pending")
+        assert await queue.cancel_task("running")
+        assert not await queue.cancel_task("unknown")
+        await queue.join()
+
+        assert running.status == TaskStatus.CANCELLED
+        assert pending.status == TaskStatus.CANCELLED
+        assert gate.started == ["running"]
+        status = await queue.get_status()
+        assert status["cancelled"] == 2
+        assert status["completed"] == 0
+
+        # The worker survived the cancellation
+        gate.release.set()
+        await queue.add_task(Task(id="next", description="t"), job=gate)
+        await queue.join()
+        assert (await queue.get_status())["completed"] == 1
+
+        await queue.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_shutdown(self):
+        """Test draining and immediate shutdown."""
+        queue = TaskQueue(max_concurrent=2)
+        for i in range(4):
+            await queue.add_task(Task(id=f"{i}", description="t"))
+        await queue.shutdown(wait=True)
+        assert (await queue.get_status())["completed"] == 4
+        with pytest.raises(QueueClosedError):
+            await queue.add_task(Task(id="late", description="t"))
+
+        queue = TaskQueue(max_concurrent=1)
+        gate = Gate()
+        for i in range(3):
+            await queue.add_task(Task(id=f"{i}", description="t"), job=gate)
+        await _settle()
+        await queue.shutdown(wait=False)
+
+        status = await queue.get_status()
+        assert status["cancelled"] == 3
+        assert status["running"] == 0
+        assert gate.started == ["0"]
+
+    @pytest.mark.asyncio
+    async def test_metrics(self):
+        """Test that queue wait and run time are reported separately."""
+        queue = TaskQueue(max_concurrent=1)
+
+        async def slow(task, report):
+            await asyncio.sleep(0.05)
+            return {}
+
+        for i in range(3):
+            await queue.add_task(Task(id=f"{i}", description="t"), job=slow)
+        await queue.join()
+
+        status = await queue.get_status()
+        assert status["run_time"]["count"] == 3
+        assert status["run_time"]["avg_ms"] >= 50
+        # The last task waited for the two before it
+        assert status["queue_wait"]["max_ms"] >= 100
+        assert status["queue_wait"]["avg_ms"] < status["queue_wait"]["max_ms"]
+
+        await queue.shutdown()
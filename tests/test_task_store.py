@@ -0,0 +1,172 @@
+import pytest
+import asyncio
+from datetime import datetime, timedelta
+from pathlib import Path
+import tempfile
+import shutil
+import threading
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from core.task_executor import TaskExecutor
+from core.task_planner import TaskPlanner
+from models.task import Task, TaskPriority, TaskStatus
+from storage.task_log import TaskLogStore
+from storage.task_store import MemoryTaskStore, SQLiteTaskStore
+
+
+@pytest.fixture
+def temp_dir():
+    temp_path = Path(tempfile.mkdtemp())
+    yield temp_path
+    shutil.rmtree(temp_path, ignore_errors=True)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, temp_dir):
+    if request.param == "memory":
+        yield MemoryTaskStore()
+    else:
+        store = SQLiteTaskStore(str(temp_dir / "tasks.db"))
+        yield store
+        store.close()
+
+
+def test_store_roundtrip(store):
+    base = datetime(2024, 5, 1)
+    for i, (status, priority) in enumerate(
+        [
+            (TaskStatus.PENDING, TaskPriority.HIGH),
+            (TaskStatus.COMPLETED, TaskPriority.LOW),
+            (TaskStatus.PENDING, TaskPriority.LOW),
+        ]
+    ):
+        store.save_task(
+            Task(
+                id=f"task-{i}",
+                description=f"任务 {i}",
+                status=status,
+                priority=priority,
+                created_at=base + timedelta(hours=i),
+            )
+        )
+
+    assert store.get_task("task-1").description == "任务 1"
+    assert store.get_task("missing") is None
+    assert store.count_tasks() == 3
+
+    listed = store.list_tasks(status=TaskStatus.PENDING)
+    assert [t.id for t in listed] == ["task-0", "task-2"]
+    listed = store.list_tasks(priority=TaskPriority.LOW, limit=1)
+    assert [t.id for t in listed] == ["task-1"]
+    listed = store.list_tasks(created_after=base)
+    assert [t.id for t in listed] == ["task-1", "task-2"]
+
+    store.set_state("task-0", "running")
+    store.set_state("task-0", "completed")
+    store.set_result("task-0", {"success": True, "files": ["a.md"]})
+
+    assert store.get_state("task-0") == "completed"
+    assert store.state_ids() == ["task-0"]
+    assert store.get_result("task-0") == {"success": True, "files": ["a.md"]}
+    assert store.get_result("task-1") is None
+
+
+def test_sqlite_survives_restart(temp_dir):
+    path = str(temp_dir / "tasks.db")
+    store = SQLiteTaskStore(path, cache_size=0)
+    store.save_task(Task(id="done", description="done"))
+    store.set_state("done", "completed")
+    store.save_task(Task(id="busy", description="busy", status=TaskStatus.IN_PROGRESS))
+    store.set_state("busy", "running")
+    store.close()
+
+    reopened = SQLiteTaskStore(path)
+    assert reopened.get_state("done") == "completed"
+    # Tasks running at shutdown are failed, not left running forever
+    assert reopened.get_state("busy") == "failed"
+    assert reopened.get_task("busy").status == TaskStatus.FAILED
+    assert reopened.get_result("busy") == {
+        "success": False,
+        "error": "Interrupted by a restart",
+    }
+
+    # Planner numbering continues after the stored tasks
+    assert TaskPlanner(store=reopened).register_task("next").id == "task-3"
+    reopened.close()
+
+
+def test_sqlite_group_commit(temp_dir):
+    store = SQLiteTaskStore(str(temp_dir / "tasks.db"), flush_interval=10)
+
+    def writer(n):
+        for i in range(200):
+            store.set_state(f"{n}-{i}", "running")
+            store.set_state(f"{n}-{i}", "completed")
+            store.set_result(f"{n}-{i}", {"success": True})
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Readable before commit, and committed by flush
+    assert store.get_state("3-199") == "completed"
+    assert store.get_result("0-0") == {"success": True}
+    store.flush()
+    stats = store.stats()
+    assert stats["committed"] == stats["written"] == 2400
+    assert len(store.state_ids()) == 800
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_executor_uses_store(temp_dir):
+    store = SQLiteTaskStore(str(temp_dir / "tasks.db"))
+    planner = TaskPlanner(store=store)
+    executor = TaskExecutor(store=store)
+
+    task = await planner.plan_task("生成周报")
+    await executor.execute_task(task)
+
+    assert "task-1" in executor.task_states
+    assert executor.task_states["task-1"] == "completed"
+    store.close()
+
+    reopened = SQLiteTaskStore(str(temp_dir / "tasks.db"))
+    executor = TaskExecutor(store=reopened)
+    assert reopened.get_task("task-1").status == TaskStatus.COMPLETED
+    assert reopened.list_tasks(status=TaskStatus.COMPLETED)[0].id == "task-1"
+    assert executor.get_task_result("task-1")["completed_subtasks"] == 3
+    reopened.close()
+    await executor.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_cleanup_records_cancelled_tasks(temp_dir):
+    store = SQLiteTaskStore(str(temp_dir / "tasks.db"))
+    logs = TaskLogStore(str(temp_dir / "logs"))
+    executor = TaskExecutor(store=store, logs=logs)
+    started = asyncio.Event()
+
+    async def job(task, report):
+        started.set()
+        await asyncio.sleep(60)
+
+    task = Task(id="long", description="long running")
+    store.save_task(task)
+    executor.start_task(task, job=job)
+    await started.wait()
+    await executor.cleanup()
+    store.close()
+
+    # The cancelled handler ran before the stores were closed
+    reopened = SQLiteTaskStore(str(temp_dir / "tasks.db"))
+    assert reopened.get_state("long") == "cancelled"
+    messages = [
+        r["message"] for r in TaskLogStore(str(temp_dir / "logs")).read("long")[0]
+    ]
+    assert messages[-1] == "Task was cancelled"
+    reopened.close()
@@ -0,0 +1,180 @@
+import pytest
+from fastapi.testclient import TestClient
+from pathlib import Path
+import tempfile
+import shutil
+import errno
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from main import app
+from storage.transfer import (
+    TransferCancelled,
+    TransferJob,
+    copy_partial_path,
+)
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def temp_dir():
+    temp_path = Path(tempfile.mkdtemp()).resolve()
+    yield temp_path
+    shutil.rmtree(temp_path, ignore_errors=True)
+
+
+def _make_tree(root: Path) -> dict:
+    rnd = random.Random(3)
+    files = {}
+    for d in range(4):
+        folder = root / f"dir{d}" / "sub"
+        folder.mkdir(parents=True)
+        for f in range(5):
+            data = rnd.randbytes(rnd.randint(0, 50_000))
+            (folder / f"f{f}.bin").write_bytes(data)
+            files[f"dir{d}/sub/f{f}.bin"] = data
+    big = rnd.randbytes(3 * 1024 * 1024)
+    (root / "big.bin").write_bytes(big)
+    files["big.bin"] = big
+    os.symlink("big.bin", root / "link")
+    return files
+
+
+def _assert_copied(source: Path, destination: Path, files: dict) -> None:
+    for relative, data in files.items():
+        copied = destination / relative
+        assert copied.read_bytes() == data
+        assert copied.stat().st_mtime_ns == (source / relative).stat().st_mtime_ns
+    assert os.readlink(destination / "link") == "big.bin"
+    assert not list(destination.rglob("*.smartwork-copy"))
+
+
+class TestTransferJob:
+    """Test kernel copies, moves and resume."""
+
+    def test_copy_tree(self, temp_dir):
+        """Test that a folder is copied with contents, links and times."""
+        files = _make_tree(temp_dir / "src")
+        events = []
+        job = TransferJob(
+            str(temp_dir / "src"), str(temp_dir / "dst"), progress_interval=0
+        )
+        summary = job.run(events.append)
+
+        _assert_copied(temp_dir / "src", temp_dir / "dst", files)
+        assert summary["files_done"] == summary["files_total"] == 22
+        assert summary["bytes_done"] == summary["bytes_total"]
+        assert events[-1]["bytes_done"] == summary["bytes_total"]
+        assert "read_write" not in summary["methods"]
+
+        with pytest.raises(FileExistsError):
+            TransferJob(str(temp_dir / "src"), str(temp_dir / "dst")).run()
+
+    def test_resume_after_cancel(self, temp_dir):
+        """Test that an interrupted copy continues where it stopped."""
+        files = _make_tree(temp_dir / "src")
+        # A partial copy of the big file, as left by an interrupted run
+        (temp_dir / "dst").mkdir()
+        partial = copy_partial_path(str(temp_dir / "dst" / "big.bin"))
+        Path(partial).write_bytes(files["big.bin"][:1_000_000])
+
+        job = TransferJob(
+            str(temp_dir / "src"),
+            str(temp_dir / "dst"),
+            resume=True,
+            max_workers=1,
+            progress_interval=0,
+        )
+        with pytest.raises(TransferCancelled):
+            job.run(lambda progress: progress["files_done"] >= 5 and job.cancel())
+        assert 0 < job.files_done < 22
+
+        summary = TransferJob(
+            str(temp_dir / "src"), str(temp_dir / "dst"), resume=True
+        ).run()
+        _assert_copied(temp_dir / "src", temp_dir / "dst", files)
+        assert summary["skipped_files"] >= 1
+
+    def test_resume_partial_file(self, temp_dir):
+        """Test that a partial file is extended rather than recopied."""
+        data = random.Random(4).randbytes(2_000_000)
+        (temp_dir / "a.bin").write_bytes(data)
+        partial = copy_partial_path(str(temp_dir / "b.bin"))
+        Path(partial).write_bytes(data[:500_000])
+
+        summary = TransferJob(
+            str(temp_dir / "a.bin"), str(temp_dir / "b.bin"), resume=True
+        ).run()
+        assert summary["resumed_bytes"] == 500_000
+        assert (temp_dir / "b.bin").read_bytes() == data
+
+        # A partial file older than a changed source is discarded
+        Path(partial).write_bytes(b"stale")
+        os.utime(partial, ns=(0, 0))
+        summary = TransferJob(
+            str(temp_dir / "a.bin"), str(temp_dir / "c.bin"), resume=True
+        ).run()
+        assert summary["resumed_bytes"] == 0
+
+    def test_sendfile_fallback(self, temp_dir, monkeypatch):
+        """Test that copies fall back when copy_file_range is unsupported."""
+
+        def unsupported(*args):
+            raise OSError(errno.EXDEV, "cross-device")
+
+        monkeypatch.setattr(os, "copy_file_range", unsupported, raising=False)
+        data = random.Random(5).randbytes(100_000)
+        (temp_dir / "a.bin").write_bytes(data)
+
+        job = TransferJob(str(temp_dir / "a.bin"), str(temp_dir / "b.bin"))
+        monkeypatch.setattr("storage.transfer._reflink", lambda src, dst: False)
+        summary = job.run()
+        assert summary["methods"] == {"sendfile": 1}
+        assert (temp_dir / "b.bin").read_bytes() == data
+
+    def test_move_renames(self, temp_dir):
+        """Test that a move within a filesystem is a rename."""
+        files = _make_tree(temp_dir / "src")
+        summary = TransferJob(
+            str(temp_dir / "src"), str(temp_dir / "moved" / "dst"), move=True
+        ).run()
+
+        assert summary["renamed"]
+        assert not (temp_dir / "src").exists()
+        assert (temp_dir / "moved" / "dst" / "big.bin").read_bytes() == files["big.bin"]
+
+
+def test_copy_endpoint(temp_dir):
+    files = _make_tree(temp_dir / "src")
+    request = {
+        "source": str(temp_dir / "src"),
+        "destination": str(temp_dir / "dst"),
+        "stream": True,
+    }
+    response = client.post("/api/files/copy", json=request)
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[-1]["type"] == "done"
+    assert lines[-1]["files_done"] == 22
+    _assert_copied(temp_dir / "src", temp_dir / "dst", files)
+
+    response = client.post("/api/files/copy", json=request)
+    assert response.status_code == 409
+
+    response = client.post(
+        "/api/files/move",
+        json={"source": str(temp_dir / "dst"), "destination": str(temp_dir / "b")},
+    )
+    assert response.status_code == 200
+    assert response.json()["renamed"]
+
+    response = client.post(
+        "/api/files/move",
+        json={"source": str(temp_dir / "dst"), "destination": str(temp_dir / "c")},
+    )
+    assert response.status_code == 404
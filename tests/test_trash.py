@@ -0,0 +1,226 @@
+import pytest
+import errno
+import os
+from fastapi.testclient import TestClient
+from pathlib import Path
+import tempfile
+import shutil
+import json
+import time
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+import api.file_system as fs_api
+from main import app
+from storage.content_index import ContentIndex
+from storage.file_index import FileIndex
+from storage.listing import iter_entries
+from storage.trash import PURGING, VOLUME_TRASH_NAME, TrashManager
+from storage.tree import TreeAggregator
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def temp_dir():
+    temp_path = Path(tempfile.mkdtemp()).resolve()
+    yield temp_path
+    shutil.rmtree(temp_path, ignore_errors=True)
+
+
+def _make_tree(root: Path, dirs: int = 5, files: int = 20) -> None:
+    for d in range(dirs):
+        folder = root / f"pkg{d}" / "lib"
+        folder.mkdir(parents=True)
+        for f in range(files):
+            (folder / f"m{f}.js").write_text("module.exports = 1;\n")
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+class TestTrashManager:
+    """Test trash, restore and background purge."""
+
+    def test_trash_and_restore(self, temp_dir):
+        """Test that trashed folders can be moved back unchanged."""
+        trash = TrashManager(str(temp_dir / "trash"))
+        target = temp_dir / "node_modules"
+        _make_tree(target)
+
+        entry = trash.trash(str(target))
+        assert not target.exists()
+        assert entry["state"] == "trashed"
+
+        trash.restore(entry["id"])
+        assert len(list(target.rglob("*.js"))) == 100
+        assert trash.entries() == []
+        trash.close()
+
+    def test_restore_conflict(self, temp_dir):
+        """Test that restore refuses to overwrite a new file."""
+        trash = TrashManager(str(temp_dir / "trash"))
+        target = temp_dir / "a.txt"
+        target.write_text("old")
+        entry = trash.trash(str(target))
+        target.write_text("new")
+
+        with pytest.raises(FileExistsError):
+            trash.restore(entry["id"])
+        assert target.read_text() == "new"
+        trash.close()
+
+    def test_throttled_purge(self, temp_dir):
+        """Test that purging honours the rate limit and reports progress."""
+        trash = TrashManager(str(temp_dir / "trash"), max_ops_per_second=500)
+        target = temp_dir / "big"
+        _make_tree(target)
+
+        entry = trash.trash(str(target))
+        started = time.monotonic()
+        trash.purge(entry["id"])
+        assert _wait_for(lambda: trash.entries() == [])
+
+        # 111 files and folders at 500 per second
+        assert time.monotonic() - started >= 0.2
+        assert trash.stats()["purged"] == 1
+        assert list((temp_dir / "trash").iterdir()) == []
+        trash.close()
+
+    def test_recover_interrupted_purge(self, temp_dir):
+        """Test that a new manager finishes purges left by an old one."""
+        trash = TrashManager(str(temp_dir / "trash"))
+        _make_tree(temp_dir / "kept")
+        _make_tree(temp_dir / "purging")
+        kept = trash.trash(str(temp_dir / "kept"))
+        purging = trash.trash(str(temp_dir / "purging"))
+        trash.close()
+
+        info_path = temp_dir / "trash" / purging["id"] / "info.json"
+        info = json.loads(info_path.read_text())
+        info_path.write_text(json.dumps({**info, "state": PURGING}))
+        (temp_dir / "trash" / "123-orphan").mkdir()
+
+        recovered = TrashManager(str(temp_dir / "trash"))
+        assert recovered.recover() == 2
+        assert _wait_for(lambda: [e["id"] for e in recovered.entries()] == [kept["id"]])
+        assert not (temp_dir / "trash" / "123-orphan").exists()
+
+        recovered.restore(kept["id"])
+        assert (temp_dir / "kept" / "pkg0" / "lib" / "m0.js").exists()
+        recovered.close()
+
+
+def test_trash_endpoints(temp_dir):
+    target = temp_dir / "folder"
+    _make_tree(target, dirs=2, files=3)
+
+    response = client.delete(f"/api/files/delete/?path={target}")
+    assert response.status_code == 200
+    trash_id = response.json()["trash_id"]
+    assert not target.exists()
+
+    entries = client.get("/api/files/trash").json()["entries"]
+    assert any(e["id"] == trash_id and e["path"] == str(target) for e in entries)
+
+    response = client.post(f"/api/files/trash/restore?trash_id={trash_id}")
+    assert response.status_code == 200
+    assert (target / "pkg1" / "lib" / "m2.js").exists()
+
+    response = client.post(f"/api/files/trash/restore?trash_id={trash_id}")
+    assert response.status_code == 404
+
+
+def test_volume_trash_is_hidden(temp_dir):
+    root = temp_dir / "root"
+    (root / "docs").mkdir(parents=True)
+    (root / "docs" / "plan.md").write_text("revenue plan")
+    (root / VOLUME_TRASH_NAME / "abc" / "item").mkdir(parents=True)
+    (root / VOLUME_TRASH_NAME / "abc" / "item" / "old.md").write_text("revenue old")
+
+    assert [item["name"] for item in iter_entries(str(root))] == ["docs"]
+
+    aggregator = TreeAggregator()
+    tree = aggregator.tree(str(root))["tree"]
+    assert [c["name"] for c in tree["children"]] == ["docs"]
+    assert tree["files"] == 1
+    aggregator.close()
+
+    file_index = FileIndex(str(temp_dir / "index.db"))
+    file_index.start()
+    file_index.add_root(str(root))
+    assert file_index.wait_until_idle(timeout=5)
+    assert [r["name"] for r in file_index.search("md")] == ["plan.md"]
+    file_index.close()
+
+    content_index = ContentIndex(str(temp_dir / "content.db"), max_workers=2)
+    content_index.refresh([str(root)])
+    assert [Path(r["path"]).name for r in content_index.search("revenue")] == [
+        "plan.md"
+    ]
+
+
+def test_deleted_path_leaves_indexes(temp_dir, monkeypatch):
+    root = temp_dir / "root"
+    (root / "docs").mkdir(parents=True)
+    (root / "docs" / "plan.md").write_text("revenue plan")
+    file_index = FileIndex(str(temp_dir / "index.db"))
+    file_index.start()
+    file_index.add_root(str(root))
+    content_index = ContentIndex(str(temp_dir / "content.db"), max_workers=2)
+    content_index.refresh([str(root)])
+    monkeypatch.setattr(fs_api, "_file_index", file_index)
+    monkeypatch.setattr(fs_api, "_content_index", content_index)
+
+    try:
+        assert file_index.wait_until_idle(timeout=5)
+        response = client.delete(f"/api/files/delete/?path={root / 'docs'}")
+        assert response.status_code == 200
+
+        assert file_index.wait_until_idle(timeout=5)
+        assert file_index.search("plan") == []
+        assert file_index.search("docs") == []
+        assert content_index.search("revenue") == []
+
+        trash_id = response.json()["trash_id"]
+        response = client.post(f"/api/files/trash/restore?trash_id={trash_id}")
+        assert response.status_code == 200
+        assert file_index.wait_until_idle(timeout=5)
+        assert [r["name"] for r in file_index.search("plan")] == ["plan.md"]
+        assert _wait_for(lambda: content_index.search("revenue"), timeout=30)
+    finally:
+        file_index.close()
+
+
+def test_delete_falls_back_when_rename_fails(temp_dir, monkeypatch):
+    target = temp_dir / "mounted"
+    _make_tree(target, dirs=1, files=2)
+    rename = os.rename
+
+    def failing_rename(src, dst):
+        if src == str(target):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        rename(src, dst)
+
+    monkeypatch.setattr(os, "rename", failing_rename)
+    response = client.delete(f"/api/files/delete/?path={target}")
+    assert response.status_code == 200
+    assert response.json()["trash_id"] is None
+    assert not target.exists()
+    # The half-made trash entry is cleaned up
+    assert all(e["path"] != str(target) for e in fs_api.get_trash().entries())
+
+
+def test_refuses_deleting_data_dir(data_dir):
+    data_dir.mkdir()
+    for path in (data_dir, data_dir.parent):
+        response = client.delete(f"/api/files/delete/?path={path}")
+        assert response.status_code == 400
+    assert data_dir.is_dir()
@@ -0,0 +1,135 @@
+import pytest
+from fastapi.testclient import TestClient
+from pathlib import Path
+import tempfile
+import shutil
+import time
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from main import app
+from storage.tree import TreeAggregator
+from storage.watcher import ChangeWatcher
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def temp_dir():
+    temp_path = Path(tempfile.mkdtemp()).resolve()
+    (temp_path / "docs" / "2024").mkdir(parents=True)
+    (temp_path / "media").mkdir()
+    (temp_path / "root.txt").write_bytes(b"x" * 10)
+    (temp_path / "docs" / "a.txt").write_bytes(b"x" * 100)
+    (temp_path / "docs" / "2024" / "b.txt").write_bytes(b"x" * 1000)
+    (temp_path / "media" / "c.bin").write_bytes(b"x" * 5000)
+    yield temp_path
+    shutil.rmtree(temp_path, ignore_errors=True)
+
+
+@pytest.fixture
+def aggregator():
+    instance = TreeAggregator(max_workers=4)
+    yield instance
+    instance.close()
+
+
+def _wait_for(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+def _child(tree, name):
+    return next(c for c in tree["children"] if c["name"] == name)
+
+
+class TestTreeAggregator:
+    """Test folder size aggregation."""
+
+    def test_aggregates(self, temp_dir, aggregator):
+        """Test total sizes and counts across nested folders."""
+        result = aggregator.tree(str(temp_dir), depth=2)
+        tree = result["tree"]
+
+        assert result["complete"] is True
+        assert result["scanned"] == 4
+        assert (tree["size"], tree["files"], tree["dirs"]) == (6110, 4, 3)
+        assert [c["name"] for c in tree["children"]] == ["media", "docs"]
+        docs = _child(tree, "docs")
+        assert (docs["size"], docs["files"]) == (1100, 2)
+        assert _child(docs, "2024")["size"] == 1000
+
+    def test_depth_and_limit(self, temp_dir, aggregator):
+        """Test that depth and limit only trim the returned tree."""
+        tree = aggregator.tree(str(temp_dir), depth=1, limit=1)["tree"]
+
+        assert tree["size"] == 6110
+        assert [c["name"] for c in tree["children"]] == ["media"]
+        assert tree["more_children"] == 1
+        assert "children" not in tree["children"][0]
+
+    def test_scan_budget(self, temp_dir, aggregator):
+        """Test that trees over max_entries are reported incomplete."""
+        result = aggregator.tree(str(temp_dir), max_entries=2)
+
+        assert result["complete"] is False
+
+    def test_incremental_update(self, temp_dir, aggregator):
+        """Test that a change rescans only the directory it happened in."""
+        if not aggregator.watcher.available:
+            pytest.skip("inotify unavailable")
+
+        aggregator.tree(str(temp_dir))
+        assert aggregator.tree(str(temp_dir))["scanned"] == 0
+
+        (temp_dir / "docs" / "2024" / "b.txt").write_bytes(b"x" * 3000)
+        assert _wait_for(lambda: aggregator.stats()["memoized"] < 4)
+
+        result = aggregator.tree(str(temp_dir))
+        assert result["scanned"] == 1
+        assert result["tree"]["size"] == 8110
+        assert _child(result["tree"], "docs")["size"] == 3100
+
+    def test_deleted_directory(self, temp_dir, aggregator):
+        """Test that removed folders drop out of the totals."""
+        if not aggregator.watcher.available:
+            pytest.skip("inotify unavailable")
+
+        aggregator.tree(str(temp_dir))
+        shutil.rmtree(temp_dir / "media")
+        assert _wait_for(lambda: aggregator.stats()["directories"] == 3)
+
+        tree = aggregator.tree(str(temp_dir))["tree"]
+        assert (tree["size"], tree["dirs"]) == (1110, 2)
+
+    def test_polling_fallback(self, temp_dir):
+        """Test mtime revalidation when inotify is not available."""
+        watcher = ChangeWatcher()
+        watcher.close()
+        aggregator = TreeAggregator(watcher=watcher)
+        try:
+            aggregator.tree(str(temp_dir))
+            time.sleep(0.01)
+            (temp_dir / "media" / "d.bin").write_bytes(b"x" * 7)
+
+            tree = aggregator.tree(str(temp_dir))["tree"]
+            assert tree["size"] == 6117
+            assert aggregator.stats()["memoized"] == 0
+        finally:
+            aggregator.close()
+
+
+def test_tree_endpoint(temp_dir):
+    response = client.get(f"/api/files/tree?path={temp_dir}&depth=1")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["tree"]["size"] == 6110
+    assert len(data["tree"]["children"]) == 2
+
+    response = client.get(f"/api/files/tree?path={temp_dir / 'missing'}")
+    assert response.status_code == 404
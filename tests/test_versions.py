@@ -0,0 +1,202 @@
+import pytest
+from fastapi.testclient import TestClient
+from pathlib import Path
+import tempfile
+import shutil
+import random
+import io
+import sys
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src" / "backend"))
+
+from main import app
+from storage.versions import VersionNotFound, VersionStore, iter_chunks
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def temp_dir():
+    temp_path = Path(tempfile.mkdtemp()).resolve()
+    yield temp_path
+    shutil.rmtree(temp_path, ignore_errors=True)
+
+
+@pytest.fixture
+def store(temp_dir):
+    return VersionStore(str(temp_dir / "store"))
+
+
+def _document(count: int = 20000) -> list:
+    rnd = random.Random(7)
+    return [f"第 {i} 行 {rnd.random()}\n" for i in range(count)]
+
+
+def _write(path: Path, lines: list) -> None:
+    path.write_text("".join(lines), encoding="utf-8")
+
+
+class TestChunking:
+    """Test content-defined chunking."""
+
+    def test_chunks_reassemble(self):
+        """Test that chunks cover the input exactly within size bounds."""
+        data = random.Random(1).randbytes(300_000)
+        chunks = list(iter_chunks(io.BytesIO(data), 1024, 10, 8192))
+
+        assert b"".join(chunks) == data
+        assert all(len(c) <= 8192 for c in chunks)
+        assert all(len(c) >= 1024 for c in chunks[:-1])
+
+    def test_insert_keeps_later_chunks(self):
+        """Test that an insert only changes the chunks around it."""
+        data = random.Random(2).randbytes(500_000)
+        edited = data[:1000] + b"inserted" + data[1000:]
+
+        before = set(iter_chunks(io.BytesIO(data)))
+        after = list(iter_chunks(io.BytesIO(edited)))
+        changed = [c for c in after if c not in before]
+
+        assert sum(len(c) for c in changed) < 70_000
+
+
+class TestVersionStore:
+    """Test snapshots, restore and diff."""
+
+    def test_edits_share_chunks(self, temp_dir, store):
+        """Test that a small edit of a large file stores little new data."""
+        path = temp_dir / "doc.txt"
+        lines = _document()
+        _write(path, lines)
+        store.snapshot(str(path))
+        stored = store.stats()["stored_bytes"]
+
+        lines[10000] = "changed\n"
+        _write(path, lines)
+        store.snapshot(str(path))
+
+        stats = store.stats()
+        assert stats["versions"] == 2
+        assert stats["stored_bytes"] - stored < 20_000
+        assert stats["stored_bytes"] < stats["logical_bytes"] / 4
+
+    def test_undo_steps_back(self, temp_dir, store):
+        """Test that repeated undo walks back through versions."""
+        path = temp_dir / "a.txt"
+        for content in ("one", "two", "three"):
+            store.snapshot(str(path))
+            path.write_text(content)
+
+        store.restore(str(path))
+        assert path.read_text() == "two"
+        store.restore(str(path))
+        assert path.read_text() == "one"
+        with pytest.raises(VersionNotFound):
+            store.restore(str(path))
+
+        # The content replaced by the first undo was kept
+        newest = store.list_versions(str(path))[0]
+        assert newest["reason"] == "restore"
+        store.restore(str(path), newest["id"])
+        assert path.read_text() == "three"
+
+    def test_diff(self, temp_dir, store):
+        """Test that diffs carry absolute line numbers."""
+        path = temp_dir / "doc.txt"
+        lines = _document()
+        _write(path, lines)
+        version = store.snapshot(str(path))
+
+        original = lines[15000]
+        lines[15000] = "changed\n"
+        _write(path, lines)
+        diff = list(store.diff(str(path), version["id"], context=1))
+
+        assert diff[2] == "@@ -15000,3 +15000,3 @@\n"
+        assert diff[3:] == [
+            " " + lines[14999],
+            "-" + original,
+            "+changed\n",
+            " " + lines[15001],
+        ]
+
+    def test_version_limit(self, temp_dir):
+        """Test that old versions and their chunks are pruned."""
+        store = VersionStore(str(temp_dir / "store"), max_versions=2)
+        path = temp_dir / "a.txt"
+        for i in range(5):
+            path.write_text(f"version {i}")
+            store.snapshot(str(path))
+
+        versions = store.list_versions(str(path))
+        assert len(versions) == 2
+        assert store.stats()["chunks"] == 2
+
+    def test_restore_oldest_at_limit(self, temp_dir):
+        """Test that the safety snapshot does not prune the restore target."""
+        store = VersionStore(str(temp_dir / "store"), max_versions=3)
+        path = temp_dir / "a.txt"
+        for i in range(3):
+            path.write_text(f"version {i}")
+            store.snapshot(str(path))
+        path.write_text("current")
+        oldest = store.list_versions(str(path))[-1]
+
+        store.restore(str(path), oldest["id"])
+
+        assert path.read_text() == "version 0"
+        versions = store.list_versions(str(path))
+        assert len(versions) == 3
+        assert versions[0]["reason"] == "restore"
+        assert oldest["id"] in [v["id"] for v in versions]
+
+
+def test_version_endpoints(temp_dir):
+    path = temp_dir / "notes.txt"
+    client.post(f"/api/files/write/?path={path}", json={"content": "first\n"})
+    client.post(f"/api/files/write/?path={path}", json={"content": "second\n"})
+
+    response = client.get(f"/api/files/versions?path={path}")
+    assert response.status_code == 200
+    versions = response.json()["versions"]
+    assert versions[0]["reason"] == "write"
+
+    response = client.get(
+        f"/api/files/versions/diff?path={path}&from_version={versions[0]['id']}"
+    )
+    assert response.status_code == 200
+    assert "-first\n+second\n" in response.text
+
+    response = client.post(f"/api/files/versions/restore?path={path}")
+    assert response.status_code == 200
+    assert path.read_text() == "first\n"
+
+    client.delete(f"/api/files/delete/?path={path}")
+    response = client.post(f"/api/files/versions/restore?path={path}")
+    assert response.status_code == 200
+    assert path.read_text() == "first\n"
+
+    response = client.get(
+        f"/api/files/versions/diff?path={path}&from_version=999999999"
+    )
+    assert response.status_code == 404
+
+
+def test_overwrites_are_versioned(temp_dir):
+    source = temp_dir / "new.txt"
+    target = temp_dir / "old.txt"
+    source.write_text("new\n")
+    target.write_text("old\n")
+
+    response = client.post(
+        "/api/files/copy",
+        json={"source": str(source), "destination": str(target), "overwrite": True},
+    )
+    assert response.status_code == 200
+    assert target.read_text() == "new\n"
+
+    versions = client.get(f"/api/files/versions?path={target}").json()["versions"]
+    assert versions[0]["reason"] == "overwrite"
+    response = client.post(f"/api/files/versions/restore?path={target}")
+    assert response.status_code == 200
+    assert target.read_text() == "old\n"